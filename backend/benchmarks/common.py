@@ -0,0 +1,80 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Every benchmark runs inside a throwaway PostgreSQL schema so it can be pointed
+at the local Docker database without touching the migrated tables.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from backend.core.config import DATABASE_URL
+
+
+def add_database_arguments(parser):
+    """Add the options every benchmark CLI shares to an ``argparse`` parser."""
+    parser.add_argument('--database-url', default=DATABASE_URL, help='PostgreSQL URL to benchmark against.')
+    parser.add_argument('--seasons', type=int, default=40, help='Synthetic seasons per league.')
+    parser.add_argument('--leagues', type=int, default=1, help='Synthetic leagues.')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed executions per query.')
+    parser.add_argument('--schema', default='benchmark', help='Scratch schema created and dropped by the run.')
+    return parser
+
+
+@contextmanager
+def scratch_schema(engine, name='benchmark'):
+    """
+    Yield a connection whose ``search_path`` only sees a freshly created schema.
+
+    The schema and everything in it is dropped when the block exits.
+    """
+    with engine.connect() as connection:
+        connection.execute(text(f'DROP SCHEMA IF EXISTS {name} CASCADE'))
+        connection.execute(text(f'CREATE SCHEMA {name}'))
+        connection.execute(text(f'SET search_path TO {name}'))
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            connection.execute(text(f'DROP SCHEMA IF EXISTS {name} CASCADE'))
+            connection.commit()
+
+
+def measure(function, repeat=20):
+    """
+    Call ``function`` ``repeat`` times and return latency percentiles.
+
+    Returns:
+        dict: ``p50`` and ``p99`` latencies in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def time_query(connection, statement, params=None, repeat=20):
+    """Return the median latency in milliseconds of a fully fetched query."""
+    return measure(lambda: connection.execute(statement, params or {}).fetchall(), repeat)['p50']
+
+
+def explain(connection, statement, params=None):
+    """Return the ``EXPLAIN ANALYZE`` plan of a textual statement as a string."""
+    plan = connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {statement.text}'), params or {})
+    return '\n'.join(row[0] for row in plan)
+
+
+def print_table(headers, rows):
+    """Print ``rows`` as a fixed-width text table."""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for line in [headers, ['-' * width for width in widths], *rows]:
+        print('  '.join(str(value).ljust(width) for value, width in zip(line, widths)))
@@ -0,0 +1,126 @@
+"""
+Load-test the engines of backend.db.database with and without pooling.
+
+Seeds synthetic seasons, then runs ``--clients`` concurrent clients that each
+check out a connection, read one season's standings and give the connection
+back. Reports p50/p99 latency and throughput for a pooled engine, the same
+engine with ``NullPool`` (a new connection per request) and, when asyncpg is
+installed, the async engine.
+
+Usage:
+    python -m backend.benchmarks.connection_pool --clients 32 --requests 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event, text
+
+from backend.benchmarks.common import add_database_arguments, print_table, scratch_schema
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.database import create_async_db_engine, create_db_engine
+
+QUERY = text('SELECT * FROM standings WHERE league_id = :league_id AND season_id = :season_id ORDER BY rank')
+
+
+def _use_schema(engine, schema):
+    """Point every new connection of ``engine`` at the scratch schema."""
+    @event.listens_for(getattr(engine, 'sync_engine', engine), 'connect')
+    def set_search_path(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET search_path TO {schema}')
+        cursor.close()
+
+
+def _summary(samples, elapsed):
+    samples.sort()
+    return [
+        f'{samples[len(samples) // 2]:.2f}',
+        f'{samples[min(len(samples) - 1, int(len(samples) * 0.99))]:.2f}',
+        f'{len(samples) / elapsed:,.0f}',
+    ]
+
+
+def run_sync(engine, scopes, clients, requests):
+    """Run ``clients`` threads issuing ``requests`` queries each; return latencies in ms and elapsed seconds."""
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            with engine.connect() as connection:
+                connection.execute(QUERY, rng.choice(scopes)).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client, range(clients)))
+    return [sample for samples in results for sample in samples], time.perf_counter() - started
+
+
+async def run_async(engine, scopes, clients, requests):
+    """Async counterpart of :func:`run_sync`, one task per client."""
+    async def client(seed_value):
+        rng = random.Random(seed_value)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            async with engine.connect() as connection:
+                (await connection.execute(QUERY, rng.choice(scopes))).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(value) for value in range(clients)))
+    await engine.dispose()
+    return [sample for samples in results for sample in samples], time.perf_counter() - started
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent clients.')
+    parser.add_argument('--requests', type=int, default=200, help='Queries per client.')
+    parser.add_argument('--pool-size', type=int, default=10, help='Pool size of the pooled engines.')
+    args = parser.parse_args()
+
+    results = []
+    with scratch_schema(create_engine(args.database_url), args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seed(connection, seasons=args.seasons, leagues=args.leagues)
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+        scopes = [
+            dict(row) for row in
+            connection.execute(text('SELECT DISTINCT league_id, season_id FROM standings')).mappings()
+        ]
+
+        engines = {
+            'QueuePool': create_db_engine(args.database_url, pool_size=args.pool_size, max_overflow=0),
+            'NullPool': create_db_engine(args.database_url, pooled=False),
+        }
+        for name, engine in engines.items():
+            _use_schema(engine, args.schema)
+            samples, elapsed = run_sync(engine, scopes, args.clients, args.requests)
+            engine.dispose()
+            results.append([name, *_summary(samples, elapsed)])
+
+        try:
+            async_engine = create_async_db_engine(args.database_url, pool_size=args.pool_size, max_overflow=0)
+        except ImportError:
+            print('asyncpg is not installed; skipping the async engine')
+        else:
+            _use_schema(async_engine, args.schema)
+            samples, elapsed = asyncio.run(run_async(async_engine, scopes, args.clients, args.requests))
+            results.append(['asyncpg QueuePool', *_summary(samples, elapsed)])
+
+    print()
+    print(f'{args.clients} clients x {args.requests} requests')
+    print_table(['engine', 'p50 ms', 'p99 ms', 'queries/s'], results)
+
+
+if __name__ == '__main__':
+    main()
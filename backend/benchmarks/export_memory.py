@@ -0,0 +1,109 @@
+"""
+Check that streaming exports stay under a fixed memory budget.
+
+Seeds the synthetic seasons, then inserts ``--rows`` extra finished matches
+server-side with ``generate_series`` (so the rows never exist in this process)
+and exports the whole ``matches`` table in every format through
+backend.db.export, discarding the output. The resident set size is sampled
+after every chunk; the run fails when it grows by more than ``--budget-mb``
+past the first chunk.
+
+Usage:
+    python -m backend.benchmarks.export_memory --rows 1000000 --budget-mb 64
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+from backend.benchmarks.common import add_database_arguments, print_table, scratch_schema
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.export import CHUNK_SIZE, FORMATS, export
+
+TEAMS = 20
+# Above the ids of the synthetic matches
+FIRST_ID = 10000000
+
+BULK_MATCHES = text("""
+    INSERT INTO matches (id, league_id, season_id, season_year, date, round, home_team_id, away_team_id,
+                         home_goals, away_goals, status)
+    SELECT :first_id + g, seasons.league_id, seasons.id, seasons.year,
+           seasons.start_date + g * interval '1 minute', 'Regular Season - ' || (g % 38 + 1),
+           1 + g % :teams, 1 + (g + 1) % :teams, g % 4, g % 3, 'Match Finished'
+    FROM generate_series(1, :rows) AS g
+    JOIN seasons ON seasons.id = 1 + g % (SELECT count(*) FROM seasons)
+""")
+
+
+def rss_mb():
+    """Return the current resident set size in MB (the peak one where /proc is not available)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def measure_export(connection, format_name, chunk_size):
+    """
+    Export ``matches`` and return ``[bytes written, seconds, first chunk MB, growth MB]``.
+
+    The first chunk pays one-time costs (pyarrow's libraries and allocator
+    arenas, the driver's buffers), so the growth checked against the budget is
+    the one past it: a streaming export must not grow with its size.
+    """
+    gc.collect()
+    baseline = rss_mb()
+    written = 0
+    started = time.perf_counter()
+    chunks = iter(export(connection, 'matches', format_name, chunk_size))
+    for data in chunks:
+        written += len(data)
+        break
+    first_chunk = peak = rss_mb()
+    for data in chunks:
+        written += len(data)
+        peak = max(peak, rss_mb())
+    return [written, time.perf_counter() - started, first_chunk - baseline, peak - first_chunk]
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--rows', type=int, default=1000000, help='Extra matches inserted server-side.')
+    parser.add_argument('--budget-mb', type=float, default=64, help='Allowed RSS growth past the first chunk.')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched and encoded at a time.')
+    parser.add_argument('--formats', nargs='+', choices=sorted(FORMATS), default=list(FORMATS))
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    results = []
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seeded = seed(connection, seasons=args.seasons, leagues=args.leagues, teams=TEAMS, players_per_team=0)
+        connection.execute(BULK_MATCHES, {'first_id': FIRST_ID, 'teams': TEAMS, 'rows': args.rows})
+        connection.commit()
+        total = seeded['matches'] + args.rows
+
+        for format_name in args.formats:
+            written, seconds, first_chunk, growth = measure_export(connection, format_name, args.chunk_size)
+            connection.rollback()
+            results.append([
+                format_name, f'{written / 2 ** 20:,.1f}', f'{seconds:.1f}', f'{total / seconds:,.0f}',
+                f'{first_chunk:.1f}', f'{growth:.1f}', 'ok' if growth <= args.budget_mb else 'OVER BUDGET',
+            ])
+
+    print()
+    print(f'{total:,} matches, chunks of {args.chunk_size:,} rows, budget {args.budget_mb:g} MB')
+    print_table(['format', 'MB written', 'seconds', 'rows/s', 'first chunk MB', 'growth MB', 'budget'], results)
+    if any(row[-1] != 'ok' for row in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
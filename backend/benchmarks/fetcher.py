@@ -0,0 +1,196 @@
+"""
+Time a full-season backfill through backend.ingestion.fetcher against a mock API.
+
+Starts a local HTTP server that answers like API-Football for one synthetic
+season (fixtures, per-fixture statistics, players and predictions, teams,
+team statistics, standings and paginated players), with per-minute and daily
+quota headers, 429s over the per-minute limit, ETags and ``304 Not Modified``.
+It then reports the wall-clock time and the quota used for:
+
+* a cold run with one request at a time, then with ``--concurrency``;
+* a warm re-run (everything served from the cache);
+* a revalidation run (every entry stale, answered with 304s);
+* a run interrupted half-way and resumed from its checkpoint.
+
+Usage:
+    python -m backend.benchmarks.fetcher --teams 20 --latency 0.04 --rate-limit 6000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import aclosing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from backend.benchmarks.common import print_table
+from backend.benchmarks.synthetic import FINISHED, generate
+from backend.ingestion.fetcher import Checkpoint, Fetcher, ResponseCache, backfill_season
+
+LEAGUE_ID = 71
+SEASON = 2024
+PAGE_SIZE = 20
+
+
+def _envelope(endpoint, params, response, page=1, total=1):
+    return {
+        'get': endpoint, 'parameters': params, 'errors': [], 'results': len(response),
+        'paging': {'current': page, 'total': total}, 'response': response,
+    }
+
+
+class MockApiFootball:
+    """API-Football look-alike serving one synthetic season."""
+
+    def __init__(self, teams=20, latency=0.04, per_minute=6000, daily=100000):
+        data = generate(seasons=1, teams=teams)
+        # A finished season, as backfills fetch
+        self.matches = [{**match, 'status': FINISHED} for match in data['matches']]
+        self.teams = data['teams']
+        self.players = data['players']
+        self.latency = latency
+        self.per_minute = per_minute
+        self.daily = daily
+        self.served = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def route(self, endpoint, params):
+        """Return the response body for a request."""
+        if endpoint == 'fixtures':
+            response = [{
+                'fixture': {'id': match['id'], 'date': match['date'].isoformat(), 'status': {'short': 'FT'}},
+                'teams': {'home': {'id': match['home_team_id']}, 'away': {'id': match['away_team_id']}},
+                'goals': {'home': match['home_goals'], 'away': match['away_goals']},
+            } for match in self.matches]
+        elif endpoint in ('fixtures/statistics', 'fixtures/players'):
+            match = next(match for match in self.matches if match['id'] == int(params['fixture']))
+            response = [{'team': {'id': team_id}, 'statistics': []}
+                        for team_id in (match['home_team_id'], match['away_team_id'])]
+        elif endpoint == 'predictions':
+            response = [{'predictions': {'advice': 'Double chance', 'percent': {'home': '45%'}}}]
+        elif endpoint == 'teams':
+            response = [{'team': {'id': team['id'], 'name': team['name']}} for team in self.teams]
+        elif endpoint == 'teams/statistics':
+            response = {'team': {'id': int(params['team'])}, 'form': 'WDLWW'}
+        elif endpoint == 'standings':
+            response = [{'league': {'standings': [[{'rank': team['id'], 'team': {'id': team['id']}}
+                                                   for team in self.teams]]}}]
+        elif endpoint == 'players':
+            page = int(params.get('page', 1))
+            total = -(-len(self.players) // PAGE_SIZE)
+            players = self.players[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            return _envelope(endpoint, params, [{'player': {'id': player['id']}} for player in players], page, total)
+        else:
+            response = []
+        return _envelope(endpoint, params, response)
+
+    def admit(self):
+        """Count a request against the quotas; return the remaining per-minute quota, or None when over it."""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] > 60:
+                self._window.popleft()
+            if len(self._window) >= self.per_minute:
+                return None
+            self._window.append(now)
+            self.served += 1
+            return self.per_minute - len(self._window)
+
+    def serve(self):
+        """Start the server in a background thread and return it."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                remaining = api.admit()
+                if remaining is None:
+                    self.send_response(429)
+                    self.send_header('X-RateLimit-Limit', str(api.per_minute))
+                    self.send_header('X-RateLimit-Remaining', '0')
+                    self.end_headers()
+                    return
+                time.sleep(api.latency)
+                body = json.dumps(api.route(url.path.strip('/'), dict(parse_qsl(url.query)))).encode()
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                not_modified = self.headers.get('If-None-Match') == etag
+                self.send_response(304 if not_modified else 200)
+                self.send_header('ETag', etag)
+                self.send_header('x-ratelimit-requests-limit', str(api.daily))
+                self.send_header('x-ratelimit-requests-remaining', str(api.daily - api.served))
+                self.send_header('X-RateLimit-Limit', str(api.per_minute))
+                self.send_header('X-RateLimit-Remaining', str(remaining))
+                if not_modified:
+                    self.end_headers()
+                    return
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+async def run(api, url, cache_dir, concurrency, ttl=None, checkpoint=None, stop_after=None):
+    """Backfill the mock season once; return ``[seconds, requests served, responses yielded]``."""
+    served = api.served
+    yielded = 0
+    started = time.perf_counter()
+    async with Fetcher(base_url=url, api_key='benchmark', cache=ResponseCache(cache_dir),
+                       rate_limit=api.per_minute, concurrency=concurrency) as fetcher:
+        async with aclosing(backfill_season(fetcher, LEAGUE_ID, SEASON, checkpoint, ttl=ttl)) as responses:
+            async for _ in responses:
+                yielded += 1
+                if stop_after and yielded >= stop_after:
+                    break
+    return [f'{time.perf_counter() - started:.2f}', api.served - served, yielded]
+
+
+async def benchmark(args):
+    api = MockApiFootball(args.teams, args.latency, args.rate_limit)
+    server = api.serve()
+    url = f'http://127.0.0.1:{server.server_port}'
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        results.append(['cold, sequential', *await run(api, url, directory / 'sequential', 1)])
+        results.append([f'cold, {args.concurrency} concurrent',
+                        *await run(api, url, directory / 'cache', args.concurrency)])
+        results.append(['warm re-run', *await run(api, url, directory / 'cache', args.concurrency)])
+        results.append(['revalidate (ttl=0)', *await run(api, url, directory / 'cache', args.concurrency, ttl=0)])
+
+        checkpoint = directory / 'resume.done'
+        interrupted = await run(api, url, directory / 'resume', args.concurrency,
+                                checkpoint=Checkpoint(checkpoint), stop_after=results[1][3] // 2)
+        results.append(['interrupted half-way', *interrupted])
+        results.append(['resumed', *await run(api, url, directory / 'resume', args.concurrency,
+                                             checkpoint=Checkpoint(checkpoint))])
+    server.shutdown()
+
+    print()
+    print(f'{args.teams} teams, {args.latency * 1000:.0f} ms latency, {args.rate_limit} requests/minute')
+    print_table(['run', 'seconds', 'quota used', 'responses'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--teams', type=int, default=20, help='Teams in the mock season.')
+    parser.add_argument('--latency', type=float, default=0.04, help='Mock server latency in seconds.')
+    parser.add_argument('--rate-limit', type=int, default=6000, help='Mock per-minute quota.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests.')
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Load test the stats endpoints with and without ETag revalidation.
+
+Seeds the synthetic seasons into a scratch schema, serves backend.main's app
+in-process through httpx's ASGI transport and sends ``--requests`` requests
+per endpoint from ``--concurrency`` concurrent clients, twice: as first
+fetches (200, query and serialization) and as React Query revalidations
+carrying the ETag of the first response (304 from the middleware). It reports
+throughput, latency and the SQL statements executed per request.
+
+Usage:
+    python -m backend.benchmarks.http_cache --seasons 40 --requests 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.benchmarks.common import add_database_arguments, print_table, scratch_schema
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.database import get_db
+from backend.db.versions import DataVersions
+from backend.main import app
+
+
+async def _load(client, url, requests, concurrency, headers=None):
+    """Send ``requests`` GETs from ``concurrency`` workers; return latencies in ms, wall time and statuses."""
+    latencies = []
+    statuses = set()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.add(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started, statuses
+
+
+async def benchmark(args, statements, season_id):
+    urls = [
+        f'/standings?season_id={season_id}',
+        f'/matches?season_id={season_id}&limit=100',
+        f'/player-statistics?season_id={season_id}&order_by=goals&limit=100',
+    ]
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        for url in urls:
+            first = await client.get(url)
+            first.raise_for_status()
+            for name, headers in (('200', None), ('304', {'If-None-Match': first.headers['etag']})):
+                executed = statements[0]
+                latencies, seconds, statuses = await _load(client, url, args.requests, args.concurrency, headers)
+                latencies.sort()
+                rows.append([
+                    url.split('?')[0], name, '/'.join(map(str, sorted(statuses))),
+                    f'{args.requests / seconds:,.0f}', f'{statistics.median(latencies):.2f}',
+                    f'{latencies[int(len(latencies) * 0.99) - 1]:.2f}',
+                    f'{(statements[0] - executed) / args.requests:.2f}',
+                ])
+    return rows
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and mode.')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients.')
+    args = parser.parse_args()
+
+    # Every pooled connection of the app must see the scratch schema
+    engine = create_engine(args.database_url, connect_args={'options': f'-csearch_path={args.schema}'})
+    statements = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(*_):
+        statements[0] += 1
+
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seed(connection, seasons=args.seasons, leagues=args.leagues)
+        connection.commit()
+
+        sessions = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        def get_benchmark_db():
+            with sessions() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = get_benchmark_db
+        app.state.data_versions = DataVersions(engine)
+        try:
+            rows = asyncio.run(benchmark(args, statements, args.seasons // 2))
+        finally:
+            app.dependency_overrides.clear()
+        engine.dispose()
+
+    print()
+    print(f'{args.requests} requests per row, {args.concurrency} concurrent clients')
+    print_table(['endpoint', 'mode', 'status', 'req/s', 'p50 ms', 'p99 ms', 'SQL/request'], rows)
+
+
+if __name__ == '__main__':
+    main()
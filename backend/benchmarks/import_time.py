@@ -0,0 +1,161 @@
+"""
+Measure the import time of the entry points with ``python -X importtime`` and check it against a budget.
+
+Each target runs in a fresh interpreter ``--repeat`` times. Its import time is
+the sum of the self times of every module imported, and the median is compared
+with the target's budget. Each target also lists modules it must not load:
+
+* ``api``: ``import backend.main``, as uvicorn does on a cold start. Pandas,
+  NumPy, PyArrow, httpx and the ingestion and processing packages stay out,
+  and no mapper is configured until the first query needs it;
+* ``migrations``: ``alembic upgrade <base> --sql``, which runs env.py offline
+  with no database, as ``alembic upgrade head`` does before every start. The
+  models stay out;
+* ``models``: ``import backend.db.models``, for reference.
+
+The run exits with status 1 when a target goes over its budget or loads a
+forbidden module, so it can guard against regressions in CI. Budgets are
+milliseconds on the machine running the check; raise them with ``--budget``
+on slower machines.
+
+Usage:
+    python -m backend.benchmarks.import_time
+    python -m backend.benchmarks.import_time --target api --repeat 7 --budget api=2000
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+from backend.benchmarks.common import print_table
+
+ROOT = Path(__file__).resolve().parents[2]
+
+HEAVY = ('pandas', 'numpy', 'pyarrow', 'httpx')
+
+# name -> (interpreter arguments, budget in ms, modules that must not be imported)
+TARGETS = {
+    'api': (
+        ['-c', 'import backend.main\n'
+               'from backend.db.base import Base\n'
+               'print(any(mapper.configured for mapper in Base.registry.mappers))'],
+        1500,
+        (*HEAVY, 'backend.ingestion', 'backend.processing'),
+    ),
+    'migrations': (
+        ['-m', 'alembic', 'upgrade', '{base}', '--sql'],
+        1200,
+        (*HEAVY, 'backend.db.models'),
+    ),
+    'models': (
+        ['-c', 'import backend.db.models'],
+        900,
+        HEAVY,
+    ),
+}
+
+
+def parse_importtime(stderr):
+    """
+    Parse the ``-X importtime`` report.
+
+    Returns:
+        dict: Module name mapped to its self time in microseconds.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, self_time, _, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+        modules[name] = int(self_time)
+    return modules
+
+
+def _base_revision():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(Config(str(ROOT / 'alembic.ini'))).get_base()
+
+
+def measure_target(arguments, repeat):
+    """
+    Run ``python -X importtime <arguments>`` ``repeat`` times.
+
+    Returns:
+        tuple: Median import time in ms, the modules imported by the last run
+        with their self times, and its standard output.
+    """
+    totals = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', *arguments], cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise RuntimeError(f'{" ".join(arguments)} failed:\n{result.stderr[-2000:]}')
+        modules = parse_importtime(result.stderr)
+        totals.append(sum(modules.values()) / 1000)
+    return statistics.median(totals), modules, result.stdout
+
+
+def forbidden_imports(modules, forbidden):
+    """Return the forbidden top-level packages or modules among ``modules``."""
+    return sorted({
+        prefix for prefix in forbidden
+        for name in modules if name == prefix or name.startswith(f'{prefix}.')
+    })
+
+
+def heaviest_packages(modules, count=5):
+    """Return the ``count`` top-level packages with the largest summed self time, in ms."""
+    packages = Counter()
+    for name, self_time in modules.items():
+        packages[name.split('.')[0]] += self_time / 1000
+    return ', '.join(f'{name} {ms:.0f}' for name, ms in packages.most_common(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per target.')
+    parser.add_argument('--budget', action='append', default=[], metavar='TARGET=MS',
+                        help='Override the budget of a target; repeat for several.')
+    parser.add_argument('--target', action='append', choices=list(TARGETS),
+                        help='Target to measure; repeat for several. All by default.')
+    args = parser.parse_args()
+    budgets = {name: budget for name, (_, budget, _) in TARGETS.items()}
+    for override in args.budget:
+        name, _, value = override.partition('=')
+        if name not in TARGETS or not value:
+            parser.error(f'--budget expects TARGET=MS with TARGET in {sorted(TARGETS)}')
+        budgets[name] = float(value)
+
+    failures = []
+    results = []
+    for name in args.target or TARGETS:
+        arguments, _, forbidden = TARGETS[name]
+        arguments = [argument.format(base=_base_revision()) if '{base}' in argument else argument
+                     for argument in arguments]
+        total, modules, stdout = measure_target(arguments, args.repeat)
+        loaded = forbidden_imports(modules, forbidden)
+        if name == 'api' and stdout.strip() != 'False':
+            loaded.append('configured mappers')
+        if total > budgets[name]:
+            failures.append(f'{name}: {total:.0f} ms is over its {budgets[name]:.0f} ms budget')
+        if loaded:
+            failures.append(f'{name}: loaded {", ".join(loaded)}')
+        results.append([
+            name, f'{total:.0f}', f'{budgets[name]:.0f}', len(modules), ', '.join(loaded) or 'none',
+            heaviest_packages(modules),
+        ])
+
+    print_table(['target', 'median ms', 'budget ms', 'modules', 'forbidden', 'heaviest packages (ms)'], results)
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
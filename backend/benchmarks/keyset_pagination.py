@@ -0,0 +1,104 @@
+"""
+Compare keyset and OFFSET pagination on deep pages.
+
+Seeds the synthetic seasons plus ``--players`` extra player statistics rows in
+one season (inserted server-side with ``generate_series``), walks the keyset
+cursors of backend.db.pagination to page ``--page`` and times page 1 and that
+page with both strategies, for matches by date and players by goals and by
+rating. Keyset pages stay flat; OFFSET pages grow with the page number.
+
+Usage:
+    python -m backend.benchmarks.keyset_pagination --seasons 40 --page 500 [--plans]
+"""
+import argparse
+
+from sqlalchemy import create_engine, text
+
+from backend.benchmarks.common import add_database_arguments, measure, print_table, scratch_schema
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.pagination import KEYSETS, decode_cursor, paginate
+
+PAGE_SIZE = 20
+# Above the ids of the synthetic players
+FIRST_ID = 10000000
+
+BULK_PLAYERS = (
+    text("""
+        INSERT INTO players (id, team_id, name)
+        SELECT :first_id + g, 1 + g % 20, 'Player ' || g FROM generate_series(1, :rows) AS g
+    """),
+    text("""
+        INSERT INTO player_statistics (id, player_id, team_id, league_id, season_id, goals_total, rating,
+                                       minutes_played)
+        SELECT :first_id + g, :first_id + g, 1 + g % 20, seasons.league_id, seasons.id, g % 31, (g % 97) / 10.0,
+               g % 3420
+        FROM generate_series(1, :rows) AS g
+        JOIN seasons ON seasons.id = :season_id
+    """),
+)
+
+
+def _offset(connection, keyset, page, filters):
+    statement = keyset.statement(limit=PAGE_SIZE, **filters).offset((page - 1) * PAGE_SIZE)
+    return lambda: connection.execute(statement).all()
+
+
+def _cursor_of_page(connection, keyset, page, filters):
+    """Follow the cursors up to the one that opens ``page``."""
+    cursor = None
+    for _ in range(page - 1):
+        cursor = paginate(connection, keyset, cursor, PAGE_SIZE, **filters).next_cursor
+        if cursor is None:
+            raise SystemExit(f"'{keyset.name}' has fewer than {page} pages; seed more rows")
+    return cursor
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--page', type=int, default=500, help='Deep page to time.')
+    parser.add_argument('--players', type=int, default=20000, help='Extra player statistics rows in one season.')
+    parser.add_argument('--plans', action='store_true', help='Print the plan of the deep keyset pages.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    rows = []
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seed(connection, seasons=args.seasons, leagues=args.leagues)
+        season_id = args.seasons // 2
+        for statement in BULK_PLAYERS:
+            connection.execute(statement, {'first_id': FIRST_ID, 'rows': args.players, 'season_id': season_id})
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+
+        listings = [
+            ('matches', {}),
+            ('player_statistics_goals', {'season_id': season_id}),
+            ('player_statistics_rating', {'season_id': season_id}),
+        ]
+        for name, filters in listings:
+            keyset = KEYSETS[name]
+            cursor = _cursor_of_page(connection, keyset, args.page, filters)
+            timings = {
+                'keyset 1': measure(lambda: paginate(connection, keyset, None, PAGE_SIZE, **filters), args.repeat),
+                f'keyset {args.page}': measure(
+                    lambda: paginate(connection, keyset, cursor, PAGE_SIZE, **filters), args.repeat
+                ),
+                'offset 1': measure(_offset(connection, keyset, 1, filters), args.repeat),
+                f'offset {args.page}': measure(_offset(connection, keyset, args.page, filters), args.repeat),
+            }
+            if args.plans:
+                statement = keyset.statement(decode_cursor(keyset, cursor), PAGE_SIZE, **filters)
+                compiled = statement.compile(connection, compile_kwargs={'literal_binds': True})
+                plan = connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {compiled}'))
+                print(f'\n--- {name}, page {args.page}\n' + '\n'.join(row[0] for row in plan))
+            rows.append([name, *(f"{timing['p50']:.3f}" for timing in timings.values())])
+
+    print()
+    print(f'{PAGE_SIZE} rows per page, p50 ms')
+    print_table(['listing', 'keyset 1', f'keyset {args.page}', 'offset 1', f'offset {args.page}'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare the precomputed leaderboards with the same leaderboards computed on the fly.
+
+Seeds the synthetic seasons, builds every leaderboard with
+backend.db.leaderboards.rebuild() and times, per metric, a season and the
+all-time leaderboard read from ``leaderboard_entries`` against the ranking
+query over ``player_statistics`` that refreshes them. Both must return the
+same players. Also times the write-path cost: refreshing one season's
+leaderboards, as each season load does, and the all-time ones, as each run
+does once.
+
+Usage:
+    python -m backend.benchmarks.leaderboards --seasons 40 --leagues 3 [--players-per-team 30]
+"""
+import argparse
+
+from sqlalchemy import create_engine, text
+
+from backend.benchmarks.common import add_database_arguments, measure, print_table, scratch_schema
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.leaderboards import leaderboard, live_leaderboard, rebuild, refresh_all_time, refresh_seasons
+
+LIMIT = 20
+MIN_MINUTES = 900
+BOARDS = ('goals', 'rating', 'goals_per_90')
+
+
+def _refresh(connection, refresh, *args):
+    def run():
+        refresh(connection, *args)
+        connection.rollback()
+    return run
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--players-per-team', type=int, default=30, help='Squad size of the synthetic teams.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    rows = []
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        counts = seed(connection, seasons=args.seasons, leagues=args.leagues, players_per_team=args.players_per_team)
+        written = rebuild(connection)
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+        print(f"{counts['player_statistics']} player statistics rows, {written} leaderboard rows")
+
+        season_id = args.seasons // 2
+        for metric in BOARDS:
+            for scope, scope_id in (('season', season_id), ('all-time', None)):
+                stored = leaderboard(connection, metric, scope_id, MIN_MINUTES, LIMIT)
+                live = live_leaderboard(connection, metric, scope_id, MIN_MINUTES, LIMIT)
+                if stored != live:
+                    raise SystemExit(f'{metric} ({scope}): the stored leaderboard differs from the live one')
+                timings = {
+                    'stored': measure(lambda: leaderboard(connection, metric, scope_id, MIN_MINUTES, LIMIT),
+                                      args.repeat),
+                    'live': measure(lambda: live_leaderboard(connection, metric, scope_id, MIN_MINUTES, LIMIT),
+                                    args.repeat),
+                }
+                connection.rollback()
+                rows.append([
+                    metric, scope, *(f"{timing[p]:.3f}" for timing in timings.values() for p in ('p50', 'p99')),
+                    f"{timings['live']['p50'] / timings['stored']['p50']:.1f}x",
+                ])
+        refreshes = {
+            'one season': measure(_refresh(connection, refresh_seasons, [season_id], False), args.repeat),
+            'all-time': measure(_refresh(connection, refresh_all_time), args.repeat),
+        }
+
+    print()
+    print(f'Top {LIMIT}, {MIN_MINUTES}+ minutes, ms')
+    print_table(['metric', 'scope', 'stored p50', 'stored p99', 'live p50', 'live p99', 'speedup'], rows)
+    print()
+    for name, refresh in refreshes.items():
+        print(f"Refreshing {name}: p50 {refresh['p50']:.1f} ms, p99 {refresh['p99']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the lookup indexes added in revision 401d1dfbd786.
+
+Seeds several decades of synthetic seasons, times the foreign-key lookups the
+API will run without any secondary index, creates the indexes declared in
+``backend/db/models.py`` and times the same queries again.
+
+Usage:
+    python -m backend.benchmarks.lookup_indexes --seasons 40 --leagues 4 [--plans]
+"""
+import argparse
+
+from sqlalchemy import create_engine, text
+
+from backend.benchmarks.common import add_database_arguments, explain, print_table, scratch_schema, time_query
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.models import FINISHED
+
+_FINISHED = ', '.join(f"'{status}'" for status in FINISHED)
+
+QUERIES = {
+    'team_statistics by team/season': text(
+        'SELECT * FROM team_statistics WHERE team_id = :team_id AND season_id = :season_id'
+    ),
+    'standings by team/season': text(
+        'SELECT * FROM standings WHERE team_id = :team_id AND season_id = :season_id'
+    ),
+    'player_statistics by team/season': text(
+        'SELECT * FROM player_statistics WHERE team_id = :team_id AND season_id = :season_id'
+    ),
+    'matches by season/date': text(
+        'SELECT * FROM matches WHERE season_id = :season_id ORDER BY date'
+    ),
+    'results by season': text(
+        f'SELECT * FROM matches WHERE season_id = :season_id AND status IN ({_FINISHED}) ORDER BY date'
+    ),
+    'upcoming fixtures': text(
+        "SELECT * FROM matches WHERE status = 'Not Started' ORDER BY date LIMIT 10"
+    ),
+    'match_statistics by match': text(
+        'SELECT * FROM match_statistics WHERE match_id = :match_id'
+    ),
+    'match_predictions by match': text(
+        'SELECT * FROM match_predictions WHERE match_id = :match_id'
+    ),
+}
+
+
+def _lookup_indexes():
+    return [index for table in Base.metadata.sorted_tables for index in table.indexes]
+
+
+def _run(connection, params, repeat, show_plans):
+    timings = {}
+    for name, statement in QUERIES.items():
+        latency = time_query(connection, statement, params, repeat)
+        plan = explain(connection, statement, params)
+        timings[name] = (latency, plan.splitlines()[0].split('  (')[0].strip())
+        if show_plans:
+            print(f'\n--- {name}\n{plan}')
+    return timings
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--plans', action='store_true', help='Print the full EXPLAIN ANALYZE output.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        for index in _lookup_indexes():
+            index.drop(connection)
+        counts = seed(connection, seasons=args.seasons, leagues=args.leagues)
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+        print('Seeded:', ', '.join(f'{name}={count}' for name, count in counts.items()))
+
+        params = {'team_id': 1, 'season_id': args.seasons // 2, 'match_id': counts['matches'] // 2}
+        before = _run(connection, params, args.repeat, args.plans)
+        for index in _lookup_indexes():
+            index.create(connection)
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+        after = _run(connection, params, args.repeat, args.plans)
+
+    rows = [
+        [name, f'{before[name][0]:.3f}', f'{after[name][0]:.3f}', f'{before[name][0] / after[name][0]:.1f}x',
+         before[name][1], after[name][1]]
+        for name in QUERIES
+    ]
+    print()
+    print_table(['query', 'before ms', 'after ms', 'speedup', 'plan before', 'plan after'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark partition pruning on the season-partitioned match tables.
+
+Seeds synthetic seasons into the partitioned tables, copies them into plain
+tables with equivalent indexes and times season-scoped queries on both.
+
+Usage:
+    python -m backend.benchmarks.partition_pruning --seasons 40 --leagues 4 [--plans]
+"""
+import argparse
+
+from sqlalchemy import create_engine, text
+
+from backend.benchmarks.common import add_database_arguments, explain, print_table, scratch_schema, time_query
+from backend.benchmarks.synthetic import FIRST_YEAR, seed
+from backend.db.base import Base
+
+QUERIES = {
+    'season matches by date': (
+        'SELECT * FROM {matches} WHERE season_year = :year ORDER BY date'
+    ),
+    'season home records': (
+        "SELECT home_team_id, count(*), sum(home_goals) FROM {matches} "
+        "WHERE season_year = :year AND status = 'Match Finished' GROUP BY home_team_id"
+    ),
+    'season shot averages': (
+        'SELECT team_id, avg(total_shots) FROM {match_statistics} WHERE season_year = :year GROUP BY team_id'
+    ),
+    'season statistics join': (
+        'SELECT m.id, s.team_id, s.total_shots FROM {matches} m '
+        'JOIN {match_statistics} s ON s.match_id = m.id AND s.season_year = m.season_year '
+        'WHERE m.season_year = :year'
+    ),
+}
+
+FLAT_COPIES = (
+    'CREATE TABLE flat_matches AS SELECT * FROM matches',
+    'CREATE TABLE flat_match_statistics AS SELECT * FROM match_statistics',
+    'ALTER TABLE flat_matches ADD PRIMARY KEY (id)',
+    'CREATE INDEX ON flat_matches (season_year, date)',
+    'CREATE INDEX ON flat_match_statistics (season_year)',
+    'CREATE INDEX ON flat_match_statistics (match_id)',
+)
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--plans', action='store_true', help='Print the full EXPLAIN ANALYZE output.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    rows = []
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seed(connection, seasons=args.seasons, leagues=args.leagues)
+        for statement in FLAT_COPIES:
+            connection.execute(text(statement))
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+
+        params = {'year': FIRST_YEAR + args.seasons // 2}
+        for name, query in QUERIES.items():
+            flat = text(query.format(matches='flat_matches', match_statistics='flat_match_statistics'))
+            partitioned = text(query.format(matches='matches', match_statistics='match_statistics'))
+            flat_ms = time_query(connection, flat, params, args.repeat)
+            partitioned_ms = time_query(connection, partitioned, params, args.repeat)
+            plan = explain(connection, partitioned, params)
+            scanned = sum(1 for line in plan.splitlines() if '_y' in line and ' on ' in line)
+            if args.plans:
+                print(f'\n--- {name} (flat)\n{explain(connection, flat, params)}')
+                print(f'\n--- {name} (partitioned)\n{plan}')
+            rows.append([
+                name, f'{flat_ms:.3f}', f'{partitioned_ms:.3f}', f'{flat_ms / partitioned_ms:.1f}x', scanned,
+            ])
+
+    print()
+    print_table(['query', 'flat ms', 'partitioned ms', 'speedup', 'partition scans'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Time the parallel backfill pipeline against a mock API, by number of transform processes.
+
+A mock API-Football runs in its own process, so serving requests does not
+compete with the pipeline's event loop. It answers for several synthetic
+seasons with bodies shaped like the real ones: fixtures, per-fixture team and
+player statistics, predictions, teams, team statistics, standings and paginated
+players. Every season is backfilled with 0 transform processes (transforms in
+the event loop), then 1, 2, 4... up to the number of cores, and a last time
+with a per-minute quota low enough to cap the request rate.
+
+Each run starts from a cold response cache. Rows are stored in a scratch
+schema, or only counted with ``--discard``.
+
+The time should drop as processes are added until fetching becomes the
+bottleneck: from then on the transform queue stays short, the fetch stage is
+busy for the whole run, and with the quota run, time is set by the quota.
+
+Usage:
+    python -m backend.benchmarks.pipeline --seasons 4 --discard
+    python -m backend.benchmarks.pipeline --seasons 4 --teams 20 --latency 0.01 --quota 3000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+from functools import partial
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from backend.benchmarks.common import add_database_arguments, print_table, scratch_schema
+from backend.benchmarks.fetcher import PAGE_SIZE, MockApiFootball, _envelope
+from backend.benchmarks.synthetic import FINISHED, _insert, generate
+from backend.db.base import Base
+from backend.ingestion.fetcher import Fetcher, ResponseCache
+from backend.ingestion.pipeline import Pipeline, store_season
+from backend.ingestion.transform import SeasonRef
+
+STATISTIC_TYPES = {
+    'shots_on_goal': 'Shots on Goal', 'total_shots': 'Total Shots', 'fouls': 'Fouls',
+    'corner_kicks': 'Corner Kicks', 'yellow_cards': 'Yellow Cards', 'red_cards': 'Red Cards',
+    'total_passes': 'Total passes', 'passes_accurate': 'Passes accurate',
+}
+PLAYED = 14
+
+
+class MockSeasons(MockApiFootball):
+    """API-Football look-alike serving every season of the synthetic dataset as finished."""
+
+    def __init__(self, seasons=4, leagues=1, teams=20, players_per_team=22, latency=0.01, per_minute=100000,
+                 daily=10000000):
+        super().__init__(teams, latency, per_minute, daily)
+        self.data = generate(seasons=seasons, teams=teams, leagues=leagues, players_per_team=players_per_team)
+        self.seasons = {(season['league_id'], season['year']): season for season in self.data['seasons']}
+        self.matches_by_season = {}
+        for match in self.data['matches']:
+            self.matches_by_season.setdefault(match['season_id'], []).append(match)
+        self.match_by_id = {match['id']: match for match in self.data['matches']}
+        self.statistics = {}
+        for row in self.data['match_statistics']:
+            self.statistics.setdefault(row['match_id'], []).append(row)
+        self.squads = {}
+        for player in self.data['players']:
+            self.squads.setdefault(player['team_id'], []).append(player)
+        self.stadiums = {stadium['id']: stadium for stadium in self.data['stadiums']}
+
+    def _fixture(self, match, season):
+        venue = self.stadiums[match['venue_id']]
+        goals = {'home': match['home_goals'], 'away': match['away_goals']}
+        home_won = goals['home'] is not None and goals['home'] > goals['away']
+        away_won = goals['home'] is not None and goals['home'] < goals['away']
+        return {
+            'fixture': {
+                'id': match['id'], 'referee': 'Referee', 'date': match['date'].isoformat() + '+00:00',
+                'venue': {'id': venue['id'], 'name': venue['name'], 'city': venue['city']},
+                'status': {'long': FINISHED, 'short': 'FT'} if match['status'] == FINISHED
+                else {'long': match['status'], 'short': 'NS'},
+            },
+            'league': {'id': season['league_id'], 'season': season['year'], 'round': match['round']},
+            'teams': {
+                'home': {'id': match['home_team_id'], 'winner': home_won if goals['home'] is not None else None},
+                'away': {'id': match['away_team_id'], 'winner': away_won if goals['home'] is not None else None},
+            },
+            'goals': goals,
+            'score': {
+                'halftime': {'home': None, 'away': None}, 'fulltime': goals,
+                'extratime': {'home': None, 'away': None}, 'penalty': {'home': None, 'away': None},
+            },
+        }
+
+    def _player_statistics(self, rng, player, position):
+        minutes = rng.randint(1, 90)
+        passes = rng.randint(5, 80)
+        return {
+            'games': {'minutes': minutes, 'number': player['id'] % 100, 'position': position,
+                      'rating': f'{rng.uniform(5.5, 8.5):.1f}', 'captain': False, 'substitute': minutes < 60},
+            'offsides': None,
+            'shots': {'total': rng.randint(0, 4), 'on': rng.randint(0, 2)},
+            'goals': {'total': rng.choices((0, 1, 2), weights=(85, 13, 2))[0], 'conceded': 0,
+                      'assists': rng.choices((0, 1), weights=(90, 10))[0], 'saves': None},
+            'passes': {'total': passes, 'key': rng.randint(0, 4), 'accuracy': str(passes * 8 // 10)},
+            'tackles': {'total': rng.randint(0, 5), 'blocks': rng.randint(0, 2), 'interceptions': rng.randint(0, 3)},
+            'duels': {'total': rng.randint(0, 15), 'won': rng.randint(0, 8)},
+            'dribbles': {'attempts': rng.randint(0, 5), 'success': rng.randint(0, 3), 'past': None},
+            'fouls': {'drawn': rng.randint(0, 3), 'committed': rng.randint(0, 3)},
+            'cards': {'yellow': rng.choices((0, 1), weights=(85, 15))[0], 'red': 0},
+            'penalty': {'won': None, 'commited': None, 'scored': 0, 'missed': 0, 'saved': None},
+        }
+
+    def route(self, endpoint, params):
+        """Return the response body for a request."""
+        if 'fixture' in params:
+            match = self.match_by_id[int(params['fixture'])]
+            if endpoint == 'fixtures/statistics':
+                response = [{
+                    'team': {'id': row['team_id']},
+                    'statistics': [
+                        {'type': 'Ball Possession', 'value': f"{row['ball_possession']}%"},
+                        {'type': 'Passes %', 'value': f"{row['pass_accuracy']}%"},
+                        *({'type': name, 'value': row[column]} for column, name in STATISTIC_TYPES.items()),
+                    ],
+                } for row in self.statistics.get(match['id'], ())]
+            elif endpoint == 'fixtures/players':
+                rng = random.Random(match['id'])
+                response = [{
+                    'team': {'id': team_id},
+                    'players': [
+                        {'player': {'id': player['id'], 'name': player['name']},
+                         'statistics': [self._player_statistics(rng, player, player['position'][0])]}
+                        for player in self.squads[team_id][:PLAYED]
+                    ],
+                } for team_id in (match['home_team_id'], match['away_team_id'])]
+            else:
+                response = [{'predictions': {'advice': 'Double chance', 'percent': {'home': '45%'}}}]
+            return _envelope(endpoint, params, response)
+
+        season = self.seasons[(int(params['league']), int(params['season']))]
+        if endpoint == 'fixtures':
+            response = [self._fixture(match, season) for match in self.matches_by_season[season['id']]]
+        elif endpoint == 'teams':
+            response = [{
+                'team': {'id': team['id'], 'name': team['name'], 'code': team['code'], 'country': team['country'],
+                         'founded': team['founded'], 'logo': None},
+                'venue': {key: self.stadiums[team['id']].get(key)
+                          for key in ('id', 'name', 'address', 'city', 'capacity', 'surface', 'image')},
+            } for team in self.data['teams']]
+        elif endpoint == 'players':
+            page = int(params.get('page', 1))
+            total = -(-len(self.data['players']) // PAGE_SIZE)
+            response = [{
+                'player': {'id': player['id'], 'name': player['name'], 'firstname': None, 'lastname': None,
+                           'age': player['age'], 'birth': {'date': '1995-01-01', 'place': None, 'country': 'Brazil'},
+                           'nationality': 'Brazil', 'height': '180 cm', 'weight': '75 kg', 'injured': False,
+                           'photo': None},
+                'statistics': [{'team': {'id': player['team_id']},
+                                'league': {'id': season['league_id'], 'season': season['year']},
+                                'games': {'position': player['position']}}],
+            } for player in self.data['players'][(page - 1) * PAGE_SIZE:page * PAGE_SIZE]]
+            return _envelope(endpoint, params, response, page, total)
+        elif endpoint == 'teams/statistics':
+            response = {'team': {'id': int(params['team'])}, 'form': 'WDLWW'}
+        else:
+            response = [{'league': {'standings': [[{'rank': team['id'], 'team': {'id': team['id']}}
+                                                   for team in self.data['teams']]]}}]
+        return _envelope(endpoint, params, response)
+
+
+def _serve(options, ports):
+    server = MockSeasons(**options).serve()
+    ports.put(server.server_port)
+    threading.Event().wait()
+
+
+def start_server(**options):
+    """Start a :class:`MockSeasons` server in a separate process; return the process and its URL."""
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    process = context.Process(target=_serve, args=(options, ports), daemon=True)
+    process.start()
+    return process, f'http://127.0.0.1:{ports.get(timeout=120)}'
+
+
+def _discard(season, season_rows):
+    return {table_name: len(rows) for table_name, rows in season_rows.items()}
+
+
+async def run(url, seasons, store, processes, args, cache_dir, per_minute):
+    """Backfill every season once and return the pipeline metrics."""
+    async with Fetcher(base_url=url, api_key='benchmark', cache=ResponseCache(cache_dir), rate_limit=per_minute,
+                       concurrency=args.concurrency) as fetcher:
+        async with Pipeline(fetcher, store, processes=processes, fetch_workers=args.fetch_workers,
+                            batch_size=args.batch_size) as pipeline:
+            return await pipeline.run(seasons, report=lambda line: None)
+
+
+def _row(label, processes, metrics):
+    stages, queues = metrics['stages'], metrics['queues']
+    return [
+        label, processes, f"{metrics['seconds']:.2f}", f"{stages['fetch']['responses_per_second']:,.0f}",
+        stages['write']['rows'], f"{stages['fetch']['busy']:.2f}",
+        f"{stages['transform']['busy']:.2f}", f"{stages['write']['busy']:.2f}",
+        f"{queues['transform']['max_depth']}/{queues['transform']['mean_depth']:.1f}",
+        f"{queues['transform']['blocked']:.2f}",
+    ]
+
+
+async def benchmark(args, data, store):
+    seasons = [SeasonRef(season['id'], season['league_id'], season['year']) for season in data['seasons']]
+    options = {'seasons': args.seasons, 'leagues': args.leagues, 'teams': args.teams,
+               'players_per_team': args.players_per_team, 'latency': args.latency}
+    counts = [0, *(2 ** power for power in range(8) if 2 ** power <= args.max_processes)]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        process, url = start_server(**options)
+        try:
+            for processes in counts:
+                metrics = await run(url, seasons, store, processes, args, Path(directory) / f'p{processes}',
+                                    100000)
+                results.append(_row('unlimited quota', processes, metrics))
+        finally:
+            process.terminate()
+
+        process, url = start_server(**options, per_minute=args.quota)
+        try:
+            metrics = await run(url, seasons, store, counts[-1], args, Path(directory) / 'quota', args.quota)
+            results.append(_row(f'{args.quota}/minute quota', counts[-1], metrics))
+        finally:
+            process.terminate()
+
+    print()
+    print(f'{len(seasons)} seasons, {args.teams} teams, {args.latency * 1000:.0f} ms latency, '
+          f'{os.cpu_count()} cores, batches of {args.batch_size}')
+    print_table(
+        ['run', 'processes', 'seconds', 'responses/s', 'rows', 'fetch s', 'transform s', 'write s',
+         'transform queue max/mean', 'fetch blocked s'],
+        results,
+    )
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.set_defaults(seasons=4)
+    parser.add_argument('--teams', type=int, default=20, help='Teams per league.')
+    parser.add_argument('--players-per-team', type=int, default=22)
+    parser.add_argument('--latency', type=float, default=0.01, help='Mock server latency in seconds.')
+    parser.add_argument('--quota', type=int, default=3000, help='Per-minute quota of the capped run.')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent requests.')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='Seasons fetched at once.')
+    parser.add_argument('--batch-size', type=int, default=50, help='Responses per transform batch.')
+    parser.add_argument('--max-processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--discard', action='store_true', help='Count the rows instead of storing them.')
+    args = parser.parse_args()
+
+    data = generate(seasons=args.seasons, teams=args.teams, leagues=args.leagues,
+                    players_per_team=args.players_per_team)
+    if args.discard:
+        asyncio.run(benchmark(args, data, _discard))
+        return
+    engine = create_engine(args.database_url, connect_args={'options': f'-csearch_path={args.schema}'})
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        for table_name in ('leagues', 'seasons'):
+            _insert(connection, table_name, data[table_name])
+        connection.commit()
+        # Every run merges the same rows again; they are unchanged after the first
+        asyncio.run(benchmark(args, data, partial(store_season, engine)))
+
+
+if __name__ == '__main__':
+    main()
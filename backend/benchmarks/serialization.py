@@ -0,0 +1,100 @@
+"""
+Compare the ways of turning a season of player statistics into JSON.
+
+Seeds the synthetic seasons into a scratch schema and serializes the
+PlayerStatistics rows of one season three ways:
+
+* ``orm → pydantic``: ORM instances validated into
+  :class:`backend.schemas.PlayerStatisticsSchema`, dumped by Pydantic;
+* ``core tuple → dict``: the projection of backend.db.serialization, with
+  dictionaries encoded by the standard ``json`` module;
+* ``core tuple → orjson``: the same projection encoded by orjson.
+
+It checks the three outputs are the same bytes and reports rows per second,
+query included and for the serialization alone (rows already fetched).
+
+Usage:
+    python -m backend.benchmarks.serialization --seasons 4 --players-per-team 60 --repeat 20
+"""
+import argparse
+import json
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from backend.benchmarks.common import add_database_arguments, measure, print_table, scratch_schema
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+from backend.db.models import PlayerStatistics
+from backend.db.serialization import PROJECTIONS
+from backend.schemas import PlayerStatisticsSchema
+
+ADAPTER = TypeAdapter(list[PlayerStatisticsSchema])
+PROJECTION = PROJECTIONS['player_statistics']
+
+
+def orm_pydantic(instances):
+    return ADAPTER.dump_json([PlayerStatisticsSchema.model_validate(instance) for instance in instances])
+
+
+def core_dict(rows):
+    return json.dumps(list(map(PROJECTION.to_dict, rows)), separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def core_orjson(rows):
+    return PROJECTION.encode(rows)
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    parser.add_argument('--players-per-team', type=int, default=60, help='Squad size, so the season size.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seed(connection, seasons=args.seasons, leagues=args.leagues, players_per_team=args.players_per_team)
+        connection.commit()
+        season_id = args.seasons // 2
+
+        orm_statement = (
+            select(PlayerStatistics).where(PlayerStatistics.season_id == season_id).order_by(PlayerStatistics.id)
+        )
+        core_statement = PROJECTION.statement(season_id=season_id)
+        session = Session(bind=connection)
+
+        def load_instances():
+            # A fresh identity map, as every request gets
+            session.expunge_all()
+            return session.scalars(orm_statement).all()
+
+        instances = load_instances()
+        rows = connection.execute(core_statement).all()
+        outputs = {orm_pydantic(instances), core_dict(rows), core_orjson(rows)}
+        if len(outputs) != 1:
+            raise SystemExit('The serialization paths disagree')
+
+        paths = [
+            ('orm → pydantic', lambda: orm_pydantic(load_instances()), lambda: orm_pydantic(instances)),
+            ('core tuple → dict', lambda: core_dict(connection.execute(core_statement)), lambda: core_dict(rows)),
+            ('core tuple → orjson', lambda: core_orjson(connection.execute(core_statement)),
+             lambda: core_orjson(rows)),
+        ]
+        table = []
+        for name, query_and_encode, encode in paths:
+            total = measure(query_and_encode, args.repeat)['p50']
+            alone = measure(encode, args.repeat)['p50']
+            table.append([
+                name, f'{total:.2f}', f'{len(rows) / total * 1000:,.0f}',
+                f'{alone:.2f}', f'{len(rows) / alone * 1000:,.0f}',
+            ])
+        session.close()
+
+    print()
+    print(f'{len(rows)} player statistics rows, {len(outputs.pop()):,} bytes of identical JSON')
+    print_table(['path', 'query+encode p50 ms', 'rows/s', 'encode p50 ms', 'rows/s'], table)
+
+
+if __name__ == '__main__':
+    main()
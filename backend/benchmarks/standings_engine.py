@@ -0,0 +1,66 @@
+"""
+Time the incremental standings engine against full recomputation.
+
+Generates a synthetic season in memory (with cards) and reports the cost of
+one result applied to a :class:`backend.processing.standings.StandingsTable`
+incrementally and recomputed from scratch. That both give the same table, for
+every competition's rules, is checked by ``backend/tests/test_standings.py``.
+
+Usage:
+    python -m backend.benchmarks.standings_engine --teams 20
+"""
+import argparse
+
+from backend.benchmarks.common import measure, print_table
+from backend.benchmarks.synthetic import FINISHED, generate
+from backend.processing.standings import RULES, StandingsTable
+
+LEAGUE_ID = 1
+SEASON_ID = 1
+
+
+def season_matches(teams, random_seed):
+    """Return the finished matches of one synthetic season with the cards of both sides."""
+    data = generate(seasons=1, teams=teams, players_per_team=0, random_seed=random_seed)
+    cards = {(row['match_id'], row['team_id']): row for row in data['match_statistics']}
+    matches = []
+    for match in data['matches']:
+        if match['status'] != FINISHED:
+            continue
+        row = {name: match[name] for name in (
+            'league_id', 'season_id', 'date', 'round', 'home_team_id', 'away_team_id', 'home_goals', 'away_goals',
+        )}
+        row['match_id'] = match['id']
+        for side in ('home', 'away'):
+            statistics_row = cards[match['id'], match[f'{side}_team_id']]
+            row[f'{side}_yellow_cards'] = statistics_row['yellow_cards']
+            row[f'{side}_red_cards'] = statistics_row['red_cards']
+        matches.append(row)
+    return sorted(matches, key=lambda match: (match['date'], match['match_id']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--teams', type=int, default=20, help='Teams per season.')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed runs per operation.')
+    args = parser.parse_args()
+
+    matches = season_matches(args.teams, 0)
+    last = matches[-1]
+    table = StandingsTable.from_matches(LEAGUE_ID, SEASON_ID, matches[:-1], RULES['brasileirao'])
+    corrected = {**last, 'home_goals': last['away_goals'], 'away_goals': last['home_goals']}
+    versions = iter([last, corrected] * (args.repeat + 1))
+    incremental = measure(lambda: table.apply(next(versions)), args.repeat)
+    full = measure(lambda: StandingsTable.from_matches(LEAGUE_ID, SEASON_ID, matches, RULES['brasileirao']),
+                   args.repeat)
+
+    print()
+    print(f'{len(matches)} finished matches, {args.teams} teams')
+    print_table(['one result', 'p50 ms', 'p99 ms'], [
+        ['incremental apply', f"{incremental['p50']:.3f}", f"{incremental['p99']:.3f}"],
+        ['full recomputation', f"{full['p50']:.3f}", f"{full['p99']:.3f}"],
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Compare the vectorized statistics engine with a naive per-match loop.
+
+Generates synthetic seasons in memory, computes TeamStatistics rows with
+backend.processing.statistics and with a straightforward loop over
+every match, checks that both agree and reports the timings. No database is
+needed: both implementations start from the rows a season query returns.
+
+Usage:
+    python -m backend.benchmarks.statistics_engine --seasons 50 --leagues 1
+"""
+import argparse
+
+import pandas as pd
+
+from backend.benchmarks.common import measure, print_table
+from backend.benchmarks.synthetic import FINISHED, generate
+from backend.db.formats import encode_form
+from backend.processing import statistics
+
+COLUMNS = ['match_id', 'league_id', 'season_id', 'home_team_id', 'away_team_id', 'home_goals', 'away_goals']
+
+
+def _naive_team_rows(matches):
+    teams = {}
+    for values in matches:
+        match = dict(zip(COLUMNS, values))
+        for is_home in (True, False):
+            team = match['home_team_id'] if is_home else match['away_team_id']
+            goals_for = match['home_goals'] if is_home else match['away_goals']
+            goals_against = match['away_goals'] if is_home else match['home_goals']
+            row = teams.setdefault((team, match['league_id'], match['season_id']), {'results': [], 'biggest': {}})
+            side = 'home' if is_home else 'away'
+            result = 'W' if goals_for > goals_against else 'D' if goals_for == goals_against else 'L'
+            row['results'].append(result)
+            for name, value in (
+                ('games_played', 1), (f'games_{side}', 1), ('goals_for', goals_for), ('goals_against', goals_against),
+                (f'goals_for_{side}', goals_for), (f'goals_against_{side}', goals_against),
+                ('clean_sheets', goals_against == 0), ('failed_to_score', goals_for == 0),
+            ):
+                row[name] = row.get(name, 0) + value
+            outcome = {'W': 'wins', 'D': 'draws', 'L': 'losses'}[result]
+            row[outcome] = row.get(outcome, 0) + 1
+            row[f'{outcome}_{side}'] = row.get(f'{outcome}_{side}', 0) + 1
+            if result != 'D':
+                name = f"biggest_{'win' if result == 'W' else 'loss'}_{side}"
+                rank = (abs(goals_for - goals_against), max(goals_for, goals_against))
+                if name not in row['biggest'] or rank > row['biggest'][name][0]:
+                    row['biggest'][name] = (rank, match['home_goals'], match['away_goals'])
+    return teams
+
+
+def naive_team_statistics(matches):
+    """Compute the TeamStatistics rows one match at a time."""
+    rows = []
+    for (team, league, season), row in _naive_team_rows(matches).items():
+        results = row['results']
+        streak = 1
+        while streak < len(results) and results[-streak - 1] == results[-1]:
+            streak += 1
+        output = {
+            'team_id': team, 'league_id': league, 'season_id': season, 'form': encode_form(''.join(results)),
+            'streak_wins': streak if results[-1] == 'W' else 0,
+            'streak_draws': streak if results[-1] == 'D' else 0,
+            'streak_losses': streak if results[-1] == 'L' else 0,
+        }
+        for name in ('games_played', 'games_home', 'games_away', 'wins', 'wins_home', 'wins_away', 'draws',
+                     'draws_home', 'draws_away', 'losses', 'losses_home', 'losses_away', 'goals_for',
+                     'goals_against', 'clean_sheets', 'failed_to_score'):
+            output[name] = int(row.get(name, 0))
+        for name, (_, home_goals, away_goals) in row['biggest'].items():
+            output[f'{name}_goals_home'] = home_goals
+            output[f'{name}_goals_away'] = away_goals
+        rows.append(output)
+    return rows
+
+
+def vectorized(matches):
+    stacked = statistics.games(pd.DataFrame.from_records(matches, columns=COLUMNS))
+    return statistics.team_statistics(stacked)
+
+
+def naive(matches):
+    return naive_team_statistics(matches)
+
+
+def _check(matches):
+    """Raise AssertionError when the two implementations disagree."""
+    expected = {(row['team_id'], row['season_id']): row for row in naive(matches)}
+    for row in statistics.records(vectorized(matches)):
+        reference = expected[row['team_id'], row['season_id']]
+        for name, value in reference.items():
+            assert row[name] == value, (name, row[name], value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seasons', type=int, default=50, help='Synthetic seasons per league.')
+    parser.add_argument('--leagues', type=int, default=1, help='Synthetic leagues.')
+    parser.add_argument('--teams', type=int, default=20, help='Teams per league.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per implementation.')
+    args = parser.parse_args()
+
+    data = generate(seasons=args.seasons, leagues=args.leagues, teams=args.teams, players_per_team=0)
+    # Rows as the season query returns them
+    matches = [
+        tuple(match['id'] if name == 'match_id' else match[name] for name in COLUMNS)
+        for match in sorted(data['matches'], key=lambda m: (m['date'], m['id'])) if match['status'] == FINISHED
+    ]
+    _check(matches)
+
+    naive_ms = measure(lambda: naive(matches), args.repeat)
+    vectorized_ms = measure(lambda: vectorized(matches), args.repeat)
+    print()
+    print(f'{len(matches):,} finished matches, {args.seasons * args.leagues} seasons; results match')
+    print_table(['implementation', 'p50 ms', 'p99 ms', 'speedup'], [
+        ['per-match loop', f"{naive_ms['p50']:.1f}", f"{naive_ms['p99']:.1f}", '1.0x'],
+        ['vectorized', f"{vectorized_ms['p50']:.1f}", f"{vectorized_ms['p99']:.1f}",
+         f"{naive_ms['p50'] / vectorized_ms['p50']:.1f}x"],
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Synthetic multi-season dataset shared by the benchmark scripts.
+
+The generator builds a double round-robin per league and season, so the row
+counts and value distributions look like a real Brasileirão history without
+having to call API-Football.
+"""
+import random
+from datetime import datetime, timedelta
+from itertools import permutations
+
+from backend.db.base import Base
+from backend.db.formats import encode_form
+from backend.db.partitions import ensure_partitions
+
+FINISHED = 'Match Finished'
+NOT_STARTED = 'Not Started'
+FIRST_YEAR = 1985
+CHUNK_SIZE = 5000
+
+
+def _insert(connection, table_name, rows):
+    """Insert ``rows`` into ``table_name`` in chunks of ``CHUNK_SIZE``."""
+    table = Base.metadata.tables[table_name]
+    for start in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+
+
+def _goals(rng):
+    return rng.choices(range(6), weights=(27, 35, 22, 10, 4, 2))[0]
+
+
+def _percent(rng, low=30, high=70):
+    return rng.randint(low, high)
+
+
+def generate(seasons=40, teams=20, leagues=1, players_per_team=22, random_seed=42):
+    """
+    Build the synthetic dataset in memory.
+
+    Args:
+        seasons (int): Number of seasons per league. The last one is current and half played.
+        teams (int): Number of teams playing every league.
+        leagues (int): Number of leagues.
+        players_per_team (int): Squad size used for the player tables.
+        random_seed (int): Seed for reproducible datasets.
+
+    Returns:
+        dict: Table name mapped to the list of row dictionaries, in insertion order.
+    """
+    rng = random.Random(random_seed)
+    data = {name: [] for name in (
+        'leagues', 'stadiums', 'teams', 'players', 'seasons', 'matches',
+        'match_statistics', 'match_predictions', 'standings', 'team_statistics',
+        'player_statistics',
+    )}
+
+    for league_id in range(1, leagues + 1):
+        data['leagues'].append({
+            'id': league_id, 'name': f'League {league_id}', 'type': 'league',
+            'country': 'Brazil',
+        })
+    for team_id in range(1, teams + 1):
+        data['stadiums'].append({
+            'id': team_id, 'name': f'Stadium {team_id}', 'address': f'Street {team_id}',
+            'city': f'City {team_id}', 'capacity': rng.randint(15000, 70000), 'surface': 'grass',
+        })
+        data['teams'].append({
+            'id': team_id, 'name': f'Team {team_id}', 'code': f'T{team_id:02d}',
+            'country': 'Brazil', 'founded': rng.randint(1890, 1950),
+        })
+        for number in range(players_per_team):
+            data['players'].append({
+                'id': team_id * 1000 + number, 'team_id': team_id,
+                'name': f'Player {team_id}-{number}', 'age': rng.randint(18, 36),
+                'position': rng.choice(('Goalkeeper', 'Defender', 'Midfielder', 'Attacker')),
+            })
+
+    season_id = 0
+    match_id = 0
+    fixtures = list(permutations(range(1, teams + 1), 2))
+    for league_id in range(1, leagues + 1):
+        for offset in range(seasons):
+            season_id += 1
+            year = FIRST_YEAR + offset
+            is_current = offset == seasons - 1
+            start = datetime(year, 4, 1)
+            data['seasons'].append({
+                'id': season_id, 'league_id': league_id, 'year': year,
+                'start_date': start, 'end_date': datetime(year, 12, 8),
+                'is_current': is_current,
+            })
+            rng.shuffle(fixtures)
+            for number, (home, away) in enumerate(fixtures):
+                match_id += 1
+                date = start + timedelta(hours=number * 12)
+                played = not is_current or number < len(fixtures) // 2
+                home_goals = _goals(rng) if played else None
+                away_goals = _goals(rng) if played else None
+                winner = None
+                if played and home_goals != away_goals:
+                    winner = home if home_goals > away_goals else away
+                data['matches'].append({
+                    'id': match_id, 'league_id': league_id, 'season_id': season_id,
+                    'season_year': year, 'date': date,
+                    'round': f'Regular Season - {number // (teams // 2) + 1}',
+                    'venue_id': home, 'home_team_id': home, 'away_team_id': away,
+                    'home_goals': home_goals, 'away_goals': away_goals,
+                    'fulltime_home_goals': home_goals, 'fulltime_away_goals': away_goals,
+                    'status': FINISHED if played else NOT_STARTED, 'winner': winner,
+                })
+                data['match_predictions'].append({
+                    'match_id': match_id, 'season_year': year, 'predicted_winner': f'Team {home}',
+                    'goals_home': 1, 'goals_away': 1, 'advice': 'Double chance',
+                    'percent_home': _percent(rng), 'percent_draw': _percent(rng, 10, 30),
+                    'percent_away': _percent(rng, 10, 40), 'last_updated': date,
+                })
+                if not played:
+                    continue
+                for team_id in (home, away):
+                    passes = rng.randint(250, 650)
+                    accurate = int(passes * rng.uniform(0.7, 0.9))
+                    data['match_statistics'].append({
+                        'match_id': match_id, 'season_year': year, 'team_id': team_id,
+                        'shots_on_goal': rng.randint(0, 10), 'total_shots': rng.randint(3, 25),
+                        'fouls': rng.randint(5, 22), 'corner_kicks': rng.randint(0, 12),
+                        'ball_possession': _percent(rng), 'yellow_cards': rng.randint(0, 6),
+                        'red_cards': rng.choices((0, 1), weights=(9, 1))[0],
+                        'total_passes': passes, 'passes_accurate': accurate,
+                        'pass_accuracy': accurate * 100 // passes,
+                    })
+
+            for team_id in range(1, teams + 1):
+                wins, draws = rng.randint(5, 25), rng.randint(3, 12)
+                losses = 2 * (teams - 1) - wins - draws
+                data['standings'].append({
+                    'team_id': team_id, 'league_id': league_id, 'season_id': season_id,
+                    'points': wins * 3 + draws, 'games_played': wins + draws + losses,
+                    'wins': wins, 'draws': draws, 'losses': losses,
+                    'goals_for': rng.randint(30, 70), 'goals_against': rng.randint(30, 70),
+                    'form': ''.join(rng.choice('WDL') for _ in range(5)),
+                    'last_updated': datetime(year, 12, 8),
+                })
+                data['team_statistics'].append({
+                    'team_id': team_id, 'league_id': league_id, 'season_id': season_id,
+                    'form': encode_form(''.join(rng.choice('WDL') for _ in range(2 * (teams - 1)))),
+                    'games_played': wins + draws + losses, 'wins': wins, 'draws': draws,
+                    'losses': losses, 'biggest_win_home_goals_home': rng.randint(1, 6),
+                    'biggest_win_home_goals_away': 0,
+                    'clean_sheets': rng.randint(3, 15), 'failed_to_score': rng.randint(3, 15),
+                })
+                for number in range(players_per_team):
+                    minutes = rng.randint(0, 3420)
+                    data['player_statistics'].append({
+                        'player_id': team_id * 1000 + number, 'team_id': team_id,
+                        'league_id': league_id, 'season_id': season_id,
+                        'appearances': minutes // 80, 'minutes_played': minutes,
+                        'rating': round(rng.uniform(5.8, 8.2), 2),
+                        'goals_total': rng.choices(range(20), weights=range(20, 0, -1))[0],
+                        'assists': rng.randint(0, 10), 'passes_total': minutes // 2,
+                        'passes_accuracy': _percent(rng, 60, 92),
+                        'yellow_cards': rng.randint(0, 10), 'red_cards': rng.randint(0, 2),
+                    })
+    return data
+
+
+def seed(connection, **options):
+    """
+    Generate the synthetic dataset and insert it through ``connection``.
+
+    Args:
+        connection (Connection): Open SQLAlchemy connection with the tables already created.
+        **options: Keyword arguments forwarded to :func:`generate`.
+
+    Returns:
+        dict: Table name mapped to the number of inserted rows.
+    """
+    data = generate(**options)
+    ensure_partitions(connection, (season['year'] for season in data['seasons']))
+    for table_name, rows in data.items():
+        _insert(connection, table_name, rows)
+    return {table_name: len(rows) for table_name, rows in data.items()}
@@ -0,0 +1,111 @@
+"""
+Compare the typed percentage, score and form columns with the old strings.
+
+Seeds synthetic seasons, copies each affected table twice (as stored now and
+converted back to the pre-868c9ff83632 string columns), then reports table
+sizes and the latency of typical aggregates on both copies.
+
+Usage:
+    python -m backend.benchmarks.typed_columns --seasons 40 --leagues 4
+"""
+import argparse
+
+from sqlalchemy import create_engine, text
+
+from backend.benchmarks.common import add_database_arguments, print_table, scratch_schema, time_query
+from backend.benchmarks.synthetic import seed
+from backend.db.base import Base
+
+# Decodes the 2-bit packed form back into 'WWDL' for the legacy copy
+_DECODE_FORM = (
+    "rtrim((SELECT string_agg(substr('-WDL', ((get_byte(form, i / 4) >> (6 - 2 * (i % 4))) & 3) + 1, 1), '' "
+    "ORDER BY i) FROM generate_series(0, length(form) * 4 - 1) AS i), '-')"
+)
+
+LEGACY_COLUMNS = {
+    'match_statistics': {
+        'ball_possession': "ball_possession || '%'",
+        'pass_accuracy': "pass_accuracy || '%'",
+    },
+    'match_predictions': {
+        'percent_home': "percent_home || '%'",
+        'percent_draw': "percent_draw || '%'",
+        'percent_away': "percent_away || '%'",
+    },
+    'player_statistics': {'passes_accuracy': "passes_accuracy || '%'"},
+    'team_statistics': {
+        'form': _DECODE_FORM,
+        'biggest_win_home': "biggest_win_home_goals_home || '-' || biggest_win_home_goals_away",
+    },
+}
+
+QUERIES = {
+    'possession by team': (
+        'SELECT team_id, avg(ball_possession) FROM typed_match_statistics GROUP BY team_id',
+        "SELECT team_id, avg(rtrim(ball_possession, '%')::int) FROM legacy_match_statistics GROUP BY team_id",
+    ),
+    'home win probability': (
+        'SELECT avg(percent_home) FROM typed_match_predictions WHERE percent_home > 50',
+        "SELECT avg(rtrim(percent_home, '%')::int) FROM legacy_match_predictions "
+        "WHERE rtrim(percent_home, '%')::int > 50",
+    ),
+    'accurate passers': (
+        'SELECT player_id FROM typed_player_statistics WHERE passes_accuracy >= 85',
+        "SELECT player_id FROM legacy_player_statistics WHERE rtrim(passes_accuracy, '%')::int >= 85",
+    ),
+    'big home wins': (
+        'SELECT team_id FROM typed_team_statistics '
+        'WHERE biggest_win_home_goals_home - biggest_win_home_goals_away >= 4',
+        "SELECT team_id FROM legacy_team_statistics "
+        "WHERE split_part(biggest_win_home, '-', 1)::int - split_part(biggest_win_home, '-', 2)::int >= 4",
+    ),
+}
+
+
+def _copy_tables(connection):
+    for table_name, legacy in LEGACY_COLUMNS.items():
+        columns = [
+            column.name for column in Base.metadata.tables[table_name].columns
+            if column.name not in legacy and not column.name.startswith('biggest_')
+        ]
+        connection.execute(text(f'CREATE TABLE typed_{table_name} AS SELECT * FROM {table_name}'))
+        connection.execute(text(
+            f'CREATE TABLE legacy_{table_name} AS SELECT {", ".join(columns)}, '
+            + ', '.join(f'{expression} AS {name}' for name, expression in legacy.items())
+            + f' FROM {table_name}'
+        ))
+
+
+def main():
+    parser = add_database_arguments(argparse.ArgumentParser(description=__doc__.splitlines()[1]))
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with scratch_schema(engine, args.schema) as connection:
+        Base.metadata.create_all(connection)
+        seed(connection, seasons=args.seasons, leagues=args.leagues)
+        _copy_tables(connection)
+        connection.execute(text('ANALYZE'))
+        connection.commit()
+
+        sizes = []
+        for table_name in LEGACY_COLUMNS:
+            typed, legacy = connection.execute(text(
+                f"SELECT pg_total_relation_size('typed_{table_name}'), pg_total_relation_size('legacy_{table_name}')"
+            )).one()
+            sizes.append([table_name, f'{legacy / 1024:,.0f}', f'{typed / 1024:,.0f}', f'{1 - typed / legacy:.0%}'])
+
+        timings = []
+        for name, (typed_query, legacy_query) in QUERIES.items():
+            typed_ms = time_query(connection, text(typed_query), repeat=args.repeat)
+            legacy_ms = time_query(connection, text(legacy_query), repeat=args.repeat)
+            timings.append([name, f'{legacy_ms:.3f}', f'{typed_ms:.3f}', f'{legacy_ms / typed_ms:.1f}x'])
+
+    print()
+    print_table(['table', 'strings KiB', 'typed KiB', 'saved'], sizes)
+    print()
+    print_table(['query', 'strings ms', 'typed ms', 'speedup'], timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+COPY-based loader for the historical backfill.
+
+Rows are streamed into temporary staging tables with ``COPY FROM STDIN`` and
+then merged into ``matches``, ``match_statistics``, ``player_match_statistics``
+and ``player_statistics`` with a single ``INSERT ... SELECT ... ON CONFLICT``
+per table. The stadiums, teams and players a season refers to, when given, are
+upserted first, and new or changed per-match player rows are rolled up into
+the season totals last (see :mod:`backend.db.rollups`). Each season is loaded
+in its own transaction, so an interrupted backfill can simply be re-run.
+
+Usage:
+    python -m backend.db.backfill path/to/export           # <season_id>/<table>.ndjson files
+    python -m backend.db.backfill --synthetic-seasons 40   # against a local container
+"""
+import argparse
+import io
+import json
+import time
+from datetime import date, datetime
+from itertools import chain
+from pathlib import Path
+
+from sqlalchemy import column, create_engine, literal_column, select, table, text
+
+from backend.core.config import DATABASE_URL
+
+from . import head_to_head, leaderboards, rollups, summaries
+from .base import Base
+from .cache import mark_rows_stale
+from .instrumentation import query_unit
+from .partitions import ensure_partitions
+from .upsert import merge_from, natural_key, upsert
+from .versions import bump_rows
+from .views import refresh_views
+
+# Load order respects the foreign keys between the backfilled tables
+DIMENSIONS = ('stadiums', 'teams', 'players')
+TABLES = ('matches', 'match_statistics', 'player_match_statistics', 'player_statistics')
+
+# Bytes handed to psycopg 3 per write, the size psycopg2's copy_expert reads
+COPY_CHUNK_SIZE = 8192
+
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_value(value):
+    """Render one value in PostgreSQL's COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex format, with the backslash escaped for COPY
+        return '\\\\x' + bytes(value).hex()
+    return str(value).translate(_ESCAPES)
+
+
+class CopyStream(io.RawIOBase):
+    """
+    File-like adapter that encodes rows lazily for ``COPY FROM STDIN``.
+
+    Only one chunk is kept in memory at a time, however many rows the
+    iterator yields.
+
+    Attributes:
+        count (int): Number of rows encoded so far.
+    """
+
+    def __init__(self, rows, columns):
+        self._lines = ('\t'.join(_copy_value(row.get(name)) for name in columns) + '\n' for row in rows)
+        self._buffer = b''
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self._buffer) < len(target):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode('utf-8')
+            self.count += 1
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _copy(connection, statement, stream):
+    """
+    Run ``COPY ... FROM STDIN`` reading ``stream``, with psycopg2 or psycopg 3.
+
+    Raises:
+        ValueError: When the connection uses another driver, which cannot COPY from a file.
+    """
+    driver = connection.dialect.driver
+    cursor = connection.connection.cursor()
+    try:
+        if driver == 'psycopg2':
+            cursor.copy_expert(statement, stream)
+        elif driver == 'psycopg':
+            with cursor.copy(statement) as copy:
+                while chunk := stream.read(COPY_CHUNK_SIZE):
+                    copy.write(chunk)
+        else:
+            raise ValueError(f"The backfill needs psycopg2 or psycopg 3 to COPY, not '{driver}'")
+    finally:
+        cursor.close()
+
+
+def copy_into_staging(connection, table_name, rows):
+    """
+    Stream ``rows`` into a temporary copy of ``table_name``.
+
+    Args:
+        connection (Connection): Connection inside the season transaction.
+        table_name (str): Target table; the staging table is dropped on commit.
+        rows (Iterable[dict]): Normalized rows sharing the same keys.
+
+    Returns:
+        tuple: The staging table name, the copied columns and the row count.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return None, [], 0
+    target = Base.metadata.tables[table_name]
+    columns = [name for name in target.columns.keys() if name in first]
+    staging = f'staging_{table_name}'
+    connection.execute(text(
+        f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS '
+        f'SELECT {", ".join(columns)} FROM {table_name} WITH NO DATA'
+    ))
+    stream = CopyStream(chain([first], rows), columns)
+    _copy(connection, f'COPY {staging} ({", ".join(columns)}) FROM STDIN', stream)
+    return staging, columns, stream.count
+
+
+def load_season(connection, season_rows, all_time=True):
+    """
+    Load one season's rows in a single transaction.
+
+    Args:
+        connection (Connection): Connection with no transaction in progress.
+        season_rows (dict): Table name mapped to an iterable of normalized rows.
+        all_time (bool): Whether to refresh the all-time leaderboards. Runs loading many seasons pass False
+            and call :func:`backend.db.leaderboards.refresh_all_time` once they are done.
+
+    Returns:
+        dict: Table name mapped to the number of rows copied, or upserted and changed for the dimension tables.
+    """
+    counts = {}
+    with connection.begin():
+        for table_name in DIMENSIONS:
+            if table_name in season_rows:
+                counts[table_name] = upsert(connection, Base.metadata.tables[table_name], season_rows[table_name],
+                                            key=['id'])
+        for table_name in TABLES:
+            staging, columns, count = copy_into_staging(connection, table_name, season_rows.get(table_name, ()))
+            counts[table_name] = count
+            if not count:
+                continue
+            if 'season_year' in columns:
+                years = connection.execute(text(f'SELECT DISTINCT season_year FROM {staging}')).scalars()
+                ensure_partitions(connection, years)
+            scopes = []
+            if {'season_id', 'league_id'} <= set(columns):
+                scopes = connection.execute(
+                    text(f'SELECT DISTINCT season_id, league_id FROM {staging}')
+                ).mappings().all()
+                mark_rows_stale(connection, scopes)
+                bump_rows(connection, table_name, scopes)
+            target = Base.metadata.tables[table_name]
+            key = natural_key(target)
+            source = table(staging, *[column(name) for name in columns])
+            # COPY appends in order, so the highest ctid is the last copy of a duplicated key
+            deduplicated = select(*source.c).distinct(*[source.c[name] for name in key]).order_by(
+                *[source.c[name] for name in key], literal_column('ctid').desc()
+            )
+            connection.execute(merge_from(target, columns, deduplicated, key))
+            if table_name == 'matches':
+                season_ids = [scope['season_id'] for scope in scopes]
+                summaries.refresh_seasons(connection, season_ids)
+                head_to_head.refresh_seasons(connection, season_ids)
+            elif table_name == 'player_statistics':
+                leaderboards.refresh_seasons(connection, (scope['season_id'] for scope in scopes), all_time)
+        # After the season totals, which the totals rolled up from per-match rows replace
+        if counts.get('player_match_statistics'):
+            season_ids = connection.execute(
+                text('SELECT DISTINCT season_id FROM staging_player_match_statistics')
+            ).scalars().all()
+            for season_id in season_ids:
+                rollups.rollup_player_statistics(connection, season_id, all_time)
+    return counts
+
+
+def backfill(connection, seasons, report=print):
+    """
+    Load every season yielded by ``seasons``, then the all-time leaderboards, and report the throughput.
+
+    Args:
+        connection (Connection): Connection with no transaction in progress.
+        seasons (Iterable[tuple]): ``(season_id, season_rows)`` pairs.
+        report (Callable): Called with one progress line per season.
+
+    Returns:
+        dict: Total rows, elapsed seconds and rows per second.
+    """
+    total_rows = 0
+    started = time.perf_counter()
+    for season_id, season_rows in seasons:
+        season_started = time.perf_counter()
+        with query_unit(f'backfill season {season_id}') as unit:
+            counts = load_season(connection, season_rows, all_time=False)
+        rows = sum(counts.values())
+        elapsed = time.perf_counter() - season_started
+        total_rows += rows
+        report(f'season {season_id}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s), {unit.summary()}')
+    with connection.begin():
+        leaderboards.refresh_all_time(connection)
+    elapsed = time.perf_counter() - started
+    return {'rows': total_rows, 'seconds': elapsed, 'rows_per_second': total_rows / elapsed if elapsed else 0.0}
+
+
+def _read_ndjson(path):
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_export(directory):
+    """
+    Yield ``(season_id, season_rows)`` pairs from an export directory.
+
+    The directory holds one sub-directory per season id with one
+    ``<table>.ndjson`` file per backfilled table. Files are read lazily.
+    """
+    for season_dir in sorted(Path(directory).iterdir(), key=lambda path: path.name):
+        if season_dir.is_dir():
+            yield season_dir.name, {
+                table_name: _read_ndjson(season_dir / f'{table_name}.ndjson')
+                for table_name in TABLES
+                if (season_dir / f'{table_name}.ndjson').exists()
+            }
+
+
+def _synthetic_seasons(connection, seasons):
+    """Insert synthetic dimension rows and yield synthetic fact rows per season."""
+    from backend.benchmarks.synthetic import generate
+
+    data = generate(seasons=seasons)
+    with connection.begin():
+        for table_name in ('leagues', 'stadiums', 'teams', 'players', 'seasons'):
+            upsert(connection, Base.metadata.tables[table_name], data[table_name], key=['id'])
+    season_of_match = {row['id']: row['season_id'] for row in data['matches']}
+    for season in data['seasons']:
+        season_id = season['id']
+        yield season_id, {
+            'matches': (row for row in data['matches'] if row['season_id'] == season_id),
+            'match_statistics': (
+                row for row in data['match_statistics'] if season_of_match[row['match_id']] == season_id
+            ),
+            'player_statistics': (row for row in data['player_statistics'] if row['season_id'] == season_id),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill historical seasons with COPY.')
+    parser.add_argument('directory', nargs='?', help='Export directory with <season_id>/<table>.ndjson files.')
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--synthetic-seasons', type=int, help='Load synthetic seasons instead of an export.')
+    args = parser.parse_args()
+    if not args.directory and not args.synthetic_seasons:
+        parser.error('pass an export directory or --synthetic-seasons')
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        if args.synthetic_seasons:
+            seasons = _synthetic_seasons(connection, args.synthetic_seasons)
+        else:
+            seasons = read_export(args.directory)
+        result = backfill(connection, seasons)
+        with connection.begin():
+            refresh_views(connection)
+    print(f"{result['rows']} rows in {result['seconds']:.2f}s ({result['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+Read-through cache for query results, invalidated by season and league.
+
+Results are cached as plain row dictionaries under keys built from the model
+and the filters (``standings?league_id=71&season_id=5``). Every entry records
+the version of its tags (``season:5``, ``league:71``) when it was stored;
+invalidating a tag bumps its version, so stale entries are ignored and
+evicted on their next read instead of being searched for.
+
+There are two tiers:
+
+* an in-process LRU, always on;
+* an optional Redis-compatible client (anything exposing ``get``, ``set``,
+  ``mget`` and ``incr``, such as redis-py or fakeredis). When configured, tag
+  versions live in Redis, so an ingestion process invalidates the caches of
+  every API worker.
+
+Writes made through :mod:`backend.db.upsert`, :mod:`backend.db.backfill`,
+:mod:`backend.db.rollups` and ORM flushes call :func:`mark_stale`, which
+invalidates the touched tags once the transaction commits.
+
+The API caches the season scoped endpoints with :func:`cached`, which also
+puts the season's data version (:mod:`backend.db.versions`) in the key, so
+writes made by other processes, such as the ingestion jobs, are picked up
+within ``DATA_VERSION_REFRESH`` seconds without Redis.
+"""
+import pickle
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Filter columns that scope cached results
+TAG_COLUMNS = ('season_id', 'league_id')
+
+_PENDING_TAGS = 'query_cache_pending_tags'
+_caches = weakref.WeakSet()
+
+
+def cache_key(model, filters, variant=None):
+    """Build the cache key for ``model`` rows matching ``filters``."""
+    table = getattr(model, '__tablename__', getattr(model, 'name', model))
+    query = '&'.join(f'{name}={filters[name]}' for name in sorted(filters))
+    return f'{table}?{query}' + (f'#{variant}' if variant else '')
+
+
+def tags_for(values):
+    """Return the invalidation tags of a filter or row dictionary."""
+    prefixes = {'season_id': 'season', 'league_id': 'league'}
+    return frozenset(f'{prefixes[name]}:{values[name]}' for name in TAG_COLUMNS if values.get(name) is not None)
+
+
+class QueryCache:
+    """
+    Two-tier read-through cache for query results.
+
+    Attributes:
+        max_entries (int): Size of the in-process LRU.
+        ttl (float): Seconds before an entry expires regardless of tags. None disables expiry.
+        redis: Optional Redis-compatible client used as the shared tier.
+        prefix (str): Namespace for the keys stored in Redis.
+        stats (dict): Counters for ``local_hits``, ``remote_hits``, ``misses`` and ``invalidations``.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, redis=None, prefix='galo'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis
+        self.prefix = prefix
+        self.stats = {'local_hits': 0, 'remote_hits': 0, 'misses': 0, 'invalidations': 0}
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    @property
+    def hit_ratio(self):
+        hits = self.stats['local_hits'] + self.stats['remote_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+    def _tag_versions(self, tags):
+        tags = sorted(tags)
+        if self.redis is None:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+        values = self.redis.mget([f'{self.prefix}:tag:{tag}' for tag in tags]) if tags else []
+        return tuple(int(value or 0) for value in values)
+
+    def _store_local(self, key, value, versions):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, versions, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, tags=()):
+        """Return the cached value for ``key``, or None when missing or stale."""
+        versions = self._tag_versions(tags)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_versions, expires = entry
+                if stored_versions == versions and (expires is None or expires > time.monotonic()):
+                    self._entries.move_to_end(key)
+                    self.stats['local_hits'] += 1
+                    return value
+                del self._entries[key]
+
+        if self.redis is not None:
+            payload = self.redis.get(f'{self.prefix}:entry:{key}')
+            if payload is not None:
+                value, stored_versions = pickle.loads(payload)
+                if stored_versions == versions:
+                    self.stats['remote_hits'] += 1
+                    self._store_local(key, value, versions)
+                    return value
+
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key, value, tags=(), versions=None):
+        """
+        Store ``value`` under ``key``, stamped with the version of ``tags``.
+
+        Args:
+            key (str): Cache key, see :func:`cache_key`.
+            value: Value to cache. None is never returned as a hit.
+            tags (Iterable[str]): Tags invalidating the entry.
+            versions (tuple): Versions of ``tags`` the value was read at. Defaults to the current ones.
+        """
+        if versions is None:
+            versions = self._tag_versions(tags)
+        self._store_local(key, value, versions)
+        if self.redis is not None:
+            # Redis expiries are whole seconds; redis-py rejects a float
+            ex = max(int(self.ttl), 1) if self.ttl else None
+            self.redis.set(f'{self.prefix}:entry:{key}', pickle.dumps((value, versions)), ex=ex)
+
+    def get_or_load(self, key, tags, loader):
+        """Return the cached value for ``key``, calling ``loader()`` and caching its result on a miss."""
+        value = self.get(key, tags)
+        if value is None:
+            # Read before loading: a write committed meanwhile leaves the entry stale rather than current
+            versions = self._tag_versions(tags)
+            value = loader()
+            self.set(key, value, tags, versions)
+        return value
+
+    def query(self, session, model, order_by=None, **filters):
+        """
+        Return the rows of ``model`` matching ``filters`` as dictionaries, through the cache.
+
+        Args:
+            session (Session | Connection): Used to run the query on a miss.
+            model (Base): Mapped class to query.
+            order_by (Sequence[str]): Column names to sort by.
+            **filters: Column equality filters, e.g. ``league_id=71, season_id=5``.
+
+        Returns:
+            list[dict]: Rows keyed by table column name.
+        """
+        table = model.__table__
+        key = cache_key(model, filters, ','.join(order_by) if order_by else None)
+
+        def load():
+            statement = select(*table.columns).where(*[table.c[name] == value for name, value in filters.items()])
+            if order_by:
+                statement = statement.order_by(*[table.c[name] for name in order_by])
+            return [dict(row) for row in session.execute(statement).mappings()]
+
+        return self.get_or_load(key, tags_for(filters), load)
+
+    def invalidate(self, tags):
+        """Invalidate every entry stamped with any of ``tags``."""
+        for tag in tags:
+            if self.redis is not None:
+                self.redis.incr(f'{self.prefix}:tag:{tag}')
+            else:
+                with self._lock:
+                    self._versions[tag] = self._versions.get(tag, 0) + 1
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop every in-process entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+def cached(cache, versions, name, filters, loader):
+    """
+    Return ``loader()`` through ``cache`` for a season scoped query.
+
+    Args:
+        cache (QueryCache): Cache to read and fill.
+        versions (DataVersions): Season versions, see :mod:`backend.db.versions`.
+        name (str): Name of the query, the first part of the key.
+        filters (dict): Parameters of the query, including ``season_id``.
+        loader (Callable): Runs the query on a miss. Its result must not be None.
+
+    Returns:
+        The cached or loaded result. Unknown seasons are loaded without caching.
+    """
+    season = versions.get(filters['season_id'])
+    if season is None:
+        return loader()
+    version, _ = season
+    return cache.get_or_load(cache_key(name, filters, f'v{version}'), tags_for(filters), loader)
+
+
+def invalidate(tags):
+    """Invalidate ``tags`` in every live cache."""
+    for cache in list(_caches):
+        cache.invalidate(tags)
+
+
+def mark_stale(connection, tags):
+    """
+    Invalidate ``tags`` once the current transaction of ``connection`` commits.
+
+    Invalidating before the commit would let a reader cache the old rows again
+    in between. Without a transaction in progress the tags are invalidated
+    immediately.
+
+    Args:
+        connection (Connection | Session): Connection or session that wrote the rows.
+        tags (Iterable[str]): Tags built with :func:`tags_for`.
+    """
+    tags = set(tags)
+    if not tags:
+        return
+    if connection.in_transaction():
+        connection.info.setdefault(_PENDING_TAGS, set()).update(tags)
+    else:
+        invalidate(tags)
+
+
+def mark_rows_stale(connection, rows):
+    """Call :func:`mark_stale` with the tags of every written row."""
+    tags = set()
+    for row in rows:
+        tags |= tags_for(row)
+    mark_stale(connection, tags)
+
+
+def _flush_pending(target):
+    tags = target.info.pop(_PENDING_TAGS, None)
+    if tags:
+        invalidate(tags)
+
+
+def _drop_pending(target):
+    target.info.pop(_PENDING_TAGS, None)
+
+
+event.listen(Engine, 'commit', _flush_pending)
+event.listen(Engine, 'rollback', _drop_pending)
+event.listen(Session, 'after_commit', _flush_pending)
+event.listen(Session, 'after_rollback', _drop_pending)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tags(session, flush_context):
+    rows = (
+        {name: getattr(instance, name, None) for name in TAG_COLUMNS}
+        for instance in (*session.new, *session.dirty, *session.deleted)
+    )
+    mark_rows_stale(session, rows)
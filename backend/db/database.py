@@ -0,0 +1,174 @@
+"""
+Engines and session factories for the application.
+
+Three pools are kept apart so that a long backfill never starves the API:
+
+* :func:`get_engine` — synchronous ``QueuePool`` for scripts and sync handlers;
+* :func:`get_async_engine` — asyncpg engine for the FastAPI handlers;
+* :func:`get_ingestion_engine` — small pool reserved for the ingestion job.
+
+Every pool pings connections before handing them out (Railway drops idle
+connections) and recycles them after ``DB_POOL_RECYCLE`` seconds. Statements
+are cached twice: SQLAlchemy caches the compiled SQL (``query_cache_size``)
+and the driver keeps server-side prepared statements per connection (asyncpg's
+statement cache, psycopg 3's ``prepare_threshold``; psycopg2 cannot prepare).
+Set ``DB_STATEMENT_CACHE_SIZE=0`` when connecting through PgBouncer in
+transaction mode, which does not support prepared statements.
+
+Engines are created on first use, so importing this module does not require
+asyncpg or a reachable database.
+"""
+from functools import lru_cache
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from backend.core.config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    INGESTION_POOL_SIZE,
+)
+
+
+def _url(url, driver):
+    """Return ``url`` using ``driver`` (``postgres://`` URLs from Railway included)."""
+    url = make_url(url.replace('postgres://', 'postgresql://', 1) if url.startswith('postgres://') else url)
+    return url.set(drivername=f'postgresql+{driver}') if driver else url
+
+
+def engine_options(url, pooled=True, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                   statement_cache_size=DB_STATEMENT_CACHE_SIZE, application_name='galo-api'):
+    """
+    Build the keyword arguments shared by the synchronous and asynchronous engines.
+
+    Args:
+        url (URL): Target database, with its driver already chosen.
+        pooled (bool): Use a ``QueuePool``. When False every checkout opens a new connection (``NullPool``).
+        pool_size (int): Connections kept open.
+        max_overflow (int): Extra connections opened under load and closed when returned.
+        statement_cache_size (int): Compiled and prepared statements cached per engine and per connection.
+        application_name (str): Shown in ``pg_stat_activity`` to tell the pools apart.
+
+    Returns:
+        dict: Arguments for ``create_engine`` or ``create_async_engine``.
+    """
+    options = {'query_cache_size': max(statement_cache_size, 0), 'connect_args': {}}
+    if pooled:
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+            pool_use_lifo=True,
+        )
+    else:
+        options['poolclass'] = NullPool
+
+    driver = url.get_driver_name()
+    if driver == 'asyncpg':
+        options['connect_args'] = {
+            'statement_cache_size': statement_cache_size,
+            'server_settings': {'application_name': application_name},
+        }
+    elif driver == 'psycopg':
+        # Prepare server-side from the second execution of a statement
+        options['connect_args'] = {
+            'prepare_threshold': 2 if statement_cache_size else None,
+            'application_name': application_name,
+        }
+    else:
+        options['connect_args'] = {'application_name': application_name}
+    return options
+
+
+def create_db_engine(url=DATABASE_URL, driver=None, **options):
+    """
+    Create a synchronous engine configured by :func:`engine_options`.
+
+    Args:
+        url (str): Database URL. Defaults to ``DATABASE_URL``.
+        driver (str): DBAPI to use instead of the URL's, e.g. ``'psycopg'``.
+        **options: Passed to :func:`engine_options`.
+
+    Returns:
+        Engine: The new engine.
+    """
+    url = _url(url, driver)
+    return create_engine(url, **engine_options(url, **options))
+
+
+def create_async_db_engine(url=DATABASE_URL, **options):
+    """
+    Create an asyncpg engine configured by :func:`engine_options`.
+
+    Args:
+        url (str): Database URL. The driver is always replaced with asyncpg.
+        **options: Passed to :func:`engine_options`.
+
+    Returns:
+        AsyncEngine: The new engine.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = _url(url, 'asyncpg')
+    statement_cache_size = options.get('statement_cache_size', DB_STATEMENT_CACHE_SIZE)
+    # SQLAlchemy keeps its own asyncpg prepared statement cache on top of the driver's
+    url = url.update_query_dict({'prepared_statement_cache_size': str(statement_cache_size)})
+    return create_async_engine(url, **engine_options(url, **options))
+
+
+@lru_cache(maxsize=None)
+def get_engine():
+    """Return the process-wide synchronous engine."""
+    return create_db_engine()
+
+
+@lru_cache(maxsize=None)
+def get_async_engine():
+    """Return the process-wide asyncpg engine."""
+    return create_async_db_engine()
+
+
+@lru_cache(maxsize=None)
+def get_ingestion_engine():
+    """Return the engine reserved for the ingestion job."""
+    return create_db_engine(pool_size=INGESTION_POOL_SIZE, max_overflow=0, application_name='galo-ingestion')
+
+
+@lru_cache(maxsize=None)
+def session_factory():
+    """Return the ``sessionmaker`` bound to :func:`get_engine`."""
+    return sessionmaker(bind=get_engine(), autoflush=False, expire_on_commit=False)
+
+
+@lru_cache(maxsize=None)
+def async_session_factory():
+    """Return the ``async_sessionmaker`` bound to :func:`get_async_engine`."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+@lru_cache(maxsize=None)
+def ingestion_session_factory():
+    """Return the ``sessionmaker`` bound to :func:`get_ingestion_engine`."""
+    return sessionmaker(bind=get_ingestion_engine(), autoflush=False, expire_on_commit=False)
+
+
+def get_db():
+    """FastAPI dependency yielding a synchronous session."""
+    with session_factory()() as session:
+        yield session
+
+
+async def get_async_db():
+    """FastAPI dependency yielding an ``AsyncSession``."""
+    async with async_session_factory()() as session:
+        yield session
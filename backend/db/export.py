@@ -0,0 +1,263 @@
+"""
+Streaming exports of the historical tables.
+
+Whole histories of ``matches``, ``match_statistics`` and ``player_statistics``
+are too large to build in memory on the Railway container, so an export never
+materializes ORM objects or the full result: it selects the table columns with
+Core, reads them through a server-side cursor (``stream_results`` with
+``yield_per``, one ``FETCH`` of ``CHUNK_SIZE`` rows at a time) and encodes each
+chunk before the next one is fetched. The memory held is one chunk of rows and
+its encoded bytes, whatever the size of the export.
+
+Formats:
+
+* ``ndjson`` — one JSON object per line, dates in ISO 8601;
+* ``csv`` — header line, then one line per row;
+* ``arrow`` — Arrow IPC stream, one record batch per chunk;
+* ``parquet`` — one row group per chunk, footer written at the end.
+
+Arrow and Parquet need the optional ``pyarrow`` package.
+
+Usage:
+    python -m backend.db.export matches --season-id 5 --format csv > matches.csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Float, LargeBinary, SmallInteger, and_, create_engine, or_, select
+
+from backend.core.config import DATABASE_URL
+
+from .models import Match, MatchStatistics, PlayerStatistics, Season
+
+CHUNK_SIZE = 10000
+
+TABLES = {model.__tablename__: model.__table__ for model in (Match, MatchStatistics, PlayerStatistics)}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def export_query(table_name, league_id=None, season_id=None, team_id=None):
+    """
+    Build the SELECT of an export.
+
+    ``match_statistics`` has no league or season column, so those filters go
+    through its match. A season filter also restricts ``season_year``, so that
+    only that season's partition is scanned.
+
+    Args:
+        table_name (str): One of :data:`TABLES`.
+        league_id (int): Only rows of this league.
+        season_id (int): Only rows of this season.
+        team_id (int): Only rows of this team (home or away team, for matches).
+
+    Returns:
+        Select: Every column of the table, in primary key order.
+    """
+    if table_name not in TABLES:
+        raise ValueError(f"Unknown export '{table_name}', expected one of {sorted(TABLES)}")
+    table = TABLES[table_name]
+    matches = Match.__table__
+    statement = select(table)
+    scope = table
+    if table is MatchStatistics.__table__ and (league_id is not None or season_id is not None):
+        statement = statement.join(
+            matches, and_(matches.c.id == table.c.match_id, matches.c.season_year == table.c.season_year)
+        )
+        scope = matches
+
+    conditions = []
+    if league_id is not None:
+        conditions.append(scope.c.league_id == league_id)
+    if season_id is not None:
+        conditions.append(scope.c.season_id == season_id)
+        if 'season_year' in scope.c:
+            year = select(Season.year).where(Season.id == season_id).scalar_subquery()
+            conditions.append(scope.c.season_year == year)
+    if team_id is not None:
+        if table is matches:
+            conditions.append(or_(table.c.home_team_id == team_id, table.c.away_team_id == team_id))
+        else:
+            conditions.append(table.c.team_id == team_id)
+    return statement.where(*conditions).order_by(*table.primary_key.columns)
+
+
+def stream_rows(connection, statement, chunk_size=CHUNK_SIZE):
+    """
+    Yield the rows of ``statement`` in lists of at most ``chunk_size``, from a server-side cursor.
+
+    Args:
+        connection (Connection): Connection to stream from. It must stay open until the generator is exhausted.
+        statement (Select): Query to stream.
+        chunk_size (int): Rows fetched per round trip.
+    """
+    result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(statement)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _ndjson(columns, chunks):
+    encode = json.JSONEncoder(default=_json_default, separators=(',', ':')).encode
+    for chunk in chunks:
+        yield ''.join(encode(dict(zip(columns, row))) + '\n' for row in chunk).encode()
+
+
+def _csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise RuntimeError('Arrow and Parquet exports need pyarrow (pip install pyarrow)') from error
+    return pyarrow
+
+
+def arrow_schema(table):
+    """Return the Arrow schema of a table's columns."""
+    pa = _pyarrow()
+    types = ((SmallInteger, pa.int16()), (Boolean, pa.bool_()), (Float, pa.float64()),
+             (DateTime, pa.timestamp('us')), (LargeBinary, pa.binary()))
+
+    def arrow_type(column):
+        for sql_type, arrow in types:
+            if isinstance(column.type, sql_type):
+                return arrow
+        return pa.int64() if column.type.python_type is int else pa.string()
+
+    return pa.schema([pa.field(column.name, arrow_type(column), nullable=column.nullable) for column in table.columns])
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes, handed out chunk by chunk."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow(chunks, schema, parquet=False):
+    pa = _pyarrow()
+    sink = _Drain()
+    writer = pa.parquet.ParquetWriter(sink, schema) if parquet else pa.ipc.new_stream(sink, schema)
+    try:
+        for chunk in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def encode(format_name, columns, chunks, schema=None):
+    """
+    Encode chunks of rows into chunks of bytes.
+
+    Args:
+        format_name (str): One of :data:`FORMATS`.
+        columns (Sequence[str]): Column names, in row order.
+        chunks (Iterable[Sequence[tuple]]): Rows, chunk by chunk.
+        schema (pyarrow.Schema): Arrow schema of the rows, for ``arrow`` and ``parquet``.
+
+    Returns:
+        Iterator[bytes]: Encoded output, about one piece per chunk of rows.
+    """
+    if format_name == 'ndjson':
+        return _ndjson(list(columns), chunks)
+    if format_name == 'csv':
+        return _csv(list(columns), chunks)
+    if format_name in ('arrow', 'parquet'):
+        return _arrow(chunks, schema, parquet=format_name == 'parquet')
+    raise ValueError(f"Unknown export format '{format_name}', expected one of {sorted(FORMATS)}")
+
+
+def export(connection, table_name, format_name='ndjson', chunk_size=CHUNK_SIZE, **filters):
+    """
+    Stream an export of ``table_name``.
+
+    Args:
+        connection (Connection): Connection to stream from, open for as long as the export is consumed.
+        table_name (str): One of :data:`TABLES`.
+        format_name (str): One of :data:`FORMATS`.
+        chunk_size (int): Rows fetched and encoded at a time.
+        **filters: ``league_id``, ``season_id`` and ``team_id`` of :func:`export_query`.
+
+    Returns:
+        Iterator[bytes]: The encoded export.
+    """
+    if format_name not in FORMATS:
+        raise ValueError(f"Unknown export format '{format_name}', expected one of {sorted(FORMATS)}")
+    statement = export_query(table_name, **filters)
+    table = TABLES[table_name]
+    schema = arrow_schema(table) if format_name in ('arrow', 'parquet') else None
+    return encode(format_name, [column.name for column in table.columns],
+                  stream_rows(connection, statement, chunk_size), schema)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a table export to standard output.')
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+    parser.add_argument('--league-id', type=int)
+    parser.add_argument('--season-id', type=int)
+    parser.add_argument('--team-id', type=int)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        for data in export(connection, args.table, args.format, args.chunk_size,
+                           league_id=args.league_id, season_id=args.season_id, team_id=args.team_id):
+            sys.stdout.buffer.write(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Compact storage formats for values API-Football sends as strings.
+
+Percentages ("54%") are stored as ``SmallInteger``, scores ("4-0") as two
+``SmallInteger`` columns and form strings ("WWDLW") as 2-bit packed ``bytea``.
+The hybrid property factories below keep the string format on model instances,
+which is what the frontend expects, while the class-level expression is the
+compact column, so SQL filters and aggregates work on numbers. Each hybrid's
+``info`` names its columns and the function formatting their values, so rows
+selected as plain tuples can be formatted too (see backend.db.serialization).
+"""
+from sqlalchemy import String, cast, func
+from sqlalchemy.ext.hybrid import hybrid_property
+
+FORM_CODES = {'W': 1, 'D': 2, 'L': 3}
+_FORM_LETTERS = {code: letter for letter, code in FORM_CODES.items()}
+
+
+def parse_percent(value):
+    """Turn '54%', '54' or 54 into 54. Empty values become None."""
+    if value is None or isinstance(value, int):
+        return value
+    digits = str(value).strip().rstrip('%').strip()
+    return int(float(digits)) if digits else None
+
+
+def format_percent(value):
+    """Turn 54 into '54%'."""
+    return None if value is None else f'{value}%'
+
+
+def parse_score(value):
+    """Turn '4-0' into (4, 0). Empty values become (None, None)."""
+    if not value:
+        return None, None
+    home, away = str(value).split('-')
+    return int(home), int(away)
+
+
+def format_score(home, away):
+    """Turn (4, 0) into '4-0'."""
+    return None if home is None or away is None else f'{home}-{away}'
+
+
+def encode_form(form):
+    """
+    Pack a form string into 2 bits per result, four results per byte.
+
+    Code 0 never encodes a result, so the zero bits padding the last byte
+    mark the end of the string.
+    """
+    if form is None:
+        return None
+    packed = bytearray((len(form) + 3) // 4)
+    for position, letter in enumerate(form.upper()):
+        packed[position // 4] |= FORM_CODES[letter] << (6 - 2 * (position % 4))
+    return bytes(packed)
+
+
+def decode_form(packed):
+    """Unpack a value written by :func:`encode_form` back into 'WWDLW'."""
+    if packed is None:
+        return None
+    letters = []
+    for byte in packed:
+        for shift in (6, 4, 2, 0):
+            code = (byte >> shift) & 0b11
+            if not code:
+                return ''.join(letters)
+            letters.append(_FORM_LETTERS[code])
+    return ''.join(letters)
+
+
+def _named(fget, name):
+    # hybrid_property takes its attribute name from the getter
+    fget.__name__ = fget.__qualname__ = name
+    return fget
+
+
+def _hybrid(fget, fset, expr, name, columns, format):
+    prop = hybrid_property(_named(fget, name), fset, expr=expr)
+    prop.info.update(columns=columns, format=format)
+    return prop
+
+
+def percent_property(attribute):
+    """Hybrid exposing a ``SmallInteger`` percentage column (``_<name>``) as '54%'."""
+    def fget(self):
+        return format_percent(getattr(self, attribute))
+
+    def fset(self, value):
+        setattr(self, attribute, parse_percent(value))
+
+    def expr(cls):
+        return getattr(cls, attribute)
+
+    return _hybrid(fget, fset, expr, attribute.lstrip('_'), (attribute,), format_percent)
+
+
+def score_property(home_attribute, away_attribute):
+    """Hybrid exposing a ``<name>_goals_home``/``<name>_goals_away`` column pair as '4-0'."""
+    def fget(self):
+        return format_score(getattr(self, home_attribute), getattr(self, away_attribute))
+
+    def fset(self, value):
+        home, away = parse_score(value)
+        setattr(self, home_attribute, home)
+        setattr(self, away_attribute, away)
+
+    def expr(cls):
+        return func.concat(
+            cast(getattr(cls, home_attribute), String), '-', cast(getattr(cls, away_attribute), String)
+        )
+
+    return _hybrid(
+        fget, fset, expr, home_attribute.removesuffix('_goals_home'), (home_attribute, away_attribute), format_score
+    )
+
+
+def form_property(attribute):
+    """Hybrid exposing a packed ``bytea`` form column (``_<name>``) as 'WWDLW'."""
+    def fget(self):
+        return decode_form(getattr(self, attribute))
+
+    def fset(self, value):
+        setattr(self, attribute, encode_form(value))
+
+    def expr(cls):
+        return getattr(cls, attribute)
+
+    return _hybrid(fget, fset, expr, attribute.lstrip('_'), (attribute,), decode_form)
@@ -0,0 +1,314 @@
+"""
+The ``head_to_heads`` read model: the all-time record between two teams.
+
+Answering "how did we do against them" from ``matches`` is an OR over
+``home_team_id`` and ``away_team_id`` across every season. ``head_to_heads``
+stores one row per pair of teams, with the lower team id as team A, holding the
+wins, draws, losses and goals of their finished matches and the latest
+``LAST_RESULTS`` of them, so :func:`head_to_head` is a primary key lookup.
+
+Rows are kept up to date by the write paths, in the transaction that changes
+the matches, for the pairs of the matches written:
+
+* :func:`backend.db.upsert.upsert` and ORM flushes of ``matches`` rows refresh
+  the pairs of the matches among them that have started, which includes every
+  match reaching a finished status;
+* :func:`backend.db.backfill.load_season` refreshes the pairs of the seasons
+  it loads.
+
+A refresh recomputes the rows of its pairs from their finished matches, found
+through ``ix_matches_team_pair``, with one ``INSERT ... SELECT ... ON CONFLICT
+DO UPDATE`` (see :func:`backend.db.upsert.merge_from`). A pair rarely has more
+than a few dozen matches, and unlike adding the new result to running totals,
+this stays right when a finished score is corrected or a match is replayed.
+A match without a winner counts as a draw; one decided on penalties counts for
+the team that won the shootout, as ``matches.winner`` says.
+
+:func:`check` rebuilds the whole table in a query and diffs it against the
+stored rows; :func:`rebuild` repairs it.
+
+Usage:
+    python -m backend.db.head_to_head check
+    python -m backend.db.head_to_head rebuild
+"""
+import argparse
+from dataclasses import dataclass, field
+
+from sqlalchemy import Select, case, create_engine, delete, event, exists, func, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by, array_agg
+from sqlalchemy.orm import Session
+
+from backend.core.config import DATABASE_URL
+
+from .models import FINISHED, HeadToHead, Match
+
+NOT_STARTED = 'Not Started'
+
+# Latest matches kept per pair
+LAST_RESULTS = 10
+
+_head_to_heads = HeadToHead.__table__
+_team_a = func.least(Match.home_team_id, Match.away_team_id)
+_team_b = func.greatest(Match.home_team_id, Match.away_team_id)
+_team_a_at_home = Match.home_team_id == _team_a
+_last_result = func.jsonb_build_object(
+    'match_id', Match.id,
+    'date', Match.date,
+    'season_id', Match.season_id,
+    'home_team_id', Match.home_team_id,
+    'away_team_id', Match.away_team_id,
+    'home_goals', Match.home_goals,
+    'away_goals', Match.away_goals,
+    'winner', Match.winner,
+    type_=JSONB,
+)
+
+# head_to_heads column -> aggregate over the finished matches of a pair
+SOURCE = {
+    'team_a_id': _team_a,
+    'team_b_id': _team_b,
+    'played': func.count(),
+    'team_a_wins': func.count().filter(Match.winner == _team_a),
+    'draws': func.count().filter(Match.winner.is_(None)),
+    'team_b_wins': func.count().filter(Match.winner == _team_b),
+    'team_a_goals': func.coalesce(func.sum(case((_team_a_at_home, Match.home_goals), else_=Match.away_goals)), 0),
+    'team_b_goals': func.coalesce(func.sum(case((_team_a_at_home, Match.away_goals), else_=Match.home_goals)), 0),
+    'first_match_date': func.min(Match.date),
+    'last_match_date': func.max(Match.date),
+    'last_results': func.to_jsonb(
+        array_agg(aggregate_order_by(_last_result, Match.date.desc(), Match.id.desc()))[1:LAST_RESULTS]
+    ),
+}
+
+
+def pair(team_id, opponent_id):
+    """Return the ``(team_a_id, team_b_id)`` key of two teams."""
+    return min(team_id, opponent_id), max(team_id, opponent_id)
+
+
+def source_query(*criteria):
+    """Select the rows of the pairs whose finished matches match ``criteria``, built from ``matches``."""
+    return (
+        select(*(expression.label(name) for name, expression in SOURCE.items()))
+        .where(Match.status.in_(FINISHED), *criteria)
+        .group_by(_team_a, _team_b)
+    )
+
+
+def refresh(connection, pairs=None):
+    """
+    Write the rows of ``pairs`` from their finished matches, and drop those left without any.
+
+    Args:
+        connection (Connection | Session): Where to execute the refresh, in the writing transaction.
+        pairs (Iterable[tuple] | Select): Pairs of team ids, in any order, or a query selecting
+            ``(team_a_id, team_b_id)`` keys. None refreshes every pair.
+
+    Returns:
+        int: Rows inserted, changed or deleted.
+    """
+    # Imported here: backend.db.upsert calls refresh_rows
+    from .upsert import merge_from
+
+    if pairs is None:
+        criteria, stored = (), ()
+    else:
+        if not isinstance(pairs, Select):
+            pairs = sorted({pair(*teams) for teams in pairs})
+            if not pairs:
+                return 0
+        criteria = (tuple_(_team_a, _team_b).in_(pairs),)
+        stored = (tuple_(_head_to_heads.c.team_a_id, _head_to_heads.c.team_b_id).in_(pairs),)
+    played = exists().where(
+        Match.status.in_(FINISHED), _team_a == _head_to_heads.c.team_a_id, _team_b == _head_to_heads.c.team_b_id,
+    )
+    deleted = connection.execute(delete(_head_to_heads).where(*stored, ~played)).rowcount
+    statement = merge_from(_head_to_heads, list(SOURCE), source_query(*criteria), key=['team_a_id', 'team_b_id'])
+    return deleted + connection.execute(statement).rowcount
+
+
+def refresh_seasons(connection, season_ids):
+    """Refresh the pairs of every finished match of ``season_ids``."""
+    season_ids = sorted({season_id for season_id in season_ids if season_id is not None})
+    if not season_ids:
+        return 0
+    pairs = select(_team_a, _team_b).where(Match.season_id.in_(season_ids), Match.status.in_(FINISHED)).distinct()
+    return refresh(connection, pairs)
+
+
+def refresh_rows(connection, table_name, rows):
+    """
+    Refresh the pairs of the matches among ``rows`` written to ``table_name``, if any.
+
+    Fixtures not started yet are skipped: they change no record, and a season's
+    update writes all of them.
+    """
+    if table_name != Match.__tablename__:
+        return 0
+    ids = sorted({row['id'] for row in rows if row.get('id') is not None and row.get('status') != NOT_STARTED})
+    if not ids:
+        return 0
+    return refresh(connection, select(_team_a, _team_b).where(Match.id.in_(ids)).distinct())
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_flushed(session, flush_context):
+    pairs = {
+        pair(instance.home_team_id, instance.away_team_id)
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, Match) and instance.home_team_id is not None and instance.away_team_id is not None
+    }
+    if pairs:
+        refresh(session, pairs)
+
+
+def _oriented(row, team_id):
+    """Return a stored row from the point of view of ``team_id``."""
+    side, other = ('a', 'b') if row['team_a_id'] == team_id else ('b', 'a')
+    results = []
+    for result in row['last_results']:
+        outcome = 'D' if result['winner'] is None else 'W' if result['winner'] == team_id else 'L'
+        results.append({**result, 'result': outcome})
+    return {
+        'team_id': team_id,
+        'opponent_id': row[f'team_{other}_id'],
+        'played': row['played'],
+        'wins': row[f'team_{side}_wins'],
+        'draws': row['draws'],
+        'losses': row[f'team_{other}_wins'],
+        'goals_for': row[f'team_{side}_goals'],
+        'goals_against': row[f'team_{other}_goals'],
+        'first_match_date': row['first_match_date'],
+        'last_match_date': row['last_match_date'],
+        'last_results': results,
+    }
+
+
+def head_to_head(connection, team_id, opponent_id):
+    """
+    Return the all-time record of a team against another, in one primary key lookup.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        team_id (int): Team whose wins, losses and goals for are reported.
+        opponent_id (int): The other team.
+
+    Returns:
+        dict: Played, wins, draws, losses, goals for and against, first and
+        last match dates and the latest results, each with the ``result``
+        ('W', 'D' or 'L') for ``team_id``. Zeros when they never met.
+    """
+    team_a_id, team_b_id = pair(team_id, opponent_id)
+    statement = select(_head_to_heads).where(
+        _head_to_heads.c.team_a_id == team_a_id, _head_to_heads.c.team_b_id == team_b_id,
+    )
+    row = connection.execute(statement).mappings().first()
+    if row is None:
+        row = {
+            'team_a_id': team_a_id, 'team_b_id': team_b_id, 'played': 0, 'team_a_wins': 0, 'draws': 0,
+            'team_b_wins': 0, 'team_a_goals': 0, 'team_b_goals': 0, 'first_match_date': None,
+            'last_match_date': None, 'last_results': [],
+        }
+    return _oriented(row, team_id)
+
+
+def opponents(connection, team_id):
+    """
+    Return the record of a team against every team it has played, most played first.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        team_id (int): Team whose wins, losses and goals for are reported.
+
+    Returns:
+        list[dict]: Records as returned by :func:`head_to_head`.
+    """
+    sides = union_all(*(
+        select(_head_to_heads).where(column == team_id)
+        for column in (_head_to_heads.c.team_a_id, _head_to_heads.c.team_b_id)
+    ))
+    rows = [_oriented(row, team_id) for row in connection.execute(sides).mappings()]
+    return sorted(rows, key=lambda row: (-row['played'], row['opponent_id']))
+
+
+@dataclass
+class Report:
+    """
+    Differences between ``head_to_heads`` and a rebuild from ``matches``.
+
+    Attributes:
+        missing (list[tuple]): Pairs with finished matches but no row.
+        extra (list[tuple]): Rows of pairs without finished matches.
+        different (list[tuple]): Rows whose values differ from their matches.
+    """
+
+    missing: list = field(default_factory=list)
+    extra: list = field(default_factory=list)
+    different: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not (self.missing or self.extra or self.different)
+
+
+def check(connection, limit=None):
+    """
+    Rebuild every row in a query and diff the result against the stored rows.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        limit (int): Maximum pairs listed per kind of difference. None lists all.
+
+    Returns:
+        Report: The differences found.
+    """
+    expected = source_query().subquery('expected')
+    stored = _head_to_heads
+    same_pair = (expected.c.team_a_id == stored.c.team_a_id) & (expected.c.team_b_id == stored.c.team_b_id)
+    columns = [name for name in SOURCE if name not in ('team_a_id', 'team_b_id')]
+    queries = {
+        'missing': select(expected.c.team_a_id, expected.c.team_b_id).outerjoin(stored, same_pair)
+        .where(stored.c.team_a_id.is_(None)),
+        'extra': select(stored.c.team_a_id, stored.c.team_b_id).outerjoin(expected, same_pair)
+        .where(expected.c.team_a_id.is_(None)),
+        'different': select(stored.c.team_a_id, stored.c.team_b_id).join(expected, same_pair)
+        .where(or_(*(stored.c[name].is_distinct_from(expected.c[name]) for name in columns))),
+    }
+    return Report(**{
+        kind: [tuple(row) for row in connection.execute(query.order_by(*query.selected_columns).limit(limit))]
+        for kind, query in queries.items()
+    })
+
+
+def rebuild(connection):
+    """
+    Make ``head_to_heads`` equal to a rebuild from ``matches``.
+
+    Args:
+        connection (Connection | Session): Where to execute the rebuild, inside a transaction.
+
+    Returns:
+        int: Rows inserted, changed or deleted.
+    """
+    return refresh(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check or rebuild the head_to_heads read model.')
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.begin() as connection:
+        if args.command == 'rebuild':
+            print(f'{rebuild(connection)} head-to-head rows written')
+        report = check(connection, limit=20)
+    for kind in ('missing', 'extra', 'different'):
+        print(f'{kind}: {getattr(report, kind) or "none"}')
+    if not report.ok:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
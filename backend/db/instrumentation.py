@@ -0,0 +1,295 @@
+"""
+Query instrumentation and slow-query profiler.
+
+:class:`QueryProfiler` listens to ``before_cursor_execute`` and
+``after_cursor_execute`` of an engine (of every engine by default) and groups
+the statements by fingerprint: the SQL with literals and bound parameters
+replaced by ``?`` and ``IN``/``VALUES`` lists collapsed, so
+``WHERE id IN (1, 2)`` and ``WHERE id IN (3)`` count as the same statement.
+Per fingerprint it keeps a count, a latency histogram and the slow executions
+(over ``SLOW_QUERY_MS``).
+
+Work is grouped into units, an API request or a season of an ingestion run
+(:func:`query_unit`). A fingerprint executed ``N_PLUS_ONE_THRESHOLD`` times or
+more in one unit is reported as an N+1 pattern: a loop issuing one query per
+row that one query could have served.
+
+With ``EXPLAIN_SLOW_QUERIES`` the first slow execution of every SELECT
+fingerprint is re-run under ``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL and
+its plan kept in :attr:`QueryProfiler.plans`. Everything is exposed in the
+Prometheus text format by :meth:`QueryProfiler.render_metrics`.
+
+Usage:
+    with query_unit('backfill season 12'):
+        load_season(connection, season_rows)
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.core.config import EXPLAIN_SLOW_QUERIES, N_PLUS_ONE_THRESHOLD, SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    # Bound parameters of psycopg, asyncpg and sqlite
+    (re.compile(r'%\(\w+\)s|%s|\$\d+'), '?'),
+    (re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\( ?\?(?: ?, ?\?)* ?\)'), '(?)'),
+    (re.compile(r'\(\?\)(?: ?, ?\(\?\))+'), '(?)'),
+)
+_MAX_CACHED_FINGERPRINTS = 4096
+_MAX_STATEMENT_LENGTH = 300
+
+
+def normalize(statement):
+    """Return ``statement`` with its literals and parameters replaced by ``?``."""
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@dataclass
+class StatementStats:
+    """
+    Executions of one statement fingerprint.
+
+    Attributes:
+        fingerprint (str): Hash of the normalized statement.
+        statement (str): Normalized statement, truncated.
+        count (int): Executions.
+        seconds (float): Total execution time.
+        max_seconds (float): Slowest execution.
+        buckets (list[int]): Executions per histogram bucket of :data:`BUCKETS`, the last one unbounded.
+        slow (int): Executions over the slow threshold.
+        n_plus_one (int): Units in which the fingerprint was reported as an N+1 pattern.
+    """
+
+    fingerprint: str
+    statement: str
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    buckets: list = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    slow: int = 0
+    n_plus_one: int = 0
+
+
+@dataclass
+class QueryUnit:
+    """
+    Queries of one request or ingestion step.
+
+    Attributes:
+        name (str): What the unit did, e.g. ``GET /standings``.
+        statements (Counter): Executions per fingerprint.
+        seconds (float): Total execution time.
+    """
+
+    name: str
+    statements: Counter = field(default_factory=Counter)
+    seconds: float = 0.0
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Return the ``(fingerprint, count)`` pairs executed at least ``threshold`` times."""
+        return [(fingerprint, count) for fingerprint, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """One line describing the unit, e.g. ``12 queries, 8.4 ms; N+1: 3f2a9c0d81b4 x10``."""
+        text = f'{self.count} queries, {self.seconds * 1000:.1f} ms'
+        repeated = self.repeated(threshold)
+        if repeated:
+            text += '; N+1: ' + ', '.join(f'{fingerprint} x{count}' for fingerprint, count in repeated)
+        return text
+
+
+class QueryProfiler:
+    """
+    Statement statistics of the engines it instruments.
+
+    Args:
+        slow_ms (float): Executions slower than this many milliseconds are counted as slow.
+        explain (bool): Capture the ``EXPLAIN ANALYZE`` plan of the first slow execution of each SELECT.
+        n_plus_one_threshold (int): Executions of one fingerprint in a unit reported as N+1.
+        max_plans (int): Plans kept in :attr:`plans`, oldest dropped first.
+
+    Attributes:
+        statements (dict): Fingerprint mapped to its :class:`StatementStats`.
+        plans (deque): ``fingerprint``, ``milliseconds``, ``statement`` and ``plan`` of captured slow executions.
+    """
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, explain=EXPLAIN_SLOW_QUERIES,
+                 n_plus_one_threshold=N_PLUS_ONE_THRESHOLD, max_plans=50):
+        self.slow_seconds = slow_ms / 1000
+        self.explain = explain
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements = {}
+        self.plans = deque(maxlen=max_plans)
+        self._fingerprints = {}
+        self._explained = set()
+        self._lock = threading.Lock()
+        # Units and timings of this profiler only, as several may instrument the same engine
+        self._unit = ContextVar(f'query_unit_{id(self)}', default=None)
+        self._started = f'query_profiler_started_{id(self)}'
+
+    def instrument(self, target=Engine):
+        """Listen to the statements of ``target``, an engine or the ``Engine`` class for all of them."""
+        event.listen(target, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(target, 'after_cursor_execute', self._after_cursor_execute)
+        return self
+
+    def fingerprint(self, statement):
+        """Return the fingerprint of a statement, caching it for the statement strings seen before."""
+        fingerprint = self._fingerprints.get(statement)
+        if fingerprint is None:
+            normalized = normalize(statement)
+            fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+            with self._lock:
+                if len(self._fingerprints) >= _MAX_CACHED_FINGERPRINTS:
+                    self._fingerprints.clear()
+                self._fingerprints[statement] = fingerprint
+                if fingerprint not in self.statements:
+                    self.statements[fingerprint] = StatementStats(fingerprint, normalized[:_MAX_STATEMENT_LENGTH])
+        return fingerprint
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # A stack, as a statement may run inside another one's events
+        conn.info.setdefault(self._started, []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info[self._started].pop()
+        fingerprint = self.fingerprint(statement)
+        stats = self.statements[fingerprint]
+        with self._lock:
+            stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.buckets[next((index for index, bound in enumerate(BUCKETS) if seconds <= bound), -1)] += 1
+            if seconds >= self.slow_seconds:
+                stats.slow += 1
+        unit = self._unit.get()
+        if unit is not None:
+            unit.statements[fingerprint] += 1
+            unit.seconds += seconds
+        if seconds >= self.slow_seconds:
+            logger.warning('Slow query %s (%.1f ms): %s', fingerprint, seconds * 1000, stats.statement)
+            if self.explain and not executemany and fingerprint not in self._explained:
+                self._explain(conn, statement, parameters, fingerprint, seconds)
+
+    def _explain(self, conn, statement, parameters, fingerprint, seconds):
+        if conn.dialect.name != 'postgresql' or not statement.lstrip().upper().startswith('SELECT'):
+            return
+        self._explained.add(fingerprint)
+        # Straight on the DBAPI connection, so the plan is not itself instrumented
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {statement}', parameters)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.close()
+        self.plans.append({
+            'fingerprint': fingerprint, 'milliseconds': round(seconds * 1000, 3),
+            'statement': self.statements[fingerprint].statement, 'plan': plan,
+        })
+
+    @contextmanager
+    def unit(self, name):
+        """
+        Group the statements executed inside the block, in this thread or task, into a :class:`QueryUnit`.
+
+        Fingerprints repeated ``n_plus_one_threshold`` times or more are logged and counted when the block exits.
+        """
+        unit = QueryUnit(name)
+        token = self._unit.set(unit)
+        try:
+            yield unit
+        finally:
+            self._unit.reset(token)
+            repeated = unit.repeated(self.n_plus_one_threshold)
+            with self._lock:
+                for fingerprint, _ in repeated:
+                    self.statements[fingerprint].n_plus_one += 1
+            for fingerprint, count in repeated:
+                logger.warning('N+1 in %s: %s ran %d times: %s', name, fingerprint, count,
+                               self.statements[fingerprint].statement)
+
+    def top(self, limit=20, key='seconds'):
+        """Return the :class:`StatementStats` with the most ``key`` (``seconds``, ``count``, ``slow``...)."""
+        with self._lock:
+            return sorted(self.statements.values(), key=lambda stats: getattr(stats, key), reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self._fingerprints.clear()
+            self._explained.clear()
+            self.plans.clear()
+
+    def render_metrics(self, prefix='galo_db'):
+        """Return the statistics in the Prometheus text exposition format."""
+        with self._lock:
+            statements = [
+                (stats, list(stats.buckets), stats.count, stats.seconds, stats.slow, stats.n_plus_one)
+                for stats in self.statements.values() if stats.count
+            ]
+        lines = [
+            f'# HELP {prefix}_query_duration_seconds Statement execution time, by fingerprint.',
+            f'# TYPE {prefix}_query_duration_seconds histogram',
+        ]
+        for stats, buckets, count, seconds, _, _ in statements:
+            label = f'fingerprint="{stats.fingerprint}"'
+            cumulative = 0
+            for bound, executions in zip((*BUCKETS, '+Inf'), buckets):
+                cumulative += executions
+                lines.append(f'{prefix}_query_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_query_duration_seconds_sum{{{label}}} {seconds}')
+            lines.append(f'{prefix}_query_duration_seconds_count{{{label}}} {count}')
+        for name, help, index in (
+            ('slow_queries_total', f'Executions slower than {self.slow_seconds * 1000:g} ms.', 4),
+            ('n_plus_one_total', 'Requests or ingestion units repeating the statement, N+1 style.', 5),
+        ):
+            lines += [f'# HELP {prefix}_{name} {help}', f'# TYPE {prefix}_{name} counter']
+            lines += [f'{prefix}_{name}{{fingerprint="{row[0].fingerprint}"}} {row[index]}' for row in statements]
+        lines += [
+            f'# HELP {prefix}_query_info Normalized statement of each fingerprint.',
+            f'# TYPE {prefix}_query_info gauge',
+        ]
+        lines += [
+            f'{prefix}_query_info{{fingerprint="{stats.fingerprint}",statement="{_escape(stats.statement)}"}} 1'
+            for stats, *_ in statements
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@lru_cache(maxsize=None)
+def get_profiler():
+    """Return the process-wide profiler, instrumenting every engine."""
+    return QueryProfiler().instrument()
+
+
+def query_unit(name):
+    """Group the statements of a request or ingestion step with the process-wide profiler."""
+    return get_profiler().unit(name)
@@ -0,0 +1,370 @@
+"""
+Precomputed player leaderboards, per season and all-time.
+
+Top scorers, assist leaders or best-rated players computed on the fly sort the
+whole season of ``player_statistics``, and the all-time ones first add every
+season up per player. ``leaderboard_entries`` stores the top
+``LEADERBOARD_SIZE`` players of each leaderboard instead:
+
+* one per metric of ``METRICS``: goals, assists, minutes, rating, and goals and
+  assists per 90 minutes;
+* per season, and for all seasons as ``season_id`` ``ALL_TIME``;
+* per minimum of minutes played of ``MIN_MINUTES``.
+
+A player's season is the sum of their ``player_statistics`` rows of the
+season, one per team they played for; all-time, of all their rows. Ratings are
+averaged weighted by minutes played. Values are rounded to 4 decimals and ties
+are broken by player id.
+
+Leaderboards are kept up to date by the write paths, in the transaction that
+changes ``player_statistics``, for the seasons written and all-time:
+
+* :func:`backend.db.upsert.upsert` and ORM flushes of ``player_statistics`` rows;
+* :func:`backend.db.backfill.load_season`;
+* :func:`backend.db.rollups.rollup_player_statistics` and
+  :func:`~backend.db.rollups.recompute_player_statistics`.
+
+A refresh replaces every leaderboard of its seasons with one ``INSERT ...
+SELECT`` ranking the players with a window function. It holds a transaction
+level advisory lock per season, so that two writers of a season take turns.
+The all-time leaderboards add up every season of every player and share one
+lock, so runs writing many seasons (the backfills and the season update jobs)
+pass ``all_time=False`` to their season loads, which then neither recompute
+them nor wait for each other, and call :func:`refresh_all_time` once at the
+end. Until then the all-time leaderboards lag behind the seasons loaded by the
+run. :func:`leaderboard` reads the stored rows, or runs the same
+ranking on the fly (:func:`live_leaderboard`) for a minimum or a length that
+is not stored.
+
+:func:`check` recomputes every leaderboard in a query and diffs it against the
+stored rows; :func:`rebuild` repairs them.
+
+Usage:
+    python -m backend.db.leaderboards check
+    python -m backend.db.leaderboards rebuild
+"""
+import argparse
+from dataclasses import dataclass, field
+
+from sqlalchemy import (
+    Float, Numeric, and_, cast, create_engine, delete, event, func, literal, or_, select, text, union_all
+)
+from sqlalchemy.orm import Session
+
+from backend.core.config import DATABASE_URL
+
+from .models import LeaderboardEntry, Player, PlayerStatistics
+
+# Players stored per leaderboard
+LEADERBOARD_SIZE = 50
+# Minutes played a player needs to be ranked, one set of leaderboards per value
+MIN_MINUTES = (0, 900, 2700)
+# season_id of the leaderboards over every season
+ALL_TIME = 0
+# First key of the advisory locks taken on the leaderboards of a season
+LEADERBOARD_LOCK = 72
+
+_entries = LeaderboardEntry.__table__
+_statistics = PlayerStatistics.__table__
+_players = Player.__table__
+
+_rated = _statistics.c.rating.isnot(None) & (_statistics.c.minutes_played > 0)
+
+# Per player totals column -> aggregate over their player_statistics rows
+TOTALS = {
+    'goals': func.coalesce(func.sum(_statistics.c.goals_total), 0),
+    'assists': func.coalesce(func.sum(_statistics.c.assists), 0),
+    'minutes_played': func.coalesce(func.sum(_statistics.c.minutes_played), 0),
+    'appearances': func.coalesce(func.sum(_statistics.c.appearances), 0),
+    'rating': (
+        func.sum(_statistics.c.rating * _statistics.c.minutes_played).filter(_rated)
+        / func.nullif(func.sum(_statistics.c.minutes_played).filter(_rated), 0)
+    ),
+}
+
+
+def _per_90(name):
+    return lambda totals: totals.c[name] * 90.0 / func.nullif(totals.c.minutes_played, 0)
+
+
+# Metric -> its value from the per player totals
+METRICS = {
+    'goals': lambda totals: totals.c.goals,
+    'assists': lambda totals: totals.c.assists,
+    'minutes': lambda totals: totals.c.minutes_played,
+    'rating': lambda totals: totals.c.rating,
+    'goals_per_90': _per_90('goals'),
+    'assists_per_90': _per_90('assists'),
+}
+
+
+def _totals(season_ids=None, all_time=False):
+    """Select the totals of each player per season of ``season_ids`` (None: all), or over every season."""
+    season = literal(ALL_TIME) if all_time else _statistics.c.season_id
+    statement = select(
+        season.label('season_id'),
+        _statistics.c.player_id,
+        *(expression.label(name) for name, expression in TOTALS.items()),
+    )
+    if season_ids is not None:
+        statement = statement.where(_statistics.c.season_id.in_(season_ids))
+    group_by = [_statistics.c.player_id] if all_time else [_statistics.c.season_id, _statistics.c.player_id]
+    return statement.group_by(*group_by)
+
+
+def _ranking(totals, metric, min_minutes):
+    """Rank the players of ``totals`` by ``metric`` among those with ``min_minutes`` played, per season."""
+    # Rounded, so that a recomputation summing in another order ranks and stores the same values
+    value = cast(func.round(cast(METRICS[metric](totals), Numeric), 4), Float)
+    return select(
+        literal(metric).label('metric'),
+        totals.c.season_id,
+        literal(min_minutes).label('min_minutes'),
+        func.row_number().over(
+            partition_by=totals.c.season_id, order_by=[value.desc(), totals.c.player_id]
+        ).label('rank'),
+        totals.c.player_id,
+        value.label('value'),
+        totals.c.minutes_played,
+        totals.c.appearances,
+    ).where(value.isnot(None), totals.c.minutes_played >= min_minutes)
+
+
+def source_query(season_ids=None, all_time=True):
+    """
+    Select the rows of the leaderboards of ``season_ids`` and the all-time ones, computed from ``player_statistics``.
+
+    Args:
+        season_ids (Iterable[int]): Seasons whose leaderboards to compute. None computes every season, an
+            empty list none.
+        all_time (bool): Whether to compute the all-time leaderboards.
+    """
+    totals = []
+    if season_ids is None or season_ids:
+        totals.append(_totals(season_ids))
+    if all_time:
+        totals.append(_totals(all_time=True))
+    totals = (union_all(*totals) if len(totals) > 1 else totals[0]).cte('totals')
+    rankings = union_all(*(
+        _ranking(totals, metric, min_minutes) for metric in METRICS for min_minutes in MIN_MINUTES
+    )).subquery('rankings')
+    return select(rankings).where(rankings.c.rank <= LEADERBOARD_SIZE)
+
+
+def _lock(connection, season_ids):
+    # Sorted, so that two refreshes always lock their seasons in the same order
+    for season_id in sorted(season_ids):
+        connection.execute(
+            text('SELECT pg_advisory_xact_lock(:namespace, :season_id)'),
+            {'namespace': LEADERBOARD_LOCK, 'season_id': season_id},
+        )
+
+
+def refresh_seasons(connection, season_ids, all_time=True):
+    """
+    Replace the leaderboards of ``season_ids`` and the all-time ones.
+
+    Args:
+        connection (Connection | Session): Where to execute the refresh, in the writing transaction.
+        season_ids (Iterable[int]): Seasons whose ``player_statistics`` rows changed.
+        all_time (bool): Whether to refresh the all-time leaderboards too. False leaves them to
+            :func:`refresh_all_time`, called once the caller has written all its seasons.
+
+    Returns:
+        int: Leaderboard rows written.
+    """
+    season_ids = sorted({season_id for season_id in season_ids if season_id is not None})
+    if not season_ids:
+        return 0
+    scopes = [*season_ids, ALL_TIME] if all_time else season_ids
+    _lock(connection, scopes)
+    connection.execute(delete(_entries).where(_entries.c.season_id.in_(scopes)))
+    statement = _entries.insert().from_select(list(_entries.c.keys()), source_query(season_ids, all_time))
+    return connection.execute(statement).rowcount
+
+
+def refresh_all_time(connection):
+    """
+    Replace the all-time leaderboards, after seasons were written with ``all_time=False``.
+
+    Args:
+        connection (Connection | Session): Where to execute the refresh, inside a transaction.
+
+    Returns:
+        int: Leaderboard rows written.
+    """
+    _lock(connection, [ALL_TIME])
+    connection.execute(delete(_entries).where(_entries.c.season_id == ALL_TIME))
+    statement = _entries.insert().from_select(list(_entries.c.keys()), source_query([], all_time=True))
+    return connection.execute(statement).rowcount
+
+
+def refresh_rows(connection, table_name, rows):
+    """Refresh the leaderboards of the seasons of ``rows`` written to ``table_name``, if any."""
+    if table_name != PlayerStatistics.__tablename__:
+        return 0
+    return refresh_seasons(connection, (row.get('season_id') for row in rows))
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_flushed(session, flush_context):
+    season_ids = {
+        instance.season_id
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(instance, PlayerStatistics)
+    }
+    if season_ids:
+        refresh_seasons(session, season_ids)
+
+
+def _rows(connection, ranking):
+    statement = (
+        select(ranking.c.rank, ranking.c.player_id, _players.c.name, _players.c.photo, ranking.c.value,
+               ranking.c.minutes_played, ranking.c.appearances)
+        .join(_players, _players.c.id == ranking.c.player_id)
+        .order_by(ranking.c.rank)
+    )
+    return [dict(row) for row in connection.execute(statement).mappings()]
+
+
+def live_leaderboard(connection, metric, season_id=None, min_minutes=0, limit=LEADERBOARD_SIZE):
+    """
+    Compute a leaderboard from ``player_statistics``, as :func:`leaderboard` returns it.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        metric (str): One of ``METRICS``.
+        season_id (int): Season to rank. None ranks all seasons.
+        min_minutes (int): Minutes a player needs to be ranked.
+        limit (int): Players to return.
+
+    Returns:
+        list[dict]: Rank, player id, name and photo, value, minutes played and appearances, best first.
+    """
+    if season_id is None:
+        totals = _totals(all_time=True).cte('totals')
+    else:
+        totals = _totals([season_id]).cte('totals')
+    ranking = _ranking(totals, metric, min_minutes).subquery('ranking')
+    return _rows(connection, select(ranking).where(ranking.c.rank <= limit).subquery('ranked'))
+
+
+def leaderboard(connection, metric, season_id=None, min_minutes=0, limit=LEADERBOARD_SIZE):
+    """
+    Return the best players of a season, or of all seasons, by ``metric``.
+
+    Reads the stored leaderboard, one range scan of its primary key, when
+    ``min_minutes`` is one of ``MIN_MINUTES`` and ``limit`` at most
+    ``LEADERBOARD_SIZE``; computes it on the fly otherwise.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        metric (str): One of ``METRICS``.
+        season_id (int): Season to rank. None ranks all seasons.
+        min_minutes (int): Minutes a player needs to be ranked.
+        limit (int): Players to return.
+
+    Returns:
+        list[dict]: Rank, player id, name and photo, value, minutes played and appearances, best first.
+
+    Raises:
+        ValueError: When ``metric`` is unknown.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {sorted(METRICS)}")
+    if min_minutes not in MIN_MINUTES or limit > LEADERBOARD_SIZE:
+        return live_leaderboard(connection, metric, season_id, min_minutes, limit)
+    stored = select(_entries).where(
+        _entries.c.metric == metric,
+        _entries.c.season_id == (ALL_TIME if season_id is None else season_id),
+        _entries.c.min_minutes == min_minutes,
+        _entries.c.rank <= limit,
+    ).subquery('stored')
+    return _rows(connection, stored)
+
+
+@dataclass
+class Report:
+    """
+    Differences between ``leaderboard_entries`` and a recomputation from ``player_statistics``.
+
+    Attributes:
+        missing (list[tuple]): ``(metric, season_id, min_minutes, rank)`` keys without a stored row.
+        extra (list[tuple]): Stored keys that should not exist.
+        different (list[tuple]): Stored keys whose player or values differ.
+    """
+
+    missing: list = field(default_factory=list)
+    extra: list = field(default_factory=list)
+    different: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not (self.missing or self.extra or self.different)
+
+
+def check(connection, limit=None):
+    """
+    Recompute every leaderboard in a query and diff the result against the stored rows.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        limit (int): Maximum keys listed per kind of difference. None lists all.
+
+    Returns:
+        Report: The differences found.
+    """
+    expected = source_query().subquery('expected')
+    stored = _entries
+    key = [name for name in stored.c.keys() if stored.c[name].primary_key]
+    same_key = and_(*(expected.c[name] == stored.c[name] for name in key))
+    columns = [name for name in stored.c.keys() if name not in key]
+    queries = {
+        'missing': select(*(expected.c[name] for name in key)).outerjoin(stored, same_key)
+        .where(stored.c.metric.is_(None)),
+        'extra': select(*(stored.c[name] for name in key)).outerjoin(expected, same_key)
+        .where(expected.c.metric.is_(None)),
+        'different': select(*(stored.c[name] for name in key)).join(expected, same_key)
+        .where(or_(*(stored.c[name].is_distinct_from(expected.c[name]) for name in columns))),
+    }
+    return Report(**{
+        kind: [tuple(row) for row in connection.execute(query.order_by(*query.selected_columns).limit(limit))]
+        for kind, query in queries.items()
+    })
+
+
+def rebuild(connection):
+    """
+    Recompute every leaderboard.
+
+    Args:
+        connection (Connection | Session): Where to execute the rebuild, inside a transaction.
+
+    Returns:
+        int: Leaderboard rows written.
+    """
+    connection.execute(text('LOCK TABLE leaderboard_entries IN EXCLUSIVE MODE'))
+    connection.execute(delete(_entries))
+    statement = _entries.insert().from_select(list(_entries.c.keys()), source_query())
+    return connection.execute(statement).rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check or rebuild the precomputed player leaderboards.')
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.begin() as connection:
+        if args.command == 'rebuild':
+            print(f'{rebuild(connection)} leaderboard rows written')
+        report = check(connection, limit=20)
+    for kind in ('missing', 'extra', 'different'):
+        print(f'{kind}: {getattr(report, kind) or "none"}')
+    if not report.ok:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,13 +14,34 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+
+def compares_models() -> bool:
+    """Whether the command compares the database with the models: ``revision --autogenerate`` or ``check``.
+
+    Migrations do not use the models, so ``alembic upgrade head`` (run before
+    every start) skips importing them and their dependencies.
+    """
+    options = config.cmd_opts
+    if options is None:
+        # Called through the alembic.command API, which does not say
+        return True
+    return bool(getattr(options, "autogenerate", False)) or options.cmd[0].__name__ == "check"
+
+
 # add your model's MetaData object here
 # for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-from backend.db import models  # noqa: E402
-from backend.db.base import Base  # noqa: E402
-target_metadata = Base.metadata  # noqa: E402
+target_metadata = None
+if compares_models():
+    from backend.db import models  # noqa: F401
+    from backend.db.base import Base
+    target_metadata = Base.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Skip the season partitions, which are managed by backend.db.partitions."""
+    from backend.db.partitions import is_partition
+
+    return not (type_ == "table" and reflected and compare_to is None and is_partition(name))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -46,6 +67,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -67,7 +89,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
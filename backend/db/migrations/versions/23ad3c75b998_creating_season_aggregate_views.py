@@ -0,0 +1,99 @@
+"""Creating season aggregate views
+
+Revision ID: 23ad3c75b998
+Revises: cd79083c44a3
+Create Date: 2026-10-18 12:20:45.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '23ad3c75b998'
+down_revision: Union[str, None] = 'cd79083c44a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every finished status, cup matches decided in extra time or on penalties included
+FINISHED = "('Match Finished', 'Match Finished After Extra Time', 'Match Finished After Penalty')"
+
+# Each view needs a unique index on plain columns to allow
+# REFRESH MATERIALIZED VIEW CONCURRENTLY.
+VIEWS = {
+    'season_team_records': (['season_id', 'team_id'], f"""
+        WITH sides AS (
+            SELECT league_id, season_id, home_team_id AS team_id, TRUE AS is_home,
+                   home_goals AS goals_for, away_goals AS goals_against
+            FROM matches WHERE status IN {FINISHED}
+            UNION ALL
+            SELECT league_id, season_id, away_team_id, FALSE,
+                   away_goals, home_goals
+            FROM matches WHERE status IN {FINISHED}
+        )
+        SELECT
+            league_id, season_id, team_id,
+            count(*) FILTER (WHERE is_home) AS home_games,
+            count(*) FILTER (WHERE is_home AND goals_for > goals_against) AS home_wins,
+            count(*) FILTER (WHERE is_home AND goals_for = goals_against) AS home_draws,
+            count(*) FILTER (WHERE is_home AND goals_for < goals_against) AS home_losses,
+            coalesce(sum(goals_for) FILTER (WHERE is_home), 0) AS home_goals_for,
+            coalesce(sum(goals_against) FILTER (WHERE is_home), 0) AS home_goals_against,
+            count(*) FILTER (WHERE NOT is_home) AS away_games,
+            count(*) FILTER (WHERE NOT is_home AND goals_for > goals_against) AS away_wins,
+            count(*) FILTER (WHERE NOT is_home AND goals_for = goals_against) AS away_draws,
+            count(*) FILTER (WHERE NOT is_home AND goals_for < goals_against) AS away_losses,
+            coalesce(sum(goals_for) FILTER (WHERE NOT is_home), 0) AS away_goals_for,
+            coalesce(sum(goals_against) FILTER (WHERE NOT is_home), 0) AS away_goals_against,
+            round(avg(goals_for), 2) AS goals_for_avg,
+            round(avg(goals_against), 2) AS goals_against_avg,
+            round(avg(goals_for) FILTER (WHERE is_home), 2) AS home_goals_for_avg,
+            round(avg(goals_for) FILTER (WHERE NOT is_home), 2) AS away_goals_for_avg
+        FROM sides
+        GROUP BY league_id, season_id, team_id
+    """),
+    'season_goal_averages': (['season_id'], f"""
+        SELECT
+            league_id, season_id,
+            count(*) AS matches_played,
+            count(*) FILTER (WHERE home_goals > away_goals) AS home_wins,
+            count(*) FILTER (WHERE home_goals = away_goals) AS draws,
+            count(*) FILTER (WHERE home_goals < away_goals) AS away_wins,
+            coalesce(sum(home_goals + away_goals), 0) AS total_goals,
+            round(avg(home_goals + away_goals), 2) AS goals_per_match,
+            round(avg(home_goals), 2) AS home_goals_per_match,
+            round(avg(away_goals), 2) AS away_goals_per_match
+        FROM matches
+        WHERE status IN {FINISHED}
+        GROUP BY league_id, season_id
+    """),
+    'season_top_scorers': (['season_id', 'player_id', 'team_id'], """
+        SELECT
+            league_id, season_id, player_id, team_id,
+            goals_total AS goals, coalesce(assists, 0) AS assists, minutes_played,
+            rank() OVER (PARTITION BY season_id ORDER BY goals_total DESC) AS rank
+        FROM player_statistics
+        WHERE goals_total > 0
+    """),
+    'season_team_cards': (['season_id', 'team_id'], """
+        SELECT
+            league_id, season_id, team_id,
+            coalesce(sum(yellow_cards), 0) AS yellow_cards,
+            coalesce(sum(red_cards), 0) AS red_cards
+        FROM player_statistics
+        GROUP BY league_id, season_id, team_id
+    """),
+}
+
+
+def upgrade() -> None:
+    for name, (columns, definition) in VIEWS.items():
+        op.execute(f'CREATE MATERIALIZED VIEW {name} AS {definition}')
+        op.create_index(f'uq_{name}_{"_".join(columns)}', name, columns, unique=True)
+
+
+def downgrade() -> None:
+    for name in reversed(VIEWS):
+        op.execute(f'DROP MATERIALIZED VIEW IF EXISTS {name}')
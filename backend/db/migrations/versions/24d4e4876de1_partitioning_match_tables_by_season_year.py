@@ -0,0 +1,262 @@
+"""Partitioning match tables by season year
+
+Revision ID: 24d4e4876de1
+Revises: 23ad3c75b998
+Create Date: 2026-10-18 14:05:52.661203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '24d4e4876de1'
+down_revision: Union[str, None] = '23ad3c75b998'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FINISHED = "('Match Finished', 'Match Finished After Extra Time', 'Match Finished After Penalty')"
+
+# Parents first, so the composite foreign keys can be created
+PARTITIONED = ('matches', 'match_statistics', 'match_predictions')
+
+# Surrogate ids keep using the sequences created by the first revision
+SEQUENCES = {'match_statistics': 'match_statistics_id_seq', 'match_predictions': 'match_predictions_id_seq'}
+
+INDEXES = {
+    'matches': [
+        ('ix_matches_season_id_date', ['season_id', 'date'], None),
+        ('ix_matches_fixtures', ['date'], "status = 'Not Started'"),
+        ('ix_matches_results', ['season_id', 'date'], f"status IN {FINISHED}"),
+    ],
+    'match_statistics': [('ix_match_statistics_match_id', ['match_id'], None)],
+    'match_predictions': [('ix_match_predictions_match_id', ['match_id'], None)],
+}
+
+
+def _match_columns():
+    return [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('season_id', sa.Integer(), nullable=False),
+        sa.Column('season_year', sa.SmallInteger(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('round', sa.String(), nullable=True),
+        sa.Column('venue_id', sa.Integer(), nullable=True),
+        sa.Column('home_team_id', sa.Integer(), nullable=False),
+        sa.Column('away_team_id', sa.Integer(), nullable=False),
+        sa.Column('home_goals', sa.Integer(), nullable=True),
+        sa.Column('away_goals', sa.Integer(), nullable=True),
+        sa.Column('halftime_home_goals', sa.Integer(), nullable=True),
+        sa.Column('halftime_away_goals', sa.Integer(), nullable=True),
+        sa.Column('fulltime_home_goals', sa.Integer(), nullable=True),
+        sa.Column('fulltime_away_goals', sa.Integer(), nullable=True),
+        sa.Column('extra_time_home_goals', sa.Integer(), nullable=True),
+        sa.Column('extra_time_away_goals', sa.Integer(), nullable=True),
+        sa.Column('penalty_home_goals', sa.Integer(), nullable=True),
+        sa.Column('penalty_away_goals', sa.Integer(), nullable=True),
+        sa.Column('referee', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('winner', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['away_team_id'], ['teams.id'], ),
+        sa.ForeignKeyConstraint(['home_team_id'], ['teams.id'], ),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+        sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+        sa.ForeignKeyConstraint(['venue_id'], ['stadiums.id'], ),
+        sa.ForeignKeyConstraint(['winner'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('id', 'season_year'),
+    ]
+
+
+def _match_statistics_columns():
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('match_statistics_id_seq')"), nullable=False),
+        sa.Column('match_id', sa.Integer(), nullable=False),
+        sa.Column('season_year', sa.SmallInteger(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('shots_on_goal', sa.Integer(), nullable=True),
+        sa.Column('shots_off_goal', sa.Integer(), nullable=True),
+        sa.Column('total_shots', sa.Integer(), nullable=True),
+        sa.Column('blocked_shots', sa.Integer(), nullable=True),
+        sa.Column('shots_inside_box', sa.Integer(), nullable=True),
+        sa.Column('shots_outside_box', sa.Integer(), nullable=True),
+        sa.Column('fouls', sa.Integer(), nullable=True),
+        sa.Column('corner_kicks', sa.Integer(), nullable=True),
+        sa.Column('offsides', sa.Integer(), nullable=True),
+        sa.Column('ball_possession', sa.String(), nullable=True),
+        sa.Column('yellow_cards', sa.Integer(), nullable=True),
+        sa.Column('red_cards', sa.Integer(), nullable=True),
+        sa.Column('goalkeeper_saves', sa.Integer(), nullable=True),
+        sa.Column('total_passes', sa.Integer(), nullable=True),
+        sa.Column('passes_accurate', sa.Integer(), nullable=True),
+        sa.Column('pass_accuracy', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['match_id', 'season_year'], ['matches.id', 'matches.season_year'], ),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('id', 'season_year'),
+        sa.UniqueConstraint(
+            'match_id', 'team_id', 'season_year', name='uq_match_statistics_match_id_team_id_season_year'
+        ),
+    ]
+
+
+def _match_predictions_columns():
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('match_predictions_id_seq')"), nullable=False),
+        sa.Column('match_id', sa.Integer(), nullable=False),
+        sa.Column('season_year', sa.SmallInteger(), nullable=False),
+        sa.Column('predicted_winner', sa.String(), nullable=True),
+        sa.Column('win_or_draw', sa.Boolean(), nullable=True),
+        sa.Column('under_over', sa.String(), nullable=True),
+        sa.Column('goals_home', sa.Integer(), nullable=True),
+        sa.Column('goals_away', sa.Integer(), nullable=True),
+        sa.Column('advice', sa.String(), nullable=True),
+        sa.Column('percent_home', sa.String(), nullable=True),
+        sa.Column('percent_draw', sa.String(), nullable=True),
+        sa.Column('percent_away', sa.String(), nullable=True),
+        sa.Column('last_updated', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['match_id', 'season_year'], ['matches.id', 'matches.season_year'], ),
+        sa.PrimaryKeyConstraint('id', 'season_year'),
+    ]
+
+
+COLUMNS = {
+    'matches': _match_columns,
+    'match_statistics': _match_statistics_columns,
+    'match_predictions': _match_predictions_columns,
+}
+
+# How each table finds the season year of its existing rows
+SEASON_YEAR = {
+    'matches': 'JOIN seasons ON seasons.id = old.season_id',
+    'match_statistics': 'JOIN matches ON matches.id = old.match_id',
+    'match_predictions': 'JOIN matches ON matches.id = old.match_id',
+}
+YEAR_COLUMN = {'matches': 'seasons.year', 'match_statistics': 'matches.season_year', 'match_predictions': 'matches.season_year'}
+
+
+# The views are saved, dropped and recreated server-side, so the revision is
+# plain DDL and can also be rendered offline with ``alembic upgrade --sql``
+_DROP_VIEWS = """
+    CREATE TEMP TABLE saved_matviews AS
+    SELECT matviewname, definition FROM pg_matviews WHERE schemaname = current_schema();
+    CREATE TEMP TABLE saved_matview_indexes AS
+    SELECT indexdef FROM pg_indexes
+    WHERE schemaname = current_schema() AND tablename IN (SELECT matviewname FROM saved_matviews);
+    DO $$
+    DECLARE saved record;
+    BEGIN
+        FOR saved IN SELECT matviewname FROM saved_matviews LOOP
+            EXECUTE format('DROP MATERIALIZED VIEW %I', saved.matviewname);
+        END LOOP;
+    END $$;
+"""
+_CREATE_VIEWS = """
+    DO $$
+    DECLARE saved record;
+    BEGIN
+        FOR saved IN SELECT matviewname, definition FROM saved_matviews LOOP
+            EXECUTE format('CREATE MATERIALIZED VIEW %I AS %s', saved.matviewname, saved.definition);
+        END LOOP;
+        FOR saved IN SELECT indexdef FROM saved_matview_indexes LOOP
+            EXECUTE saved.indexdef;
+        END LOOP;
+    END $$;
+    DROP TABLE saved_matviews, saved_matview_indexes;
+"""
+
+
+def _create_partitions(table):
+    """Create one partition per stored season year plus the next one; later ones use backend.db.partitions."""
+    op.execute(f"""
+        DO $$
+        DECLARE year int;
+        BEGIN
+            FOR year IN
+                SELECT DISTINCT seasons.year FROM seasons
+                UNION
+                SELECT coalesce(max(seasons.year), extract(year FROM now())::int) + 1 FROM seasons
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                    '{table}_y' || year, year, year + 1
+                );
+            END LOOP;
+        END $$
+    """)
+
+
+def _set_aside(table):
+    """Rename a table and free the index names it holds."""
+    op.rename_table(table, f'{table}_old')
+    op.execute(f'ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey')
+    for name, _, _ in INDEXES[table]:
+        op.drop_index(name, table_name=f'{table}_old')
+
+
+def _create_indexes(table):
+    for name, columns, where in INDEXES[table]:
+        options = {'postgresql_where': sa.text(where)} if where else {}
+        op.create_index(name, table, columns, unique=False, **options)
+
+
+def upgrade() -> None:
+    op.execute(_DROP_VIEWS)
+    for table in PARTITIONED:
+        _set_aside(table)
+    op.drop_constraint('uq_match_statistics_match_id_team_id', 'match_statistics_old', type_='unique')
+
+    for table in PARTITIONED:
+        op.create_table(table, *COLUMNS[table](), postgresql_partition_by='RANGE (season_year)')
+        _create_partitions(table)
+        # The old tables have the same columns, without season_year
+        columns = [
+            item.name for item in COLUMNS[table]() if isinstance(item, sa.Column) and item.name != 'season_year'
+        ]
+        op.execute(
+            f'INSERT INTO {table} ({", ".join(columns)}, season_year) '
+            f'SELECT {", ".join("old." + column for column in columns)}, {YEAR_COLUMN[table]} '
+            f'FROM {table}_old AS old {SEASON_YEAR[table]}'
+        )
+        _create_indexes(table)
+
+    for table, sequence in SEQUENCES.items():
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    # matches_id_seq is owned by matches_old.id and is dropped with it: matches.id has no
+    # default anymore, fixture ids come from API-Football and must always be supplied
+    for table in reversed(PARTITIONED):
+        op.drop_table(f'{table}_old')
+    op.execute(_CREATE_VIEWS)
+
+
+def downgrade() -> None:
+    op.execute(_DROP_VIEWS)
+    for table in PARTITIONED:
+        op.execute(f'CREATE TABLE {table}_old (LIKE {table} INCLUDING DEFAULTS)')
+        op.execute(f'INSERT INTO {table}_old SELECT * FROM {table}')
+    for table, sequence in SEQUENCES.items():
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}_old.id')
+    for table in reversed(PARTITIONED):
+        op.drop_table(table)
+
+    for table in PARTITIONED:
+        op.rename_table(f'{table}_old', table)
+        op.drop_column(table, 'season_year')
+        op.create_primary_key(f'{table}_pkey', table, ['id'])
+    op.execute('CREATE SEQUENCE matches_id_seq OWNED BY matches.id')
+    op.execute("SELECT setval('matches_id_seq', coalesce(max(id), 0) + 1, false) FROM matches")
+    op.execute("ALTER TABLE matches ALTER COLUMN id SET DEFAULT nextval('matches_id_seq')")
+
+    for column, referred in (
+        ('league_id', 'leagues'), ('season_id', 'seasons'), ('venue_id', 'stadiums'),
+        ('home_team_id', 'teams'), ('away_team_id', 'teams'), ('winner', 'teams'),
+    ):
+        op.create_foreign_key(f'matches_{column}_fkey', 'matches', referred, [column], ['id'])
+    op.create_foreign_key('match_statistics_match_id_fkey', 'match_statistics', 'matches', ['match_id'], ['id'])
+    op.create_foreign_key('match_statistics_team_id_fkey', 'match_statistics', 'teams', ['team_id'], ['id'])
+    op.create_foreign_key('match_predictions_match_id_fkey', 'match_predictions', 'matches', ['match_id'], ['id'])
+    op.create_unique_constraint('uq_match_statistics_match_id_team_id', 'match_statistics', ['match_id', 'team_id'])
+    for table in PARTITIONED:
+        _create_indexes(table)
+    op.execute(_CREATE_VIEWS)
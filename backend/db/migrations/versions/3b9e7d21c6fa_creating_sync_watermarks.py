@@ -0,0 +1,37 @@
+"""Creating sync watermarks
+
+Revision ID: 3b9e7d21c6fa
+Revises: f0756e80efc4
+Create Date: 2026-10-18 18:02:41.506317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e7d21c6fa'
+down_revision: Union[str, None] = 'f0756e80efc4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_watermarks',
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('league_id', sa.Integer(), nullable=False),
+    sa.Column('synced_at', sa.DateTime(), nullable=False),
+    sa.Column('high_water', sa.DateTime(), nullable=True),
+    sa.Column('requests', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('rows_written', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+    sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+    sa.PrimaryKeyConstraint('entity', 'season_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sync_watermarks')
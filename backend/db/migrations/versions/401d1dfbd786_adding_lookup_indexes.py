@@ -0,0 +1,48 @@
+"""Adding lookup indexes
+
+Revision ID: 401d1dfbd786
+Revises: 0024803e318b
+Create Date: 2026-10-18 10:12:41.538112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '401d1dfbd786'
+down_revision: Union[str, None] = '0024803e318b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FINISHED = "('Match Finished', 'Match Finished After Extra Time', 'Match Finished After Penalty')"
+
+
+def upgrade() -> None:
+    op.create_index('ix_team_statistics_team_id_season_id', 'team_statistics', ['team_id', 'season_id'], unique=False)
+    op.create_index('ix_standings_team_id_season_id', 'standings', ['team_id', 'season_id'], unique=False)
+    op.create_index('ix_player_statistics_team_id_season_id', 'player_statistics', ['team_id', 'season_id'], unique=False)
+    op.create_index('ix_matches_season_id_date', 'matches', ['season_id', 'date'], unique=False)
+    op.create_index(
+        'ix_matches_fixtures', 'matches', ['date'], unique=False,
+        postgresql_where=sa.text("status = 'Not Started'")
+    )
+    op.create_index(
+        'ix_matches_results', 'matches', ['season_id', 'date'], unique=False,
+        postgresql_where=sa.text(f"status IN {FINISHED}")
+    )
+    op.create_index('ix_match_statistics_match_id', 'match_statistics', ['match_id'], unique=False)
+    op.create_index('ix_match_predictions_match_id', 'match_predictions', ['match_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_match_predictions_match_id', table_name='match_predictions')
+    op.drop_index('ix_match_statistics_match_id', table_name='match_statistics')
+    op.drop_index('ix_matches_results', table_name='matches', postgresql_where=sa.text(f"status IN {FINISHED}"))
+    op.drop_index('ix_matches_fixtures', table_name='matches', postgresql_where=sa.text("status = 'Not Started'"))
+    op.drop_index('ix_matches_season_id_date', table_name='matches')
+    op.drop_index('ix_player_statistics_team_id_season_id', table_name='player_statistics')
+    op.drop_index('ix_standings_team_id_season_id', table_name='standings')
+    op.drop_index('ix_team_statistics_team_id_season_id', table_name='team_statistics')
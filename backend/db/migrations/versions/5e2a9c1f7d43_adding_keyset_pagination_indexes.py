@@ -0,0 +1,49 @@
+"""Adding keyset pagination indexes
+
+Revision ID: 5e2a9c1f7d43
+Revises: 3b9e7d21c6fa
+Create Date: 2026-10-18 19:24:13.871406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a9c1f7d43'
+down_revision: Union[str, None] = '3b9e7d21c6fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (season_id, date, id) serves every query (season_id, date) did
+    op.drop_index('ix_matches_season_id_date', table_name='matches')
+    op.create_index('ix_matches_season_id_date_id', 'matches', ['season_id', 'date', 'id'], unique=False)
+    op.create_index('ix_matches_date_id', 'matches', ['date', 'id'], unique=False)
+    op.create_index(
+        'ix_player_statistics_season_id_goals_total_id', 'player_statistics', ['season_id', 'goals_total', 'id'],
+        unique=False, postgresql_where=sa.text('goals_total IS NOT NULL')
+    )
+    op.create_index(
+        'ix_player_statistics_season_id_rating_id', 'player_statistics', ['season_id', 'rating', 'id'],
+        unique=False, postgresql_where=sa.text('rating IS NOT NULL')
+    )
+    op.create_index('ix_standings_season_id_rank_id', 'standings', ['season_id', 'rank', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_standings_season_id_rank_id', table_name='standings')
+    op.drop_index(
+        'ix_player_statistics_season_id_rating_id', table_name='player_statistics',
+        postgresql_where=sa.text('rating IS NOT NULL')
+    )
+    op.drop_index(
+        'ix_player_statistics_season_id_goals_total_id', table_name='player_statistics',
+        postgresql_where=sa.text('goals_total IS NOT NULL')
+    )
+    op.drop_index('ix_matches_date_id', table_name='matches')
+    op.drop_index('ix_matches_season_id_date_id', table_name='matches')
+    op.create_index('ix_matches_season_id_date', 'matches', ['season_id', 'date'], unique=False)
@@ -0,0 +1,90 @@
+"""Creating match summaries
+
+Revision ID: 7d3b5f0e9a12
+Revises: 9c4f1e8a2b67
+Create Date: 2026-10-18 21:12:40.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b5f0e9a12'
+down_revision: Union[str, None] = '9c4f1e8a2b67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    'match_id', 'league_id', 'season_id', 'season_year', 'round', 'status', 'league_name', 'league_logo',
+    'home_team_id', 'home_team_name', 'home_team_logo', 'away_team_id', 'away_team_name', 'away_team_logo',
+    'home_goals', 'away_goals', 'penalty_home_goals', 'penalty_away_goals', 'winner', 'venue_id', 'venue_name',
+    'venue_city',
+]
+
+
+def upgrade() -> None:
+    op.create_table('match_summaries',
+    sa.Column('match_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('league_id', sa.Integer(), nullable=False),
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('season_year', sa.SmallInteger(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('round', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('league_name', sa.String(), nullable=True),
+    sa.Column('league_logo', sa.String(), nullable=True),
+    sa.Column('home_team_id', sa.Integer(), nullable=False),
+    sa.Column('home_team_name', sa.String(), nullable=True),
+    sa.Column('home_team_logo', sa.String(), nullable=True),
+    sa.Column('away_team_id', sa.Integer(), nullable=False),
+    sa.Column('away_team_name', sa.String(), nullable=True),
+    sa.Column('away_team_logo', sa.String(), nullable=True),
+    sa.Column('home_goals', sa.Integer(), nullable=True),
+    sa.Column('away_goals', sa.Integer(), nullable=True),
+    sa.Column('penalty_home_goals', sa.Integer(), nullable=True),
+    sa.Column('penalty_away_goals', sa.Integer(), nullable=True),
+    sa.Column('winner', sa.Integer(), nullable=True),
+    sa.Column('venue_id', sa.Integer(), nullable=True),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('venue_city', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('match_id')
+    )
+    # Filled before the indexes are built, which is faster than maintaining them row by row
+    op.execute("""
+        INSERT INTO match_summaries
+        SELECT matches.id, matches.league_id, matches.season_id, matches.season_year, matches.date, matches.round,
+               matches.status, leagues.name, leagues.logo, matches.home_team_id, home_teams.name, home_teams.logo,
+               matches.away_team_id, away_teams.name, away_teams.logo, matches.home_goals, matches.away_goals,
+               matches.penalty_home_goals, matches.penalty_away_goals, matches.winner, matches.venue_id,
+               stadiums.name, stadiums.city
+        FROM matches
+        JOIN teams AS home_teams ON home_teams.id = matches.home_team_id
+        JOIN teams AS away_teams ON away_teams.id = matches.away_team_id
+        JOIN leagues ON leagues.id = matches.league_id
+        LEFT JOIN stadiums ON stadiums.id = matches.venue_id
+    """)
+    op.create_index(
+        'ix_match_summaries_home_team_id_date', 'match_summaries', ['home_team_id', 'date'], unique=False,
+        postgresql_include=[name for name in COLUMNS if name != 'home_team_id']
+    )
+    op.create_index(
+        'ix_match_summaries_away_team_id_date', 'match_summaries', ['away_team_id', 'date'], unique=False,
+        postgresql_include=[name for name in COLUMNS if name != 'away_team_id']
+    )
+    op.create_index(
+        'ix_match_summaries_upcoming', 'match_summaries', ['date'], unique=False,
+        postgresql_where=sa.text("status = 'Not Started'"), postgresql_include=COLUMNS
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_match_summaries_upcoming', table_name='match_summaries',
+        postgresql_where=sa.text("status = 'Not Started'")
+    )
+    op.drop_index('ix_match_summaries_away_team_id_date', table_name='match_summaries')
+    op.drop_index('ix_match_summaries_home_team_id_date', table_name='match_summaries')
+    op.drop_table('match_summaries')
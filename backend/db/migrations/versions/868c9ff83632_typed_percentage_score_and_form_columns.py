@@ -0,0 +1,116 @@
+"""Typed percentage, score and form columns
+
+Revision ID: 868c9ff83632
+Revises: 24d4e4876de1
+Create Date: 2026-10-18 15:31:09.284471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '868c9ff83632'
+down_revision: Union[str, None] = '24d4e4876de1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PERCENTAGES = {
+    'match_statistics': ['ball_possession', 'pass_accuracy'],
+    'player_statistics': ['passes_accuracy'],
+    'match_predictions': ['percent_home', 'percent_draw', 'percent_away'],
+}
+SCORES = ['biggest_win_home', 'biggest_win_away', 'biggest_loss_home', 'biggest_loss_away']
+
+# Frozen copy of backend.db.formats.encode_form/decode_form: two bits per result,
+# W=1, D=2 and L=3, four results per byte from the high bits, 0 ends the form.
+# Like encode_form, which raises KeyError, any other letter fails the conversion.
+# They run server-side, so the revision can also be rendered with ``alembic upgrade --sql``
+ENCODE_FORM = """
+    CREATE FUNCTION pg_temp.convert_form(form text) RETURNS bytea LANGUAGE plpgsql AS $$
+    DECLARE
+        packed bytea := decode(repeat('00', (length(form) + 3) / 4), 'hex');
+        code int;
+    BEGIN
+        FOR i IN 0 .. length(form) - 1 LOOP
+            code := strpos('WDL', upper(substr(form, i + 1, 1)));
+            IF code = 0 THEN
+                -- 0 would end the form there: fail the upgrade rather than drop the rest of it
+                RAISE EXCEPTION 'Unknown result % in form %', substr(form, i + 1, 1), form;
+            END IF;
+            packed := set_byte(packed, i / 4, get_byte(packed, i / 4) | (code << (6 - 2 * (i % 4))));
+        END LOOP;
+        RETURN packed;
+    END $$
+"""
+DECODE_FORM = """
+    CREATE FUNCTION pg_temp.convert_form(packed bytea) RETURNS text LANGUAGE plpgsql AS $$
+    DECLARE
+        form text := '';
+        code int;
+    BEGIN
+        FOR i IN 0 .. length(packed) * 4 - 1 LOOP
+            code := (get_byte(packed, i / 4) >> (6 - 2 * (i % 4))) & 3;
+            EXIT WHEN code = 0;
+            form := form || substr('WDL', code, 1);
+        END LOOP;
+        RETURN form;
+    END $$
+"""
+
+
+def _convert_form(target_type, function):
+    """Rewrite team_statistics.form through a temporary column and a temporary conversion function."""
+    op.add_column('team_statistics', sa.Column('form_converted', target_type, nullable=True))
+    op.execute(function)
+    op.execute('UPDATE team_statistics SET form_converted = pg_temp.convert_form(form) WHERE form IS NOT NULL')
+    op.execute('DROP FUNCTION pg_temp.convert_form')
+    op.drop_column('team_statistics', 'form')
+    op.alter_column('team_statistics', 'form_converted', new_column_name='form')
+
+
+def upgrade() -> None:
+    # '54%', '54' and '' all become integers; the type change rewrites each table once
+    for table, columns in PERCENTAGES.items():
+        for column in columns:
+            op.alter_column(
+                table, column, type_=sa.SmallInteger(), existing_type=sa.String(),
+                postgresql_using=f"NULLIF(regexp_replace({column}, '[^0-9.]', '', 'g'), '')::numeric::smallint",
+            )
+
+    for score in SCORES:
+        op.add_column('team_statistics', sa.Column(f'{score}_goals_home', sa.SmallInteger(), nullable=True))
+        op.add_column('team_statistics', sa.Column(f'{score}_goals_away', sa.SmallInteger(), nullable=True))
+    op.execute(
+        'UPDATE team_statistics SET ' + ', '.join(
+            f"{score}_goals_home = NULLIF(split_part({score}, '-', 1), '')::smallint, "
+            f"{score}_goals_away = NULLIF(split_part({score}, '-', 2), '')::smallint"
+            for score in SCORES
+        ) + ' WHERE ' + ' OR '.join(f'{score} IS NOT NULL' for score in SCORES)
+    )
+    for score in SCORES:
+        op.drop_column('team_statistics', score)
+
+    _convert_form(sa.LargeBinary(), ENCODE_FORM)
+
+
+def downgrade() -> None:
+    _convert_form(sa.String(), DECODE_FORM)
+
+    for score in SCORES:
+        op.add_column('team_statistics', sa.Column(score, sa.String(), nullable=True))
+        op.execute(
+            f"UPDATE team_statistics SET {score} = {score}_goals_home || '-' || {score}_goals_away "
+            f'WHERE {score}_goals_home IS NOT NULL'
+        )
+        op.drop_column('team_statistics', f'{score}_goals_away')
+        op.drop_column('team_statistics', f'{score}_goals_home')
+
+    for table, columns in PERCENTAGES.items():
+        for column in columns:
+            op.alter_column(
+                table, column, type_=sa.String(), existing_type=sa.SmallInteger(),
+                postgresql_using=f"{column} || '%'",
+            )
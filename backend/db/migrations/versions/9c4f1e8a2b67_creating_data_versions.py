@@ -0,0 +1,32 @@
+"""Creating data versions
+
+Revision ID: 9c4f1e8a2b67
+Revises: 5e2a9c1f7d43
+Create Date: 2026-10-18 20:07:52.114930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4f1e8a2b67'
+down_revision: Union[str, None] = '5e2a9c1f7d43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('data_versions',
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+    sa.PrimaryKeyConstraint('season_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
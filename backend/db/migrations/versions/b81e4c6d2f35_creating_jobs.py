@@ -0,0 +1,73 @@
+"""Creating jobs
+
+Revision ID: b81e4c6d2f35
+Revises: 7d3b5f0e9a12
+Create Date: 2026-10-18 22:03:17.846201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81e4c6d2f35'
+down_revision: Union[str, None] = '7d3b5f0e9a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('season_id', sa.Integer(), nullable=True),
+    sa.Column('parent_id', sa.BigInteger(), nullable=True),
+    sa.Column('status', sa.String(), server_default=sa.text("'queued'"), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), server_default=sa.text("(now() AT TIME ZONE 'utc')"), nullable=False),
+    sa.Column('leased_by', sa.String(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text("(now() AT TIME ZONE 'utc')"), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['parent_id'], ['jobs.id'], ),
+    sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'uq_jobs_kind_season_id_active', 'jobs', ['kind', 'season_id'], unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running') AND season_id IS NOT NULL")
+    )
+    op.create_index(
+        'uq_jobs_kind_active', 'jobs', ['kind'], unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running') AND season_id IS NULL")
+    )
+    op.create_index(
+        'ix_jobs_queued', 'jobs', ['run_after', 'id'], unique=False,
+        postgresql_where=sa.text("status = 'queued'")
+    )
+    op.create_index(
+        'ix_jobs_running', 'jobs', ['lease_expires_at'], unique=False,
+        postgresql_where=sa.text("status = 'running'")
+    )
+    op.create_index('ix_jobs_parent_id', 'jobs', ['parent_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_parent_id', table_name='jobs')
+    op.drop_index('ix_jobs_running', table_name='jobs', postgresql_where=sa.text("status = 'running'"))
+    op.drop_index('ix_jobs_queued', table_name='jobs', postgresql_where=sa.text("status = 'queued'"))
+    op.drop_index(
+        'uq_jobs_kind_active', table_name='jobs',
+        postgresql_where=sa.text("status IN ('queued', 'running') AND season_id IS NULL")
+    )
+    op.drop_index(
+        'uq_jobs_kind_season_id_active', table_name='jobs',
+        postgresql_where=sa.text("status IN ('queued', 'running') AND season_id IS NOT NULL")
+    )
+    op.drop_table('jobs')
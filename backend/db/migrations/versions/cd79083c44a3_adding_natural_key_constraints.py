@@ -0,0 +1,43 @@
+"""Adding natural key constraints
+
+Revision ID: cd79083c44a3
+Revises: 401d1dfbd786
+Create Date: 2026-10-18 11:02:17.904316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd79083c44a3'
+down_revision: Union[str, None] = '401d1dfbd786'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NATURAL_KEYS = {
+    'uq_team_statistics_team_id_league_id_season_id': ('team_statistics', ['team_id', 'league_id', 'season_id']),
+    'uq_standings_team_id_league_id_season_id': ('standings', ['team_id', 'league_id', 'season_id']),
+    'uq_match_statistics_match_id_team_id': ('match_statistics', ['match_id', 'team_id']),
+    'uq_player_statistics_player_id_team_id_league_id_season_id': (
+        'player_statistics', ['player_id', 'team_id', 'league_id', 'season_id']
+    ),
+}
+
+
+def upgrade() -> None:
+    for name, (table, columns) in NATURAL_KEYS.items():
+        # Earlier refreshes may have inserted the same row twice; keep the newest copy
+        key = ' AND '.join(f'older.{column} = newer.{column}' for column in columns)
+        op.execute(
+            f'DELETE FROM {table} AS older USING {table} AS newer '
+            f'WHERE {key} AND older.id < newer.id'
+        )
+        op.create_unique_constraint(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, (table, _) in reversed(NATURAL_KEYS.items()):
+        op.drop_constraint(name, table, type_='unique')
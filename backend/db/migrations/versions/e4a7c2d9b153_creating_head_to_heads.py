@@ -0,0 +1,72 @@
+"""Creating head to heads
+
+Revision ID: e4a7c2d9b153
+Revises: b81e4c6d2f35
+Create Date: 2026-10-18 22:48:05.219374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2d9b153'
+down_revision: Union[str, None] = 'b81e4c6d2f35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FINISHED = "('Match Finished', 'Match Finished After Extra Time', 'Match Finished After Penalty')"
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_matches_team_pair', 'matches',
+        [sa.text('least(home_team_id, away_team_id)'), sa.text('greatest(home_team_id, away_team_id)')],
+        unique=False
+    )
+    op.create_table('head_to_heads',
+    sa.Column('team_a_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('team_b_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('played', sa.Integer(), nullable=False),
+    sa.Column('team_a_wins', sa.Integer(), nullable=False),
+    sa.Column('draws', sa.Integer(), nullable=False),
+    sa.Column('team_b_wins', sa.Integer(), nullable=False),
+    sa.Column('team_a_goals', sa.Integer(), nullable=False),
+    sa.Column('team_b_goals', sa.Integer(), nullable=False),
+    sa.Column('first_match_date', sa.DateTime(), nullable=True),
+    sa.Column('last_match_date', sa.DateTime(), nullable=True),
+    sa.Column('last_results', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.CheckConstraint('team_a_id < team_b_id', name='ck_head_to_heads_team_order'),
+    sa.ForeignKeyConstraint(['team_a_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['team_b_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('team_a_id', 'team_b_id')
+    )
+    # Filled before the index is built, which is faster than maintaining it row by row
+    op.execute(f"""
+        INSERT INTO head_to_heads
+        SELECT least(home_team_id, away_team_id), greatest(home_team_id, away_team_id), count(*),
+               count(*) FILTER (WHERE winner = least(home_team_id, away_team_id)),
+               count(*) FILTER (WHERE winner IS NULL),
+               count(*) FILTER (WHERE winner = greatest(home_team_id, away_team_id)),
+               coalesce(sum(CASE WHEN home_team_id < away_team_id THEN home_goals ELSE away_goals END), 0),
+               coalesce(sum(CASE WHEN home_team_id < away_team_id THEN away_goals ELSE home_goals END), 0),
+               min(date), max(date),
+               to_jsonb((array_agg(jsonb_build_object(
+                   'match_id', id, 'date', date, 'season_id', season_id, 'home_team_id', home_team_id,
+                   'away_team_id', away_team_id, 'home_goals', home_goals, 'away_goals', away_goals,
+                   'winner', winner
+               ) ORDER BY date DESC, id DESC))[1:10])
+        FROM matches
+        WHERE status IN {FINISHED}
+        GROUP BY least(home_team_id, away_team_id), greatest(home_team_id, away_team_id)
+    """)
+    op.create_index('ix_head_to_heads_team_b_id', 'head_to_heads', ['team_b_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_head_to_heads_team_b_id', table_name='head_to_heads')
+    op.drop_table('head_to_heads')
+    op.drop_index('ix_matches_team_pair', table_name='matches')
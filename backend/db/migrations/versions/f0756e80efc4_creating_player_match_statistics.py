@@ -0,0 +1,83 @@
+"""Creating player match statistics
+
+Revision ID: f0756e80efc4
+Revises: 868c9ff83632
+Create Date: 2026-10-18 16:48:33.720915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0756e80efc4'
+down_revision: Union[str, None] = '868c9ff83632'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = [
+    'shots_total', 'shots_on_goal', 'goals_total', 'assists', 'goals_conceded', 'goals_saves',
+    'passes_total', 'passes_key', 'passes_accuracy', 'tackles_total', 'tackles_blocks',
+    'tackles_interceptions', 'duels_total', 'duels_won', 'dribbles_attempts', 'dribbles_success',
+    'fouls_drawn', 'fouls_committed', 'yellow_cards', 'red_cards', 'penalties_won',
+    'penalties_commited', 'penalties_scored', 'penalties_missed', 'penalties_saved',
+]
+
+
+def upgrade() -> None:
+    op.create_table('player_match_statistics',
+    sa.Column('match_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('player_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('season_year', sa.SmallInteger(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('league_id', sa.Integer(), nullable=False),
+    sa.Column('season_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.String(), nullable=True),
+    sa.Column('minutes_played', sa.SmallInteger(), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('captain', sa.Boolean(), nullable=True),
+    sa.Column('substitute', sa.Boolean(), nullable=True),
+    *[sa.Column(name, sa.SmallInteger(), nullable=True) for name in COUNTERS],
+    sa.Column('rolled_up', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+    sa.ForeignKeyConstraint(['match_id', 'season_year'], ['matches.id', 'matches.season_year'], ),
+    sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+    sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('match_id', 'player_id', 'season_year'),
+    postgresql_partition_by='RANGE (season_year)'
+    )
+    # Same years as the matches partitions created by 24d4e4876de1 and backend.db.partitions,
+    # found server-side so the revision can also be rendered with ``alembic upgrade --sql``
+    op.execute("""
+        DO $$
+        DECLARE year int;
+        BEGIN
+            FOR year IN
+                SELECT substring(child.relname FROM '_y(\\d{4})$')::int FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = 'matches'::regclass
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF player_match_statistics FOR VALUES FROM (%s) TO (%s)',
+                    'player_match_statistics_y' || year, year, year + 1
+                );
+            END LOOP;
+        END $$
+    """)
+    op.create_index(
+        'ix_player_match_statistics_player_id_season_id', 'player_match_statistics',
+        ['player_id', 'season_id'], unique=False
+    )
+    op.create_index(
+        'ix_player_match_statistics_pending', 'player_match_statistics', ['season_id'], unique=False,
+        postgresql_where=sa.text('NOT rolled_up')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_player_match_statistics_pending', table_name='player_match_statistics')
+    op.drop_index('ix_player_match_statistics_player_id_season_id', table_name='player_match_statistics')
+    op.drop_table('player_match_statistics')
@@ -0,0 +1,80 @@
+"""Creating leaderboard entries
+
+Revision ID: f6b3d8a1c927
+Revises: e4a7c2d9b153
+Create Date: 2026-10-18 23:26:51.874610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b3d8a1c927'
+down_revision: Union[str, None] = 'e4a7c2d9b153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('leaderboard_entries',
+    sa.Column('metric', sa.String(), nullable=False),
+    sa.Column('season_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('min_minutes', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('rank', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('player_id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('minutes_played', sa.Integer(), nullable=False),
+    sa.Column('appearances', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+    sa.PrimaryKeyConstraint('metric', 'season_id', 'min_minutes', 'rank')
+    )
+    # Same leaderboards as backend.db.leaderboards.rebuild(): season_id 0 is all-time,
+    # top 50 per metric and minimum of minutes played
+    op.execute("""
+        WITH totals AS (
+            SELECT season_id, player_id, coalesce(sum(goals_total), 0) AS goals,
+                   coalesce(sum(assists), 0) AS assists, coalesce(sum(minutes_played), 0) AS minutes_played,
+                   coalesce(sum(appearances), 0) AS appearances,
+                   sum(rating * minutes_played) FILTER (WHERE rating IS NOT NULL AND minutes_played > 0)
+                   / nullif(sum(minutes_played) FILTER (WHERE rating IS NOT NULL AND minutes_played > 0), 0)
+                   AS rating
+            FROM player_statistics
+            GROUP BY season_id, player_id
+            UNION ALL
+            SELECT 0, player_id, coalesce(sum(goals_total), 0), coalesce(sum(assists), 0),
+                   coalesce(sum(minutes_played), 0), coalesce(sum(appearances), 0),
+                   sum(rating * minutes_played) FILTER (WHERE rating IS NOT NULL AND minutes_played > 0)
+                   / nullif(sum(minutes_played) FILTER (WHERE rating IS NOT NULL AND minutes_played > 0), 0)
+            FROM player_statistics
+            GROUP BY player_id
+        ), metric_values AS (
+            SELECT totals.*, metric, CAST(round(CAST(CASE metric
+                WHEN 'goals' THEN goals
+                WHEN 'assists' THEN assists
+                WHEN 'minutes' THEN minutes_played
+                WHEN 'rating' THEN rating
+                WHEN 'goals_per_90' THEN goals * 90.0 / nullif(minutes_played, 0)
+                WHEN 'assists_per_90' THEN assists * 90.0 / nullif(minutes_played, 0)
+            END AS numeric), 4) AS float) AS value
+            FROM totals
+            CROSS JOIN (VALUES ('goals'), ('assists'), ('minutes'), ('rating'), ('goals_per_90'),
+                               ('assists_per_90')) AS metrics (metric)
+        ), ranked AS (
+            SELECT metric, season_id, min_minutes,
+                   row_number() OVER (PARTITION BY metric, season_id, min_minutes ORDER BY value DESC, player_id)
+                   AS rank,
+                   player_id, value, minutes_played, appearances
+            FROM metric_values
+            CROSS JOIN (VALUES (0), (900), (2700)) AS minimums (min_minutes)
+            WHERE value IS NOT NULL AND minutes_played >= min_minutes
+        )
+        INSERT INTO leaderboard_entries
+        SELECT * FROM ranked WHERE rank <= 50
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('leaderboard_entries')
@@ -1,6 +1,18 @@
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Table
+from sqlalchemy import (
+    JSON, BigInteger, Boolean, CheckConstraint, Column, DateTime, Float, ForeignKey, ForeignKeyConstraint, Index,
+    Integer, LargeBinary, SmallInteger, String, Table, UniqueConstraint, column, func, text
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from .base import Base
+from .formats import form_property, percent_property, score_property
+
+# Relationships use lazy='raise': they only work when the query loads them
+# explicitly (see backend.db.repository), so an N+1 pattern fails loudly and
+# nothing tries to lazy load under an AsyncSession.
+
+# Statuses of a match whose result is final: after normal time, extra time or a penalty shootout
+FINISHED = ('Match Finished', 'Match Finished After Extra Time', 'Match Finished After Penalty')
 
 class League(Base):
     """
@@ -24,10 +36,11 @@ class League(Base):
     flag = Column(String)
     
     # Relationships
-    seasons = relationship('Season', back_populates='league')
-    standing = relationship('Standings', back_populates='league')
-    statistics = relationship('TeamStatistics', back_populates='league')
-    matches = relationship('Match', back_populates='league')
+    seasons = relationship('Season', back_populates='league', lazy='raise')
+    standings = relationship('Standings', back_populates='league', lazy='raise')
+    statistics = relationship('TeamStatistics', back_populates='league', lazy='raise')
+    player_statistics = relationship('PlayerStatistics', back_populates='league', lazy='raise')
+    matches = relationship('Match', back_populates='league', lazy='raise')
 
 class Season(Base):
     """
@@ -52,10 +65,13 @@ class Season(Base):
     is_current = Column(Boolean, nullable=False)
     
     # Relationships
-    league = relationship('League', back_populates='seasons')
-    standings = relationship('Standings', back_populates='season')
-    statistics = relationship('TeamStatistics', back_populates='season')
-    matches = relationship('Match', back_populates='season')
+    league = relationship('League', back_populates='seasons', lazy='raise')
+    standings = relationship(
+        'Standings', back_populates='season', order_by=lambda: [Standings.group_name, Standings.rank], lazy='raise'
+    )
+    statistics = relationship('TeamStatistics', back_populates='season', lazy='raise')
+    player_statistics = relationship('PlayerStatistics', back_populates='season', lazy='raise')
+    matches = relationship('Match', back_populates='season', lazy='raise')
 
 class TeamStatistics(Base):
     """
@@ -66,7 +82,7 @@ class TeamStatistics(Base):
         team_id (int): Foreign key referencing the Team.
         league_id (int): Foreign key referencing the League.
         season_id (int): Foreign key referencing the Season.
-        form (str): Team's current form.
+        form (str): Team's current form (e.g. 'WWDL'), stored packed 2 bits per game.
         games_played (int): Total games played.
         games_home (int): Total home games played.
         games_away (int): Total away games played.
@@ -83,10 +99,12 @@ class TeamStatistics(Base):
         goals_against (int): Total goals conceded.
         clean_sheets (int): Total clean sheets.
         failed_to_score (int): Total games where the team failed to score.
-        biggest_win_home (str): Biggest win at home.
+        biggest_win_home (str): Biggest win at home (e.g. '4-0').
         biggest_win_away (str): Biggest win away.
         biggest_loss_home (str): Biggest loss at home.
         biggest_loss_away (str): Biggest loss away.
+        biggest_*_goals_home (int): Home side goals of each biggest score above.
+        biggest_*_goals_away (int): Away side goals of each biggest score above.
         penalty_scored (int): Total penalties scored.
         penalty_missed (int): Total penalties missed.
         streak_wins (int): Current winning streak.
@@ -97,12 +115,16 @@ class TeamStatistics(Base):
     """
     
     __tablename__ = 'team_statistics'
+    __table_args__ = (
+        UniqueConstraint('team_id', 'league_id', 'season_id', name='uq_team_statistics_team_id_league_id_season_id'),
+        Index('ix_team_statistics_team_id_season_id', 'team_id', 'season_id'),
+    )
     
     id = Column(Integer, primary_key=True)
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
     season_id = Column(Integer, ForeignKey('seasons.id'), nullable=False)
-    form = Column(String)
+    _form = Column('form', LargeBinary)
     games_played = Column(Integer)
     games_home = Column(Integer)
     games_away = Column(Integer)
@@ -119,10 +141,14 @@ class TeamStatistics(Base):
     goals_against = Column(Integer)
     clean_sheets = Column(Integer)
     failed_to_score = Column(Integer)
-    biggest_win_home = Column(String)
-    biggest_win_away = Column(String)
-    biggest_loss_home = Column(String)
-    biggest_loss_away = Column(String)
+    biggest_win_home_goals_home = Column(SmallInteger)
+    biggest_win_home_goals_away = Column(SmallInteger)
+    biggest_win_away_goals_home = Column(SmallInteger)
+    biggest_win_away_goals_away = Column(SmallInteger)
+    biggest_loss_home_goals_home = Column(SmallInteger)
+    biggest_loss_home_goals_away = Column(SmallInteger)
+    biggest_loss_away_goals_home = Column(SmallInteger)
+    biggest_loss_away_goals_away = Column(SmallInteger)
     penalty_scored = Column(Integer)
     penalty_missed = Column(Integer)
     streak_wins = Column(Integer)
@@ -131,10 +157,17 @@ class TeamStatistics(Base):
     yellow_cards = Column(Integer)
     red_cards = Column(Integer)
     
+    # String formats expected by the frontend, backed by the compact columns above
+    form = form_property('_form')
+    biggest_win_home = score_property('biggest_win_home_goals_home', 'biggest_win_home_goals_away')
+    biggest_win_away = score_property('biggest_win_away_goals_home', 'biggest_win_away_goals_away')
+    biggest_loss_home = score_property('biggest_loss_home_goals_home', 'biggest_loss_home_goals_away')
+    biggest_loss_away = score_property('biggest_loss_away_goals_home', 'biggest_loss_away_goals_away')
+    
     # Relationships
-    team = relationship('Team', back_populates='statistics')
-    league = relationship('League', back_populates='statistics')
-    season = relationship('Season', back_populates='statistics')
+    team = relationship('Team', back_populates='statistics', lazy='raise')
+    league = relationship('League', back_populates='statistics', lazy='raise')
+    season = relationship('Season', back_populates='statistics', lazy='raise')
 
 class Stadium(Base):
     """
@@ -161,7 +194,7 @@ class Stadium(Base):
     image = Column(String)
     
     # Relationships
-    matches = relationship('Match', back_populates='stadium')
+    matches = relationship('Match', back_populates='stadium', lazy='raise')
     
 class Standings(Base):
     """
@@ -200,6 +233,11 @@ class Standings(Base):
     """
     
     __tablename__ = 'standings'
+    __table_args__ = (
+        UniqueConstraint('team_id', 'league_id', 'season_id', name='uq_standings_team_id_league_id_season_id'),
+        Index('ix_standings_team_id_season_id', 'team_id', 'season_id'),
+        Index('ix_standings_season_id_rank_id', 'season_id', 'rank', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
@@ -232,9 +270,9 @@ class Standings(Base):
     last_updated = Column(DateTime)
     
     # Relationships
-    team = relationship('Team', back_populates='standings')
-    league = relationship('League', back_populates='standings')
-    season = relationship('Season', back_populates='standings')
+    team = relationship('Team', back_populates='standings', lazy='raise')
+    league = relationship('League', back_populates='standings', lazy='raise')
+    season = relationship('Season', back_populates='standings', lazy='raise')
     
 class Match(Base):
     """
@@ -244,6 +282,7 @@ class Match(Base):
         id (int): Primary key.
         league_id (int): Foreign key referencing the League.
         season_id (int): Foreign key referencing the Season.
+        season_year (int): Year of the Season, used as the partition key.
         date (date): Match date.
         round (str): Match round (e.g., '1st Phase').
         venue_id: (int): Foreign key referencing the Stadium.
@@ -265,10 +304,31 @@ class Match(Base):
     """
     
     __tablename__ = 'matches'
+    __table_args__ = (
+        # Keyset pagination by date (see backend.db.pagination), overall and per season
+        Index('ix_matches_date_id', 'date', 'id'),
+        Index('ix_matches_season_id_date_id', 'season_id', 'date', 'id'),
+        # Partial indexes for the fixtures and results feeds
+        Index(
+            'ix_matches_fixtures',
+            'date',
+            postgresql_where=text("status = 'Not Started'")
+        ),
+        Index(
+            'ix_matches_results',
+            'season_id',
+            'date',
+            postgresql_where=column('status').in_(FINISHED)
+        ),
+        # Partitions are created per season year by backend.db.partitions
+        {'postgresql_partition_by': 'RANGE (season_year)'},
+    )
     
-    id = Column(Integer, primary_key=True)
+    # Fixture ids come from API-Football, so they are not generated locally
+    id = Column(Integer, primary_key=True, autoincrement=False)
     league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
     season_id = Column(Integer, ForeignKey('seasons.id'), nullable=False)
+    season_year = Column(SmallInteger, primary_key=True)
     date = Column(DateTime, nullable=False)
     round = Column(String)
     venue_id = Column(Integer, ForeignKey('stadiums.id'))
@@ -288,26 +348,39 @@ class Match(Base):
     status = Column(String)
     winner = Column(Integer, ForeignKey('teams.id'), nullable=True)
     
+    # The partition key has to be part of the table's primary key, but ids are unique on their own
+    __mapper_args__ = {'primary_key': [id]}
+    
     # Relationships
-    league = relationship('League', back_populates='matches')
-    season = relationship('Season', back_populates='matches')
-    stadium = relationship('Stadium', back_populates='matches')
-    winning_team = relationship('Team', foreign_keys=[winner])
-    statistics = relationship('MatchStatistics', back_populates='match')
-    predictions = relationship('MatchPredictions', back_populates='match')
+    league = relationship('League', back_populates='matches', lazy='raise')
+    season = relationship('Season', back_populates='matches', lazy='raise')
+    stadium = relationship('Stadium', back_populates='matches', lazy='raise')
+    winning_team = relationship('Team', foreign_keys=[winner], lazy='raise')
+    statistics = relationship('MatchStatistics', back_populates='match', lazy='raise')
+    predictions = relationship('MatchPredictions', back_populates='match', lazy='raise')
+    player_statistics = relationship('PlayerMatchStatistics', back_populates='match', lazy='raise')
     
     # Using lambda function to defer the evaluation of the home and away team relationships
     home_team = relationship(
         'Team',
         back_populates='home_matches',
-        foreign_keys=lambda: [Match.home_team_id]
+        foreign_keys=lambda: [Match.home_team_id],
+        lazy='raise'
     )
     away_team = relationship(
         'Team',
         back_populates='away_matches',
-        foreign_keys=lambda: [Match.away_team_id]
+        foreign_keys=lambda: [Match.away_team_id],
+        lazy='raise'
     )
     
+# Matches of a pair of teams whichever side hosted, for backend.db.head_to_head
+Index(
+    'ix_matches_team_pair',
+    func.least(Match.__table__.c.home_team_id, Match.__table__.c.away_team_id),
+    func.greatest(Match.__table__.c.home_team_id, Match.__table__.c.away_team_id)
+)
+
 class MatchStatistics(Base):
     """
     Represents a specific match statistics.
@@ -315,6 +388,7 @@ class MatchStatistics(Base):
     Attributes:
         id (int): Primary key.
         match_id (int): Foreign key referencing the Match.
+        season_year (int): Year of the match's Season, used as the partition key.
         team_id (int): Foreign key referencing the Team.
         shots_on_goal (int): Total shots on goal.
         shots_off_goal (int): Total shots off goal.
@@ -325,19 +399,28 @@ class MatchStatistics(Base):
         fouls (int): Total fouls.
         corner_kicks (int): Total corner kicks.
         offsides (int): Total offsides.
-        ball_possession (str): Ball possession percentage.
+        ball_possession (str): Ball possession percentage (e.g. '54%'), stored as an integer.
         yellow_cards (int): Total yellow cards.
         red_cards (int): Total red cards.
         goalkeeper_saves (int): Total goalkeeper saves.
         total_passes (int): Total passes.
         passes_accurate (int): Total accurate passes.
-        pass_accuracy (str): Pass accuracy percentage.
+        pass_accuracy (str): Pass accuracy percentage, stored as an integer.
     """
     
     __tablename__ = 'match_statistics'
+    __table_args__ = (
+        UniqueConstraint(
+            'match_id', 'team_id', 'season_year', name='uq_match_statistics_match_id_team_id_season_year'
+        ),
+        ForeignKeyConstraint(['match_id', 'season_year'], ['matches.id', 'matches.season_year']),
+        Index('ix_match_statistics_match_id', 'match_id'),
+        {'postgresql_partition_by': 'RANGE (season_year)'},
+    )
     
-    id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.id'), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    match_id = Column(Integer, nullable=False)
+    season_year = Column(SmallInteger, primary_key=True)
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     shots_on_goal = Column(Integer)
     shots_off_goal = Column(Integer)
@@ -348,17 +431,22 @@ class MatchStatistics(Base):
     fouls = Column(Integer)
     corner_kicks = Column(Integer)
     offsides = Column(Integer)
-    ball_possession = Column(String)
+    _ball_possession = Column('ball_possession', SmallInteger)
     yellow_cards = Column(Integer)
     red_cards = Column(Integer)
     goalkeeper_saves = Column(Integer)
     total_passes = Column(Integer)
     passes_accurate = Column(Integer)
-    pass_accuracy = Column(String)
+    _pass_accuracy = Column('pass_accuracy', SmallInteger)
+    
+    __mapper_args__ = {'primary_key': [id]}
+    
+    ball_possession = percent_property('_ball_possession')
+    pass_accuracy = percent_property('_pass_accuracy')
     
     # Relationships
-    match = relationship('Match', back_populates='statistics')
-    team = relationship('Team', back_populates='statistics')
+    match = relationship('Match', back_populates='statistics', lazy='raise')
+    team = relationship('Team', back_populates='match_statistics', lazy='raise')
     
 class MatchPredictions(Base):
     """
@@ -367,35 +455,48 @@ class MatchPredictions(Base):
     Attributes:
         id (int): Primary key.
         match_id (int): Foreign key referencing the Match.
+        season_year (int): Year of the match's Season, used as the partition key.
         predicted_winner (str): Predicted match winner.
         win_or_draw (bool): Whether prediction is win or draw.
         under_over (str): Predicted under or over (e.g., -3.5, +2.5).
         goals_home (int): Predicted home team goals.
         goals_away (int): Predicted away team goals.
         advice (str): Prediction advice.
-        percent_home (str): Probability of home team winning.
-        percent_draw (str): Probability of draw.
-        percent_away (str): Probability of away team winning.
+        percent_home (str): Probability of home team winning (e.g. '45%'), stored as an integer.
+        percent_draw (str): Probability of draw, stored as an integer.
+        percent_away (str): Probability of away team winning, stored as an integer.
         last_updated (date): Last time the predictions were updated.
     """
     
     __tablename__ = 'match_predictions'
+    __table_args__ = (
+        ForeignKeyConstraint(['match_id', 'season_year'], ['matches.id', 'matches.season_year']),
+        Index('ix_match_predictions_match_id', 'match_id'),
+        {'postgresql_partition_by': 'RANGE (season_year)'},
+    )
     
-    id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.id'), nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    match_id = Column(Integer, nullable=False)
+    season_year = Column(SmallInteger, primary_key=True)
     predicted_winner = Column(String)
     win_or_draw = Column(Boolean)
     under_over = Column(String)
     goals_home = Column(Integer)
     goals_away = Column(Integer)
     advice = Column(String)
-    percent_home = Column(String)
-    percent_draw = Column(String)
-    percent_away = Column(String)
+    _percent_home = Column('percent_home', SmallInteger)
+    _percent_draw = Column('percent_draw', SmallInteger)
+    _percent_away = Column('percent_away', SmallInteger)
     last_updated = Column(DateTime)
     
+    __mapper_args__ = {'primary_key': [id]}
+    
+    percent_home = percent_property('_percent_home')
+    percent_draw = percent_property('_percent_draw')
+    percent_away = percent_property('_percent_away')
+    
     # Relationships
-    match = relationship('Match', back_populates='predictions')
+    match = relationship('Match', back_populates='predictions', lazy='raise')
     
 class Team(Base):
     """
@@ -420,11 +521,13 @@ class Team(Base):
     logo = Column(String)
     
     # Relationships
-    statistics = relationship('TeamStatistics', back_populates='team')
-    standings = relationship('Standings', back_populates='team')
-    home_matches = relationship('Match', back_populates='home_team', foreign_keys=[Match.home_team_id])
-    away_matches = relationship('Match', back_populates='away_team', foreign_keys=[Match.away_team_id])
-    players = relationship('Player', back_populates='team')
+    statistics = relationship('TeamStatistics', back_populates='team', lazy='raise')
+    match_statistics = relationship('MatchStatistics', back_populates='team', lazy='raise')
+    player_statistics = relationship('PlayerStatistics', back_populates='team', lazy='raise')
+    standings = relationship('Standings', back_populates='team', lazy='raise')
+    home_matches = relationship('Match', back_populates='home_team', foreign_keys=[Match.home_team_id], lazy='raise')
+    away_matches = relationship('Match', back_populates='away_team', foreign_keys=[Match.away_team_id], lazy='raise')
+    players = relationship('Player', back_populates='team', lazy='raise')
     
 class Player(Base):
     """
@@ -466,8 +569,9 @@ class Player(Base):
     position = Column(String)
     
     # Relationships
-    team = relationship('Team', back_populates='players')
-    statistics = relationship('PlayerStatistics', back_populates='player')
+    team = relationship('Team', back_populates='players', lazy='raise')
+    statistics = relationship('PlayerStatistics', back_populates='player', lazy='raise')
+    match_statistics = relationship('PlayerMatchStatistics', back_populates='player', lazy='raise')
     
 class PlayerStatistics(Base):
     """
@@ -496,7 +600,7 @@ class PlayerStatistics(Base):
         goals_saves (int): Total goals saved (for goalkeepers).
         passes_total (int): Total passes.
         passes_key (int): Total key passes.
-        passes_accuracy (str): Pass accuracy percentage.
+        passes_accuracy (str): Pass accuracy percentage, stored as an integer.
         tackles_total (int): Total tackles.
         tackles_blocks (int): Total blocks.
         tackles_interceptions (int): Total interceptions.
@@ -516,6 +620,25 @@ class PlayerStatistics(Base):
     """
     
     __tablename__ = 'player_statistics'
+    __table_args__ = (
+        UniqueConstraint('player_id', 'team_id', 'league_id', 'season_id', name='uq_player_statistics_player_id_team_id_league_id_season_id'),
+        Index('ix_player_statistics_team_id_season_id', 'team_id', 'season_id'),
+        # Keyset pagination of the season rankings (see backend.db.pagination)
+        Index(
+            'ix_player_statistics_season_id_goals_total_id',
+            'season_id',
+            'goals_total',
+            'id',
+            postgresql_where=text('goals_total IS NOT NULL')
+        ),
+        Index(
+            'ix_player_statistics_season_id_rating_id',
+            'season_id',
+            'rating',
+            'id',
+            postgresql_where=text('rating IS NOT NULL')
+        ),
+    )
     
     id = Column(Integer, primary_key=True)
     player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
@@ -539,7 +662,7 @@ class PlayerStatistics(Base):
     goals_saves = Column(Integer)
     passes_total = Column(Integer)
     passes_key = Column(Integer)
-    passes_accuracy = Column(String)
+    _passes_accuracy = Column('passes_accuracy', SmallInteger)
     tackles_total = Column(Integer)
     tackles_blocks = Column(Integer)
     tackles_interceptions = Column(Integer)
@@ -557,8 +680,389 @@ class PlayerStatistics(Base):
     penalties_missed = Column(Integer)
     penalties_saved = Column(Integer)
     
+    passes_accuracy = percent_property('_passes_accuracy')
+    
+    # Relationships
+    player = relationship('Player', back_populates='statistics', lazy='raise')
+    team = relationship('Team', back_populates='player_statistics', lazy='raise')
+    league = relationship('League', back_populates='player_statistics', lazy='raise')
+    season = relationship('Season', back_populates='player_statistics', lazy='raise')
+    
+class PlayerMatchStatistics(Base):
+    """
+    Represents a player's statistics in a single match.
+    
+    Rows are appended as fixtures finish and later rolled up into the
+    PlayerStatistics season totals by backend.db.rollups.
+    
+    Attributes:
+        match_id (int): Foreign key referencing the Match.
+        player_id (int): Foreign key referencing the Player.
+        season_year (int): Year of the match's Season, used as the partition key.
+        team_id (int): Foreign key referencing the Team the player played for.
+        league_id (int): Foreign key referencing the League.
+        season_id (int): Foreign key referencing the Season.
+        position (str): Position played (e.g., 'M').
+        minutes_played (int): Minutes played.
+        rating (float): Match rating.
+        captain (bool): Whether the player was captain.
+        substitute (bool): Whether the player started on the bench.
+        shots_total (int): Total shots.
+        shots_on_goal (int): Shots on goal.
+        goals_total (int): Goals scored.
+        assists (int): Assists.
+        goals_conceded (int): Goals conceded (for goalkeepers).
+        goals_saves (int): Saves (for goalkeepers).
+        passes_total (int): Total passes.
+        passes_key (int): Key passes.
+        passes_accuracy (str): Pass accuracy percentage, stored as an integer.
+        tackles_total (int): Total tackles.
+        tackles_blocks (int): Blocks.
+        tackles_interceptions (int): Interceptions.
+        duels_total (int): Total duels.
+        duels_won (int): Duels won.
+        dribbles_attempts (int): Dribble attempts.
+        dribbles_success (int): Successful dribbles.
+        fouls_drawn (int): Fouls drawn.
+        fouls_committed (int): Fouls committed.
+        yellow_cards (int): Yellow cards.
+        red_cards (int): Red cards.
+        penalties_won (int): Penalties won.
+        penalties_commited (int): Penalties committed.
+        penalties_scored (int): Penalties scored.
+        penalties_missed (int): Penalties missed.
+        penalties_saved (int): Penalties saved (for goalkeepers).
+        rolled_up (bool): Whether the row's values are counted in PlayerStatistics. Reset when they change.
+    """
+    
+    __tablename__ = 'player_match_statistics'
+    __table_args__ = (
+        ForeignKeyConstraint(['match_id', 'season_year'], ['matches.id', 'matches.season_year']),
+        Index('ix_player_match_statistics_player_id_season_id', 'player_id', 'season_id'),
+        # Only the rows still waiting for the rollup are indexed here
+        Index(
+            'ix_player_match_statistics_pending',
+            'season_id',
+            postgresql_where=text('NOT rolled_up')
+        ),
+        {'postgresql_partition_by': 'RANGE (season_year)'},
+    )
+    
+    match_id = Column(Integer, primary_key=True, autoincrement=False)
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True, autoincrement=False)
+    season_year = Column(SmallInteger, primary_key=True)
+    team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
+    season_id = Column(Integer, ForeignKey('seasons.id'), nullable=False)
+    position = Column(String)
+    minutes_played = Column(SmallInteger)
+    rating = Column(Float)
+    captain = Column(Boolean)
+    substitute = Column(Boolean)
+    shots_total = Column(SmallInteger)
+    shots_on_goal = Column(SmallInteger)
+    goals_total = Column(SmallInteger)
+    assists = Column(SmallInteger)
+    goals_conceded = Column(SmallInteger)
+    goals_saves = Column(SmallInteger)
+    passes_total = Column(SmallInteger)
+    passes_key = Column(SmallInteger)
+    _passes_accuracy = Column('passes_accuracy', SmallInteger)
+    tackles_total = Column(SmallInteger)
+    tackles_blocks = Column(SmallInteger)
+    tackles_interceptions = Column(SmallInteger)
+    duels_total = Column(SmallInteger)
+    duels_won = Column(SmallInteger)
+    dribbles_attempts = Column(SmallInteger)
+    dribbles_success = Column(SmallInteger)
+    fouls_drawn = Column(SmallInteger)
+    fouls_committed = Column(SmallInteger)
+    yellow_cards = Column(SmallInteger)
+    red_cards = Column(SmallInteger)
+    penalties_won = Column(SmallInteger)
+    penalties_commited = Column(SmallInteger)
+    penalties_scored = Column(SmallInteger)
+    penalties_missed = Column(SmallInteger)
+    penalties_saved = Column(SmallInteger)
+    rolled_up = Column(Boolean, nullable=False, server_default=text('false'))
+    
+    __mapper_args__ = {'primary_key': [match_id, player_id]}
+    
+    passes_accuracy = percent_property('_passes_accuracy')
+    
     # Relationships
-    player = relationship('Player', back_populates='statistics')
-    team = relationship('Team', back_populates='statistics')
-    league = relationship('League', back_populates='statistics')
-    season = relationship('Season', back_populates='statistics')
+    match = relationship('Match', back_populates='player_statistics', lazy='raise')
+    player = relationship('Player', back_populates='match_statistics', lazy='raise')
+    
+class SyncWatermark(Base):
+    """
+    Records when each kind of API data was last synchronized for a season.
+
+    Attributes:
+        entity (str): What was synchronized (e.g. 'fixtures', 'standings', 'predictions').
+        season_id (int): Foreign key referencing the Season.
+        league_id (int): Foreign key referencing the League.
+        synced_at (date): When the data was fetched.
+        high_water (date): Latest match date covered by the sync, when the entity follows matches.
+        requests (int): API requests the sync used.
+        rows_written (int): Rows inserted or changed by the sync.
+    """
+    
+    __tablename__ = 'sync_watermarks'
+    
+    entity = Column(String, primary_key=True)
+    season_id = Column(Integer, ForeignKey('seasons.id'), primary_key=True)
+    league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
+    synced_at = Column(DateTime, nullable=False)
+    high_water = Column(DateTime)
+    requests = Column(Integer, nullable=False, server_default=text('0'))
+    rows_written = Column(Integer, nullable=False, server_default=text('0'))
+    
+class DataVersion(Base):
+    """
+    Counts the writes to a season's match, standings and statistics rows.
+
+    The API derives its ETags from the version, so a client holding the
+    response of the current version can be answered with 304 Not Modified.
+
+    Attributes:
+        season_id (int): Foreign key referencing the Season.
+        version (int): Incremented by every transaction that changes the season's rows.
+        updated_at (date): Time of the last increment.
+    """
+    
+    __tablename__ = 'data_versions'
+    
+    season_id = Column(Integer, ForeignKey('seasons.id'), primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default=text('0'))
+    updated_at = Column(DateTime)
+    
+# Columns of match_summaries besides the date, copied into its feed indexes so
+# the feeds are answered by index-only scans
+MATCH_SUMMARY_COLUMNS = (
+    'match_id', 'league_id', 'season_id', 'season_year', 'round', 'status', 'league_name', 'league_logo',
+    'home_team_id', 'home_team_name', 'home_team_logo', 'away_team_id', 'away_team_name', 'away_team_logo',
+    'home_goals', 'away_goals',
+    'penalty_home_goals', 'penalty_away_goals', 'winner', 'venue_id', 'venue_name', 'venue_city',
+)
+    
+class MatchSummary(Base):
+    """
+    Represents a match as the fixtures and results feeds show it (read model).
+    
+    Rows are Match rows pre-joined with their teams, stadium and league, kept
+    up to date by backend.db.summaries whenever those tables are written.
+    
+    Attributes:
+        match_id (int): Id of the Match.
+        league_id (int): League of the match.
+        season_id (int): Season of the match.
+        season_year (int): Year of the Season.
+        date (date): Match date.
+        round (str): Match round (e.g., 'Regular Season - 1').
+        status (str): Match status (e.g. 'Match Finished', 'Not Started').
+        league_name (str): League name.
+        league_logo (str): URL to the league's logo.
+        home_team_id (int): Home team.
+        home_team_name (str): Home team name.
+        home_team_logo (str): URL to the home team's logo.
+        away_team_id (int): Away team.
+        away_team_name (str): Away team name.
+        away_team_logo (str): URL to the away team's logo.
+        home_goals (int): Home team's goals.
+        away_goals (int): Away team's goals.
+        penalty_home_goals (int): Home team's goals in penalty shootout.
+        penalty_away_goals (int): Away team's goals in penalty shootout.
+        winner (int): Winning team, if any.
+        venue_id (int): Stadium of the match.
+        venue_name (str): Stadium name.
+        venue_city (str): Stadium city.
+    """
+    
+    __tablename__ = 'match_summaries'
+    __table_args__ = (
+        # "Team X, latest N matches": one range scan per side, merged by backend.db.summaries
+        Index(
+            'ix_match_summaries_home_team_id_date',
+            'home_team_id',
+            'date',
+            postgresql_include=[name for name in MATCH_SUMMARY_COLUMNS if name != 'home_team_id']
+        ),
+        Index(
+            'ix_match_summaries_away_team_id_date',
+            'away_team_id',
+            'date',
+            postgresql_include=[name for name in MATCH_SUMMARY_COLUMNS if name != 'away_team_id']
+        ),
+        # Upcoming fixtures
+        Index(
+            'ix_match_summaries_upcoming',
+            'date',
+            postgresql_where=text("status = 'Not Started'"),
+            postgresql_include=list(MATCH_SUMMARY_COLUMNS)
+        ),
+    )
+    
+    match_id = Column(Integer, primary_key=True, autoincrement=False)
+    league_id = Column(Integer, nullable=False)
+    season_id = Column(Integer, nullable=False)
+    season_year = Column(SmallInteger, nullable=False)
+    date = Column(DateTime, nullable=False)
+    round = Column(String)
+    status = Column(String)
+    league_name = Column(String)
+    league_logo = Column(String)
+    home_team_id = Column(Integer, nullable=False)
+    home_team_name = Column(String)
+    home_team_logo = Column(String)
+    away_team_id = Column(Integer, nullable=False)
+    away_team_name = Column(String)
+    away_team_logo = Column(String)
+    home_goals = Column(Integer)
+    away_goals = Column(Integer)
+    penalty_home_goals = Column(Integer)
+    penalty_away_goals = Column(Integer)
+    winner = Column(Integer)
+    venue_id = Column(Integer)
+    venue_name = Column(String)
+    venue_city = Column(String)
+    
+class HeadToHead(Base):
+    """
+    Represents the all-time record between two teams (read model).
+    
+    Each pair of teams has one row, stored with the lower team id first, built
+    from their finished matches and kept up to date by backend.db.head_to_head.
+    
+    Attributes:
+        team_a_id (int): Foreign key referencing the Team with the lower id.
+        team_b_id (int): Foreign key referencing the Team with the higher id.
+        played (int): Finished matches between the two teams.
+        team_a_wins (int): Matches won by team A.
+        draws (int): Matches without a winner.
+        team_b_wins (int): Matches won by team B.
+        team_a_goals (int): Goals scored by team A.
+        team_b_goals (int): Goals scored by team B.
+        first_match_date (date): Date of their first finished match.
+        last_match_date (date): Date of their latest finished match.
+        last_results (list): Their latest finished matches, most recent first.
+    """
+    
+    __tablename__ = 'head_to_heads'
+    __table_args__ = (
+        CheckConstraint('team_a_id < team_b_id', name='ck_head_to_heads_team_order'),
+        # The primary key serves the pairs of a team as team A, this index those as team B
+        Index('ix_head_to_heads_team_b_id', 'team_b_id'),
+    )
+    
+    team_a_id = Column(Integer, ForeignKey('teams.id'), primary_key=True, autoincrement=False)
+    team_b_id = Column(Integer, ForeignKey('teams.id'), primary_key=True, autoincrement=False)
+    played = Column(Integer, nullable=False)
+    team_a_wins = Column(Integer, nullable=False)
+    draws = Column(Integer, nullable=False)
+    team_b_wins = Column(Integer, nullable=False)
+    team_a_goals = Column(Integer, nullable=False)
+    team_b_goals = Column(Integer, nullable=False)
+    first_match_date = Column(DateTime)
+    last_match_date = Column(DateTime)
+    # JSONB rather than JSON, which has no equality for the upsert's IS DISTINCT FROM guard
+    last_results = Column(JSONB, nullable=False)
+    
+class LeaderboardEntry(Base):
+    """
+    Represents one row of a precomputed player leaderboard (read model).
+    
+    A leaderboard is the top players of a season, or of all seasons, by one
+    metric among the players with a minimum of minutes played, kept up to date
+    by backend.db.leaderboards whenever player_statistics is written.
+    
+    Attributes:
+        metric (str): Ranking metric (e.g. 'goals', 'rating', 'goals_per_90').
+        season_id (int): Season ranked, or 0 for all seasons.
+        min_minutes (int): Minutes a player needs to be ranked.
+        rank (int): Position in the leaderboard, from 1.
+        player_id (int): Foreign key referencing the Player.
+        value (float): The player's value of the metric.
+        minutes_played (int): Minutes played in the season, or in all seasons.
+        appearances (int): Appearances in the season, or in all seasons.
+    """
+    
+    __tablename__ = 'leaderboard_entries'
+    
+    metric = Column(String, primary_key=True)
+    season_id = Column(Integer, primary_key=True, autoincrement=False)
+    min_minutes = Column(Integer, primary_key=True, autoincrement=False)
+    rank = Column(SmallInteger, primary_key=True, autoincrement=False)
+    player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
+    value = Column(Float, nullable=False)
+    minutes_played = Column(Integer, nullable=False)
+    appearances = Column(Integer, nullable=False)
+    
+class Job(Base):
+    """
+    Represents a background job, claimed and run by the workers of backend.ingestion.jobs.
+    
+    Attributes:
+        id (int): Primary key.
+        kind (str): Handler to run (e.g. 'update', 'update_season').
+        season_id (int): Foreign key referencing the Season the job is sharded on, if any.
+        parent_id (int): Foreign key referencing the Job that enqueued this one.
+        status (str): 'queued', 'running', 'succeeded' or 'failed'.
+        attempts (int): Times the job was claimed.
+        max_attempts (int): Claims before the job is given up as failed.
+        run_after (date): Earliest time the job may be claimed, pushed back after a failure.
+        leased_by (str): Worker running the job.
+        lease_expires_at (date): When the job may be reclaimed, unless its worker renews the lease.
+        created_at (date): Time the job was enqueued.
+        started_at (date): Time the job was first claimed.
+        finished_at (date): Time the job succeeded or was given up.
+        result (dict): Value returned by the handler.
+        error (str): Last error raised by the handler.
+    """
+    
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Single flight: enqueuing a job already queued or running returns the existing one
+        Index(
+            'uq_jobs_kind_season_id_active',
+            'kind',
+            'season_id',
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running') AND season_id IS NOT NULL")
+        ),
+        Index(
+            'uq_jobs_kind_active',
+            'kind',
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running') AND season_id IS NULL")
+        ),
+        # Claiming queued jobs and reclaiming expired leases
+        Index(
+            'ix_jobs_queued',
+            'run_after',
+            'id',
+            postgresql_where=text("status = 'queued'")
+        ),
+        Index(
+            'ix_jobs_running',
+            'lease_expires_at',
+            postgresql_where=text("status = 'running'")
+        ),
+        Index('ix_jobs_parent_id', 'parent_id'),
+    )
+    
+    id = Column(BigInteger, primary_key=True)
+    kind = Column(String, nullable=False)
+    season_id = Column(Integer, ForeignKey('seasons.id'))
+    parent_id = Column(BigInteger, ForeignKey('jobs.id'))
+    status = Column(String, nullable=False, server_default=text("'queued'"))
+    attempts = Column(Integer, nullable=False, server_default=text('0'))
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime, nullable=False, server_default=text("(now() AT TIME ZONE 'utc')"))
+    leased_by = Column(String)
+    lease_expires_at = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, server_default=text("(now() AT TIME ZONE 'utc')"))
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    result = Column(JSON)
+    error = Column(String)
@@ -0,0 +1,174 @@
+"""
+Keyset (cursor) pagination for the listing endpoints.
+
+``OFFSET n`` makes PostgreSQL read and discard ``n`` rows, so deep pages get
+slower as the history grows. A keyset page instead starts right after the last
+row of the previous one: ``WHERE (sort_key, id) > (:last_sort_key, :last_id)
+ORDER BY sort_key, id LIMIT :size`` is one index range scan of ``size`` rows
+whatever the page, as long as an index on ``(filters..., sort_key, id)`` exists.
+Each :class:`Keyset` below names the indexes declared for it in
+``backend/db/models.py``.
+
+The position is handed to clients as an opaque cursor: the keyset name and the
+key values of the last row, as URL-safe base64 JSON. Rows whose sort key is
+NULL are left out of rankings, since NULL cannot be compared.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from .models import Match, PlayerStatistics, Standings
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor was tampered with or belongs to another listing."""
+
+
+@dataclass(frozen=True)
+class Keyset:
+    """
+    Ordering of a paginated listing.
+
+    Attributes:
+        name (str): Identifies the listing inside its cursors.
+        model (Base): Model listed.
+        keys (tuple[str]): Sort columns, ending with a unique one.
+        descending (bool): Whether every key is sorted descending.
+        filters (tuple[str]): Columns that may be filtered by equality.
+        required (tuple[str]): Filters that must be given, being the prefix of the index.
+        indexes (tuple[str]): Indexes that serve the listing.
+    """
+
+    name: str
+    model: type
+    keys: tuple
+    descending: bool = False
+    filters: tuple = ()
+    required: tuple = ()
+    indexes: tuple = ()
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+    def statement(self, after=None, limit=DEFAULT_PAGE_SIZE, **filters):
+        """
+        Build the query of one page.
+
+        Args:
+            after (tuple): Key values of the last row of the previous page.
+            limit (int): Rows to select.
+            **filters: Equality filters, among :attr:`filters`.
+
+        Returns:
+            Select: The page, ordered by :attr:`keys`.
+        """
+        unknown = set(filters) - set(self.filters)
+        if unknown:
+            raise ValueError(f"'{self.name}' cannot be filtered by {sorted(unknown)}")
+        missing = set(self.required) - {name for name, value in filters.items() if value is not None}
+        if missing:
+            raise ValueError(f"'{self.name}' needs {sorted(missing)}")
+
+        columns = [self.table.c[name] for name in self.keys]
+        statement = select(self.table).where(
+            *(self.table.c[name] == value for name, value in filters.items() if value is not None),
+            *(column.is_not(None) for column in columns[:-1] if column.nullable),
+        )
+        if after is not None:
+            position = tuple_(*columns)
+            statement = statement.where(position < tuple_(*after) if self.descending else position > tuple_(*after))
+        order = [column.desc() for column in columns] if self.descending else columns
+        return statement.order_by(*order).limit(limit)
+
+
+KEYSETS = {keyset.name: keyset for keyset in (
+    Keyset(
+        'matches', Match, ('date', 'id'), descending=True, filters=('league_id', 'season_id'),
+        indexes=('ix_matches_season_id_date_id', 'ix_matches_date_id'),
+    ),
+    Keyset(
+        'player_statistics_goals', PlayerStatistics, ('goals_total', 'id'), descending=True,
+        filters=('season_id',), required=('season_id',), indexes=('ix_player_statistics_season_id_goals_total_id',),
+    ),
+    Keyset(
+        'player_statistics_rating', PlayerStatistics, ('rating', 'id'), descending=True,
+        filters=('season_id',), required=('season_id',), indexes=('ix_player_statistics_season_id_rating_id',),
+    ),
+    Keyset(
+        'standings', Standings, ('rank', 'id'),
+        filters=('season_id',), required=('season_id',), indexes=('ix_standings_season_id_rank_id',),
+    ),
+)}
+
+
+def _encode_value(value):
+    return {'t': value.isoformat()} if isinstance(value, datetime) else value
+
+
+def _decode_value(value):
+    return datetime.fromisoformat(value['t']) if isinstance(value, dict) else value
+
+
+def encode_cursor(keyset, values):
+    """Return the opaque cursor pointing after a row with key ``values``."""
+    payload = json.dumps([keyset.name, [_encode_value(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b'=').decode()
+
+
+def decode_cursor(keyset, cursor):
+    """
+    Return the key values of a cursor made by :func:`encode_cursor`.
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded or belongs to another keyset.
+    """
+    try:
+        name, values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = tuple(_decode_value(value) for value in values)
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError) as error:
+        raise InvalidCursor('Malformed cursor') from error
+    if name != keyset.name or len(values) != len(keyset.keys):
+        raise InvalidCursor(f"Cursor does not belong to '{keyset.name}'")
+    return values
+
+
+@dataclass
+class Page:
+    """One page of a listing, and the cursor of the next one (None on the last page)."""
+
+    items: list
+    next_cursor: str = None
+
+
+def paginate(connection, keyset, cursor=None, limit=DEFAULT_PAGE_SIZE, **filters):
+    """
+    Fetch one page of a listing.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        keyset (Keyset | str): Listing, or its name in :data:`KEYSETS`.
+        cursor (str): ``next_cursor`` of the previous page. None for the first page.
+        limit (int): Page size, capped at ``MAX_PAGE_SIZE``.
+        **filters: Equality filters of the keyset.
+
+    Returns:
+        Page: Rows as dictionaries keyed by column name.
+    """
+    keyset = KEYSETS[keyset] if isinstance(keyset, str) else keyset
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = decode_cursor(keyset, cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    rows = connection.execute(keyset.statement(after, limit + 1, **filters)).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(keyset, [items[-1][name] for name in keyset.keys])
+    return Page(items, next_cursor)
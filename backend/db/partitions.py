@@ -0,0 +1,86 @@
+"""
+Season-year partitions for the match tables.
+
+``matches``, ``match_statistics`` and ``match_predictions`` are partitioned by
+``RANGE (season_year)`` with one partition per year, named ``<table>_y<year>``.
+There is no default partition: a partition has to exist before its season is
+ingested, so run this ahead of every new season (the ingestion paths also call
+:func:`ensure_partitions` for the years they are about to write).
+
+Usage:
+    python -m backend.db.partitions              # next season after the latest one
+    python -m backend.db.partitions 2027 2028
+"""
+import argparse
+import re
+
+from sqlalchemy import create_engine, func, select, text
+
+from backend.core.config import DATABASE_URL
+
+from . import models
+from .base import Base
+
+PARTITIONED_TABLES = tuple(
+    table.name for table in Base.metadata.sorted_tables
+    if table.dialect_options['postgresql']['partition_by']
+)
+
+_PARTITION_NAME = re.compile(rf'^({"|".join(PARTITIONED_TABLES)})_y\d{{4}}$')
+
+
+def partition_name(table_name, year):
+    """Return the name of the partition of ``table_name`` holding ``year``."""
+    return f'{table_name}_y{year}'
+
+
+def is_partition(name):
+    """Whether ``name`` is a season partition managed by this module."""
+    return bool(_PARTITION_NAME.match(name))
+
+
+def create_season_partitions(connection, year):
+    """
+    Create the ``year`` partition of every partitioned table, if missing.
+
+    Args:
+        connection (Connection | Session): Where to execute the DDL.
+        year (int): Season year.
+    """
+    year = int(year)
+    for table_name in PARTITIONED_TABLES:
+        connection.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {partition_name(table_name, year)} '
+            f'PARTITION OF {table_name} FOR VALUES FROM ({year}) TO ({year + 1})'
+        ))
+
+
+def ensure_partitions(connection, years):
+    """Create the partitions for every year in ``years``."""
+    for year in sorted(set(years)):
+        create_season_partitions(connection, year)
+
+
+def next_season_year(connection):
+    """Return the year after the latest stored season."""
+    latest = connection.execute(select(func.max(models.Season.year))).scalar()
+    if latest is None:
+        latest = connection.execute(text('SELECT extract(year FROM now())::int')).scalar()
+    return latest + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create season partitions ahead of time.')
+    parser.add_argument('years', nargs='*', type=int, help='Season years. Defaults to the next season.')
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.begin() as connection:
+        years = args.years or [next_season_year(connection)]
+        ensure_partitions(connection, years)
+    print('Partitions ready for', ', '.join(str(year) for year in sorted(set(years))))
+
+
+if __name__ == '__main__':
+    main()
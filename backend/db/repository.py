@@ -0,0 +1,127 @@
+"""
+Async read queries with explicit loading strategies.
+
+Every relationship is declared ``lazy='raise'``, so each function states what
+the page it serves needs. Many-to-one relationships (teams, stadium, league)
+are ``joinedload``-ed into the main query; collections (statistics,
+predictions, standings) are ``selectinload``-ed with one extra
+``SELECT ... WHERE id IN (...)`` each, which avoids multiplying the main rows.
+The number of statements each function runs is fixed and given in its
+docstring.
+"""
+from sqlalchemy import or_, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models import FINISHED, Match, MatchStatistics, PlayerMatchStatistics, Season, Standings, TeamStatistics
+
+NOT_STARTED = 'Not Started'
+
+# Enough to render a match row: both teams and where it is played
+_MATCH_ROW = (joinedload(Match.home_team), joinedload(Match.away_team), joinedload(Match.stadium))
+
+
+async def fixture_list(session, season_id, limit=None):
+    """
+    Return the upcoming matches of a season, soonest first.
+
+    Runs 1 statement.
+
+    Args:
+        session (AsyncSession): Session to query with.
+        season_id (int): Season to list.
+        limit (int): Maximum number of matches.
+
+    Returns:
+        list[Match]: Matches with ``home_team``, ``away_team`` and ``stadium`` loaded.
+    """
+    statement = (
+        select(Match)
+        .where(Match.season_id == season_id, Match.status == NOT_STARTED)
+        .order_by(Match.date, Match.id)
+        .options(*_MATCH_ROW)
+        .limit(limit)
+    )
+    return (await session.scalars(statement)).all()
+
+
+async def team_results(session, team_id, season_id=None, limit=10):
+    """
+    Return the latest finished matches of a team, most recent first.
+
+    Runs 1 statement.
+
+    Args:
+        session (AsyncSession): Session to query with.
+        team_id (int): Team playing home or away.
+        season_id (int): Restrict to one season. Defaults to every season.
+        limit (int): Maximum number of matches.
+
+    Returns:
+        list[Match]: Matches with ``home_team``, ``away_team`` and ``stadium`` loaded.
+    """
+    statement = (
+        select(Match)
+        .where(Match.status.in_(FINISHED), or_(Match.home_team_id == team_id, Match.away_team_id == team_id))
+        .order_by(Match.date.desc(), Match.id.desc())
+        .options(*_MATCH_ROW)
+        .limit(limit)
+    )
+    if season_id is not None:
+        statement = statement.where(Match.season_id == season_id)
+    return (await session.scalars(statement)).all()
+
+
+async def match_detail(session, match_id):
+    """
+    Return one match with everything the match page shows.
+
+    Runs 4 statements: the match with its league, season, stadium and teams,
+    then its team statistics, predictions and player statistics.
+
+    Args:
+        session (AsyncSession): Session to query with.
+        match_id (int): Match to load.
+
+    Returns:
+        Match | None: The match, or None when it does not exist.
+    """
+    statement = (
+        select(Match)
+        .where(Match.id == match_id)
+        .options(
+            *_MATCH_ROW,
+            joinedload(Match.league),
+            joinedload(Match.season),
+            joinedload(Match.winning_team),
+            selectinload(Match.statistics).joinedload(MatchStatistics.team),
+            selectinload(Match.predictions),
+            selectinload(Match.player_statistics).joinedload(PlayerMatchStatistics.player),
+        )
+    )
+    return (await session.scalars(statement)).one_or_none()
+
+
+async def season_summary(session, season_id):
+    """
+    Return a season with its table and team statistics.
+
+    Runs 3 statements: the season with its league, then the standings and the
+    team statistics, each with their team.
+
+    Args:
+        session (AsyncSession): Session to query with.
+        season_id (int): Season to load.
+
+    Returns:
+        Season | None: The season, or None when it does not exist.
+    """
+    statement = (
+        select(Season)
+        .where(Season.id == season_id)
+        .options(
+            joinedload(Season.league),
+            selectinload(Season.standings).joinedload(Standings.team),
+            selectinload(Season.statistics).joinedload(TeamStatistics.team),
+        )
+    )
+    return (await session.scalars(statement)).one_or_none()
@@ -0,0 +1,162 @@
+"""
+Incremental rollup of PlayerMatchStatistics rows into PlayerStatistics totals.
+
+A per-match row is pending until it is rolled up. New rows are inserted as
+pending, and :func:`backend.db.upsert.merge_from` sets a row back to pending
+whenever one of its values changes, so a corrected rating or goal is picked up
+again. :func:`rollup_player_statistics` claims the pending rows (found through
+the partial ``ix_player_match_statistics_pending`` index) and recomputes the
+totals of their ``(player, team, league, season)`` keys only, from every
+per-match row of those keys, with ``ON CONFLICT DO UPDATE``. A key holds one
+row per match its player played for the team, so a rollup reads a few dozen
+rows per player written rather than the whole season, and, unlike adding the
+new rows to the totals, stays right when a counted row is corrected.
+
+The write paths roll up the seasons they write per-match rows to, in the same
+transaction: :func:`backend.db.upsert.upsert` through :func:`rollup_rows`, and
+:func:`backend.db.backfill.load_season`. The totals of rolled up keys replace
+any API-Football season totals loaded for them.
+
+:func:`recompute_player_statistics` rebuilds a whole season from scratch and
+is what the incremental path must always agree with.
+"""
+from sqlalchemy import Integer, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from .cache import mark_rows_stale
+from .leaderboards import refresh_seasons
+from .versions import bump
+
+KEY = ('player_id', 'team_id', 'league_id', 'season_id')
+# First key of the advisory locks taken on the totals of a season
+ROLLUP_LOCK = 73
+
+_COUNTERS = (
+    'minutes_played', 'shots_total', 'shots_on_goal', 'goals_total', 'assists', 'goals_conceded',
+    'goals_saves', 'passes_total', 'passes_key', 'tackles_total', 'tackles_blocks', 'tackles_interceptions',
+    'duels_total', 'duels_won', 'dribbles_attempts', 'dribbles_success', 'fouls_drawn', 'fouls_committed',
+    'yellow_cards', 'red_cards', 'penalties_won', 'penalties_commited', 'penalties_scored',
+    'penalties_missed', 'penalties_saved',
+)
+
+# PlayerStatistics column -> aggregate over PlayerMatchStatistics rows
+SUMS = {
+    'appearances': 'count(*) FILTER (WHERE minutes_played > 0)',
+    'lineups': 'count(*) FILTER (WHERE NOT substitute)',
+    'sub_in': 'count(*) FILTER (WHERE substitute AND minutes_played > 0)',
+    'bench': 'count(*) FILTER (WHERE substitute AND coalesce(minutes_played, 0) = 0)',
+    **{name: f'coalesce(sum({name}), 0)' for name in _COUNTERS},
+}
+AVERAGES = {
+    'rating': 'avg(rating)',
+    'passes_accuracy': 'round(avg(passes_accuracy))::smallint',
+}
+CAPTAIN = 'coalesce(bool_or(captain), false)'
+
+_KEY = ', '.join(KEY)
+_COLUMNS = (*SUMS, 'captain', *AVERAGES)
+_AGGREGATES = [
+    *(f'{expression} AS {name}' for name, expression in SUMS.items()),
+    f'{CAPTAIN} AS captain',
+    *(f'{expression} AS {name}' for name, expression in AVERAGES.items()),
+]
+
+
+def _recompute_statement(where):
+    return text(f"""
+        INSERT INTO player_statistics ({_KEY}, {', '.join(_COLUMNS)})
+        SELECT {_KEY}, {', '.join(_AGGREGATES)}
+        FROM player_match_statistics
+        WHERE {where}
+        GROUP BY {_KEY}
+        ON CONFLICT ({_KEY}) DO UPDATE SET
+            {', '.join(f'{name} = excluded.{name}' for name in _COLUMNS)}
+        RETURNING {_KEY}
+    """)
+
+
+def _claim_statement(by_season):
+    season_filter = 'AND season_id = :season_id' if by_season else ''
+    return text(f'UPDATE player_match_statistics SET rolled_up = TRUE WHERE NOT rolled_up {season_filter} '
+                f'RETURNING {_KEY}')
+
+
+_RECOMPUTE_KEYS = _recompute_statement(
+    f'({_KEY}) IN (SELECT * FROM unnest(:player_ids, :team_ids, :league_ids, :season_ids))'
+).bindparams(*[bindparam(f'{name}s', type_=ARRAY(Integer)) for name in KEY])
+_RECOMPUTE_SEASON = _recompute_statement('season_id = :season_id')
+
+
+def _lock(connection, season_ids):
+    # Sorted, so that two rollups always lock their seasons in the same order. Held until commit, the
+    # lock makes a rollup wait for the other rollups of its seasons, then recompute from their rows too.
+    for season_id in sorted(season_ids):
+        connection.execute(
+            text('SELECT pg_advisory_xact_lock(:namespace, :season_id)'),
+            {'namespace': ROLLUP_LOCK, 'season_id': season_id},
+        )
+
+
+def _written(connection, keys, all_time=True):
+    """Invalidate what depends on the totals of ``keys`` and return how many there are."""
+    if keys:
+        mark_rows_stale(connection, keys)
+        season_ids = {key['season_id'] for key in keys}
+        bump(connection, season_ids)
+        refresh_seasons(connection, season_ids, all_time)
+    return len(keys)
+
+
+def rollup_player_statistics(connection, season_id=None, all_time=True):
+    """
+    Recompute the PlayerStatistics totals of the keys with pending per-match rows.
+
+    Concurrent calls are safe: each pending row is claimed by exactly one
+    ``UPDATE ... RETURNING``, and rollups of the same season take turns.
+
+    Args:
+        connection (Connection | Session): Where to execute the rollup, inside a transaction.
+        season_id (int): Restrict the rollup to one season. Defaults to every pending row.
+        all_time (bool): Whether to refresh the all-time leaderboards, see
+            :func:`backend.db.leaderboards.refresh_seasons`.
+
+    Returns:
+        int: Number of PlayerStatistics rows written.
+    """
+    claimed = connection.execute(_claim_statement(season_id is not None), {'season_id': season_id})
+    keys = sorted({tuple(row) for row in claimed})
+    if not keys:
+        return 0
+    _lock(connection, {key[-1] for key in keys})
+    params = {f'{name}s': [key[position] for key in keys] for position, name in enumerate(KEY)}
+    written = connection.execute(_RECOMPUTE_KEYS, params).mappings().all()
+    return _written(connection, written, all_time)
+
+
+def rollup_rows(connection, table_name, rows):
+    """Roll up the seasons of the per-match ``rows`` written to ``table_name``, if any."""
+    if table_name != 'player_match_statistics':
+        return 0
+    season_ids = sorted({row['season_id'] for row in rows if row.get('season_id') is not None})
+    return sum(rollup_player_statistics(connection, season_id) for season_id in season_ids)
+
+
+def recompute_player_statistics(connection, season_id):
+    """
+    Rebuild the PlayerStatistics totals of a season from all its per-match rows.
+
+    Args:
+        connection (Connection | Session): Where to execute the rebuild, inside a transaction.
+        season_id (int): Season to rebuild.
+
+    Returns:
+        int: Number of PlayerStatistics rows written.
+    """
+    _lock(connection, [season_id])
+    connection.execute(
+        text('UPDATE player_match_statistics SET rolled_up = TRUE WHERE season_id = :season_id AND NOT rolled_up'),
+        {'season_id': season_id},
+    )
+    written = connection.execute(_RECOMPUTE_SEASON, {'season_id': season_id}).mappings().all()
+    mark_rows_stale(connection, [{'season_id': season_id}])
+    return _written(connection, written)
@@ -0,0 +1,272 @@
+"""
+The ``match_summaries`` read model behind the fixtures and results feeds.
+
+A feed row needs the match plus both teams, the stadium and the league, i.e.
+four joins. ``match_summaries`` stores those rows pre-joined and is kept up to
+date by the write paths, in the transaction that changes the source rows:
+
+* :func:`backend.db.upsert.upsert` and ORM flushes of ``matches``, ``teams``,
+  ``stadiums`` and ``leagues`` rows refresh the summaries referencing them;
+* :func:`backend.db.backfill.load_season` refreshes the seasons it loads.
+
+A refresh is one ``INSERT ... SELECT ... ON CONFLICT DO UPDATE`` over the
+joined source rows in scope (see :func:`backend.db.upsert.merge_from`), which
+leaves unchanged summaries untouched. :func:`check` rebuilds the whole table
+in a query and diffs it against the stored rows; :func:`rebuild` repairs it.
+
+Usage:
+    python -m backend.db.summaries check
+    python -m backend.db.summaries rebuild
+"""
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, delete, event, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from backend.core.config import DATABASE_URL
+
+from .models import League, Match, MatchSummary, Stadium, Team
+
+NOT_STARTED = 'Not Started'
+
+_summaries = MatchSummary.__table__
+# Table aliases rather than aliased() classes, which would configure every mapper on import
+_home = Team.__table__.alias('home_teams')
+_away = Team.__table__.alias('away_teams')
+
+# match_summaries column -> source expression
+SOURCE = {
+    'match_id': Match.id,
+    'league_id': Match.league_id,
+    'season_id': Match.season_id,
+    'season_year': Match.season_year,
+    'date': Match.date,
+    'round': Match.round,
+    'status': Match.status,
+    'league_name': League.name,
+    'league_logo': League.logo,
+    'home_team_id': Match.home_team_id,
+    'home_team_name': _home.c.name,
+    'home_team_logo': _home.c.logo,
+    'away_team_id': Match.away_team_id,
+    'away_team_name': _away.c.name,
+    'away_team_logo': _away.c.logo,
+    'home_goals': Match.home_goals,
+    'away_goals': Match.away_goals,
+    'penalty_home_goals': Match.penalty_home_goals,
+    'penalty_away_goals': Match.penalty_away_goals,
+    'winner': Match.winner,
+    'venue_id': Match.venue_id,
+    'venue_name': Stadium.name,
+    'venue_city': Stadium.city,
+}
+
+# Written table -> condition on the matches depending on some of its ids
+_FILTERS = {
+    Match.__tablename__: lambda ids: Match.id.in_(ids),
+    Team.__tablename__: lambda ids: or_(Match.home_team_id.in_(ids), Match.away_team_id.in_(ids)),
+    Stadium.__tablename__: lambda ids: Match.venue_id.in_(ids),
+    League.__tablename__: lambda ids: Match.league_id.in_(ids),
+}
+
+
+def _utcnow():
+    # Dates are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def source_query(*criteria):
+    """Select the summaries of the matches matching ``criteria``, built from the source tables."""
+    return (
+        select(*(expression.label(name) for name, expression in SOURCE.items()))
+        .select_from(Match)
+        .join(_home, _home.c.id == Match.home_team_id)
+        .join(_away, _away.c.id == Match.away_team_id)
+        .join(League, League.id == Match.league_id)
+        .outerjoin(Stadium, Stadium.id == Match.venue_id)
+        .where(*criteria)
+    )
+
+
+def refresh(connection, *criteria):
+    """
+    Write the summaries of the matches matching ``criteria``, e.g. ``Match.season_id == 5``.
+
+    Args:
+        connection (Connection | Session): Where to execute the refresh, in the writing transaction.
+        *criteria: Conditions on the source tables. None refreshes every match.
+
+    Returns:
+        int: Summaries inserted or changed.
+    """
+    # Imported here: backend.db.upsert calls refresh_rows
+    from .upsert import merge_from
+
+    statement = merge_from(_summaries, list(SOURCE), source_query(*criteria), key=['match_id'])
+    return connection.execute(statement).rowcount
+
+
+def refresh_seasons(connection, season_ids):
+    """Refresh the summaries of every match of ``season_ids``."""
+    season_ids = sorted({season_id for season_id in season_ids if season_id is not None})
+    return refresh(connection, Match.season_id.in_(season_ids)) if season_ids else 0
+
+
+def refresh_rows(connection, table_name, rows):
+    """Refresh the summaries that depend on ``rows`` written to ``table_name``, if any."""
+    if table_name not in _FILTERS:
+        return 0
+    ids = sorted({row['id'] for row in rows if row.get('id') is not None})
+    return refresh(connection, _FILTERS[table_name](ids)) if ids else 0
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_flushed(session, flush_context):
+    ids = {}
+    for instance in (*session.new, *session.dirty):
+        table_name = getattr(instance, '__tablename__', None)
+        if table_name in _FILTERS:
+            ids.setdefault(table_name, set()).add(instance.id)
+    for table_name, table_ids in ids.items():
+        refresh(session, _FILTERS[table_name](sorted(table_ids)))
+    deleted = sorted(instance.id for instance in session.deleted if isinstance(instance, Match))
+    if deleted:
+        session.execute(delete(_summaries).where(_summaries.c.match_id.in_(deleted)))
+
+
+def team_matches(connection, team_id, limit=10, before=None):
+    """
+    Return the latest matches of a team, most recent first.
+
+    Each side is one range scan of its covering index, limited to ``limit``
+    rows, and the two are merged.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        team_id (int): Team, home or away.
+        limit (int): Matches to return.
+        before (datetime): Only matches before this date. Defaults to now.
+
+    Returns:
+        list[dict]: Summaries as dictionaries keyed by column name.
+    """
+    before = before or _utcnow()
+    sides = [
+        select(_summaries)
+        .where(column == team_id, _summaries.c.date < before)
+        .order_by(_summaries.c.date.desc())
+        .limit(limit)
+        for column in (_summaries.c.home_team_id, _summaries.c.away_team_id)
+    ]
+    merged = union_all(*(side.subquery().select() for side in sides)).subquery()
+    statement = select(merged).order_by(merged.c.date.desc(), merged.c.match_id.desc()).limit(limit)
+    return [dict(row) for row in connection.execute(statement).mappings()]
+
+
+def upcoming_fixtures(connection, limit=20, league_id=None, after=None):
+    """
+    Return the next matches not started yet, soonest first.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        limit (int): Matches to return.
+        league_id (int): Only this league's matches.
+        after (datetime): Only matches from this date. Defaults to now.
+
+    Returns:
+        list[dict]: Summaries as dictionaries keyed by column name.
+    """
+    statement = (
+        select(_summaries)
+        .where(_summaries.c.status == NOT_STARTED, _summaries.c.date >= (after or _utcnow()))
+        .order_by(_summaries.c.date, _summaries.c.match_id)
+        .limit(limit)
+    )
+    if league_id is not None:
+        statement = statement.where(_summaries.c.league_id == league_id)
+    return [dict(row) for row in connection.execute(statement).mappings()]
+
+
+@dataclass
+class Report:
+    """
+    Differences between ``match_summaries`` and a rebuild from the source tables.
+
+    Attributes:
+        missing (list[int]): Matches without a summary.
+        extra (list[int]): Summaries of matches that do not exist anymore.
+        different (list[int]): Summaries whose values differ from the source rows.
+    """
+
+    missing: list = field(default_factory=list)
+    extra: list = field(default_factory=list)
+    different: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not (self.missing or self.extra or self.different)
+
+
+def check(connection, limit=None):
+    """
+    Rebuild every summary in a query and diff the result against the stored rows.
+
+    Args:
+        connection (Connection | Session): Where to read.
+        limit (int): Maximum match ids listed per kind of difference. None lists all.
+
+    Returns:
+        Report: The differences found.
+    """
+    expected = source_query().subquery('expected')
+    stored = _summaries
+    columns = [name for name in SOURCE if name != 'match_id']
+    queries = {
+        'missing': select(expected.c.match_id).outerjoin(stored, stored.c.match_id == expected.c.match_id)
+        .where(stored.c.match_id.is_(None)),
+        'extra': select(stored.c.match_id).outerjoin(expected, expected.c.match_id == stored.c.match_id)
+        .where(expected.c.match_id.is_(None)),
+        'different': select(stored.c.match_id).join(expected, expected.c.match_id == stored.c.match_id)
+        .where(or_(*(stored.c[name].is_distinct_from(expected.c[name]) for name in columns))),
+    }
+    return Report(**{
+        kind: list(connection.execute(query.order_by(query.selected_columns[0]).limit(limit)).scalars())
+        for kind, query in queries.items()
+    })
+
+
+def rebuild(connection):
+    """
+    Make ``match_summaries`` equal to a rebuild from the source tables.
+
+    Args:
+        connection (Connection | Session): Where to execute the rebuild, inside a transaction.
+
+    Returns:
+        int: Summaries inserted, changed or deleted.
+    """
+    orphans = delete(_summaries).where(~_summaries.c.match_id.in_(select(Match.id)))
+    return connection.execute(orphans).rowcount + refresh(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check or rebuild the match_summaries read model.')
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.begin() as connection:
+        if args.command == 'rebuild':
+            print(f'{rebuild(connection)} summaries written')
+        report = check(connection, limit=20)
+    for kind in ('missing', 'extra', 'different'):
+        print(f'{kind}: {getattr(report, kind) or "none"}')
+    if not report.ok:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
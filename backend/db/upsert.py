@@ -0,0 +1,144 @@
+"""
+Bulk upserts for API-Football ingestion.
+
+A whole API page is written with a single ``INSERT ... SELECT FROM unnest(...)
+ON CONFLICT DO UPDATE`` statement per batch. Each column travels as one array
+parameter, so the statement size does not grow with the number of rows, and the
+``WHERE ... IS DISTINCT FROM`` guard leaves rows whose payload did not change
+untouched (no new tuple version, no trigger, no WAL).
+"""
+from sqlalchemy import bindparam, func, select, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from . import head_to_head, leaderboards, models, rollups, summaries
+from .cache import mark_rows_stale
+from .versions import bump_rows
+
+BATCH_SIZE = 5000
+
+# Natural keys backed by the unique constraints declared in models.py
+NATURAL_KEYS = {
+    models.Standings.__tablename__: ('team_id', 'league_id', 'season_id'),
+    models.TeamStatistics.__tablename__: ('team_id', 'league_id', 'season_id'),
+    models.PlayerStatistics.__tablename__: ('player_id', 'team_id', 'league_id', 'season_id'),
+    models.MatchStatistics.__tablename__: ('match_id', 'team_id', 'season_year'),
+}
+
+# Columns set back to a value whenever a row's payload changes
+RESET_ON_CHANGE = {
+    models.PlayerMatchStatistics.__tablename__: {'rolled_up': False},
+}
+
+
+def _table(target):
+    return getattr(target, '__table__', target)
+
+
+def natural_key(table):
+    """Return the conflict columns used for ``table`` when none are given."""
+    return NATURAL_KEYS.get(table.name) or [column.name for column in table.primary_key]
+
+
+def merge_from(target, columns, source, key=None):
+    """
+    Build an ``INSERT ... SELECT ... ON CONFLICT DO UPDATE`` from any selectable.
+
+    Args:
+        target (Table | Base): Table or mapped class to write to.
+        columns (Sequence[str]): Columns produced by ``source``, in order.
+        source (Select): Selectable producing the rows to merge.
+        key (Sequence[str]): Conflict columns. Defaults to the table's natural key, or its primary key.
+
+    Returns:
+        Insert: Statement that only touches rows whose payload changed, setting the
+        ``RESET_ON_CHANGE`` columns of those rows.
+    """
+    table = _table(target)
+    key = key or natural_key(table)
+    missing = set(key) - set(columns)
+    if missing:
+        raise ValueError(f"Rows for '{table.name}' are missing key columns: {sorted(missing)}")
+
+    statement = insert(table).from_select(list(columns), source)
+    updated = [column for column in columns if column not in key and not table.c[column].primary_key]
+    if not updated:
+        return statement.on_conflict_do_nothing(index_elements=list(key))
+    reset = {
+        column: value for column, value in RESET_ON_CHANGE.get(table.name, {}).items() if column not in columns
+    }
+    return statement.on_conflict_do_update(
+        index_elements=list(key),
+        set_={**{column: statement.excluded[column] for column in updated}, **reset},
+        where=tuple_(*[table.c[column] for column in updated]).is_distinct_from(
+            tuple_(*[statement.excluded[column] for column in updated])
+        ),
+    )
+
+
+def build_upsert(target, columns, key=None):
+    """
+    Build the batched upsert statement for ``columns`` of a table.
+
+    Args:
+        target (Table | Base): Table or mapped class to write to.
+        columns (Sequence[str]): Columns present in every row.
+        key (Sequence[str]): Conflict columns. Defaults to the table's natural key, or its primary key.
+
+    Returns:
+        Insert: Statement expecting one list-valued parameter per column.
+    """
+    table = _table(target)
+    arrays = select(*[
+        func.unnest(bindparam(column, type_=ARRAY(table.c[column].type))).label(column)
+        for column in columns
+    ])
+    return merge_from(table, columns, arrays, key)
+
+
+def upsert(connection, target, rows, key=None, batch_size=BATCH_SIZE):
+    """
+    Insert or update ``rows`` in one round trip per batch.
+
+    Rows repeating a key inside the same call are collapsed to the last one,
+    since PostgreSQL refuses to update the same row twice in one statement.
+    Cached queries for the seasons and leagues of the rows are invalidated on commit.
+    When any row changed, the data version of their seasons is bumped and the
+    match summaries, head-to-head records and leaderboards depending on them
+    are refreshed, and per-match player rows are rolled up into the season totals.
+
+    Args:
+        connection (Connection | Session): Where to execute the statements.
+        target (Table | Base): Table or mapped class to write to.
+        rows (Iterable[dict]): Normalized rows sharing the same keys.
+        key (Sequence[str]): Conflict columns. Defaults to the table's natural key.
+        batch_size (int): Maximum rows per statement.
+
+    Returns:
+        int: Number of rows inserted or changed. Unchanged rows are not counted.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    table = _table(target)
+    columns = [column.name for column in table.columns if column.name in rows[0]]
+    key = key or natural_key(table)
+    statement = build_upsert(table, columns, key)
+
+    unique = {}
+    for row in rows:
+        unique[tuple(row[column] for column in key)] = row
+    rows = list(unique.values())
+
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        params = {column: [row.get(column) for row in batch] for column in columns}
+        written += connection.execute(statement, params).rowcount
+    mark_rows_stale(connection, rows)
+    if written:
+        bump_rows(connection, table.name, rows)
+        summaries.refresh_rows(connection, table.name, rows)
+        head_to_head.refresh_rows(connection, table.name, rows)
+        leaderboards.refresh_rows(connection, table.name, rows)
+        rollups.rollup_rows(connection, table.name, rows)
+    return written
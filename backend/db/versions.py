@@ -0,0 +1,115 @@
+"""
+Per-season data versions, for HTTP revalidation.
+
+Every transaction that writes ``matches``, ``standings``, ``team_statistics``
+or ``player_statistics`` rows of a season increments the season's row in
+``data_versions``, in the same transaction: the write paths that mark cached
+queries stale (:mod:`backend.db.upsert`, :mod:`backend.db.backfill`,
+:mod:`backend.db.rollups` and ORM flushes) call :func:`bump` too. A version
+therefore changes exactly when a response built from the season's rows can.
+
+API processes read the versions through :class:`DataVersions`, which loads
+all of them (with ``Season.is_current``) in one query at most every
+``DATA_VERSION_REFRESH`` seconds, so answering a revalidation costs no query.
+"""
+import threading
+import time
+
+from sqlalchemy import BigInteger, bindparam, event, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from backend.core.config import DATA_VERSION_REFRESH
+
+from .database import get_engine
+from .models import DataVersion, Match, PlayerStatistics, Season, Standings, TeamStatistics
+
+VERSIONED_TABLES = frozenset(
+    model.__tablename__ for model in (Match, Standings, TeamStatistics, PlayerStatistics)
+)
+
+_BUMP = text("""
+    INSERT INTO data_versions (season_id, version, updated_at)
+    SELECT season_id, 1, now() AT TIME ZONE 'utc' FROM unnest(:season_ids) AS season_id
+    ON CONFLICT (season_id) DO UPDATE
+    SET version = data_versions.version + 1, updated_at = excluded.updated_at
+""").bindparams(bindparam('season_ids', type_=ARRAY(BigInteger)))
+
+
+def bump(connection, season_ids):
+    """
+    Increment the version of ``season_ids`` in the current transaction of ``connection``.
+
+    Args:
+        connection (Connection | Session): Connection or session that wrote the rows.
+        season_ids (Iterable[int]): Seasons whose rows changed. None values are ignored.
+    """
+    season_ids = sorted({season_id for season_id in season_ids if season_id is not None})
+    if season_ids:
+        # Sorted, so concurrent writers lock the version rows in the same order
+        connection.execute(_BUMP, {'season_ids': season_ids})
+
+
+def bump_rows(connection, table_name, rows):
+    """Call :func:`bump` with the seasons of ``rows`` when ``table_name`` is versioned."""
+    if table_name in VERSIONED_TABLES:
+        bump(connection, (row.get('season_id') for row in rows))
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed(session, flush_context):
+    season_ids = {
+        instance.season_id for instance in (*session.new, *session.dirty, *session.deleted)
+        if getattr(instance, '__tablename__', None) in VERSIONED_TABLES
+    }
+    bump(session, season_ids)
+
+
+class DataVersions:
+    """
+    In-process view of ``data_versions``, refreshed at most every ``refresh_interval`` seconds.
+
+    Args:
+        engine (Engine): Where to read the versions. Defaults to :func:`backend.db.database.get_engine`.
+        refresh_interval (float): Seconds a snapshot is served before being reloaded.
+    """
+
+    def __init__(self, engine=None, refresh_interval=DATA_VERSION_REFRESH):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self.refreshes = 0
+        self._seasons = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def refresh(self):
+        """Reload every season's version and ``is_current`` flag."""
+        if self.engine is None:
+            self.engine = get_engine()
+        statement = (
+            select(Season.id, func.coalesce(DataVersion.version, 0), Season.is_current)
+            .outerjoin(DataVersion, DataVersion.season_id == Season.id)
+        )
+        with self.engine.connect() as connection:
+            seasons = {
+                season_id: (version, is_current) for season_id, version, is_current in connection.execute(statement)
+            }
+        with self._lock:
+            self._seasons = seasons
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def get(self, season_id):
+        """
+        Return the version of a season and whether it is current.
+
+        Returns:
+            tuple | None: ``(version, is_current)``, or None for an unknown season.
+        """
+        if self.stale:
+            self.refresh()
+        return self._seasons.get(season_id)
@@ -0,0 +1,158 @@
+from sqlalchemy import Column, Integer, Numeric, event, text
+from sqlalchemy.orm import declarative_base
+
+# Materialized views live in their own registry so that Alembic autogenerate
+# and metadata.create_all() never try to create them as tables. They are
+# created by revision 23ad3c75b998.
+ViewBase = declarative_base()
+
+
+@event.listens_for(ViewBase, 'before_insert', propagate=True)
+@event.listens_for(ViewBase, 'before_update', propagate=True)
+@event.listens_for(ViewBase, 'before_delete', propagate=True)
+def _read_only(mapper, connection, target):
+    raise TypeError(f'{type(target).__name__} is a materialized view and cannot be written to')
+
+
+class SeasonTeamRecord(ViewBase):
+    """
+    Represents a team's home/away record in a season (materialized view).
+
+    Attributes:
+        league_id (int): League of the season.
+        season_id (int): Season (part of the unique key).
+        team_id (int): Team (part of the unique key).
+        home_games (int): Finished home games.
+        home_wins (int): Home wins.
+        home_draws (int): Home draws.
+        home_losses (int): Home losses.
+        home_goals_for (int): Goals scored at home.
+        home_goals_against (int): Goals conceded at home.
+        away_games (int): Finished away games.
+        away_wins (int): Away wins.
+        away_draws (int): Away draws.
+        away_losses (int): Away losses.
+        away_goals_for (int): Goals scored away.
+        away_goals_against (int): Goals conceded away.
+        goals_for_avg (Decimal): Goals scored per game.
+        goals_against_avg (Decimal): Goals conceded per game.
+        home_goals_for_avg (Decimal): Goals scored per home game.
+        away_goals_for_avg (Decimal): Goals scored per away game.
+    """
+
+    __tablename__ = 'season_team_records'
+
+    league_id = Column(Integer, nullable=False)
+    season_id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, primary_key=True)
+    home_games = Column(Integer)
+    home_wins = Column(Integer)
+    home_draws = Column(Integer)
+    home_losses = Column(Integer)
+    home_goals_for = Column(Integer)
+    home_goals_against = Column(Integer)
+    away_games = Column(Integer)
+    away_wins = Column(Integer)
+    away_draws = Column(Integer)
+    away_losses = Column(Integer)
+    away_goals_for = Column(Integer)
+    away_goals_against = Column(Integer)
+    goals_for_avg = Column(Numeric(5, 2))
+    goals_against_avg = Column(Numeric(5, 2))
+    home_goals_for_avg = Column(Numeric(5, 2))
+    away_goals_for_avg = Column(Numeric(5, 2))
+
+
+class SeasonGoalAverages(ViewBase):
+    """
+    Represents the goal averages of a whole season (materialized view).
+
+    Attributes:
+        league_id (int): League of the season.
+        season_id (int): Season (unique key).
+        matches_played (int): Finished matches.
+        home_wins (int): Matches won by the home team.
+        draws (int): Drawn matches.
+        away_wins (int): Matches won by the away team.
+        total_goals (int): Goals scored in the season.
+        goals_per_match (Decimal): Average goals per match.
+        home_goals_per_match (Decimal): Average home team goals per match.
+        away_goals_per_match (Decimal): Average away team goals per match.
+    """
+
+    __tablename__ = 'season_goal_averages'
+
+    league_id = Column(Integer, nullable=False)
+    season_id = Column(Integer, primary_key=True)
+    matches_played = Column(Integer)
+    home_wins = Column(Integer)
+    draws = Column(Integer)
+    away_wins = Column(Integer)
+    total_goals = Column(Integer)
+    goals_per_match = Column(Numeric(5, 2))
+    home_goals_per_match = Column(Numeric(5, 2))
+    away_goals_per_match = Column(Numeric(5, 2))
+
+
+class SeasonTopScorer(ViewBase):
+    """
+    Represents a goal scorer ranked within a season (materialized view).
+
+    Attributes:
+        league_id (int): League of the season.
+        season_id (int): Season (part of the unique key).
+        player_id (int): Player (part of the unique key).
+        team_id (int): Team the goals were scored for (part of the unique key).
+        goals (int): Goals scored.
+        assists (int): Assists.
+        minutes_played (int): Minutes played.
+        rank (int): Position in the season's scorer table (ties share a rank).
+    """
+
+    __tablename__ = 'season_top_scorers'
+
+    league_id = Column(Integer, nullable=False)
+    season_id = Column(Integer, primary_key=True)
+    player_id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, primary_key=True)
+    goals = Column(Integer)
+    assists = Column(Integer)
+    minutes_played = Column(Integer)
+    rank = Column(Integer)
+
+
+class SeasonTeamCards(ViewBase):
+    """
+    Represents a team's card count in a season (materialized view).
+
+    Attributes:
+        league_id (int): League of the season.
+        season_id (int): Season (part of the unique key).
+        team_id (int): Team (part of the unique key).
+        yellow_cards (int): Yellow cards received by the team's players.
+        red_cards (int): Red cards received by the team's players.
+    """
+
+    __tablename__ = 'season_team_cards'
+
+    league_id = Column(Integer, nullable=False)
+    season_id = Column(Integer, primary_key=True)
+    team_id = Column(Integer, primary_key=True)
+    yellow_cards = Column(Integer)
+    red_cards = Column(Integer)
+
+
+def refresh_views(connection, concurrently=True):
+    """
+    Refresh every season aggregate view, e.g. at the end of an update run.
+
+    ``CONCURRENTLY`` keeps the views readable while they are rebuilt; pass
+    ``concurrently=False`` for the first refresh of an empty database.
+
+    Args:
+        connection (Connection | Session): Where to execute the refreshes.
+        concurrently (bool): Whether to refresh without locking out readers.
+    """
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    for name in ViewBase.metadata.tables:
+        connection.execute(text(f'REFRESH MATERIALIZED VIEW {mode}{name}'))
@@ -0,0 +1,360 @@
+"""
+Concurrent, rate-limited API-Football client with an on-disk response cache.
+
+* Requests run concurrently (``concurrency`` at a time) but never faster than a
+  :class:`TokenBucket` allows. The bucket follows the per-minute quota headers
+  (``X-RateLimit-Limit``/``X-RateLimit-Remaining``), and the client stops
+  before the daily quota (``x-ratelimit-requests-remaining``) runs out.
+* Raw JSON responses are kept in a content-addressed :class:`ResponseCache`:
+  bodies are stored once under their SHA-256, and each request points to the
+  body it last returned, with its ETag and fetch time. Fresh entries cost no
+  request, stale ones are revalidated with ``If-None-Match``.
+* :func:`backfill_season` walks every endpoint of a season and records each
+  finished request in a :class:`Checkpoint`, so an interrupted backfill resumes
+  where it stopped.
+
+Usage:
+    async with Fetcher() as fetcher:
+        async for endpoint, params, body in backfill_season(fetcher, 71, 2024, Checkpoint('71-2024.done')):
+            ...
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+import httpx
+
+from backend.core.config import API_FOOTBALL_CACHE_DIR, API_FOOTBALL_KEY, API_FOOTBALL_RATE_LIMIT, API_FOOTBALL_URL
+
+# Default freshness of cached responses, in seconds. None keeps them forever.
+DEFAULT_TTL = 6 * 3600
+FINISHED_STATUSES = {'FT', 'AET', 'PEN'}
+
+
+class FetchError(RuntimeError):
+    """Raised when API-Football answers with an error that retrying will not fix."""
+
+
+class QuotaExhausted(FetchError):
+    """Raised before a request would go over the daily quota."""
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the request rate.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum burst.
+        tokens (float): Tokens currently available.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def observe(self, limit, remaining):
+        """Align the bucket with the per-minute quota reported by the server."""
+        if limit:
+            self.rate = limit / 60
+            self.capacity = limit
+        if remaining is not None:
+            self._refill()
+            self.tokens = min(self.tokens, remaining)
+
+    def drain(self):
+        """Empty the bucket, after the server refused a request for exceeding the rate."""
+        self._refill()
+        self.tokens = 0
+
+
+def request_key(endpoint, params):
+    """Return the SHA-256 identifying a request, independent of parameter order."""
+    canonical = json.dumps([endpoint.strip('/'), sorted((str(k), str(v)) for k, v in params.items())])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+class ResponseCache:
+    """
+    Content-addressed store of raw API responses.
+
+    ``objects/<sha256>.json`` holds each distinct body once;
+    ``requests/<request key>.json`` holds the request, its ETag, when it was
+    fetched and the SHA-256 of the body it returned.
+    """
+
+    def __init__(self, directory=API_FOOTBALL_CACHE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, kind, digest):
+        return self.directory / kind / digest[:2] / f'{digest}.json'
+
+    def lookup(self, key):
+        """Return the entry stored for a request key, or None."""
+        path = self._path('requests', key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_bytes())
+
+    def body(self, entry):
+        """Return the raw body an entry points to."""
+        return self._path('objects', entry['object']).read_bytes()
+
+    def store(self, key, endpoint, params, body, etag=None):
+        """Store ``body`` and point the request key at it."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._path('objects', digest)
+        if not path.exists():
+            _write_atomic(path, body)
+        entry = {'endpoint': endpoint, 'params': params, 'etag': etag, 'fetched_at': time.time(), 'object': digest}
+        _write_atomic(self._path('requests', key), json.dumps(entry).encode())
+        return entry
+
+    def touch(self, key, entry):
+        """Mark an entry as fresh again after a ``304 Not Modified``."""
+        entry = {**entry, 'fetched_at': time.time()}
+        _write_atomic(self._path('requests', key), json.dumps(entry).encode())
+        return entry
+
+
+class Checkpoint:
+    """
+    Append-only record of the requests a backfill already handled.
+
+    One request key per line, flushed as soon as it is added, so the file
+    survives the process being killed mid-season.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set(self.path.read_text().split()) if self.path.exists() else set()
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def add(self, key):
+        if key in self.done:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as file:
+            file.write(f'{key}\n')
+        self.done.add(key)
+
+
+class Fetcher:
+    """
+    Async API-Football client.
+
+    ``transport`` replaces the HTTP transport of the underlying ``httpx.AsyncClient``,
+    e.g. with an ``httpx.MockTransport`` in tests.
+
+    Attributes:
+        stats (dict): Counters for ``requests`` sent, ``cache_hits``, ``not_modified`` answers and ``retries``.
+        daily_remaining (int): Requests left today, as last reported by the server.
+    """
+
+    def __init__(self, base_url=API_FOOTBALL_URL, api_key=API_FOOTBALL_KEY, cache=None,
+                 rate_limit=API_FOOTBALL_RATE_LIMIT, concurrency=8, daily_reserve=10, retries=4, transport=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.cache = cache or ResponseCache()
+        self.bucket = TokenBucket(rate_limit)
+        self.daily_reserve = daily_reserve
+        self.daily_remaining = None
+        self.retries = retries
+        self.stats = {'requests': 0, 'cache_hits': 0, 'not_modified': 0, 'retries': 0}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._transport = transport
+        self._client = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url, headers={'x-apisports-key': self.api_key}, timeout=30, transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    def _observe(self, headers):
+        daily = headers.get('x-ratelimit-requests-remaining')
+        if daily is not None:
+            self.daily_remaining = int(daily)
+        limit, remaining = headers.get('x-ratelimit-limit'), headers.get('x-ratelimit-remaining')
+        self.bucket.observe(int(limit) if limit else None, int(remaining) if remaining else None)
+
+    async def _send(self, endpoint, params, etag):
+        headers = {'If-None-Match': etag} if etag else {}
+        for attempt in range(self.retries + 1):
+            if self.daily_remaining is not None and self.daily_remaining <= self.daily_reserve:
+                raise QuotaExhausted(f'{self.daily_remaining} requests left today')
+            await self.bucket.acquire()
+            self.stats['requests'] += 1
+            try:
+                response = await self._client.get(f'/{endpoint.strip("/")}', params=params, headers=headers)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                self._observe(response.headers)
+                if response.status_code == 304:
+                    return response
+                if response.status_code == 429:
+                    self.bucket.drain()
+                elif response.status_code < 500:
+                    response.raise_for_status()
+                    errors = response.json().get('errors')
+                    if not errors:
+                        return response
+                    # API-Football reports quota errors in a 200 response
+                    if 'requests' in errors:
+                        raise QuotaExhausted(str(errors))
+                    if 'rateLimit' not in errors:
+                        raise FetchError(f'{endpoint} {params}: {errors}')
+                    self.bucket.drain()
+                if attempt == self.retries:
+                    raise FetchError(f'{endpoint} {params}: gave up after HTTP {response.status_code}')
+            self.stats['retries'] += 1
+            await asyncio.sleep(min(60, 2 ** attempt) * (0.5 + random.random()))
+
+    async def get(self, endpoint, ttl=DEFAULT_TTL, **params):
+        """
+        Return the JSON body of ``endpoint``, from the cache when it is fresh.
+
+        Args:
+            endpoint (str): API path, e.g. ``'fixtures'``.
+            ttl (float): Seconds a cached response stays fresh. None keeps it forever, 0 always revalidates.
+            **params: Query parameters.
+
+        Returns:
+            dict: The decoded response.
+        """
+        key = request_key(endpoint, params)
+        entry = self.cache.lookup(key)
+        if entry and (ttl is None or time.time() - entry['fetched_at'] < ttl):
+            self.stats['cache_hits'] += 1
+            return json.loads(self.cache.body(entry))
+
+        async with self._semaphore:
+            response = await self._send(endpoint, params, entry and entry['etag'])
+        if response.status_code == 304:
+            self.stats['not_modified'] += 1
+            return json.loads(self.cache.body(self.cache.touch(key, entry)))
+        self.cache.store(key, endpoint, params, response.content, response.headers.get('etag'))
+        return response.json()
+
+    async def get_pages(self, endpoint, ttl=DEFAULT_TTL, **params):
+        """Return every page of a paginated endpoint, fetching pages after the first concurrently."""
+        first = await self.get(endpoint, ttl, **params)
+        total = first.get('paging', {}).get('total', 1)
+        rest = await asyncio.gather(*(self.get(endpoint, ttl, **params, page=page) for page in range(2, total + 1)))
+        return [first, *rest]
+
+
+def season_requests(league_id, season):
+    """Return the league-level requests of a season as ``(endpoint, params)`` pairs."""
+    params = {'league': league_id, 'season': season}
+    return [('standings', params), ('teams', params), ('fixtures', params)]
+
+
+def fixture_requests(fixture_id):
+    """Return the per-fixture requests as ``(endpoint, params)`` pairs."""
+    return [
+        ('fixtures/statistics', {'fixture': fixture_id}),
+        ('fixtures/players', {'fixture': fixture_id}),
+        ('predictions', {'fixture': fixture_id}),
+    ]
+
+
+async def backfill_season(fetcher, league_id, season, checkpoint=None, ttl=None):
+    """
+    Fetch every response of a season, yielding them as they complete.
+
+    A request is added to ``checkpoint`` once the consumer has handled the
+    response it yielded, and is not yielded again on the next run. Its
+    response still comes back from the cache when later requests depend on it
+    (the fixture list, the team list).
+
+    Args:
+        fetcher (Fetcher): Open fetcher.
+        league_id (int): API-Football league id.
+        season (int): Season year.
+        checkpoint (Checkpoint): Requests already handled. Defaults to none.
+        ttl (float): Freshness of cached responses. None (finished seasons) never refetches.
+
+    Yields:
+        tuple: ``(endpoint, params, body)`` for each response not handled yet.
+    """
+    checkpoint = checkpoint if checkpoint is not None else Checkpoint(os.devnull)
+
+    async def fetch(endpoint, params):
+        return endpoint, params, await fetcher.get(endpoint, ttl, **params)
+
+    def start(requests):
+        return [asyncio.ensure_future(fetch(endpoint, params))
+                for endpoint, params in requests if request_key(endpoint, params) not in checkpoint]
+
+    params = {'league': league_id, 'season': season}
+    league_level = {}
+    tasks = start(season_requests(league_id, season))
+    try:
+        for task in asyncio.as_completed(tasks):
+            endpoint, request_params, body = await task
+            league_level[endpoint] = body
+            yield endpoint, request_params, body
+            checkpoint.add(request_key(endpoint, request_params))
+
+        for page, body in enumerate(await fetcher.get_pages('players', ttl, **params), start=1):
+            request_params = params if page == 1 else {**params, 'page': page}
+            if request_key('players', request_params) not in checkpoint:
+                yield 'players', request_params, body
+                checkpoint.add(request_key('players', request_params))
+
+        # Checkpointed in an earlier run: read them back, normally from the cache
+        for endpoint in ('fixtures', 'teams'):
+            if endpoint not in league_level:
+                league_level[endpoint] = await fetcher.get(endpoint, ttl, **params)
+        fixtures, teams = league_level['fixtures'], league_level['teams']
+        dependent = [('teams/statistics', {**params, 'team': item['team']['id']}) for item in teams['response']]
+        for item in fixtures['response']:
+            if item['fixture']['status']['short'] in FINISHED_STATUSES:
+                dependent.extend(fixture_requests(item['fixture']['id']))
+
+        tasks = start(dependent)
+        for task in asyncio.as_completed(tasks):
+            endpoint, request_params, body = await task
+            yield endpoint, request_params, body
+            checkpoint.add(request_key(endpoint, request_params))
+    finally:
+        # Stop the requests still in flight when the consumer stops early
+        for task in tasks:
+            task.cancel()
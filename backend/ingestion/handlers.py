@@ -0,0 +1,147 @@
+"""
+Writers of the responses fetched by the incremental sync.
+
+:func:`handle` is the ``handle`` of :func:`backend.ingestion.sync.run_sync`: it
+turns the response of one :class:`~backend.ingestion.sync.SyncCall` into rows
+with the transforms of :mod:`backend.ingestion.transform`, the same the
+backfill uses, and writes them with :func:`backend.db.upsert.upsert`, which
+skips unchanged rows and refreshes what depends on the changed ones:
+
+* ``teams`` -> ``stadiums`` and ``teams``, after creating the season's partitions;
+* ``schedule``, ``live`` and ``match_details`` -> ``matches``, and for fixtures
+  requested by id their ``match_statistics`` and ``player_match_statistics``.
+  Players not stored yet are inserted with the name and photo the fixture
+  gives, as the players themselves are only fetched by the backfill;
+* ``predictions`` -> the match's ``match_predictions`` row, replaced, as it has
+  no natural key to merge on;
+* ``standings`` -> the standings derived from the stored matches, in the
+  groups of the response (see :mod:`backend.processing.standings`);
+* ``team_statistics`` -> the team statistics derived from the stored matches,
+  with no request (see :mod:`backend.processing.statistics`).
+
+Every handler runs in the transaction of its tick, so a failed tick writes
+nothing and its watermarks do not move.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, select
+
+from backend.db.cache import mark_rows_stale
+from backend.db.models import (
+    Match,
+    MatchPredictions,
+    MatchStatistics,
+    Player,
+    PlayerMatchStatistics,
+    Stadium,
+    Team,
+)
+from backend.db.partitions import ensure_partitions
+from backend.db.upsert import upsert
+from backend.ingestion import transform
+from backend.ingestion.pipeline import clear_unknown_venues
+from backend.processing import standings, statistics
+
+
+def _fixture_players(connection, body):
+    """Return the rows of the players of fixtures ``body`` that are not stored yet."""
+    listed = {
+        player['player']['id']: {
+            'id': player['player']['id'], 'team_id': team['team']['id'],
+            'name': player['player'].get('name'), 'photo': player['player'].get('photo'),
+        }
+        for item in body['response']
+        for team in item.get('players') or ()
+        for player in team.get('players') or ()
+    }
+    if not listed:
+        return []
+    stored = set(connection.execute(select(Player.id).where(Player.id.in_(sorted(listed)))).scalars())
+    return [row for player_id, row in listed.items() if player_id not in stored and row['name']]
+
+
+def handle_teams(connection, season, call, body):
+    """Write the season's teams and their stadiums."""
+    ensure_partitions(connection, [season.year])
+    rows = transform.table_rows(transform.teams(season, [(call.params, body)]))
+    return upsert(connection, Stadium, rows.get('stadiums', ())) + upsert(connection, Team, rows.get('teams', ()))
+
+
+def handle_fixtures(connection, season, call, body):
+    """Write the matches of a fixtures response, and the statistics they embed."""
+    if body is None:
+        return 0
+    rows = transform.table_rows(transform.fixtures(season, [(call.params, body)]))
+    clear_unknown_venues(connection, rows.get('matches', ()))
+    written = upsert(connection, Match, rows.get('matches', ()))
+    written += upsert(connection, MatchStatistics, rows.get('match_statistics', ()))
+    if rows.get('player_match_statistics'):
+        new_players = _fixture_players(connection, body)
+        upsert(connection, Player, new_players)
+        stored = set(connection.execute(select(Player.id).where(Player.id.in_(
+            sorted({row['player_id'] for row in rows['player_match_statistics']})
+        ))).scalars())
+        written += len(new_players) + upsert(connection, PlayerMatchStatistics, [
+            row for row in rows['player_match_statistics'] if row['player_id'] in stored
+        ])
+    return written
+
+
+def handle_predictions(connection, season, call, body):
+    """
+    Replace the predictions of one match.
+
+    A match without predictions still gets a row, empty but for
+    ``last_updated``, so the next ticks do not ask again before it is stale.
+    """
+    match_id = int(call.params['fixture'])
+    rows = transform.table_rows(transform.predictions(season, [(call.params, body)])).get('match_predictions')
+    rows = rows or [{'match_id': match_id, 'season_year': season.year}]
+    last_updated = datetime.now(timezone.utc).replace(tzinfo=None)
+    table = MatchPredictions.__table__
+    connection.execute(delete(table).where(table.c.match_id == match_id, table.c.season_year == season.year))
+    connection.execute(insert(table), [{**row, 'last_updated': last_updated} for row in rows])
+    mark_rows_stale(connection, [{'season_id': season.id, 'league_id': season.league_id}])
+    return len(rows)
+
+
+def handle_standings(connection, season, call, body):
+    """Derive the season's standings from its stored matches, in the groups of the response."""
+    rows = transform.table_rows(transform.standings(season, [(call.params, body)])).get('standings', ())
+    groups = {row['team_id']: row['group_name'] for row in rows}
+    return standings.write_season(
+        connection, season.league_id, season.id, rules=standings.rules_for(season.league_id), groups=groups,
+    )
+
+
+def handle_team_statistics(connection, season, call, body):
+    """Derive the season's team statistics from its stored matches."""
+    return sum(statistics.write_season(connection, season.id).values())
+
+
+# Sync entity -> handler of its calls
+HANDLERS = {
+    'teams': handle_teams,
+    'schedule': handle_fixtures,
+    'live': handle_fixtures,
+    'match_details': handle_fixtures,
+    'predictions': handle_predictions,
+    'standings': handle_standings,
+    'team_statistics': handle_team_statistics,
+}
+
+
+def handle(connection, season, call, body):
+    """
+    Write the rows of one sync call.
+
+    Args:
+        connection (Connection): Where to write, inside the tick's transaction.
+        season (SeasonSync): Season being synchronized.
+        call (SyncCall): Call made.
+        body (dict): Response of the call, or None for calls without a request.
+
+    Returns:
+        int: Number of rows inserted or changed.
+    """
+    return HANDLERS[call.entity](connection, season, call, body)
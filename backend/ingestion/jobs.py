@@ -0,0 +1,354 @@
+"""
+Background jobs: a persistent queue in the ``jobs`` table and a worker pool.
+
+``POST /update-data`` only enqueues an ``update`` job and returns its id. A
+worker (``python -m backend.ingestion.jobs worker``) claims jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent workers never claim the
+same job, and runs them in a process pool:
+
+* ``update`` fans out into one ``update_season`` job per current season, so
+  the seasons are ingested in parallel across the pool and across workers;
+* ``update_season`` runs one incremental sync tick over its season with
+  :func:`backend.ingestion.sync.sync`, which only requests what can have
+  changed since the season's last tick.
+
+A claim leases the job for ``JOB_LEASE_SECONDS``. The worker renews the leases
+of the jobs it runs, so a job whose lease expired lost its worker and is
+claimed again. A failed job is retried after an exponential backoff with
+jitter, until it has been claimed ``max_attempts`` times.
+
+Two guards keep two triggers from ingesting the same season at once:
+
+* enqueuing is single flight: partial unique indexes allow one queued or
+  running job per kind and season, and :func:`enqueue` returns the id of the
+  existing job instead of adding another;
+* a season job holds a PostgreSQL advisory lock on its season while it runs,
+  so a job reclaimed while its first run is still alive is postponed until
+  that run ends.
+
+Usage:
+    python -m backend.ingestion.jobs enqueue update
+    python -m backend.ingestion.jobs worker --processes 4 [--until-idle]
+    python -m backend.ingestion.jobs status 42
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+from sqlalchemy import DateTime, bindparam, func, select, text
+
+from backend.core.config import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_PROCESSES,
+    JOB_RETRY_BASE,
+    JOB_RETRY_MAX,
+)
+from backend.db.database import create_db_engine, get_ingestion_engine
+from backend.db.models import Job, Season
+
+ACTIVE = ('queued', 'running')
+# First key of the advisory locks taken on season ids
+SEASON_LOCK = 71
+
+_NOW = "(now() AT TIME ZONE 'utc')"
+
+_ENQUEUE = text("""
+    INSERT INTO jobs (kind, season_id, parent_id, max_attempts, run_after)
+    VALUES (:kind, :season_id, :parent_id, :max_attempts, coalesce(:run_after, now() AT TIME ZONE 'utc'))
+    ON CONFLICT DO NOTHING
+    RETURNING id
+""").bindparams(bindparam('run_after', type_=DateTime))
+
+_ACTIVE_JOB = select(Job.id).where(
+    Job.kind == bindparam('kind'),
+    Job.season_id.is_not_distinct_from(bindparam('season_id')),
+    Job.status.in_(ACTIVE),
+)
+
+# Expired leases are reclaimed along with the queued jobs
+_CLAIM = text(f"""
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, leased_by = :worker,
+        lease_expires_at = {_NOW} + :lease_seconds * interval '1 second',
+        started_at = coalesce(started_at, {_NOW})
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE (status = 'queued' AND run_after <= {_NOW})
+           OR (status = 'running' AND lease_expires_at < {_NOW})
+        ORDER BY run_after, id
+        LIMIT :limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, kind, season_id, parent_id, attempts, max_attempts
+""")
+
+_RENEW = text(f"""
+    UPDATE jobs SET lease_expires_at = {_NOW} + :lease_seconds * interval '1 second'
+    WHERE id = ANY(:job_ids) AND leased_by = :worker AND status = 'running'
+""")
+
+# Every transition out of 'running' is conditioned on still holding the lease
+_SUCCEED = text(f"""
+    UPDATE jobs
+    SET status = 'succeeded', result = :result, error = NULL, finished_at = {_NOW},
+        leased_by = NULL, lease_expires_at = NULL
+    WHERE id = :id AND leased_by = :worker AND status = 'running'
+""").bindparams(bindparam('result', type_=Job.result.type))
+
+_FAIL = text(f"""
+    UPDATE jobs
+    SET status = CASE WHEN :retry AND attempts - :refund < max_attempts THEN 'queued' ELSE 'failed' END,
+        finished_at = CASE WHEN :retry AND attempts - :refund < max_attempts THEN NULL ELSE {_NOW} END,
+        run_after = {_NOW} + :delay * interval '1 second',
+        attempts = attempts - :refund, error = :error, leased_by = NULL, lease_expires_at = NULL
+    WHERE id = :id AND leased_by = :worker AND status = 'running'
+""")
+
+
+class SeasonBusy(RuntimeError):
+    """Raised when another run holds the season; the job is postponed without using up an attempt."""
+
+
+def enqueue(connection, kind, season_id=None, parent_id=None, max_attempts=JOB_MAX_ATTEMPTS, run_after=None):
+    """
+    Add a job to the queue, unless the same job is already queued or running.
+
+    Args:
+        connection (Connection | Session): Where to write. The job is visible to workers once committed.
+        kind (str): Key of :data:`HANDLERS`.
+        season_id (int): Season the job works on, if any.
+        parent_id (int): Job enqueuing this one.
+        max_attempts (int): Claims before the job is given up.
+        run_after (datetime): Earliest claim time, as naive UTC. Defaults to now.
+
+    Returns:
+        int: Id of the new job, or of the queued or running job with the same kind and season.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}', expected one of {sorted(HANDLERS)}")
+    params = {
+        'kind': kind, 'season_id': season_id, 'parent_id': parent_id, 'max_attempts': max_attempts,
+        'run_after': run_after,
+    }
+    # The active job may finish between the two statements: then insert again
+    for _ in range(3):
+        job_id = connection.execute(_ENQUEUE, params).scalar()
+        if job_id is None:
+            job_id = connection.execute(_ACTIVE_JOB, params).scalar()
+        if job_id is not None:
+            return job_id
+    raise RuntimeError(f"Could not enqueue '{kind}' for season {season_id}")
+
+
+def job_status(connection, job_id):
+    """
+    Return a job with the number of its child jobs per status.
+
+    Returns:
+        dict | None: The job's columns plus ``children``, or None when it does not exist.
+    """
+    job = connection.execute(select(Job.__table__).where(Job.id == job_id)).mappings().first()
+    if job is None:
+        return None
+    children = connection.execute(
+        select(Job.status, func.count()).where(Job.parent_id == job_id).group_by(Job.status)
+    ).all()
+    return {**job, 'children': dict(children)}
+
+
+def backoff(attempts, base=JOB_RETRY_BASE, maximum=JOB_RETRY_MAX):
+    """Seconds to wait before retrying a job claimed ``attempts`` times, jittered over the upper half."""
+    delay = min(base * 2 ** max(attempts - 1, 0), maximum)
+    return random.uniform(delay / 2, delay)
+
+
+@contextmanager
+def season_lock(connection, season_id):
+    """
+    Hold the advisory lock of a season on ``connection`` for the duration of the block.
+
+    The lock is session level, so it survives the commits made inside the block.
+
+    Raises:
+        SeasonBusy: When another connection holds it.
+    """
+    params = {'namespace': SEASON_LOCK, 'season_id': season_id}
+    if not connection.execute(text('SELECT pg_try_advisory_lock(:namespace, :season_id)'), params).scalar():
+        connection.rollback()
+        raise SeasonBusy(f'Season {season_id} is being updated by another job')
+    try:
+        yield
+    finally:
+        connection.rollback()
+        connection.execute(text('SELECT pg_advisory_unlock(:namespace, :season_id)'), params)
+        connection.commit()
+
+
+def fan_out(job):
+    """Handler of ``update`` jobs: enqueue one ``update_season`` job per current season."""
+    with get_ingestion_engine().begin() as connection:
+        season_ids = connection.execute(select(Season.id).where(Season.is_current).order_by(Season.id)).scalars()
+        job_ids = [enqueue(connection, 'update_season', season_id, parent_id=job['id']) for season_id in season_ids]
+    return {'jobs': job_ids}
+
+
+def update_season(job):
+    """Handler of ``update_season`` jobs: sync one current season, on the connection holding its lock."""
+    # Imported here: the API enqueues jobs without loading the sync's handlers and Pandas
+    from backend.ingestion.sync import sync
+
+    season_id = job['season_id']
+    with get_ingestion_engine().connect() as connection, season_lock(connection, season_id):
+        # The lock is session level and outlives this transaction
+        connection.rollback()
+        totals = asyncio.run(sync(connection, [season_id]))
+    return {'season_id': season_id, **totals}
+
+
+# Job kind -> handler, called in a worker process with the claimed job and returning a JSON value
+HANDLERS = {
+    'update': fan_out,
+    'update_season': update_season,
+}
+
+
+def run_job(job):
+    """Run a claimed job. Called in the worker processes."""
+    return HANDLERS[job['kind']](job)
+
+
+class Worker:
+    """
+    Claims jobs and runs them in a process pool, renewing their leases.
+
+    Args:
+        engine (Engine): Where the jobs live. Defaults to a one-connection engine of ``DATABASE_URL``.
+        processes (int): Jobs run at once.
+        lease_seconds (int): Lease of a claimed job, renewed every third of it.
+        poll_interval (float): Seconds between claims when no job finished.
+        name (str): Identifies the worker in ``jobs.leased_by``. Defaults to host and pid.
+    """
+
+    def __init__(self, engine=None, processes=JOB_PROCESSES, lease_seconds=JOB_LEASE_SECONDS,
+                 poll_interval=JOB_POLL_INTERVAL, name=None):
+        self.engine = engine or create_db_engine(pool_size=1, max_overflow=0, application_name='galo-jobs')
+        self.processes = processes
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def _execute(self, statement, params):
+        with self.engine.begin() as connection:
+            return connection.execute(statement, {'worker': self.name, **params})
+
+    def claim(self, limit):
+        """Lease up to ``limit`` claimable jobs, giving up those whose leases expired too often."""
+        if limit <= 0:
+            return []
+        with self.engine.begin() as connection:
+            jobs = connection.execute(
+                _CLAIM, {'worker': self.name, 'lease_seconds': self.lease_seconds, 'limit': limit}
+            ).mappings().all()
+        claimed = []
+        for job in map(dict, jobs):
+            if job['attempts'] > job['max_attempts']:
+                self.fail(job, 'Lease expired on the last attempt', retry=False)
+            else:
+                claimed.append(job)
+        return claimed
+
+    def renew(self, job_ids):
+        job_ids = list(job_ids)
+        if job_ids:
+            self._execute(_RENEW, {'job_ids': job_ids, 'lease_seconds': self.lease_seconds})
+
+    def succeed(self, job, result):
+        self._execute(_SUCCEED, {'id': job['id'], 'result': result})
+
+    def fail(self, job, error, retry=True):
+        """Requeue ``job`` after a backoff, or mark it failed when it has no attempt left or ``retry`` is False."""
+        params = {'id': job['id'], 'error': str(error), 'retry': retry, 'refund': 0}
+        self._execute(_FAIL, {**params, 'delay': backoff(job['attempts'])})
+
+    def postpone(self, job, error):
+        """Requeue ``job`` without using up an attempt."""
+        self._execute(_FAIL, {'id': job['id'], 'error': str(error), 'retry': True, 'refund': 1,
+                              'delay': JOB_RETRY_BASE})
+
+    def _finish(self, job, future):
+        try:
+            result = future.result()
+        except SeasonBusy as error:
+            self.postpone(job, error)
+        except Exception as error:
+            self.fail(job, f'{type(error).__name__}: {error}')
+        else:
+            self.succeed(job, result)
+
+    def run(self, until_idle=False, stop=None):
+        """
+        Claim and run jobs until ``stop`` is set or, with ``until_idle``, until nothing is claimable.
+
+        Args:
+            until_idle (bool): Return once no job is running and none can be claimed now.
+            stop (threading.Event | multiprocessing.Event): Set to stop claiming; running jobs are awaited.
+        """
+        running = {}
+        renewed_at = time.monotonic()
+        # Spawned, so the workers do not inherit the connections of this process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.processes, mp_context=context) as pool:
+            while True:
+                if stop is None or not stop.is_set():
+                    for job in self.claim(self.processes - len(running)):
+                        running[pool.submit(run_job, job)] = job
+                if not running:
+                    if until_idle or (stop is not None and stop.is_set()):
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._finish(running.pop(future), future)
+                if time.monotonic() - renewed_at >= self.lease_seconds / 3:
+                    self.renew(job['id'] for job in running.values())
+                    renewed_at = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Enqueue, run and inspect background jobs.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    enqueue_parser = commands.add_parser('enqueue', help='Add a job, or print the id of the same active job.')
+    enqueue_parser.add_argument('kind', choices=sorted(HANDLERS))
+    enqueue_parser.add_argument('--season-id', type=int)
+    worker_parser = commands.add_parser('worker', help='Claim and run jobs.')
+    worker_parser.add_argument('--processes', type=int, default=JOB_PROCESSES)
+    worker_parser.add_argument('--until-idle', action='store_true', help='Exit once no job can be claimed.')
+    status_parser = commands.add_parser('status', help='Print a job and the status of its children.')
+    status_parser.add_argument('job_id', type=int)
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        Worker(processes=args.processes).run(until_idle=args.until_idle)
+    elif args.command == 'enqueue':
+        with get_ingestion_engine().begin() as connection:
+            print(enqueue(connection, args.kind, args.season_id))
+    else:
+        with get_ingestion_engine().connect() as connection:
+            job = job_status(connection, args.job_id)
+        if job is None:
+            raise SystemExit(f'No job {args.job_id}')
+        for name, value in job.items():
+            print(f'{name}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,459 @@
+"""
+Parallel backfill of many seasons from API-Football, in three stages.
+
+    fetch (asyncio) -> transform queue -> transform (process pool) -> write queue -> write (threads)
+
+* **fetch**: ``fetch_workers`` coroutines each walk one season at a time with
+  :func:`backend.ingestion.fetcher.backfill_season`. They share one
+  :class:`~backend.ingestion.fetcher.Fetcher`, so the rate limit and the daily
+  quota hold across all seasons. Responses are grouped into batches of
+  ``batch_size`` per season.
+* **transform**: one dispatcher per process hands batches to
+  :func:`backend.ingestion.transform.transform_batch` in a process pool, so the
+  Pandas work runs on every core instead of the event loop's.
+* **write**: a season's rows are gathered as its batches arrive. Once the last
+  one is in, :func:`store_season` loads the season in one transaction with
+  :func:`backend.db.backfill.load_season`, which also rolls its per-match player
+  rows up into player statistics, then derives its standings, with the
+  competition's rules (see :mod:`backend.processing.standings`), and team
+  statistics. Loads run in threads, ``writers`` at a time.
+
+The queues between the stages are bounded. When the writers fall behind, the
+transform dispatchers block on the write queue, the transform queue fills up
+and the fetchers stop pulling responses. Memory stays bounded and the quota is
+not spent faster than the rows can be stored. :meth:`Pipeline.metrics` reports
+each stage's throughput and busy time, and each queue's depth and the time
+producers spent blocked on it.
+
+:func:`update_season` runs the same stages over a single season, such as a
+current season reloaded in full. The update jobs of :mod:`backend.ingestion.jobs`
+do not: they run the incremental sync of :mod:`backend.ingestion.sync`.
+
+Seasons are recorded in a :class:`~backend.ingestion.fetcher.Checkpoint` once
+stored, and skipped by the next run. Responses stay in the fetcher's cache, so
+re-running a season that was interrupted costs no quota.
+
+Usage:
+    python -m backend.ingestion.pipeline --league 71 --from-year 2010 --processes 8
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
+from dataclasses import dataclass
+from functools import partial
+
+from sqlalchemy import create_engine, select
+
+from backend.core.config import (
+    API_FOOTBALL_CACHE_DIR,
+    DATABASE_URL,
+    PIPELINE_BATCH_SIZE,
+    PIPELINE_PROCESSES,
+    PIPELINE_QUEUE_SIZE,
+)
+from backend.db.backfill import load_season
+from backend.db.leaderboards import refresh_all_time
+from backend.db.models import Season, Stadium
+from backend.db.views import refresh_views
+from backend.ingestion.fetcher import DEFAULT_TTL, Checkpoint, Fetcher, backfill_season
+from backend.ingestion.transform import SeasonRef, transform_batch
+from backend.processing import standings, statistics
+
+
+@dataclass
+class StageMetrics:
+    """
+    Work done by one stage.
+
+    Attributes:
+        items (int): Batches (or seasons, for the write stage) handled.
+        responses (int): API responses handled.
+        rows (int): Rows produced or stored.
+        busy (float): Seconds spent working, summed over the stage's workers.
+    """
+
+    items: int = 0
+    responses: int = 0
+    rows: int = 0
+    busy: float = 0.0
+
+
+class MeteredQueue(asyncio.Queue):
+    """
+    Bounded queue recording its depth after each put and how long producers were blocked.
+
+    Attributes:
+        max_depth (int): Largest depth seen.
+        blocked (float): Seconds producers spent waiting for room, summed over producers.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.max_depth = 0
+        self.blocked = 0.0
+        self._depth_total = 0
+        self._puts = 0
+
+    async def put(self, item):
+        started = time.perf_counter()
+        await super().put(item)
+        self.blocked += time.perf_counter() - started
+        depth = self.qsize()
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._puts += 1
+
+    @property
+    def mean_depth(self):
+        return self._depth_total / self._puts if self._puts else 0.0
+
+
+def _warm_up():
+    # Importing the transforms (and Pandas) ahead of the first batch
+    return os.getpid()
+
+
+def _season_key(season):
+    return f'season-{season.id}'
+
+
+def clear_unknown_venues(connection, matches, stadiums=()):
+    """
+    Clear the venue of the ``matches`` rows whose stadium is neither stored nor among the ``stadiums`` rows.
+
+    API-Football does not describe neutral venues in full, and a match cannot
+    refer to a stadium that is not stored.
+    """
+    venue_ids = sorted({row['venue_id'] for row in matches if row['venue_id'] is not None})
+    if not venue_ids:
+        return
+    venues = set(connection.execute(select(Stadium.id).where(Stadium.id.in_(venue_ids))).scalars())
+    venues.update(row['id'] for row in stadiums)
+    for row in matches:
+        if row['venue_id'] not in venues:
+            row['venue_id'] = None
+
+
+def store_season(engine, season, season_rows):
+    """
+    Store one season's transformed rows and derive its aggregates.
+
+    Venues of matches that are neither stored nor among the season's stadium
+    rows are cleared (see :func:`clear_unknown_venues`). The all-time
+    leaderboards are left to the run, which refreshes them once its seasons are
+    stored (see :func:`backend.db.leaderboards.refresh_all_time`).
+
+    Args:
+        engine (Engine): Where to write.
+        season (SeasonRef): Season the rows belong to.
+        season_rows (dict): Table name mapped to row dictionaries.
+
+    Returns:
+        dict: Table name mapped to the number of rows stored.
+    """
+    with engine.connect() as connection:
+        if season_rows.get('matches'):
+            clear_unknown_venues(connection, season_rows['matches'], season_rows.get('stadiums', ()))
+            connection.rollback()
+        # The standings rows only carry the groups, the table itself is derived from the matches
+        groups = {row['team_id']: row['group_name'] for row in season_rows.pop('standings', ())}
+        counts = load_season(connection, season_rows, all_time=False)
+        with connection.begin():
+            counts['standings'] = standings.write_season(
+                connection, season.league_id, season.id, rules=standings.rules_for(season.league_id), groups=groups,
+            )
+            counts.update(statistics.write_season(connection, season.id))
+    return counts
+
+
+class Pipeline:
+    """
+    Backfills seasons through the fetch, transform and write stages.
+
+    Use as an async context manager, which starts and stops the process pool:
+
+        async with Fetcher() as fetcher, Pipeline(fetcher, partial(store_season, engine)) as pipeline:
+            await pipeline.run(seasons)
+
+    Args:
+        fetcher (Fetcher): Open fetcher shared by every season.
+        store (Callable): ``store(season, season_rows)`` writes one season and returns row counts per table.
+            Called in a thread.
+        processes (int): Transform processes. 0 transforms in the event loop, one batch at a time.
+        fetch_workers (int): Seasons fetched at once.
+        writers (int): Seasons stored at once.
+        batch_size (int): Responses per transform batch.
+        queue_size (int): Capacity of each queue, in batches.
+        ttl (float): Freshness of cached responses. None, for finished seasons, never refetches.
+        checkpoint (Checkpoint): Seasons already stored, skipped by :meth:`run`. Defaults to none.
+    """
+
+    def __init__(self, fetcher, store, processes=PIPELINE_PROCESSES, fetch_workers=4, writers=1,
+                 batch_size=PIPELINE_BATCH_SIZE, queue_size=PIPELINE_QUEUE_SIZE, ttl=None, checkpoint=None):
+        self.fetcher = fetcher
+        self.store = store
+        self.processes = processes
+        self.fetch_workers = fetch_workers
+        self.writers = writers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.ttl = ttl
+        self.checkpoint = checkpoint if checkpoint is not None else Checkpoint(os.devnull)
+        self.stages = {}
+        self.queues = {}
+        self.elapsed = 0.0
+        self._pool = None
+
+    async def __aenter__(self):
+        if self.processes:
+            # Spawned, so the workers do not inherit the event loop or connections of this process
+            self._pool = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_up) for _ in range(self.processes)))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _fetch(self, seasons, transform_queue, write_queue):
+        stage = self.stages['fetch']
+        while seasons:
+            season = seasons.pop(0)
+            batches = 0
+            batch = []
+            started = time.perf_counter()
+            responses = backfill_season(self.fetcher, season.league_id, season.year, ttl=self.ttl)
+            async with aclosing(responses):
+                async for response in responses:
+                    batch.append(response)
+                    stage.responses += 1
+                    if len(batch) == self.batch_size:
+                        stage.busy += time.perf_counter() - started
+                        await transform_queue.put((season, batch))
+                        started = time.perf_counter()
+                        batches += 1
+                        batch = []
+            stage.busy += time.perf_counter() - started
+            if batch:
+                await transform_queue.put((season, batch))
+                batches += 1
+            stage.items += batches
+            # Tells the writers how many batches make the season
+            await write_queue.put((season, None, batches))
+
+    async def _transform(self, transform_queue, write_queue):
+        stage = self.stages['transform']
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await transform_queue.get()
+            if item is None:
+                return
+            season, batch = item
+            started = time.perf_counter()
+            if self._pool is None:
+                rows = transform_batch(season, batch)
+            else:
+                rows = await loop.run_in_executor(self._pool, transform_batch, season, batch)
+            stage.busy += time.perf_counter() - started
+            stage.items += 1
+            stage.responses += len(batch)
+            stage.rows += sum(len(table_rows) for table_rows in rows.values())
+            await write_queue.put((season, rows, None))
+
+    async def _write(self, write_queue, pending, report):
+        stage = self.stages['write']
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            season, rows, batches = item
+            state = pending.setdefault(season.id, {'rows': {}, 'received': 0, 'expected': None})
+            if rows is None:
+                state['expected'] = batches
+            else:
+                state['received'] += 1
+                for table_name, table_rows in rows.items():
+                    state['rows'].setdefault(table_name, []).extend(table_rows)
+            if state['received'] != state['expected']:
+                continue
+            del pending[season.id]
+            started = time.perf_counter()
+            counts = await asyncio.to_thread(self.store, season, state['rows'])
+            elapsed = time.perf_counter() - started
+            stage.busy += elapsed
+            stage.items += 1
+            stage.rows += sum(len(table_rows) for table_rows in state['rows'].values())
+            self.checkpoint.add(_season_key(season))
+            report(f'season {season.id} ({season.league_id}/{season.year}): {counts} in {elapsed:.2f}s')
+
+    async def _stage(self, workers, queue, count):
+        # Wait for every worker of a stage, then tell the next stage's workers to stop
+        await asyncio.gather(*workers)
+        for _ in range(count):
+            await queue.put(None)
+
+    async def run(self, seasons, report=print):
+        """
+        Backfill ``seasons`` that the checkpoint does not list yet.
+
+        Args:
+            seasons (Iterable[SeasonRef]): Seasons to backfill.
+            report (Callable): Called with one line per stored season.
+
+        Returns:
+            dict: See :meth:`metrics`.
+        """
+        seasons = [season for season in seasons if _season_key(season) not in self.checkpoint]
+        self.stages = {name: StageMetrics() for name in ('fetch', 'transform', 'write')}
+        transform_queue = MeteredQueue(self.queue_size)
+        write_queue = MeteredQueue(self.queue_size)
+        self.queues = {'transform': transform_queue, 'write': write_queue}
+        transformers = max(self.processes, 1)
+        # Season id -> rows gathered so far, shared by the writers
+        pending = {}
+
+        started = time.perf_counter()
+        stages = [
+            asyncio.ensure_future(self._stage(
+                [self._fetch(seasons, transform_queue, write_queue) for _ in range(self.fetch_workers)],
+                transform_queue, transformers,
+            )),
+            asyncio.ensure_future(self._stage(
+                [self._transform(transform_queue, write_queue) for _ in range(transformers)],
+                write_queue, self.writers,
+            )),
+            asyncio.ensure_future(asyncio.gather(*(self._write(write_queue, pending, report)
+                                                   for _ in range(self.writers)))),
+        ]
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in stages:
+                task.cancel()
+            self.elapsed = time.perf_counter() - started
+        return self.metrics()
+
+    def metrics(self):
+        """
+        Return the throughput of each stage and the depth of each queue for the last :meth:`run`.
+
+        Returns:
+            dict: ``seconds`` elapsed, ``stages`` mapped to their counters and ``per_second`` rates, and
+            ``queues`` mapped to their ``max_depth``, ``mean_depth`` and ``blocked`` seconds.
+        """
+        elapsed = self.elapsed or float('inf')
+        return {
+            'seconds': self.elapsed,
+            'stages': {
+                name: {
+                    'items': stage.items, 'responses': stage.responses, 'rows': stage.rows,
+                    'busy': stage.busy, 'responses_per_second': stage.responses / elapsed,
+                    'rows_per_second': stage.rows / elapsed,
+                }
+                for name, stage in self.stages.items()
+            },
+            'queues': {
+                name: {'max_depth': queue.max_depth, 'mean_depth': queue.mean_depth, 'blocked': queue.blocked}
+                for name, queue in self.queues.items()
+            },
+        }
+
+
+async def update_season(engine, season, ttl=DEFAULT_TTL, processes=0):
+    """
+    Backfill one season on its own, current or not, e.g. to reload it in full after a correction.
+
+    Every response of the season is requested, so this is no way to keep a
+    current season up to date: :func:`backend.ingestion.sync.run_sync` is.
+    Responses cached within ``ttl`` are reused.
+
+    Args:
+        engine (Engine): Where to write.
+        season (SeasonRef): Season to backfill.
+        ttl (float): Freshness of cached responses.
+        processes (int): Transform processes. 0 transforms in the event loop.
+
+    Returns:
+        dict: Table name mapped to the number of rows stored.
+    """
+    counts = {}
+
+    def store(season, season_rows):
+        counts.update(store_season(engine, season, season_rows))
+        return counts
+
+    async with Fetcher() as fetcher, Pipeline(fetcher, store, processes=processes, fetch_workers=1,
+                                             ttl=ttl) as pipeline:
+        await pipeline.run([season], report=lambda line: None)
+    with engine.begin() as connection:
+        refresh_all_time(connection)
+        refresh_views(connection)
+    return counts
+
+
+def seasons_to_backfill(connection, league_ids=None, from_year=None, to_year=None):
+    """Return the finished seasons matching the filters as :class:`SeasonRef`, oldest first."""
+    statement = select(Season.id, Season.league_id, Season.year).where(~Season.is_current)
+    if league_ids:
+        statement = statement.where(Season.league_id.in_(league_ids))
+    if from_year is not None:
+        statement = statement.where(Season.year >= from_year)
+    if to_year is not None:
+        statement = statement.where(Season.year <= to_year)
+    rows = connection.execute(statement.order_by(Season.year, Season.league_id)).all()
+    return [SeasonRef(row.id, row.league_id, row.year) for row in rows]
+
+
+def print_metrics(metrics, report=print):
+    """Print the metrics returned by :meth:`Pipeline.run` as one line per stage and queue."""
+    report(f"{metrics['seconds']:.2f}s")
+    for name, stage in metrics['stages'].items():
+        report(f"  {name:<9} {stage['items']:>6} items  {stage['responses']:>7} responses  "
+               f"{stage['rows']:>8} rows  {stage['responses_per_second']:>8,.0f} responses/s  "
+               f"busy {stage['busy']:.2f}s")
+    for name, queue in metrics['queues'].items():
+        report(f"  {name} queue: max depth {queue['max_depth']}, mean {queue['mean_depth']:.1f}, "
+               f"producers blocked {queue['blocked']:.2f}s")
+
+
+async def _backfill(args):
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        seasons = seasons_to_backfill(connection, args.league, args.from_year, args.to_year)
+    checkpoint = Checkpoint(args.checkpoint)
+    async with Fetcher(concurrency=args.concurrency) as fetcher, Pipeline(
+        fetcher, partial(store_season, engine), processes=args.processes, fetch_workers=args.fetch_workers,
+        writers=args.writers, checkpoint=checkpoint,
+    ) as pipeline:
+        metrics = await pipeline.run(seasons)
+    with engine.begin() as connection:
+        refresh_all_time(connection)
+        refresh_views(connection)
+    print_metrics(metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill finished seasons from API-Football in parallel.')
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--league', type=int, action='append', help='League id; repeat for several. Defaults to all.')
+    parser.add_argument('--from-year', type=int)
+    parser.add_argument('--to-year', type=int)
+    parser.add_argument('--processes', type=int, default=PIPELINE_PROCESSES, help='Transform processes.')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='Seasons fetched at once.')
+    parser.add_argument('--writers', type=int, default=1, help='Seasons stored at once.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent API requests.')
+    parser.add_argument('--checkpoint', default=os.path.join(API_FOOTBALL_CACHE_DIR, 'pipeline.done'),
+                        help='File recording the seasons already stored.')
+    asyncio.run(_backfill(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
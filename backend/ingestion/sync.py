@@ -0,0 +1,365 @@
+"""
+Incremental synchronization planner for the current seasons.
+
+Finished seasons never change, so a sync tick only looks at seasons with
+``is_current`` and asks the stored rows what can have changed since the last
+tick, recorded per entity and season in ``sync_watermarks``:
+
+* ``teams`` — the season's teams and venues, on its first sync only, so the
+  matches written next can refer to them;
+* ``schedule`` — the season's fixture list, at most once per ``SCHEDULE_TTL``,
+  to pick up rescheduled matches;
+* ``live`` — matches in play, or not started although their kick-off has
+  passed, fetched ``IDS_PER_REQUEST`` at a time with ``fixtures?ids=`` (which
+  embeds statistics and player statistics);
+* ``predictions`` — upcoming matches within ``PREDICTION_WINDOW`` whose
+  ``MatchPredictions.last_updated`` is older than ``PREDICTION_TTL``;
+* ``match_details`` — matches finished since the watermark's ``high_water``
+  and not already fetched as live in the same tick;
+* ``standings`` and ``team_statistics`` — only when a match finished since
+  their ``high_water``. Both are derived from the stored matches; the
+  standings response is fetched for the groups of the teams only, and team
+  statistics cost no request.
+
+The last three depend on the rows written by the first ones, so they are
+planned after the first stage is written. On a quiet day a tick costs no
+request at all, and with a round in progress a handful. The responses are
+written by :func:`backend.ingestion.handlers.handle` with
+:func:`backend.db.upsert.upsert`, which skips unchanged rows.
+
+Usage:
+    python -m backend.ingestion.sync [--season-id 5] [--dry-run]
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import DateTime, bindparam, create_engine, select, text
+
+from backend.core.config import DATABASE_URL
+from backend.db.instrumentation import query_unit
+from backend.db.models import FINISHED, Season, SyncWatermark
+from backend.db.upsert import upsert
+
+NOT_STARTED = 'Not Started'
+# Not expected to change until rescheduled, which the schedule sync picks up
+UNSCHEDULED = ('Time To Be Defined', 'Match Postponed', 'Match Cancelled', 'Match Abandoned')
+
+IDS_PER_REQUEST = 20
+SCHEDULE_TTL = timedelta(hours=24)
+PREDICTION_WINDOW = timedelta(days=3)
+PREDICTION_TTL = timedelta(hours=12)
+# How far back match details are re-fetched when a season has no watermark yet
+FIRST_SYNC_WINDOW = timedelta(days=3)
+
+
+@dataclass
+class SyncCall:
+    """One API request of a sync plan, and the watermark it advances."""
+
+    entity: str
+    endpoint: str
+    params: dict
+    high_water: datetime = None
+    match_ids: tuple = ()
+
+
+@dataclass
+class SeasonSync:
+    """Current season being synchronized."""
+
+    id: int
+    league_id: int
+    year: int
+    watermarks: dict = field(default_factory=dict)
+
+    @property
+    def params(self):
+        return {'league': self.league_id, 'season': self.year}
+
+
+def _utcnow():
+    # Dates are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def current_seasons(connection, season_ids=None):
+    """Return the current seasons, or those of ``season_ids`` that are current, with their watermarks."""
+    statement = select(Season.id, Season.league_id, Season.year).where(Season.is_current)
+    if season_ids is not None:
+        statement = statement.where(Season.id.in_(list(season_ids)))
+    seasons = {row.id: SeasonSync(row.id, row.league_id, row.year) for row in connection.execute(statement)}
+    if seasons:
+        watermarks = connection.execute(
+            select(SyncWatermark.__table__).where(SyncWatermark.season_id.in_(list(seasons)))
+        ).mappings()
+        for watermark in watermarks:
+            seasons[watermark['season_id']].watermarks[watermark['entity']] = watermark
+    return list(seasons.values())
+
+
+def _high_water(season, entity, now):
+    watermark = season.watermarks.get(entity)
+    return watermark['high_water'] if watermark and watermark['high_water'] else now - FIRST_SYNC_WINDOW
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    return [tuple(ids[start:start + IDS_PER_REQUEST]) for start in range(0, len(ids), IDS_PER_REQUEST)]
+
+
+def _by_ids(entity, ids, high_water=None):
+    return [
+        SyncCall(entity, 'fixtures', {'ids': '-'.join(str(match_id) for match_id in chunk)}, high_water, chunk)
+        for chunk in _chunks(ids)
+    ]
+
+
+_LIVE = text("""
+    SELECT id FROM matches
+    WHERE season_id = :season_id AND season_year = :year
+      AND (status = :not_started AND date <= :now
+           OR status IS NULL
+           OR status NOT IN :finished AND status NOT IN :unscheduled AND status <> :not_started)
+""").bindparams(
+    bindparam('finished', expanding=True), bindparam('unscheduled', expanding=True), bindparam('now', type_=DateTime)
+)
+
+_STALE_PREDICTIONS = text("""
+    SELECT matches.id FROM matches
+    LEFT JOIN match_predictions ON match_predictions.match_id = matches.id
+         AND match_predictions.season_year = matches.season_year
+    WHERE matches.season_id = :season_id AND matches.season_year = :year
+      AND matches.status = :not_started AND matches.date > :now AND matches.date <= :horizon
+      AND (match_predictions.last_updated IS NULL OR match_predictions.last_updated < :stale_before)
+""").bindparams(*[bindparam(name, type_=DateTime) for name in ('now', 'horizon', 'stale_before')])
+
+_FINISHED_SINCE = text("""
+    SELECT id, date, home_team_id, away_team_id FROM matches
+    WHERE season_id = :season_id AND season_year = :year AND status IN :finished AND date > :since
+""").bindparams(bindparam('finished', expanding=True), bindparam('since', type_=DateTime)).columns(date=DateTime)
+
+
+def plan_matches(connection, season, now):
+    """
+    Plan the first stage of a season's sync: schedule, live matches and predictions.
+
+    Args:
+        connection (Connection | Session): Connection to read the stored state from.
+        season (SeasonSync): Season to plan.
+        now (datetime): Time of the tick.
+
+    Returns:
+        list[SyncCall]: Requests to make.
+    """
+    calls = []
+    schedule = season.watermarks.get('schedule')
+    if schedule is None:
+        calls.append(SyncCall('teams', 'teams', season.params))
+    if schedule is None or schedule['synced_at'] <= now - SCHEDULE_TTL:
+        calls.append(SyncCall('schedule', 'fixtures', season.params))
+
+    params = {'season_id': season.id, 'year': season.year, 'now': now}
+    live = connection.execute(_LIVE, {
+        **params, 'not_started': NOT_STARTED, 'finished': list(FINISHED), 'unscheduled': list(UNSCHEDULED),
+    }).scalars().all()
+    calls.extend(_by_ids('live', live))
+
+    upcoming = connection.execute(_STALE_PREDICTIONS, {
+        **params, 'not_started': NOT_STARTED, 'horizon': now + PREDICTION_WINDOW,
+        'stale_before': now - PREDICTION_TTL,
+    }).scalars().all()
+    calls.extend(SyncCall('predictions', 'predictions', {'fixture': match_id}) for match_id in sorted(upcoming))
+    return calls
+
+
+def plan_followups(connection, season, now, fetched_ids=()):
+    """
+    Plan the second stage of a season's sync, from the rows the first stage wrote.
+
+    Args:
+        connection (Connection | Session): Connection to read the stored state from.
+        season (SeasonSync): Season to plan.
+        now (datetime): Time of the tick.
+        fetched_ids (Iterable[int]): Matches already fetched with their details in this tick.
+
+    Returns:
+        list[SyncCall]: Requests to make.
+    """
+    calls = []
+    fetched_ids = set(fetched_ids)
+    finished = {
+        entity: connection.execute(_FINISHED_SINCE, {
+            'season_id': season.id, 'year': season.year, 'finished': list(FINISHED),
+            'since': _high_water(season, entity, now),
+        }).all()
+        for entity in ('match_details', 'standings', 'team_statistics')
+    }
+
+    if finished['match_details']:
+        high_water = max(match.date for match in finished['match_details'])
+        missing = {match.id for match in finished['match_details']} - fetched_ids
+        calls.extend(_by_ids('match_details', missing, high_water))
+        if not missing:
+            # Still advance the watermark, with no request
+            calls.append(SyncCall('match_details', None, {}, high_water))
+
+    if finished['standings']:
+        high_water = max(match.date for match in finished['standings'])
+        calls.append(SyncCall('standings', 'standings', season.params, high_water))
+
+    if finished['team_statistics']:
+        # Derived from the stored matches, with no request
+        high_water = max(match.date for match in finished['team_statistics'])
+        calls.append(SyncCall('team_statistics', None, {}, high_water))
+    return calls
+
+
+def record_watermarks(connection, season, calls, now, rows_written):
+    """
+    Advance the watermarks of the entities synchronized by ``calls``.
+
+    Args:
+        connection (Connection | Session): Connection to write with, in the transaction that wrote the rows.
+        season (SeasonSync): Synchronized season.
+        calls (Sequence[SyncCall]): Calls made.
+        now (datetime): Time of the tick.
+        rows_written (dict): Entity mapped to the number of rows written.
+    """
+    rows = {}
+    for call in calls:
+        row = rows.setdefault(call.entity, {
+            'entity': call.entity, 'season_id': season.id, 'league_id': season.league_id,
+            'synced_at': now, 'high_water': None, 'requests': 0,
+            'rows_written': rows_written.get(call.entity, 0),
+        })
+        row['requests'] += call.endpoint is not None
+        if call.high_water and (row['high_water'] is None or call.high_water > row['high_water']):
+            row['high_water'] = call.high_water
+    for row in rows.values():
+        previous = season.watermarks.get(row['entity'])
+        if row['high_water'] is None and previous is not None:
+            row['high_water'] = previous['high_water']
+    upsert(connection, SyncWatermark, rows.values())
+
+
+async def _execute(connection, fetcher, season, calls, handle, now):
+    requests = [call for call in calls if call.endpoint is not None]
+    # ttl=0: always ask the server, revalidating with the cached ETag
+    bodies = await asyncio.gather(*(fetcher.get(call.endpoint, 0, **call.params) for call in requests))
+    bodies = iter(bodies)
+    rows_written = {}
+    with connection.begin():
+        # In plan order, so rows derived without a request see the rows written before them
+        for call in calls:
+            written = handle(connection, season, call, next(bodies) if call.endpoint is not None else None)
+            rows_written[call.entity] = rows_written.get(call.entity, 0) + written
+        record_watermarks(connection, season, calls, now, rows_written)
+    return len(requests), sum(rows_written.values())
+
+
+async def sync_season(connection, fetcher, season, handle, now):
+    """
+    Run one sync tick over one current season.
+
+    Returns:
+        tuple: Requests made and rows written.
+    """
+    with query_unit(f'sync season {season.id}'):
+        calls = plan_matches(connection, season, now)
+        connection.rollback()
+        requests, rows = await _execute(connection, fetcher, season, calls, handle, now)
+        fetched_ids = {match_id for call in calls if call.entity == 'live' for match_id in call.match_ids}
+        followups = plan_followups(connection, season, now, fetched_ids)
+        connection.rollback()
+        more_requests, more_rows = await _execute(connection, fetcher, season, followups, handle, now)
+    return requests + more_requests, rows + more_rows
+
+
+async def run_sync(connection, fetcher, handle, now=None, season_ids=None):
+    """
+    Run one sync tick over every current season.
+
+    Args:
+        connection (Connection): Connection with no transaction in progress.
+        fetcher (Fetcher): Open :class:`backend.ingestion.fetcher.Fetcher`.
+        handle (Callable): ``handle(connection, season, call, body)`` writes the rows of one call and returns
+            how many changed, such as :func:`backend.ingestion.handlers.handle`. ``body`` is the response, or
+            None for calls without a request.
+        now (datetime): Time of the tick. Defaults to the current UTC time.
+        season_ids (Iterable[int]): Only sync these seasons, when current. Defaults to every current season.
+
+    Returns:
+        dict: ``requests`` made and ``rows`` written.
+    """
+    now = now or _utcnow()
+    totals = {'requests': 0, 'rows': 0}
+    for season in current_seasons(connection, season_ids):
+        requests, rows = await sync_season(connection, fetcher, season, handle, now)
+        totals['requests'] += requests
+        totals['rows'] += rows
+    return totals
+
+
+def plan_sync(connection, now=None, season_ids=None):
+    """
+    Return the calls the next tick would make, without fetching anything.
+
+    The second stage is planned from the rows stored now, so it cannot include
+    matches that the first stage would find finished.
+
+    Returns:
+        dict: Season id mapped to its list of :class:`SyncCall`.
+    """
+    now = now or _utcnow()
+    plan = {}
+    for season in current_seasons(connection, season_ids):
+        calls = plan_matches(connection, season, now)
+        fetched_ids = {match_id for call in calls if call.entity == 'live' for match_id in call.match_ids}
+        plan[season.id] = calls + plan_followups(connection, season, now, fetched_ids)
+    return plan
+
+
+async def sync(connection, season_ids=None):
+    """
+    Run one sync tick with its own :class:`~backend.ingestion.fetcher.Fetcher`, writing with the handlers.
+
+    Args:
+        connection (Connection): Connection with no transaction in progress.
+        season_ids (Iterable[int]): Only sync these seasons, when current. Defaults to every current season.
+
+    Returns:
+        dict: ``requests`` made and ``rows`` written.
+    """
+    # Imported here: the handlers load the transforms and Pandas, which planning does not need
+    from backend.ingestion.fetcher import Fetcher
+    from backend.ingestion.handlers import handle
+
+    async with Fetcher() as fetcher:
+        return await run_sync(connection, fetcher, handle, season_ids=season_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run one incremental sync tick over the current seasons.')
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--season-id', type=int, action='append', help='Season id; repeat for several. '
+                                                                       'Defaults to every current season.')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the planned requests.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        if not args.dry_run:
+            totals = asyncio.run(sync(connection, args.season_id))
+            print(f"{totals['requests']} requests, {totals['rows']} rows written")
+            return
+        for season_id, calls in plan_sync(connection, season_ids=args.season_id).items():
+            print(f'season {season_id}: {sum(call.endpoint is not None for call in calls)} requests')
+            for call in calls:
+                if call.endpoint is not None:
+                    print(f'  {call.entity:<16} {call.endpoint} {call.params}')
+
+
+if __name__ == '__main__':
+    main()
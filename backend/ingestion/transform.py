@@ -0,0 +1,403 @@
+"""
+Vectorized transforms of API-Football responses into table rows.
+
+Each transform takes every response of one endpoint in a batch at once,
+flattens them with ``pd.json_normalize`` into a single DataFrame and renames,
+parses and types whole columns: numbers sent as strings ("54%", "185 cm",
+"7.1") are extracted with one regular expression per column, and every column
+is cast to the type of its database column, so the rows can be streamed
+straight into :func:`backend.db.backfill.load_season` or
+:func:`backend.db.upsert.upsert`.
+
+Only the responses that map to stored rows are transformed:
+
+* ``fixtures`` -> ``matches``, and with the statistics and players embedded
+  in fixtures requested by id, ``match_statistics`` and
+  ``player_match_statistics`` (:func:`fixtures`);
+* ``fixtures/statistics`` -> ``match_statistics``;
+* ``fixtures/players`` -> ``player_match_statistics``;
+* ``teams`` -> ``teams`` and ``stadiums``;
+* ``players`` -> ``players``;
+* ``standings`` -> the ``team_id`` and ``group_name`` of ``standings`` rows.
+
+``standings``, ``teams/statistics`` and ``player_statistics`` are derived from
+the stored matches and per-match rows instead (see
+:mod:`backend.processing.standings`, :mod:`backend.processing.statistics` and
+:mod:`backend.db.rollups`), so those responses are skipped. Only the groups
+of the standings, which the matches do not tell, are kept, to derive the table
+in them. Predictions have no natural key to merge on: :func:`predictions` is
+only used by the incremental sync, which replaces them (see
+:mod:`backend.ingestion.handlers`).
+
+The functions are pure and module level, so :func:`transform_batch` can run in
+the worker processes of :mod:`backend.ingestion.pipeline`.
+"""
+from dataclasses import dataclass
+
+import pandas as pd
+from sqlalchemy import Boolean, DateTime, Float, Integer
+
+from backend.db.base import Base
+from backend.processing.statistics import records
+
+_NUMBER = r'(-?\d+(?:\.\d+)?)'
+
+
+@dataclass(frozen=True)
+class SeasonRef:
+    """
+    The season a batch of responses belongs to.
+
+    :class:`backend.ingestion.sync.SeasonSync` has the same attributes and can be passed instead.
+
+    Attributes:
+        id (int): Season id in the ``seasons`` table.
+        league_id (int): API-Football league id.
+        year (int): Season year, as the API's ``season`` parameter.
+    """
+
+    id: int
+    league_id: int
+    year: int
+
+
+# matches column -> flattened fixtures field
+MATCH_FIELDS = {
+    'id': 'fixture.id',
+    'date': 'fixture.date',
+    'referee': 'fixture.referee',
+    'venue_id': 'fixture.venue.id',
+    'status': 'fixture.status.long',
+    'round': 'league.round',
+    'home_team_id': 'teams.home.id',
+    'away_team_id': 'teams.away.id',
+    'home_goals': 'goals.home',
+    'away_goals': 'goals.away',
+    'halftime_home_goals': 'score.halftime.home',
+    'halftime_away_goals': 'score.halftime.away',
+    'fulltime_home_goals': 'score.fulltime.home',
+    'fulltime_away_goals': 'score.fulltime.away',
+    'extra_time_home_goals': 'score.extratime.home',
+    'extra_time_away_goals': 'score.extratime.away',
+    'penalty_home_goals': 'score.penalty.home',
+    'penalty_away_goals': 'score.penalty.away',
+}
+
+# fixtures/statistics type -> match_statistics column
+MATCH_STATISTICS_TYPES = {
+    'Shots on Goal': 'shots_on_goal',
+    'Shots off Goal': 'shots_off_goal',
+    'Total Shots': 'total_shots',
+    'Blocked Shots': 'blocked_shots',
+    'Shots insidebox': 'shots_inside_box',
+    'Shots outsidebox': 'shots_outside_box',
+    'Fouls': 'fouls',
+    'Corner Kicks': 'corner_kicks',
+    'Offsides': 'offsides',
+    'Ball Possession': 'ball_possession',
+    'Yellow Cards': 'yellow_cards',
+    'Red Cards': 'red_cards',
+    'Goalkeeper Saves': 'goalkeeper_saves',
+    'Total passes': 'total_passes',
+    'Passes accurate': 'passes_accurate',
+    'Passes %': 'pass_accuracy',
+}
+
+# player_match_statistics column -> flattened fixtures/players statistics field
+PLAYER_MATCH_FIELDS = {
+    'position': 'games.position',
+    'minutes_played': 'games.minutes',
+    'rating': 'games.rating',
+    'captain': 'games.captain',
+    'substitute': 'games.substitute',
+    'shots_total': 'shots.total',
+    'shots_on_goal': 'shots.on',
+    'goals_total': 'goals.total',
+    'assists': 'goals.assists',
+    'goals_conceded': 'goals.conceded',
+    'goals_saves': 'goals.saves',
+    'passes_total': 'passes.total',
+    'passes_key': 'passes.key',
+    'passes_accuracy': 'passes.accuracy',
+    'tackles_total': 'tackles.total',
+    'tackles_blocks': 'tackles.blocks',
+    'tackles_interceptions': 'tackles.interceptions',
+    'duels_total': 'duels.total',
+    'duels_won': 'duels.won',
+    'dribbles_attempts': 'dribbles.attempts',
+    'dribbles_success': 'dribbles.success',
+    'fouls_drawn': 'fouls.drawn',
+    'fouls_committed': 'fouls.committed',
+    'yellow_cards': 'cards.yellow',
+    'red_cards': 'cards.red',
+    'penalties_won': 'penalty.won',
+    'penalties_commited': 'penalty.commited',
+    'penalties_scored': 'penalty.scored',
+    'penalties_missed': 'penalty.missed',
+    'penalties_saved': 'penalty.saved',
+}
+
+# players column -> flattened players field
+PLAYER_FIELDS = {
+    'id': 'player.id',
+    'team_id': 'team.id',
+    'name': 'player.name',
+    'first_name': 'player.firstname',
+    'last_name': 'player.lastname',
+    'age': 'player.age',
+    'birth_date': 'player.birth.date',
+    'birth_place': 'player.birth.place',
+    'birth_country': 'player.birth.country',
+    'nationality': 'player.nationality',
+    'height': 'player.height',
+    'weight': 'player.weight',
+    'injured': 'player.injured',
+    'photo': 'player.photo',
+    'position': 'games.position',
+}
+
+TEAM_FIELDS = {
+    'id': 'team.id', 'name': 'team.name', 'code': 'team.code', 'country': 'team.country',
+    'founded': 'team.founded', 'logo': 'team.logo',
+}
+STADIUM_FIELDS = {
+    'id': 'venue.id', 'name': 'venue.name', 'address': 'venue.address', 'city': 'venue.city',
+    'capacity': 'venue.capacity', 'surface': 'venue.surface', 'image': 'venue.image',
+}
+
+# match_predictions column -> flattened predictions field
+PREDICTION_FIELDS = {
+    'predicted_winner': 'predictions.winner.name',
+    'win_or_draw': 'predictions.win_or_draw',
+    'under_over': 'predictions.under_over',
+    'goals_home': 'predictions.goals.home',
+    'goals_away': 'predictions.goals.away',
+    'advice': 'predictions.advice',
+    'percent_home': 'predictions.percent.home',
+    'percent_draw': 'predictions.percent.draw',
+    'percent_away': 'predictions.percent.away',
+}
+
+
+def _select(frame, fields):
+    """Return the ``fields`` of a flattened frame under their column names, missing fields as nulls."""
+    return frame.reindex(columns=list(fields.values())).set_axis(list(fields), axis=1)
+
+
+def _numbers(series):
+    """Parse a column of numbers or strings holding one ('54%', '185 cm', '7.1') into floats."""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.to_numeric(series, errors='coerce')
+    extracted = series.astype('string').str.extract(_NUMBER, expand=False)
+    return pd.to_numeric(extracted, errors='coerce')
+
+
+def typed(frame, table_name):
+    """
+    Cast every column of ``frame`` to the type of its ``table_name`` column.
+
+    Integers become nullable ``Int64``, so missing values do not turn them into
+    floats, and dates become naive UTC timestamps, as they are stored.
+    """
+    table = Base.metadata.tables[table_name]
+    columns = {}
+    for name, series in frame.items():
+        column_type = table.c[name].type
+        if isinstance(column_type, Integer):
+            columns[name] = _numbers(series).round().astype('Int64')
+        elif isinstance(column_type, Float):
+            columns[name] = _numbers(series).astype('float64')
+        elif isinstance(column_type, DateTime):
+            columns[name] = pd.to_datetime(series, errors='coerce', utc=True).dt.tz_localize(None)
+        elif isinstance(column_type, Boolean):
+            columns[name] = series.astype('boolean')
+        else:
+            columns[name] = series.astype(object).where(series.notna(), None)
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def _with_season(frame, season, year_only=False):
+    if not year_only:
+        frame['league_id'] = season.league_id
+        frame['season_id'] = season.id
+    frame['season_year'] = season.year
+    return frame
+
+
+def matches(season, responses):
+    """Transform ``fixtures`` responses into ``matches`` rows."""
+    fixtures = pd.json_normalize([item for _, body in responses for item in body['response']])
+    if fixtures.empty:
+        return {}
+    frame = _select(fixtures, MATCH_FIELDS)
+    home_won = fixtures.reindex(columns=['teams.home.winner'])['teams.home.winner'].eq(True)
+    away_won = fixtures.reindex(columns=['teams.away.winner'])['teams.away.winner'].eq(True)
+    frame['winner'] = frame['home_team_id'].where(home_won, frame['away_team_id'].where(away_won))
+    return {'matches': _with_season(frame, season).drop_duplicates('id', keep='last')}
+
+
+def match_statistics(season, responses):
+    """Transform ``fixtures/statistics`` responses into ``match_statistics`` rows, one per team and match."""
+    values = pd.DataFrame([
+        (int(params['fixture']), item['team']['id'], statistic['type'], statistic['value'])
+        for params, body in responses
+        for item in body['response']
+        for statistic in item.get('statistics') or ()
+    ], columns=['match_id', 'team_id', 'type', 'value'])
+    if values.empty:
+        return {}
+    values['value'] = _numbers(values['value'])
+    frame = (
+        values.groupby(['match_id', 'team_id', 'type'])['value'].first()
+        .unstack()
+        .reindex(columns=list(MATCH_STATISTICS_TYPES))
+        .rename(columns=MATCH_STATISTICS_TYPES)
+        .reset_index()
+    )
+    frame.columns.name = None
+    return {'match_statistics': _with_season(frame, season, year_only=True)}
+
+
+def player_match_statistics(season, responses):
+    """Transform ``fixtures/players`` responses into ``player_match_statistics`` rows."""
+    played = pd.json_normalize([
+        {'match_id': int(params['fixture']), 'team_id': item['team']['id'], 'player_id': player['player']['id'],
+         **(player.get('statistics') or [{}])[0]}
+        for params, body in responses
+        for item in body['response']
+        for player in item.get('players') or ()
+    ])
+    if played.empty:
+        return {}
+    frame = pd.concat([played[['match_id', 'team_id', 'player_id']], _select(played, PLAYER_MATCH_FIELDS)], axis=1)
+    frame = _with_season(frame, season).drop_duplicates(['match_id', 'player_id'], keep='last')
+    return {'player_match_statistics': frame}
+
+
+def teams(season, responses):
+    """Transform ``teams`` responses into ``teams`` and ``stadiums`` rows."""
+    listed = pd.json_normalize([item for _, body in responses for item in body['response']])
+    if listed.empty:
+        return {}
+    stadiums = _select(listed, STADIUM_FIELDS)
+    # Venues missing a required column are left out; matches keep their id only when it is stored
+    stadiums = stadiums.dropna(subset=['id', 'name', 'address', 'city']).drop_duplicates('id', keep='last')
+    return {
+        'stadiums': stadiums,
+        'teams': _select(listed, TEAM_FIELDS).drop_duplicates('id', keep='last'),
+    }
+
+
+def players(season, responses):
+    """
+    Transform ``players`` responses into ``players`` rows.
+
+    A player's team is the one of their statistics entry for this league and
+    season, the last one when they moved during the season. Players without
+    such an entry are left out, as ``players.team_id`` is required.
+    """
+    entries = pd.json_normalize([
+        {'player': item['player'], **entry}
+        for _, body in responses
+        for item in body['response']
+        for entry in item.get('statistics') or ()
+        if (entry.get('league') or {}).get('id') == season.league_id
+        and (entry.get('league') or {}).get('season') == season.year
+    ])
+    if entries.empty:
+        return {}
+    frame = _select(entries, PLAYER_FIELDS).dropna(subset=['id', 'team_id', 'name'])
+    return {'players': frame.drop_duplicates('id', keep='last')}
+
+
+def standings(season, responses):
+    """
+    Transform ``standings`` responses into the group of each team, as partial ``standings`` rows.
+
+    The rows are not loaded as they are: the standings are derived from the
+    matches, in the groups the API lists.
+    """
+    frame = pd.DataFrame([
+        (entry['team']['id'], entry.get('group'))
+        for _, body in responses
+        for item in body['response']
+        for group in item['league'].get('standings') or ()
+        for entry in group
+    ], columns=['team_id', 'group_name'])
+    if frame.empty:
+        return {}
+    frame['season_id'] = season.id
+    return {'standings': frame.drop_duplicates('team_id', keep='last')}
+
+
+def fixtures(season, responses):
+    """
+    Transform ``fixtures?ids=`` responses into ``matches``, ``match_statistics`` and ``player_match_statistics`` rows.
+
+    Fixtures requested by id embed the statistics and players of each match, in
+    the shape of the ``fixtures/statistics`` and ``fixtures/players`` responses.
+    A fixture list by league and season has neither and gives only ``matches``.
+    """
+    frames = matches(season, responses)
+    items = [item for _, body in responses for item in body['response']]
+    for transform, embedded in ((match_statistics, 'statistics'), (player_match_statistics, 'players')):
+        frames.update(transform(season, [
+            ({'fixture': item['fixture']['id']}, {'response': item.get(embedded) or []}) for item in items
+        ]))
+    return frames
+
+
+def predictions(season, responses):
+    """
+    Transform ``predictions`` responses into ``match_predictions`` rows, one per match.
+
+    Predictions have no natural key to merge on: the incremental sync replaces
+    a match's row instead (see :mod:`backend.ingestion.handlers`), and the
+    backfill does not load them.
+    """
+    listed = pd.json_normalize([
+        {'match_id': int(params['fixture']), **item} for params, body in responses for item in body['response']
+    ])
+    if listed.empty:
+        return {}
+    frame = pd.concat([listed[['match_id']], _select(listed, PREDICTION_FIELDS)], axis=1)
+    return {'match_predictions': _with_season(frame, season, year_only=True).drop_duplicates('match_id', keep='last')}
+
+
+def table_rows(frames):
+    """Convert the frames returned by a transform into row dictionaries typed like their columns."""
+    return {table_name: records(typed(frame, table_name)) for table_name, frame in frames.items()}
+
+
+# Endpoint -> transform of all the responses of a batch from that endpoint
+TRANSFORMS = {
+    'fixtures': matches,
+    'fixtures/statistics': match_statistics,
+    'fixtures/players': player_match_statistics,
+    'teams': teams,
+    'players': players,
+    'standings': standings,
+}
+
+
+def transform_batch(season, responses):
+    """
+    Transform a batch of one season's responses into table rows.
+
+    Args:
+        season (SeasonRef): Season the responses belong to.
+        responses (Sequence[tuple]): ``(endpoint, params, body)`` as yielded by
+            :func:`backend.ingestion.fetcher.backfill_season`.
+
+    Returns:
+        dict: Table name mapped to a list of row dictionaries typed like its columns.
+    """
+    by_endpoint = {}
+    for endpoint, params, body in responses:
+        if endpoint in TRANSFORMS:
+            by_endpoint.setdefault(endpoint, []).append((params, body))
+    rows = {}
+    for endpoint, endpoint_responses in by_endpoint.items():
+        for table_name, batch_rows in table_rows(TRANSFORMS[endpoint](season, endpoint_responses)).items():
+            rows.setdefault(table_name, []).extend(batch_rows)
+    return rows
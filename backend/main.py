@@ -0,0 +1,177 @@
+"""
+FastAPI entry point.
+
+Usage:
+    uvicorn backend.main:app --reload
+"""
+from dataclasses import asdict
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from backend.core.config import APP_ENV, QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from backend.db.cache import QueryCache, cached
+from backend.db.database import get_db, get_engine
+from backend.db.export import FORMATS, TABLES, export
+from backend.db.head_to_head import head_to_head, opponents
+from backend.db.instrumentation import get_profiler
+from backend.db.leaderboards import LEADERBOARD_SIZE, METRICS, leaderboard
+from backend.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from backend.db.serialization import PROJECTIONS
+from backend.db.summaries import team_matches, upcoming_fixtures
+from backend.db.versions import DataVersions
+from backend.middleware import HTTPCacheMiddleware, QueryProfilerMiddleware
+
+app = FastAPI(title='Galo React')
+app.state.data_versions = DataVersions()
+app.state.query_cache = QueryCache(max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+app.add_middleware(HTTPCacheMiddleware)
+app.add_middleware(QueryProfilerMiddleware)
+
+
+@app.get('/healthcheck')
+def healthcheck():
+    return {'status': 'ok'}
+
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def metrics():
+    """Query counts, latency histograms, slow queries and N+1 reports, for Prometheus."""
+    return PlainTextResponse(get_profiler().render_metrics(), media_type='text/plain; version=0.0.4')
+
+
+@app.get('/debug/queries', include_in_schema=False)
+def debug_queries(limit: int = 20):
+    """The most expensive statements and the captured slow plans. Only in development."""
+    if APP_ENV != 'development':
+        raise HTTPException(404)
+    profiler = get_profiler()
+    return {'statements': [asdict(stats) for stats in profiler.top(limit)], 'plans': list(profiler.plans)}
+
+
+@app.post('/update-data', status_code=202)
+def update_data(db=Depends(get_db)):
+    """Enqueue an update of every current season and return its job id, the running one's if any."""
+    # Imported here: serving reads never loads the ingestion stack
+    from backend.ingestion.jobs import enqueue
+
+    job_id = enqueue(db, 'update')
+    db.commit()
+    return {'job_id': job_id}
+
+
+@app.get('/jobs/{job_id}')
+def get_job(job_id: int, db=Depends(get_db)):
+    """Return a background job and the status counts of the season jobs it enqueued."""
+    from backend.ingestion.jobs import job_status
+
+    job = job_status(db, job_id)
+    if job is None:
+        raise HTTPException(404, f'No job {job_id}')
+    return job
+
+
+@app.get('/export/{table}')
+def export_table(table: str, format: str = 'ndjson', league_id: int = None, season_id: int = None,
+                 team_id: int = None):
+    """Stream a whole table, optionally filtered by league, season and team, as NDJSON, CSV, Arrow or Parquet."""
+    if table not in TABLES:
+        raise HTTPException(404, f"Unknown export '{table}', expected one of {sorted(TABLES)}")
+    if format not in FORMATS:
+        raise HTTPException(400, f"Unknown format '{format}', expected one of {sorted(FORMATS)}")
+
+    def body():
+        # The connection is held by the response, not by the request handler
+        with get_engine().connect() as connection:
+            yield from export(connection, table, format, league_id=league_id, season_id=season_id,
+                              team_id=team_id)
+
+    return StreamingResponse(body(), media_type=FORMATS[format], headers={
+        'Content-Disposition': f'attachment; filename="{table}.{format}"',
+    })
+
+
+def _cached(name, loader, **filters):
+    return cached(app.state.query_cache, app.state.data_versions, name, filters, loader)
+
+
+def _page(db, keyset, cursor, limit, **filters):
+    try:
+        return asdict(paginate(db, keyset, cursor, limit, **filters))
+    except ValueError as error:
+        raise HTTPException(400, str(error))
+
+
+@app.get('/matches')
+def list_matches(league_id: int = None, season_id: int = None, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE,
+                 db=Depends(get_db)):
+    """List matches, most recent first."""
+    return _page(db, 'matches', cursor, limit, league_id=league_id, season_id=season_id)
+
+
+@app.get('/player-statistics')
+def list_player_statistics(season_id: int, order_by: str = 'goals', cursor: str = None,
+                           limit: int = DEFAULT_PAGE_SIZE, db=Depends(get_db)):
+    """List the player statistics of a season by goals or rating, best first."""
+    if order_by not in ('goals', 'rating'):
+        raise HTTPException(400, "order_by must be 'goals' or 'rating'")
+    keyset = f'player_statistics_{order_by}'
+    return _cached(keyset, lambda: _page(db, keyset, cursor, limit, season_id=season_id),
+                   season_id=season_id, cursor=cursor, limit=limit)
+
+
+@app.get('/leaderboards/{metric}')
+def get_leaderboard(metric: str, season_id: int = None, min_minutes: int = 0, limit: int = 20,
+                    db=Depends(get_db)):
+    """List the best players of a season, or of all seasons without ``season_id``, by a metric."""
+    if metric not in METRICS:
+        raise HTTPException(404, f"Unknown leaderboard '{metric}', expected one of {sorted(METRICS)}")
+    min_minutes, limit = max(0, min_minutes), max(1, min(limit, LEADERBOARD_SIZE))
+    if season_id is None:
+        # The all-time leaderboards change with every season, so they are read from the database
+        return leaderboard(db, metric, None, min_minutes, limit)
+    return _cached(f'leaderboard_{metric}', lambda: leaderboard(db, metric, season_id, min_minutes, limit),
+                   season_id=season_id, min_minutes=min_minutes, limit=limit)
+
+
+@app.get('/standings')
+def list_standings(season_id: int, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, db=Depends(get_db)):
+    """List the standings of a season by rank."""
+    return _cached('standings', lambda: _page(db, 'standings', cursor, limit, season_id=season_id),
+                   season_id=season_id, cursor=cursor, limit=limit)
+
+
+@app.get('/team-stats')
+def team_stats(season_id: int, team_id: int = None, db=Depends(get_db)):
+    """Return the statistics of every team of a season, or of one team."""
+    def load():
+        return PROJECTIONS['team_statistics'].dumps(db, season_id=season_id, team_id=team_id)
+
+    body = _cached('team_statistics', load, season_id=season_id, team_id=team_id)
+    return Response(body, media_type='application/json')
+
+
+@app.get('/teams/{team_id}/matches')
+def list_team_matches(team_id: int, limit: int = 10, db=Depends(get_db)):
+    """List the latest matches of a team, most recent first."""
+    return team_matches(db, team_id, max(1, min(limit, MAX_PAGE_SIZE)))
+
+
+@app.get('/teams/{team_id}/head-to-head/{opponent_id}')
+def get_head_to_head(team_id: int, opponent_id: int, db=Depends(get_db)):
+    """Return the all-time record of a team against another and their latest results."""
+    if team_id == opponent_id:
+        raise HTTPException(400, 'A team has no head-to-head record against itself')
+    return head_to_head(db, team_id, opponent_id)
+
+
+@app.get('/teams/{team_id}/opponents')
+def list_opponents(team_id: int, db=Depends(get_db)):
+    """List the all-time record of a team against every opponent, most played first."""
+    return opponents(db, team_id)
+
+
+@app.get('/fixtures')
+def list_fixtures(league_id: int = None, limit: int = DEFAULT_PAGE_SIZE, db=Depends(get_db)):
+    """List the upcoming fixtures, soonest first."""
+    return upcoming_fixtures(db, max(1, min(limit, MAX_PAGE_SIZE)), league_id=league_id)
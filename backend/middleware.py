@@ -0,0 +1,136 @@
+"""
+ASGI middlewares of the API.
+
+Conditional GET for the season-scoped stats endpoints
+------------------------------------------------------
+
+Responses of ``CACHED_PATHS`` that carry a ``season_id`` are a function of the
+URL and of the season's rows, whose changes are counted by
+:mod:`backend.db.versions`. :class:`HTTPCacheMiddleware` therefore derives a
+strong ETag from the season's data version and the URL, before the endpoint
+runs:
+
+* when ``If-None-Match`` holds that ETag, it answers ``304 Not Modified``
+  itself: no session, no query, no serialization;
+* otherwise the endpoint runs and a ``200`` gets the ETag.
+
+Both carry ``Cache-Control``: short-lived with ``stale-while-revalidate`` for
+seasons in progress (``HTTP_CACHE_CURRENT``), long-lived for finished ones
+(``HTTP_CACHE_FINISHED``), so React Query and any CDN in front can serve the
+cached copy while revalidating.
+
+Query profiling
+---------------
+
+:class:`QueryProfilerMiddleware` runs every request in a query unit of
+:mod:`backend.db.instrumentation`, so N+1 patterns are reported per request,
+and in development adds an ``X-Query-Summary`` header such as
+``12 queries, 8.4 ms; N+1: 3f2a9c0d81b4 x10``.
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.core.config import APP_ENV, HTTP_CACHE_CURRENT, HTTP_CACHE_FINISHED
+from backend.db.instrumentation import get_profiler
+
+CACHED_PATHS = frozenset({'/matches', '/player-statistics', '/standings', '/team-stats'})
+# Changing how the responses are built must change every ETag
+REPRESENTATION_VERSION = '1'
+
+
+def make_etag(path, params, season_id, version):
+    """Return the strong ETag of a response, from its URL and its season's data version."""
+    url = f"{path}?{urlencode(sorted(params))}#{REPRESENTATION_VERSION}"
+    digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+    return f'"{season_id}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header value matches ``etag``, with the weak comparison RFC 9110 requires."""
+    candidates = {candidate.strip().removeprefix('W/') for candidate in if_none_match.split(',')}
+    return '*' in candidates or etag in candidates
+
+
+class HTTPCacheMiddleware:
+    """
+    ASGI middleware adding ETags and ``Cache-Control`` to the stats endpoints.
+
+    Args:
+        app: Wrapped ASGI application.
+        versions (DataVersions): Season versions. Defaults to ``app.state.data_versions`` of the
+            application serving the request, read on every request so it can be replaced.
+        paths (Iterable[str]): Paths whose responses depend only on the URL and a season's rows.
+    """
+
+    def __init__(self, app, versions=None, paths=CACHED_PATHS):
+        self.app = app
+        self.versions = versions
+        self.paths = frozenset(paths)
+
+    def _versions(self, scope):
+        return self.versions or scope['app'].state.data_versions
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD') or scope['path'] not in self.paths:
+            return await self.app(scope, receive, send)
+        params = parse_qsl(scope['query_string'].decode('latin-1'))
+        season_ids = [value for name, value in params if name == 'season_id']
+        if len(season_ids) != 1 or not season_ids[0].isdigit():
+            return await self.app(scope, receive, send)
+
+        season_id = int(season_ids[0])
+        versions = self._versions(scope)
+        season = await run_in_threadpool(versions.get, season_id) if versions.stale else versions.get(season_id)
+        if season is None:
+            return await self.app(scope, receive, send)
+        version, is_current = season
+        etag = make_etag(scope['path'], params, season_id, version)
+        headers = [
+            (b'etag', etag.encode()),
+            (b'cache-control', (HTTP_CACHE_CURRENT if is_current else HTTP_CACHE_FINISHED).encode()),
+        ]
+
+        if_none_match = next((value for name, value in scope['headers'] if name == b'if-none-match'), None)
+        if if_none_match is not None and etag_matches(if_none_match.decode('latin-1'), etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async def send_with_headers(message):
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                message = {**message, 'headers': [*message.get('headers', []), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware grouping the queries of each request into a unit of the query profiler.
+
+    Args:
+        app: Wrapped ASGI application.
+        profiler (QueryProfiler): Defaults to :func:`backend.db.instrumentation.get_profiler`.
+        summary_header (bool): Add ``X-Query-Summary`` to the responses. On in development.
+    """
+
+    def __init__(self, app, profiler=None, summary_header=APP_ENV == 'development'):
+        self.app = app
+        self.profiler = profiler or get_profiler()
+        self.summary_header = summary_header
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        with self.profiler.unit(f"{scope['method']} {scope['path']}") as unit:
+            async def send_with_summary(message):
+                if message['type'] == 'http.response.start' and self.summary_header:
+                    summary = unit.summary(self.profiler.n_plus_one_threshold)
+                    headers = [*message.get('headers', []), (b'x-query-summary', summary.encode())]
+                    message = {**message, 'headers': headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_summary)
@@ -0,0 +1,479 @@
+"""
+Standings tables derived from finished matches, with competition tiebreakers.
+
+A :class:`StandingsTable` holds the counters of every team of a league season
+(with its group, for group stages), the head-to-head results between each pair
+of teams and the cards from ``match_statistics``. Applying a finished match
+touches two rows and one head-to-head pair, then re-sorts the affected group:
+the group is already in order except for the two teams that played, which
+Python's sort merges in linear time, so a result costs O(teams) however far
+the season has gone. A result that changes (a corrected score) is first
+removed and then applied again.
+
+The order within a group follows the competition's :class:`Rules`:
+
+* ``brasileirao`` — points, wins, goal difference, goals scored, head-to-head
+  (only when exactly two clubs are tied), fewest red cards, fewest yellow cards;
+* ``libertadores`` — group stage only: points, goal difference, goals scored,
+  away goals scored, fewest red cards, fewest yellow cards.
+
+The last resort of both regulations is a draw, replaced here by the team id so
+that the order is deterministic. Groups are not derivable from the matches:
+they are read from the ``group_name`` of the stored standings, along with the
+teams that have not played yet, or given by the caller for a season loaded
+from scratch (see :func:`backend.ingestion.transform.standings`).
+
+Usage:
+    python -m backend.processing.standings --season-id 5
+"""
+import argparse
+import bisect
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, create_engine, select, text
+
+from backend.core.config import DATABASE_URL
+from backend.db.models import FINISHED, Standings
+from backend.db.upsert import upsert
+
+FORM_LENGTH = 5
+
+# Sort key of each criterion: lower ranks first
+CRITERIA = {
+    'points': lambda row: -row.points,
+    'wins': lambda row: -row.wins,
+    'goal_difference': lambda row: -row.goal_difference,
+    'goals_for': lambda row: -row.goals_for,
+    'away_goals_for': lambda row: -row.away_goals_for,
+    'fewest_red_cards': lambda row: row.red_cards,
+    'fewest_yellow_cards': lambda row: row.yellow_cards,
+}
+HEAD_TO_HEAD = 'head_to_head'
+
+
+@dataclass(frozen=True)
+class Rules:
+    """Tiebreakers of a competition, and the rounds that count for its table."""
+
+    name: str
+    tiebreakers: tuple
+    round_prefix: str = None
+
+    def __post_init__(self):
+        unknown = set(self.tiebreakers) - set(CRITERIA) - {HEAD_TO_HEAD}
+        if unknown:
+            raise ValueError(f'Unknown tiebreakers: {sorted(unknown)}')
+
+    def counts(self, round_name):
+        """Whether a match of ``round_name`` counts for the table."""
+        return self.round_prefix is None or round_name is None or round_name.startswith(self.round_prefix)
+
+
+RULES = {
+    'brasileirao': Rules('brasileirao', (
+        'points', 'wins', 'goal_difference', 'goals_for', HEAD_TO_HEAD, 'fewest_red_cards', 'fewest_yellow_cards',
+    ), 'Regular Season'),
+    'libertadores': Rules('libertadores', (
+        'points', 'goal_difference', 'goals_for', 'away_goals_for', 'fewest_red_cards', 'fewest_yellow_cards',
+    ), 'Group Stage'),
+    # Leagues without regulations: points, goal difference, goals scored, wins
+    'default': Rules('default', ('points', 'goal_difference', 'goals_for', 'wins')),
+}
+
+# API-Football league ids
+LEAGUE_RULES = {71: RULES['brasileirao'], 13: RULES['libertadores']}
+
+
+def rules_for(league_id):
+    """Return the :class:`Rules` of a league, or the default ones."""
+    return LEAGUE_RULES.get(league_id, RULES['default'])
+
+
+@dataclass
+class TeamRow:
+    """Counters of one team in a standings table."""
+
+    team_id: int
+    group_name: str = None
+    rank: int = None
+    games_played: int = 0
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    goals_for: int = 0
+    goals_against: int = 0
+    home_games: int = 0
+    home_wins: int = 0
+    home_draws: int = 0
+    home_losses: int = 0
+    home_goals_for: int = 0
+    home_goals_against: int = 0
+    away_games: int = 0
+    away_wins: int = 0
+    away_draws: int = 0
+    away_losses: int = 0
+    away_goals_for: int = 0
+    away_goals_against: int = 0
+    yellow_cards: int = 0
+    red_cards: int = 0
+    # (date, match_id, result letter), oldest first whatever the order the matches were applied in
+    results: list = field(default_factory=list)
+
+    @property
+    def points(self):
+        return self.wins * 3 + self.draws
+
+    @property
+    def goal_difference(self):
+        return self.goals_for - self.goals_against
+
+    @property
+    def form(self):
+        return ''.join(letter for _, _, letter in self.results[-FORM_LENGTH:])
+
+    def values(self):
+        """Return the stored columns, to compare a row before and after an update."""
+        return (
+            self.rank, self.group_name, self.form, self.games_played, self.wins, self.draws, self.losses,
+            self.goals_for, self.goals_against, self.home_games, self.home_wins, self.home_draws, self.home_losses,
+            self.home_goals_for, self.home_goals_against, self.away_games, self.away_wins, self.away_draws,
+            self.away_losses, self.away_goals_for, self.away_goals_against,
+        )
+
+
+def _cards(value):
+    return value or 0
+
+
+class StandingsTable:
+    """
+    Standings of one league season, kept up to date one match at a time.
+
+    Args:
+        league_id (int): League of the table.
+        season_id (int): Season of the table.
+        rules (Rules): Tiebreakers. Defaults to :func:`rules_for` the league.
+        groups (dict): Team id mapped to its group name, or None outside group stages. Listed teams get a
+            row before they play, and keep it when their only result is removed.
+    """
+
+    def __init__(self, league_id, season_id, rules=None, groups=None):
+        self.league_id = league_id
+        self.season_id = season_id
+        self.rules = rules or rules_for(league_id)
+        self.groups = dict(groups or {})
+        self.rows = {}
+        # Group name mapped to its team ids, in rank order
+        self.order = {}
+        # (team_id, opponent_id) mapped to [points, goals for, goals against, away goals for]
+        self.head_to_head = {}
+        # Match id mapped to the match as applied
+        self.applied = {}
+        for team_id in self.groups:
+            self._row(team_id)
+        for group_name in self.order:
+            self._rank(group_name)
+
+    @classmethod
+    def from_matches(cls, league_id, season_id, matches, rules=None, groups=None):
+        """Build a table from a whole season of matches, oldest first, ranking each group once."""
+        table = cls(league_id, season_id, rules, groups)
+        for match in matches:
+            if table._counts(match):
+                table._count(match, 1)
+                table.applied[match['match_id']] = match
+        for group_name in table.order:
+            table._rank(group_name)
+        return table
+
+    def _row(self, team_id):
+        row = self.rows.get(team_id)
+        if row is None:
+            row = self.rows[team_id] = TeamRow(team_id, self.groups.get(team_id))
+            self.order.setdefault(row.group_name, []).append(team_id)
+        return row
+
+    def _counts(self, match):
+        if not self.rules.counts(match.get('round')):
+            return False
+        # Group stage matches only count between teams of the same group
+        return self.groups.get(match['home_team_id']) == self.groups.get(match['away_team_id'])
+
+    def _count(self, match, sign):
+        home_goals, away_goals = match['home_goals'], match['away_goals']
+        for side, team_id, opponent_id, goals_for, goals_against in (
+            ('home', match['home_team_id'], match['away_team_id'], home_goals, away_goals),
+            ('away', match['away_team_id'], match['home_team_id'], away_goals, home_goals),
+        ):
+            row = self._row(team_id)
+            outcome = 'wins' if goals_for > goals_against else 'draws' if goals_for == goals_against else 'losses'
+            for name, value in (
+                ('games_played', 1), (f'{side}_games', 1), (outcome, 1), (f'{side}_{outcome}', 1),
+                ('goals_for', goals_for), ('goals_against', goals_against),
+                (f'{side}_goals_for', goals_for), (f'{side}_goals_against', goals_against),
+                ('yellow_cards', _cards(match.get(f'{side}_yellow_cards'))),
+                ('red_cards', _cards(match.get(f'{side}_red_cards'))),
+            ):
+                setattr(row, name, getattr(row, name) + sign * value)
+            result = (match['date'], match['match_id'], outcome[0].upper())
+            if sign > 0:
+                bisect.insort(row.results, result)
+            else:
+                row.results.remove(result)
+
+            pair = self.head_to_head.setdefault((team_id, opponent_id), [0, 0, 0, 0])
+            points = 3 if outcome == 'wins' else 1 if outcome == 'draws' else 0
+            for position, value in enumerate((points, goals_for, goals_against, goals_for if side == 'away' else 0)):
+                pair[position] += sign * value
+
+    def _head_to_head(self, team_id, opponent_id):
+        points, goals_for, goals_against, away_goals = self.head_to_head.get((team_id, opponent_id), (0, 0, 0, 0))
+        return -points, goals_against - goals_for, -away_goals
+
+    def _rank(self, group_name):
+        """Sort a group by its tiebreakers and number its ranks."""
+        tiebreakers = self.rules.tiebreakers
+        split = tiebreakers.index(HEAD_TO_HEAD) if HEAD_TO_HEAD in tiebreakers else len(tiebreakers)
+        before = [CRITERIA[name] for name in tiebreakers[:split]]
+        after = [CRITERIA[name] for name in tiebreakers[split + 1:]]
+        order = self.order[group_name]
+        keys = {team_id: tuple(key(self.rows[team_id]) for key in before) for team_id in order}
+        # The order is already right but for the teams that just played: sorting is linear
+        order.sort(key=lambda team_id: (keys[team_id], team_id))
+
+        head_to_head = {}
+        if split < len(tiebreakers):
+            # Head-to-head only separates two clubs tied on every previous criterion
+            start = 0
+            while start < len(order):
+                end = start + 1
+                while end < len(order) and keys[order[end]] == keys[order[start]]:
+                    end += 1
+                if end - start == 2:
+                    first, second = order[start:end]
+                    head_to_head[first] = self._head_to_head(first, second)
+                    head_to_head[second] = self._head_to_head(second, first)
+                start = end
+        order.sort(key=lambda team_id: (
+            keys[team_id], head_to_head.get(team_id, ()), tuple(key(self.rows[team_id]) for key in after), team_id,
+        ))
+        for position, team_id in enumerate(order, 1):
+            self.rows[team_id].rank = position
+
+    def apply(self, match):
+        """
+        Apply a finished match, or a corrected result of an applied one.
+
+        Args:
+            match (Mapping): Columns of :func:`load_matches`: ``match_id``, ``date``, ``round``, team ids, goals and,
+                optionally, ``home_yellow_cards``, ``home_red_cards``, ``away_yellow_cards`` and
+                ``away_red_cards``.
+
+        Returns:
+            list[int]: Ids of the teams whose stored row changed.
+        """
+        previous = self.applied.get(match['match_id'])
+        affected = set()
+        if previous is not None:
+            affected.update(self._group_names(previous))
+        if self._counts(match):
+            affected.update(self._group_names(match))
+        if not affected:
+            return []
+        before = {team_id: self.rows[team_id].values() for name in affected for team_id in self.order.get(name, ())}
+
+        if previous is not None:
+            self._count(previous, -1)
+            del self.applied[match['match_id']]
+        if self._counts(match):
+            self._count(match, 1)
+            self.applied[match['match_id']] = match
+        for group_name in affected:
+            self._rank(group_name)
+        return [
+            team_id for name in affected for team_id in self.order[name]
+            if before.get(team_id) != self.rows[team_id].values()
+        ]
+
+    def remove(self, match_id):
+        """Remove an applied match (e.g. annulled) and return the ids of the teams whose row changed."""
+        previous = self.applied.get(match_id)
+        if previous is None:
+            return []
+        group_names = self._group_names(previous)
+        before = {team_id: self.rows[team_id].values() for name in group_names for team_id in self.order[name]}
+        self._count(previous, -1)
+        del self.applied[match_id]
+        for group_name in group_names:
+            self._rank(group_name)
+        return [team_id for team_id in before if before[team_id] != self.rows[team_id].values()]
+
+    def _group_names(self, match):
+        return {self.groups.get(match['home_team_id']), self.groups.get(match['away_team_id'])}
+
+    def records(self, team_ids=None, last_updated=None):
+        """
+        Return Standings rows, ready for :func:`backend.db.upsert.upsert`.
+
+        Args:
+            team_ids (Iterable[int]): Teams to return. Defaults to every team, in group and rank order.
+            last_updated (datetime): Stored in ``last_updated``. Defaults to now (naive UTC).
+        """
+        last_updated = last_updated or datetime.now(timezone.utc).replace(tzinfo=None)
+        if team_ids is None:
+            team_ids = [team_id for name in sorted(self.order, key=str) for team_id in self.order[name]]
+        records = []
+        for team_id in team_ids:
+            row = self.rows[team_id]
+            records.append({
+                'team_id': team_id, 'league_id': self.league_id, 'season_id': self.season_id,
+                'rank': row.rank, 'points': row.points, 'goal_difference': row.goal_difference,
+                'group_name': row.group_name, 'form': row.form, 'games_played': row.games_played,
+                'wins': row.wins, 'draws': row.draws, 'losses': row.losses,
+                'goals_for': row.goals_for, 'goals_against': row.goals_against,
+                'home_games': row.home_games, 'home_wins': row.home_wins, 'home_draws': row.home_draws,
+                'home_losses': row.home_losses, 'home_goals_for': row.home_goals_for,
+                'home_goals_against': row.home_goals_against,
+                'away_games': row.away_games, 'away_wins': row.away_wins, 'away_draws': row.away_draws,
+                'away_losses': row.away_losses, 'away_goals_for': row.away_goals_for,
+                'away_goals_against': row.away_goals_against,
+                'last_updated': last_updated,
+            })
+        return records
+
+
+_MATCHES = text("""
+    SELECT matches.id AS match_id, matches.league_id, matches.season_id, matches.date, matches.round,
+           matches.home_team_id, matches.away_team_id, matches.home_goals, matches.away_goals,
+           home.yellow_cards AS home_yellow_cards, home.red_cards AS home_red_cards,
+           away.yellow_cards AS away_yellow_cards, away.red_cards AS away_red_cards
+    FROM matches
+    LEFT JOIN match_statistics AS home ON home.match_id = matches.id
+         AND home.season_year = matches.season_year AND home.team_id = matches.home_team_id
+    LEFT JOIN match_statistics AS away ON away.match_id = matches.id
+         AND away.season_year = matches.season_year AND away.team_id = matches.away_team_id
+    WHERE matches.season_id = :season_id
+      AND matches.season_year = (SELECT year FROM seasons WHERE id = :season_id)
+      AND matches.status IN :finished AND matches.home_goals IS NOT NULL AND matches.away_goals IS NOT NULL
+      AND (CAST(:match_id AS INTEGER) IS NULL OR matches.id = :match_id)
+    ORDER BY matches.date, matches.id
+""").bindparams(bindparam('finished', expanding=True), bindparam('match_id', value=None))
+
+
+def load_matches(connection, season_id, match_id=None):
+    """Return the finished matches of a season (or one of them) with their cards, oldest first."""
+    return connection.execute(_MATCHES, {
+        'season_id': season_id, 'finished': list(FINISHED), 'match_id': match_id,
+    }).mappings().all()
+
+
+def load_groups(connection, season_id):
+    """Return the team id to ``group_name`` mapping of the stored standings of a season."""
+    return dict(connection.execute(
+        select(Standings.team_id, Standings.group_name).where(Standings.season_id == season_id)
+    ).all())
+
+
+def load_table(connection, league_id, season_id, rules=None, groups=None):
+    """
+    Recompute the standings table of a season from its stored matches.
+
+    ``groups`` (team id mapped to group name) add to or replace the groups of the stored standings.
+    """
+    groups = {**load_groups(connection, season_id), **(groups or {})}
+    return StandingsTable.from_matches(league_id, season_id, load_matches(connection, season_id), rules, groups)
+
+
+class StandingsEngine:
+    """
+    Standings tables of the seasons in progress, kept in memory between sync ticks.
+
+    The first result of a season loads and ranks the whole season once; every
+    later one updates its table in O(teams) and writes only the rows that
+    changed.
+    """
+
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, connection, league_id, season_id):
+        """Return the table of a season, loading it on first use."""
+        table = self.tables.get(season_id)
+        if table is None:
+            table = self.tables[season_id] = load_table(connection, league_id, season_id)
+        return table
+
+    def match_finished(self, connection, league_id, season_id, match_id, last_updated=None):
+        """
+        Apply a finished match, stored beforehand, and write the standings rows it changed.
+
+        Args:
+            connection (Connection | Session): Where to read and write, inside a transaction.
+            league_id (int): League of the match.
+            season_id (int): Season of the match.
+            match_id (int): Finished match.
+            last_updated (datetime): Stored in ``last_updated``.
+
+        Returns:
+            int: Number of standings rows written.
+        """
+        loaded = season_id in self.tables
+        table = self.table(connection, league_id, season_id)
+        if not loaded:
+            # Loading replayed the season, this match included
+            return upsert(connection, Standings, table.records(last_updated=last_updated))
+        matches = load_matches(connection, season_id, match_id)
+        changed = table.apply(matches[0]) if matches else table.remove(match_id)
+        return upsert(connection, Standings, table.records(changed, last_updated)) if changed else 0
+
+    def invalidate(self, season_id=None):
+        """Forget one season's table, or all of them, e.g. after a transaction rolled back."""
+        if season_id is None:
+            self.tables.clear()
+        else:
+            self.tables.pop(season_id, None)
+
+
+def write_season(connection, league_id, season_id, rules=None, last_updated=None, groups=None):
+    """
+    Recompute and store the standings of a season.
+
+    Args:
+        connection (Connection | Session): Where to read and write, inside a transaction.
+        league_id (int): League of the season.
+        season_id (int): Season to recompute.
+        rules (Rules): Tiebreakers. Defaults to the league's, see :func:`rules_for`.
+        last_updated (datetime): Stored in ``last_updated``.
+        groups (dict): Team id mapped to its group name, for seasons whose standings are not stored yet.
+
+    Returns:
+        int: Number of rows inserted or changed.
+    """
+    table = load_table(connection, league_id, season_id, rules, groups)
+    return upsert(connection, Standings, table.records(last_updated=last_updated))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute the standings of a season from its matches.')
+    parser.add_argument('--database-url', default=DATABASE_URL)
+    parser.add_argument('--season-id', type=int, required=True)
+    parser.add_argument('--rules', choices=sorted(RULES), help="Tiebreakers. Defaults to the league's.")
+    parser.add_argument('--dry-run', action='store_true', help='Print the table instead of storing it.')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.begin() as connection:
+        league_id = connection.execute(text('SELECT league_id FROM seasons WHERE id = :id'),
+                                       {'id': args.season_id}).scalar_one()
+        rules = RULES[args.rules] if args.rules else None
+        if args.dry_run:
+            for record in load_table(connection, league_id, args.season_id, rules).records():
+                print(f"{record['group_name'] or '':<10} {record['rank']:>3} {record['team_id']:>6} "
+                      f"{record['points']:>4} {record['goal_difference']:>4} {record['form']}")
+        else:
+            print(f'{write_season(connection, league_id, args.season_id, rules)} standings rows written')
+
+
+if __name__ == '__main__':
+    main()
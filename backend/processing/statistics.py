@@ -0,0 +1,247 @@
+"""
+Vectorized TeamStatistics engine.
+
+A season's finished matches are loaded with one columnar query and turned into
+:class:`Games`: NumPy arrays with one entry per team and match (home and away
+perspectives stacked), sorted by team and date so that every team occupies one
+contiguous slice. Every column of ``team_statistics`` is then derived from
+whole arrays:
+
+* counters are ``np.add.reduceat`` sums of boolean arrays over the team slices;
+* the biggest wins and losses come from one ``np.lexsort`` per kind;
+* current streaks are run-length encoded: a new run starts wherever the team
+  or the result changes, and a team's streak is the length of its last run;
+* ``form`` is packed 2 bits per game (see :mod:`backend.db.formats`) by
+  shifting each result code into place and summing per byte with
+  ``np.bincount``.
+
+Only the final conversion of each team's bytes and letters runs per team; no
+code runs per match. Frames may hold several seasons (or leagues) at once;
+every aggregate is keyed by ``(team_id, league_id, season_id)``.
+
+Standings need the competition's groups and tiebreakers, and are derived by
+:mod:`backend.processing.standings` only.
+"""
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from backend.db.formats import FORM_CODES
+from backend.db.models import FINISHED, TeamStatistics
+from backend.db.upsert import upsert
+
+KEY = ['team_id', 'league_id', 'season_id']
+
+_MATCHES = text("""
+    SELECT id AS match_id, league_id, season_id, home_team_id, away_team_id, home_goals, away_goals
+    FROM matches
+    WHERE season_id = :season_id AND season_year = (SELECT year FROM seasons WHERE id = :season_id)
+      AND status IN :finished AND home_goals IS NOT NULL AND away_goals IS NOT NULL
+    ORDER BY date, id
+""").bindparams(bindparam('finished', expanding=True))
+
+_CARDS = text("""
+    SELECT match_statistics.team_id, matches.league_id, matches.season_id,
+           sum(match_statistics.yellow_cards) AS yellow_cards, sum(match_statistics.red_cards) AS red_cards
+    FROM match_statistics
+    JOIN matches ON matches.id = match_statistics.match_id AND matches.season_year = match_statistics.season_year
+    WHERE matches.season_id = :season_id AND matches.season_year = (SELECT year FROM seasons WHERE id = :season_id)
+    GROUP BY match_statistics.team_id, matches.league_id, matches.season_id
+""")
+
+
+def _frame(result):
+    return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+
+def load_matches(connection, season_id):
+    """Return the finished matches of a season as a DataFrame, oldest first (the order :class:`Games` relies on)."""
+    return _frame(connection.execute(_MATCHES, {'season_id': season_id, 'finished': list(FINISHED)}))
+
+
+def load_cards(connection, season_id):
+    """Return the yellow and red cards of each team in a season, summed from ``match_statistics``."""
+    return _frame(connection.execute(_CARDS, {'season_id': season_id}))
+
+
+class Games:
+    """
+    Home and away perspectives of finished matches, sorted by team and date.
+
+    Attributes:
+        keys (DataFrame): ``team_id``, ``league_id`` and ``season_id`` of each team slice.
+        starts (ndarray): First index of each team slice.
+        ends (ndarray): Index after the last one of each team slice.
+        group (ndarray): Team slice of each entry.
+        is_home, goals_for, goals_against (ndarray): Per entry.
+        result (ndarray): 1 win, 0 draw, -1 loss.
+    """
+
+    def __init__(self, matches):
+        """Build the arrays from ``matches``, which must be sorted oldest first like :func:`load_matches`."""
+        def both(home, away):
+            return np.concatenate([matches[home].to_numpy(), matches[away].to_numpy()])
+
+        def twice(name):
+            column = matches[name].to_numpy()
+            return np.concatenate([column, column])
+
+        team = both('home_team_id', 'away_team_id')
+        league, season = twice('league_id'), twice('season_id')
+        # Rows arrive oldest first, so the row position orders each team's games
+        chronological = np.tile(np.arange(len(matches)), 2)
+        order = np.lexsort((chronological, season, league, team))
+        team, league, season = team[order], league[order], season[order]
+        self.is_home = np.repeat([True, False], len(matches))[order]
+        self.goals_for = both('home_goals', 'away_goals').astype(np.int64)[order]
+        self.goals_against = both('away_goals', 'home_goals').astype(np.int64)[order]
+        self.result = np.sign(self.goals_for - self.goals_against)
+
+        new_group = np.ones(len(team), dtype=bool)
+        new_group[1:] = (team[1:] != team[:-1]) | (league[1:] != league[:-1]) | (season[1:] != season[:-1])
+        self.starts = np.flatnonzero(new_group)
+        self.ends = np.append(self.starts[1:], len(team))
+        self.group = np.cumsum(new_group) - 1
+        self.new_group = new_group
+        self.keys = pd.DataFrame({
+            'team_id': team[self.starts], 'league_id': league[self.starts], 'season_id': season[self.starts],
+        })
+
+    def __len__(self):
+        return len(self.starts)
+
+    @cached_property
+    def counters(self):
+        """Per-team game, result and goal counters."""
+        return _counters(self)
+
+    def sum(self, **columns):
+        """Return the per-team sums of boolean or integer arrays as a DataFrame."""
+        if not len(self):
+            return pd.DataFrame({name: np.zeros(0, dtype=np.int64) for name in columns})
+        values = np.column_stack([np.asarray(value, dtype=np.int64) for value in columns.values()])
+        return pd.DataFrame(np.add.reduceat(values, self.starts, axis=0), columns=list(columns))
+
+
+def games(matches):
+    """
+    Build the :class:`Games` of ``matches``.
+
+    Args:
+        matches (DataFrame): Columns of :func:`load_matches`.
+
+    Returns:
+        Games: Per team and match arrays.
+    """
+    return matches if isinstance(matches, Games) else Games(matches)
+
+
+def _counters(stacked):
+    home, win, draw, loss = stacked.is_home, stacked.result == 1, stacked.result == 0, stacked.result == -1
+    return stacked.sum(
+        games_played=np.ones(len(home)), games_home=home, games_away=~home,
+        wins=win, wins_home=win & home, wins_away=win & ~home,
+        draws=draw, draws_home=draw & home, draws_away=draw & ~home,
+        losses=loss, losses_home=loss & home, losses_away=loss & ~home,
+        goals_for=stacked.goals_for, goals_against=stacked.goals_against,
+        clean_sheets=stacked.goals_against == 0, failed_to_score=stacked.goals_for == 0,
+    )
+
+
+def _biggest(stacked, result, is_home):
+    """Return the biggest win or loss of each team at home or away, as home and away goals."""
+    name = f"biggest_{'win' if result == 1 else 'loss'}_{'home' if is_home else 'away'}"
+    rows = np.flatnonzero((stacked.result == result) & (stacked.is_home == is_home))
+    margin = np.abs(stacked.goals_for[rows] - stacked.goals_against[rows])
+    winner_goals = np.maximum(stacked.goals_for[rows], stacked.goals_against[rows])
+    # Widest margin first, then most goals by the winner; the earliest match wins ties
+    rows = rows[np.lexsort((rows, -winner_goals, -margin, stacked.group[rows]))]
+    groups, first = np.unique(stacked.group[rows], return_index=True)
+    chosen = rows[first]
+    home_goals, away_goals = (
+        (stacked.goals_for, stacked.goals_against) if is_home else (stacked.goals_against, stacked.goals_for)
+    )
+    columns = {}
+    for column, goals in ((f'{name}_goals_home', home_goals), (f'{name}_goals_away', away_goals)):
+        values = pd.array(np.zeros(len(stacked), dtype=np.int64), dtype='Int64')
+        values[:] = pd.NA
+        values[groups] = goals[chosen]
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def _streaks(stacked):
+    """Return the current win, draw and loss streak of each team, by run-length encoding the results."""
+    new_run = stacked.new_group.copy()
+    new_run[1:] |= stacked.result[1:] != stacked.result[:-1]
+    # Start of the run each entry belongs to
+    run_start = np.maximum.accumulate(np.where(new_run, np.arange(len(new_run)), 0))
+    last = stacked.ends - 1
+    length = stacked.ends - run_start[last]
+    result = stacked.result[last]
+    return pd.DataFrame({
+        'streak_wins': np.where(result == 1, length, 0),
+        'streak_draws': np.where(result == 0, length, 0),
+        'streak_losses': np.where(result == -1, length, 0),
+    })
+
+
+def _packed_form(stacked):
+    """Return the full-season form of each team packed 2 bits per game, 4 games per byte."""
+    codes = np.select([stacked.result == 1, stacked.result == 0], [FORM_CODES['W'], FORM_CODES['D']], FORM_CODES['L'])
+    position = np.arange(len(codes)) - stacked.starts[stacked.group]
+    sizes = (stacked.ends - stacked.starts + 3) // 4
+    offsets = np.cumsum(sizes) - sizes
+    data = np.bincount(
+        offsets[stacked.group] + position // 4, weights=codes << (6 - 2 * (position % 4)), minlength=sizes.sum(),
+    ).astype(np.uint8)
+    return pd.Series([data[offset:offset + size].tobytes() for offset, size in zip(offsets, sizes)], name='form')
+
+
+def team_statistics(matches, cards=None):
+    """
+    Compute every TeamStatistics column from finished matches.
+
+    Penalties are not stored per match, so ``penalty_scored`` and
+    ``penalty_missed`` are left to the API.
+
+    Args:
+        matches (DataFrame | Games): Columns of :func:`load_matches`. May span several seasons.
+        cards (DataFrame): Optional output of :func:`load_cards`.
+
+    Returns:
+        DataFrame: One row per team and season, columns named as in ``team_statistics``.
+    """
+    stacked = games(matches)
+    parts = [stacked.keys, stacked.counters, _packed_form(stacked), _streaks(stacked)]
+    parts.extend(_biggest(stacked, result, is_home) for result in (1, -1) for is_home in (True, False))
+    statistics = pd.concat(parts, axis=1)
+    if cards is not None and not cards.empty:
+        statistics = statistics.merge(cards[[*KEY, 'yellow_cards', 'red_cards']], on=KEY, how='left')
+        statistics[['yellow_cards', 'red_cards']] = statistics[['yellow_cards', 'red_cards']].astype('Int64')
+    return statistics
+
+
+def records(frame):
+    """Convert a DataFrame to row dictionaries with plain Python values and None for missing ones."""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def write_season(connection, season_id):
+    """
+    Recompute and store the TeamStatistics of a season.
+
+    Args:
+        connection (Connection | Session): Where to read and write, inside a transaction.
+        season_id (int): Season to recompute.
+
+    Returns:
+        dict: Table name mapped to the number of rows inserted or changed.
+    """
+    matches = load_matches(connection, season_id)
+    if matches.empty:
+        return {TeamStatistics.__tablename__: 0}
+    statistics = team_statistics(games(matches), load_cards(connection, season_id))
+    return {TeamStatistics.__tablename__: upsert(connection, TeamStatistics, records(statistics))}
@@ -0,0 +1,96 @@
+"""
+Pydantic response models of the statistics endpoints.
+
+They describe the JSON the frontend receives: the compact columns of
+backend.db.formats appear in their string formats ('WWDLW', '4-0', '54%').
+Endpoints returning many rows serialize them with backend.db.serialization,
+which emits the same bytes without building model instances.
+"""
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class TeamStatisticsSchema(BaseModel):
+    """A team's statistics in a season, as :class:`backend.db.models.TeamStatistics` exposes them."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    team_id: int
+    league_id: int
+    season_id: int
+    form: Optional[str] = None
+    games_played: Optional[int] = None
+    games_home: Optional[int] = None
+    games_away: Optional[int] = None
+    wins: Optional[int] = None
+    wins_home: Optional[int] = None
+    wins_away: Optional[int] = None
+    draws: Optional[int] = None
+    draws_home: Optional[int] = None
+    draws_away: Optional[int] = None
+    losses: Optional[int] = None
+    losses_home: Optional[int] = None
+    losses_away: Optional[int] = None
+    goals_for: Optional[int] = None
+    goals_against: Optional[int] = None
+    clean_sheets: Optional[int] = None
+    failed_to_score: Optional[int] = None
+    biggest_win_home: Optional[str] = None
+    biggest_win_away: Optional[str] = None
+    biggest_loss_home: Optional[str] = None
+    biggest_loss_away: Optional[str] = None
+    penalty_scored: Optional[int] = None
+    penalty_missed: Optional[int] = None
+    streak_wins: Optional[int] = None
+    streak_draws: Optional[int] = None
+    streak_losses: Optional[int] = None
+    yellow_cards: Optional[int] = None
+    red_cards: Optional[int] = None
+
+
+class PlayerStatisticsSchema(BaseModel):
+    """A player's statistics in a season, as :class:`backend.db.models.PlayerStatistics` exposes them."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    player_id: int
+    team_id: int
+    league_id: int
+    season_id: int
+    position: Optional[str] = None
+    appearances: Optional[int] = None
+    lineups: Optional[int] = None
+    minutes_played: Optional[int] = None
+    rating: Optional[float] = None
+    captain: Optional[bool] = None
+    sub_in: Optional[int] = None
+    sub_out: Optional[int] = None
+    bench: Optional[int] = None
+    shots_total: Optional[int] = None
+    shots_on_goal: Optional[int] = None
+    goals_total: Optional[int] = None
+    assists: Optional[int] = None
+    goals_conceded: Optional[int] = None
+    goals_saves: Optional[int] = None
+    passes_total: Optional[int] = None
+    passes_key: Optional[int] = None
+    passes_accuracy: Optional[str] = None
+    tackles_total: Optional[int] = None
+    tackles_blocks: Optional[int] = None
+    tackles_interceptions: Optional[int] = None
+    duels_total: Optional[int] = None
+    duels_won: Optional[int] = None
+    dribbles_attempts: Optional[int] = None
+    dribbles_success: Optional[int] = None
+    fouls_drawn: Optional[int] = None
+    fouls_committed: Optional[int] = None
+    yellow_cards: Optional[int] = None
+    red_cards: Optional[int] = None
+    penalties_won: Optional[int] = None
+    penalties_commited: Optional[int] = None
+    penalties_scored: Optional[int] = None
+    penalties_missed: Optional[int] = None
+    penalties_saved: Optional[int] = None
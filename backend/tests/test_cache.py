@@ -0,0 +1,101 @@
+import pytest
+
+from backend.db.cache import QueryCache, cached, invalidate
+
+
+class Versions:
+    """Stands in for DataVersions with a fixed version per season."""
+
+    def __init__(self, seasons):
+        self.seasons = seasons
+
+    def get(self, season_id):
+        return self.seasons.get(season_id)
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis-py calls the cache makes, shared by several caches."""
+
+    def __init__(self):
+        self.values = {}
+        self.expiries = {}
+
+    def get(self, name):
+        return self.values.get(name)
+
+    def set(self, name, value, ex=None):
+        if ex is not None and not isinstance(ex, int):
+            # As redis-py's DataError
+            raise TypeError('ex must be an integer')
+        self.values[name] = value
+        self.expiries[name] = ex
+
+    def mget(self, names):
+        return [self.values.get(name) for name in names]
+
+    def incr(self, name):
+        self.values[name] = int(self.values.get(name) or 0) + 1
+        return self.values[name]
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+def test_get_or_load_caches_until_invalidated():
+    cache = QueryCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_load('standings?season_id=5', {'season:5'}, load) == 1
+    assert cache.get_or_load('standings?season_id=5', {'season:5'}, load) == 1
+    invalidate({'season:5'})
+    assert cache.get_or_load('standings?season_id=5', {'season:5'}, load) == 2
+    assert cache.stats['local_hits'] == 1
+
+
+def test_write_committed_while_loading_leaves_the_entry_stale():
+    cache = QueryCache()
+
+    def load_then_write():
+        # The rows were read, then a writer commits before the result is stored
+        cache.invalidate({'season:5'})
+        return 'old rows'
+
+    assert cache.get_or_load('standings?season_id=5', {'season:5'}, load_then_write) == 'old rows'
+    assert cache.get_or_load('standings?season_id=5', {'season:5'}, lambda: 'new rows') == 'new rows'
+
+
+def test_cached_keys_entries_by_data_version():
+    cache = QueryCache()
+    versions = Versions({5: (1, True)})
+    assert cached(cache, versions, 'standings', {'season_id': 5}, lambda: 'version 1') == 'version 1'
+    assert cached(cache, versions, 'standings', {'season_id': 5}, lambda: 'unused') == 'version 1'
+    # Another process wrote the season
+    versions.seasons[5] = (2, True)
+    assert cached(cache, versions, 'standings', {'season_id': 5}, lambda: 'version 2') == 'version 2'
+    # Unknown seasons are not cached
+    assert cached(cache, versions, 'standings', {'season_id': 6}, lambda: 'a') == 'a'
+    assert cached(cache, versions, 'standings', {'season_id': 6}, lambda: 'b') == 'b'
+
+
+def test_shared_tier_serves_and_invalidates_across_caches(redis):
+    api = QueryCache(ttl=3600.0, redis=redis)
+    other_api = QueryCache(ttl=3600.0, redis=redis)
+    ingestion = QueryCache(redis=redis)
+
+    assert api.get_or_load('standings?season_id=5', {'season:5'}, lambda: 'rows') == 'rows'
+    assert redis.expiries['galo:entry:standings?season_id=5'] == 3600
+    # Another worker reads the entry stored by the first one
+    assert other_api.get_or_load('standings?season_id=5', {'season:5'}, lambda: 'unused') == 'rows'
+    assert other_api.stats['remote_hits'] == 1
+
+    # A tag bump from another process invalidates the entries, local copies included
+    ingestion.invalidate({'season:5'})
+    assert api.get('standings?season_id=5', {'season:5'}) is None
+    assert other_api.get_or_load('standings?season_id=5', {'season:5'}, lambda: 'new rows') == 'new rows'
+    assert api.get('standings?season_id=5', {'season:5'}) == 'new rows'
@@ -0,0 +1,89 @@
+import importlib.util
+
+import pytest
+
+from backend.benchmarks.export_memory import BULK_MATCHES, FIRST_ID, TEAMS, measure_export
+from backend.benchmarks.synthetic import generate, seed
+from backend.db import export
+from backend.db.models import Match
+
+COLUMNS = [column.name for column in Match.__table__.columns]
+CHUNK_SIZE = 500
+# Matches inserted server-side for the memory check, and the RSS growth allowed past the first chunk
+BULK_ROWS = 1000000
+BUDGET_MB = 64
+
+
+@pytest.fixture(scope='module')
+def match_rows():
+    """Every synthetic match as a tuple in column order, about 9,000 of them."""
+    data = generate(seasons=24, teams=20, players_per_team=0)
+    return [tuple(match.get(name) for name in COLUMNS) for match in data['matches']]
+
+
+class Chunks:
+    """Chunks of rows, as stream_rows yields them, counting how many were pulled."""
+
+    def __init__(self, rows, chunk_size=CHUNK_SIZE):
+        self.rows = rows
+        self.chunk_size = chunk_size
+        self.pulled = 0
+
+    def __iter__(self):
+        for start in range(0, len(self.rows), self.chunk_size):
+            self.pulled += 1
+            yield self.rows[start:start + self.chunk_size]
+
+
+@pytest.mark.parametrize('format_name', list(export.FORMATS))
+def test_encode_holds_one_chunk_at_a_time(match_rows, format_name):
+    if format_name in ('arrow', 'parquet'):
+        pytest.importorskip('pyarrow')
+    schema = export.arrow_schema(Match.__table__) if format_name in ('arrow', 'parquet') else None
+    chunks = Chunks(match_rows)
+    sizes = []
+    for data in export.encode(format_name, COLUMNS, chunks, schema):
+        # Each piece is encoded before the next chunk of rows is fetched
+        assert chunks.pulled <= len(sizes) + 1
+        sizes.append(len(data))
+
+    rows_chunks = -(-len(match_rows) // CHUNK_SIZE)
+    assert chunks.pulled == rows_chunks
+    # One piece per chunk, plus what the writer flushes when closed (the Parquet footer, the Arrow end marker)
+    assert rows_chunks <= len(sizes) <= rows_chunks + 1
+    one_chunk = sum(map(len, export.encode(format_name, COLUMNS, [match_rows[:CHUNK_SIZE]], schema)))
+    assert max(sizes[:rows_chunks]) <= 1.5 * one_chunk
+
+
+def test_export_streams_bounded_chunks(connection, monkeypatch):
+    counts = seed(connection, seasons=6, teams=12, players_per_team=0)
+    connection.commit()
+    fetched = []
+    stream_rows = export.stream_rows
+
+    def counted(*args, **kwargs):
+        for chunk in stream_rows(*args, **kwargs):
+            fetched.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(export, 'stream_rows', counted)
+    lines = b''.join(export.export(connection, 'matches', 'ndjson', chunk_size=100)).splitlines()
+
+    assert len(lines) == sum(fetched) == counts['matches']
+    assert len(fetched) == -(-counts['matches'] // 100)
+    assert max(fetched) == 100
+
+
+def test_export_memory_stays_within_budget(connection):
+    seed(connection, seasons=2, teams=TEAMS, players_per_team=0)
+    connection.execute(BULK_MATCHES, {'first_id': FIRST_ID, 'teams': TEAMS, 'rows': BULK_ROWS})
+    connection.commit()
+    formats = [
+        format_name for format_name in export.FORMATS
+        if format_name not in ('arrow', 'parquet') or importlib.util.find_spec('pyarrow')
+    ]
+    for format_name in formats:
+        written, _, _, growth = measure_export(connection, format_name, export.CHUNK_SIZE)
+        connection.rollback()
+        assert written, format_name
+        assert growth <= BUDGET_MB, f'{format_name} grew {growth:.1f} MB past its first chunk'
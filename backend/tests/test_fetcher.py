@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.ingestion.fetcher import Fetcher, QuotaExhausted, ResponseCache, TokenBucket
+
+
+class Clock:
+    """Monotonic clock moved forward by the patched ``asyncio.sleep`` only."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(asyncio, 'sleep', clock.sleep)
+    return clock
+
+
+class MockApi:
+    """Answers like API-Football, with an ETag per body and quota headers."""
+
+    def __init__(self, per_minute=600, daily=1000, throttled=0):
+        self.per_minute = per_minute
+        self.daily = daily
+        self.throttled = throttled
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        headers = {'x-ratelimit-limit': str(self.per_minute), 'x-ratelimit-remaining': str(self.per_minute - 1),
+                   'x-ratelimit-requests-remaining': str(self.daily - len(self.requests))}
+        if self.throttled:
+            self.throttled -= 1
+            return httpx.Response(429, headers={**headers, 'x-ratelimit-remaining': '0'})
+        body = json.dumps({'errors': [], 'response': [dict(request.url.params)]}).encode()
+        etag = f'"{hash(body)}"'
+        if request.headers.get('if-none-match') == etag:
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, content=body, headers={**headers, 'etag': etag})
+
+
+def _fetcher(api, tmp_path, **options):
+    return Fetcher(base_url='https://api.test', cache=ResponseCache(tmp_path), transport=httpx.MockTransport(api),
+                   **options)
+
+
+def test_token_bucket_waits_for_tokens(clock):
+    async def run():
+        bucket = TokenBucket(60, capacity=2, clock=clock)
+        for _ in range(3):
+            await bucket.acquire()
+        # The server reports a doubled rate and no request left this minute
+        bucket.observe(120, 0)
+        await bucket.acquire()
+        return bucket
+
+    bucket = asyncio.run(run())
+    # The burst is free, then one token per second, then one per half second
+    assert clock.sleeps == [1.0, 0.5]
+    assert bucket.rate == 2
+    assert bucket.capacity == 120
+
+
+def test_fresh_responses_come_from_the_cache(tmp_path, clock):
+    api = MockApi()
+
+    async def run():
+        async with _fetcher(api, tmp_path) as fetcher:
+            first = await fetcher.get('fixtures', league=71, season=2024)
+            # Same request, parameters in another order
+            second = await fetcher.get('fixtures', season=2024, league=71)
+            return fetcher, first, second
+
+    fetcher, first, second = asyncio.run(run())
+    assert first == second == {'errors': [], 'response': [{'league': '71', 'season': '2024'}]}
+    assert len(api.requests) == 1
+    assert fetcher.stats == {'requests': 1, 'cache_hits': 1, 'not_modified': 0, 'retries': 0}
+
+
+def test_stale_responses_are_revalidated(tmp_path, clock):
+    api = MockApi()
+
+    async def run():
+        async with _fetcher(api, tmp_path) as fetcher:
+            first = await fetcher.get('standings', league=71, season=2024)
+            second = await fetcher.get('standings', ttl=0, league=71, season=2024)
+            return fetcher, first, second
+
+    fetcher, first, second = asyncio.run(run())
+    assert first == second
+    assert 'if-none-match' in api.requests[1].headers
+    assert fetcher.stats['not_modified'] == 1
+    assert fetcher.stats['cache_hits'] == 0
+
+
+def test_throttled_requests_drain_the_bucket_and_retry(tmp_path, clock):
+    api = MockApi(throttled=1)
+
+    async def run():
+        async with _fetcher(api, tmp_path) as fetcher:
+            return fetcher, await fetcher.get('teams', league=71, season=2024)
+
+    fetcher, body = asyncio.run(run())
+    assert body['response'] == [{'league': '71', 'season': '2024'}]
+    assert len(api.requests) == 2
+    assert fetcher.stats['retries'] == 1
+
+
+def test_daily_quota_stops_before_the_reserve(tmp_path, clock):
+    # 10 requests left after the first one, the reserve
+    api = MockApi(daily=11)
+
+    async def run():
+        async with _fetcher(api, tmp_path, daily_reserve=10) as fetcher:
+            await fetcher.get('fixtures', league=71, season=2024)
+            # Cached: costs no quota
+            await fetcher.get('fixtures', league=71, season=2024)
+            with pytest.raises(QuotaExhausted):
+                await fetcher.get('fixtures', league=71, season=2023)
+
+    asyncio.run(run())
+    assert len(api.requests) == 1
@@ -0,0 +1,34 @@
+from sqlalchemy import select, update
+
+from backend.benchmarks.synthetic import seed
+from backend.db.leaderboards import ALL_TIME, check, rebuild, refresh_all_time, refresh_seasons
+from backend.db.models import LeaderboardEntry, PlayerStatistics
+
+SEASON_ID = 2
+
+
+def _stored(connection, season_id):
+    entries = LeaderboardEntry.__table__
+    statement = select(entries).where(entries.c.season_id == season_id).order_by(*entries.primary_key.columns)
+    return [dict(row) for row in connection.execute(statement).mappings()]
+
+
+def test_deferred_all_time_refresh_matches_full_recomputation(connection):
+    seed(connection, seasons=3, teams=6, players_per_team=5)
+    rebuild(connection)
+    all_time = _stored(connection, ALL_TIME)
+
+    statistics = PlayerStatistics.__table__
+    connection.execute(
+        update(statistics).where(statistics.c.season_id == SEASON_ID)
+        .values(goals_total=statistics.c.goals_total + statistics.c.player_id % 7)
+    )
+    # A season load of a run leaves the all-time leaderboards to the end of the run
+    refresh_seasons(connection, [SEASON_ID], all_time=False)
+    assert _stored(connection, ALL_TIME) == all_time
+    report = check(connection)
+    assert not report.missing and not report.extra
+    assert report.different and {key[1] for key in report.different} == {ALL_TIME}
+
+    refresh_all_time(connection)
+    assert check(connection).ok
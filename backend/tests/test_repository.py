@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, func, select
+
+from backend.benchmarks.synthetic import seed
+from backend.core.config import TEST_DATABASE_URL
+from backend.db import repository
+from backend.db.database import create_async_db_engine
+from backend.db.models import Match, Season
+from backend.tests.conftest import SCHEMA
+
+
+async def _count_statements(query, *args):
+    """Run ``query(session, *args)`` and return its result and the statements it ran."""
+    # Imported here: sqlalchemy.ext.asyncio needs greenlet, which only the API installs
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    engine = create_async_db_engine(TEST_DATABASE_URL, pooled=False)
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def _search_path(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'SET search_path TO {SCHEMA}')
+        cursor.close()
+
+    statements = []
+    try:
+        async with AsyncSession(engine) as session:
+            # Connects first, so only the statements of the query are counted
+            await session.execute(select(1))
+            event.listen(engine.sync_engine, 'before_cursor_execute',
+                         lambda *event_args: statements.append(event_args[2]))
+            result = await query(session, *args)
+    finally:
+        await engine.dispose()
+    return result, statements
+
+
+@pytest.fixture
+def seeded(connection):
+    pytest.importorskip('asyncpg')
+    pytest.importorskip('greenlet')
+    seed(connection, seasons=2, teams=4, players_per_team=3)
+    connection.commit()
+    # The last season is current and half played
+    season_id = connection.execute(select(func.max(Season.id))).scalar()
+    match = connection.execute(
+        select(Match.id, Match.home_team_id).where(Match.season_id == season_id).order_by(Match.date)
+    ).first()
+    return season_id, match
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('match_detail', 4),
+    ('season_summary', 3),
+    ('team_results', 1),
+    ('fixture_list', 1),
+])
+def test_statements_per_query(seeded, query, expected):
+    season_id, match = seeded
+    args = {
+        'match_detail': (match.id,),
+        'season_summary': (season_id,),
+        'team_results': (match.home_team_id, season_id),
+        'fixture_list': (season_id,),
+    }[query]
+    result, statements = asyncio.run(_count_statements(getattr(repository, query), *args))
+    assert result
+    assert len(statements) == expected, statements
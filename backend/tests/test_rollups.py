@@ -0,0 +1,65 @@
+from sqlalchemy import select
+
+from backend.benchmarks.synthetic import FINISHED, seed
+from backend.db.models import Match, PlayerMatchStatistics, PlayerStatistics
+from backend.db.rollups import KEY, recompute_player_statistics, rollup_player_statistics
+from backend.db.upsert import upsert
+
+SEASON_ID = 1
+
+
+def _match_rows(connection, players=3):
+    """One per-match row for the first ``players`` players of each side of every finished match of the season."""
+    matches = Match.__table__
+    matches = connection.execute(
+        select(matches).where(matches.c.season_id == SEASON_ID, matches.c.status == FINISHED)
+    ).mappings().all()
+    rows = []
+    for match in matches:
+        for team_id in (match['home_team_id'], match['away_team_id']):
+            for number in range(players):
+                rows.append({
+                    'match_id': match['id'], 'player_id': team_id * 1000 + number,
+                    'season_year': match['season_year'], 'team_id': team_id, 'league_id': match['league_id'],
+                    'season_id': SEASON_ID, 'minutes_played': 90 - 20 * number,
+                    'rating': 6.0 + number / 2 + match['id'] % 3,
+                    'captain': number == 0, 'substitute': number == 2, 'goals_total': (match['id'] + number) % 3,
+                    'assists': number % 2, 'passes_accuracy': 70 + number,
+                })
+    return rows
+
+
+def _totals(connection, keys):
+    totals = PlayerStatistics.__table__
+    statement = select(totals).order_by(*(totals.c[name] for name in KEY))
+    rows = [dict(row) for row in connection.execute(statement).mappings()]
+    return [{name: value for name, value in row.items() if name != 'id'} for row in rows
+            if tuple(row[name] for name in KEY) in keys]
+
+
+def test_incremental_rollup_matches_full_recompute(connection):
+    seed(connection, seasons=2, teams=6, players_per_team=5)
+    rows = _match_rows(connection)
+    keys = {tuple(row[name] for name in KEY) for row in rows}
+
+    # Written in two halves, each rolled up by the upsert
+    half = len(rows) // 2
+    upsert(connection, PlayerMatchStatistics, rows[:half])
+    upsert(connection, PlayerMatchStatistics, rows[half:])
+    # A counted row is corrected
+    corrected = {**rows[0], 'goals_total': rows[0]['goals_total'] + 2, 'rating': 9.5}
+    upsert(connection, PlayerMatchStatistics, [corrected])
+    # Rewriting the same values leaves nothing to roll up
+    upsert(connection, PlayerMatchStatistics, rows[1:])
+    assert rollup_player_statistics(connection, SEASON_ID) == 0
+    incremental = _totals(connection, keys)
+
+    recompute_player_statistics(connection, SEASON_ID)
+    recomputed = _totals(connection, keys)
+
+    assert len(recomputed) == len(keys)
+    assert incremental == recomputed
+    player = next(row for row in recomputed if row['player_id'] == corrected['player_id'])
+    assert player['goals_total'] == sum(
+        row['goals_total'] for row in [corrected, *rows[1:]] if row['player_id'] == corrected['player_id']
+    )
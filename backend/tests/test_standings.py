@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from backend.benchmarks.standings_engine import LEAGUE_ID, SEASON_ID, season_matches
+from backend.processing.standings import RULES, Rules, StandingsTable
+
+TEAMS = 12
+GROUPS = 4
+IGNORED = ('last_updated',)
+
+LIBERTADORES_GROUPS = Rules('libertadores groups', RULES['libertadores'].tiebreakers)
+
+
+def _rows(table):
+    return [{name: value for name, value in row.items() if name not in IGNORED} for row in table.records()]
+
+
+@pytest.mark.parametrize('random_seed', range(5))
+@pytest.mark.parametrize('rules, grouped', [
+    (RULES['brasileirao'], False),
+    (LIBERTADORES_GROUPS, True),
+    (RULES['default'], False),
+], ids=lambda value: getattr(value, 'name', None))
+def test_incremental_table_matches_full_recomputation(random_seed, rules, grouped):
+    matches = season_matches(TEAMS, random_seed)
+    # Every team has a stored row from the start, as load_groups finds them
+    teams = dict.fromkeys(range(1, TEAMS + 1))
+    groups = {team_id: f'Group {chr(65 + team_id % GROUPS)}' for team_id in teams} if grouped else teams
+    rng = random.Random(random_seed)
+    table = StandingsTable(LEAGUE_ID, SEASON_ID, rules, groups)
+    current = {}
+    for step, match in enumerate(rng.sample(matches, len(matches))):
+        applied = [match]
+        if rng.random() < 0.1:
+            # A corrected score arrives later
+            applied.append({**match, 'home_goals': rng.randint(0, 4), 'away_goals': rng.randint(0, 4)})
+        for version in applied:
+            table.apply(version)
+            current[version['match_id']] = version
+        if rng.random() < 0.05:
+            table.remove(match['match_id'])
+            del current[match['match_id']]
+        full = StandingsTable.from_matches(
+            LEAGUE_ID, SEASON_ID, sorted(current.values(), key=lambda m: (m['date'], m['match_id'])), rules, groups,
+        )
+        assert _rows(table) == _rows(full), step
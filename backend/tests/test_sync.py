@@ -0,0 +1,103 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from backend.benchmarks.synthetic import FINISHED, NOT_STARTED, generate, seed
+from backend.db.models import Match, MatchPredictions, Player, PlayerMatchStatistics, Standings, SyncWatermark
+from backend.ingestion.handlers import handle
+from backend.ingestion.sync import run_sync
+
+NEW_PLAYER_ID = 99999
+
+
+def _fixture(match, status, goals=(None, None)):
+    home_goals, away_goals = goals
+    return {
+        'fixture': {'id': match['id'], 'date': f"{match['date'].isoformat()}+00:00", 'referee': None,
+                    'venue': {'id': match['venue_id']}, 'status': {'long': status}},
+        'league': {'round': match['round']},
+        'teams': {'home': {'id': match['home_team_id'], 'winner': None},
+                  'away': {'id': match['away_team_id'], 'winner': None}},
+        'goals': {'home': home_goals, 'away': away_goals},
+        'score': {'fulltime': {'home': home_goals, 'away': away_goals}},
+    }
+
+
+class FakeFetcher:
+    """Answers the sync's requests from the synthetic season, with ``live`` finished 2-1."""
+
+    def __init__(self, data, live):
+        self.data = data
+        self.live = live
+        self.requests = []
+
+    def _fixtures(self, ids=None):
+        items = []
+        for match in self.data['matches']:
+            if ids is not None and match['id'] not in ids:
+                continue
+            if match['id'] == self.live['id']:
+                item = _fixture(match, FINISHED, (2, 1))
+                item['statistics'] = [{'team': {'id': match['home_team_id']},
+                                       'statistics': [{'type': 'Total Shots', 'value': 12}]}]
+                item['players'] = [{'team': {'id': match['home_team_id']}, 'players': [
+                    {'player': {'id': NEW_PLAYER_ID, 'name': 'New Signing', 'photo': None},
+                     'statistics': [{'games': {'minutes': 90}, 'goals': {'total': 2}}]},
+                ]}]
+            else:
+                item = _fixture(match, match['status'], (match['home_goals'], match['away_goals']))
+            items.append(item)
+        return {'response': items}
+
+    async def get(self, endpoint, ttl=None, **params):
+        self.requests.append((endpoint, params))
+        if endpoint == 'teams':
+            return {'response': [
+                {'team': {'id': team['id'], 'name': team['name'], 'country': team['country']},
+                 'venue': {'id': team['id'], 'name': f"Stadium {team['id']}", 'address': 'Street',
+                           'city': 'City'}}
+                for team in self.data['teams']
+            ]}
+        if endpoint == 'fixtures':
+            ids = {int(match_id) for match_id in params['ids'].split('-')} if 'ids' in params else None
+            return self._fixtures(ids)
+        if endpoint == 'standings':
+            return {'response': [{'league': {'standings': [
+                [{'team': {'id': team['id']}, 'group': 'Serie A'} for team in self.data['teams']],
+            ]}}]}
+        return {'response': []}
+
+
+def test_sync_writes_the_responses(connection):
+    seed(connection, seasons=1, teams=4, players_per_team=2)
+    connection.commit()
+    data = generate(seasons=1, teams=4, players_per_team=2)
+    upcoming = [match for match in data['matches'] if match['status'] == NOT_STARTED]
+    live = min(upcoming, key=lambda match: match['date'])
+    now = live['date'] + timedelta(hours=2)
+    fetcher = FakeFetcher(data, live)
+
+    totals = asyncio.run(run_sync(connection, fetcher, handle, now=now))
+
+    assert totals['requests'] == len(fetcher.requests) and totals['rows']
+    match = connection.execute(select(Match).where(Match.id == live['id'])).one()
+    assert (match.status, match.home_goals, match.away_goals) == (FINISHED, 2, 1)
+    assert connection.execute(select(Player.name).where(Player.id == NEW_PLAYER_ID)).scalar_one() == 'New Signing'
+    goals = connection.execute(
+        select(PlayerMatchStatistics.goals_total).where(PlayerMatchStatistics.match_id == live['id'])
+    ).scalar_one()
+    assert goals == 2
+    assert set(connection.execute(select(Standings.group_name).where(Standings.season_id == 1)).scalars()) == {
+        'Serie A'
+    }
+    entities = set(connection.execute(select(SyncWatermark.entity)).scalars())
+    assert {'teams', 'schedule', 'live', 'standings', 'team_statistics'} <= entities
+    connection.commit()
+
+    # The next tick has nothing new to ask: no teams, schedule nor finished match
+    fetcher.requests.clear()
+    asyncio.run(run_sync(connection, fetcher, handle, now=now + timedelta(minutes=5)))
+    assert {endpoint for endpoint, _ in fetcher.requests} <= {'predictions'}
+    predictions = connection.execute(select(MatchPredictions.match_id, MatchPredictions.last_updated)).all()
+    assert all(row.last_updated for row in predictions)